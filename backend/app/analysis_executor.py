@@ -0,0 +1,247 @@
+"""
+⚙️ Ejecutor de Análisis - ToxiGuard
+Saca el análisis del event loop de asyncio: un pool de hilos acotado para las
+peticiones (sklearn, numpy y torch liberan el GIL), otro para los niveles que
+la fusión lanza en paralelo y un pool de procesos opcional para los modos de
+reglas en Python puro. Limita la cola y aplica un timeout por petición.
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Configuración del ejecutor (sobrescribible por variables de entorno)
+EXECUTOR_CONFIG = {
+    "max_workers": int(os.getenv("ANALYSIS_WORKERS", "0")) or min(8, (os.cpu_count() or 1) + 2),
+    "request_workers": int(os.getenv("ANALYSIS_REQUEST_WORKERS", "0")) or min(8, (os.cpu_count() or 1) + 2),
+    "max_queue": int(os.getenv("ANALYSIS_MAX_QUEUE", "64")),          # Peticiones en espera además de las en curso
+    "request_timeout_seconds": float(os.getenv("ANALYSIS_TIMEOUT_SECONDS", "10")),
+    "batch_timeout_seconds": float(os.getenv("ANALYSIS_BATCH_TIMEOUT_SECONDS", "60")),
+    "process_workers": int(os.getenv("ANALYSIS_RULE_PROCESSES", "0")),  # 0 = sin pool de procesos
+    "process_modes": ["rules", "advanced"],                          # Modos en Python puro
+    # forkserver: los procesos no se bifurcan del servidor, que ya tiene hilos en marcha
+    "process_start_method": os.getenv("ANALYSIS_PROCESS_START_METHOD", "forkserver"),
+    "process_preload": [f"{__package__}.hybrid_classifier"],         # Módulos cargados una vez en el forkserver
+    "thread_name_prefix": "toxiguard-analysis"
+}
+
+
+class AnalysisOverloadedError(RuntimeError):
+    """La cola del ejecutor está llena (la API responde 503)"""
+
+
+class AnalysisTimeoutError(TimeoutError):
+    """El análisis superó el timeout de la petición (la API responde 504)"""
+
+
+def analyze_in_process(text: str, mode: str) -> Dict:
+    """Análisis dentro de un proceso del pool (usa la instancia global heredada o importada)"""
+    from .hybrid_classifier import hybrid_classifier
+    return hybrid_classifier.analyze_text(text, mode=mode)
+
+
+class AnalysisExecutor:
+    """Pools acotados para el trabajo de análisis fuera del event loop"""
+
+    def __init__(self, config: Dict[str, Any] = None):
+        """
+        Inicializa el ejecutor
+
+        Args:
+            config: Configuración (por defecto EXECUTOR_CONFIG)
+        """
+        self.config = {**EXECUTOR_CONFIG, **(config or {})}
+        self.max_workers = self.config["max_workers"]
+        self.request_workers = self.config["request_workers"]
+        self.max_in_flight = self.request_workers + self.config["max_queue"]
+        
+        # Pools separados: una petición en fusión espera a sus niveles sin ocupar sus hilos
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix=f"{self.config['thread_name_prefix']}-tier"
+        )
+        self._request_pool = ThreadPoolExecutor(
+            max_workers=self.request_workers,
+            thread_name_prefix=f"{self.config['thread_name_prefix']}-request"
+        )
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self.stats = {
+            "submitted": 0, "completed": 0, "failed": 0, "busy_time_ms": 0.0,
+            "requests": 0, "rejected": 0, "timeouts": 0, "process_requests": 0
+        }
+
+        logger.info(
+            f"✅ Ejecutor de análisis inicializado: {self.request_workers} hilos de petición, "
+            f"{self.max_workers} de nivel, cola máxima {self.config['max_queue']}"
+        )
+
+    def _timed(self, fn: Callable, *args, **kwargs) -> Any:
+        """Ejecuta la tarea acumulando tiempo y resultado en las estadísticas"""
+        start = time.perf_counter()
+        failed = False
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self.stats["failed" if failed else "completed"] += 1
+                self.stats["busy_time_ms"] += elapsed
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Envía una tarea al pool y devuelve su Future"""
+        with self._lock:
+            self.stats["submitted"] += 1
+        return self._pool.submit(self._timed, fn, *args, **kwargs)
+
+    def uses_process_pool(self, mode: str) -> bool:
+        """Indica si el modo se ejecuta en el pool de procesos"""
+        return self.config["process_workers"] > 0 and mode in self.config["process_modes"]
+
+    def _process_context(self) -> multiprocessing.context.BaseContext:
+        """
+        Contexto de multiprocessing del pool de procesos
+
+        Hacer fork del servidor con hilos en marcha (micro-batcher, escritor de la
+        caché compartida, trabajos) puede copiar locks tomados por otro hilo. Con
+        forkserver los procesos se bifurcan de un servidor sin hilos que precarga
+        los clasificadores una sola vez; sin forkserver (Windows) se usa spawn.
+        """
+        method = self.config["process_start_method"]
+        if method not in multiprocessing.get_all_start_methods():
+            method = "spawn"
+        context = multiprocessing.get_context(method)
+        if method == "forkserver" and self.config["process_preload"]:
+            context.set_forkserver_preload(self.config["process_preload"])
+        return context
+
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        """Crea el pool de procesos al primer uso"""
+        with self._lock:
+            if self._process_pool is None:
+                context = self._process_context()
+                self._process_pool = ProcessPoolExecutor(
+                    max_workers=self.config["process_workers"], mp_context=context
+                )
+                logger.info(
+                    f"✅ Pool de procesos de reglas iniciado con {self.config['process_workers']} procesos "
+                    f"({context.get_start_method()})"
+                )
+            return self._process_pool
+
+    def start_process_pool(self):
+        """Arranca el pool de procesos en el inicio (la carga de modelos no cae en la primera petición)"""
+        if self.config["process_workers"] > 0:
+            self._get_process_pool().submit(os.getpid)
+
+    async def run_analysis(self, fn: Callable, *args, timeout: Optional[float] = None,
+                           in_process: bool = False) -> Any:
+        """
+        Ejecuta un análisis de petición fuera del event loop
+
+        Args:
+            fn: Función a ejecutar (debe ser serializable si in_process=True)
+            timeout: Timeout en segundos (por defecto request_timeout_seconds)
+            in_process: Ejecutar en el pool de procesos en lugar del de hilos
+
+        Raises:
+            AnalysisOverloadedError: Si hay demasiadas peticiones en curso o en cola
+            AnalysisTimeoutError: Si el análisis no termina a tiempo
+        """
+        with self._lock:
+            if self._in_flight >= self.max_in_flight:
+                self.stats["rejected"] += 1
+                raise AnalysisOverloadedError(
+                    f"Servicio saturado: {self._in_flight} análisis en curso o en cola"
+                )
+            self._in_flight += 1
+            self.stats["requests"] += 1
+            if in_process:
+                self.stats["process_requests"] += 1
+
+        try:
+            if in_process:
+                future = self._get_process_pool().submit(fn, *args)
+            else:
+                future = self._request_pool.submit(self._timed, fn, *args)
+        except Exception:
+            self._release()
+            raise
+        # El hueco se libera cuando el trabajo termina de verdad, no al vencer el timeout
+        future.add_done_callback(lambda _: self._release())
+
+        timeout = timeout if timeout is not None else self.config["request_timeout_seconds"]
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            with self._lock:
+                self.stats["timeouts"] += 1
+            raise AnalysisTimeoutError(f"El análisis superó el timeout de {timeout:.1f}s")
+
+    def _release(self):
+        """Libera un hueco de petición"""
+        with self._lock:
+            self._in_flight -= 1
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Ejecuta una tarea en el pool de niveles sin bloquear el event loop"""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def get_info(self) -> Dict[str, Any]:
+        """Estado y contadores del ejecutor"""
+        with self._lock:
+            stats = dict(self.stats)
+            in_flight = self._in_flight
+        stats["busy_time_ms"] = round(stats["busy_time_ms"], 3)
+        return {
+            "max_workers": self.max_workers,
+            "request_workers": self.request_workers,
+            "max_queue": self.config["max_queue"],
+            "in_flight": in_flight,
+            "queued": max(in_flight - self.request_workers, 0),
+            "process_workers": self.config["process_workers"],
+            **stats
+        }
+
+    def _reset_after_fork(self):
+        """Recrea los pools en un hijo de fork (los hilos del padre no existen en el hijo)"""
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._process_pool = None
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix=f"{self.config['thread_name_prefix']}-tier"
+        )
+        self._request_pool = ThreadPoolExecutor(
+            max_workers=self.request_workers,
+            thread_name_prefix=f"{self.config['thread_name_prefix']}-request"
+        )
+
+    def shutdown(self, wait: bool = True):
+        """Detiene los pools (las tareas en curso terminan si wait=True)"""
+        self._request_pool.shutdown(wait=wait, cancel_futures=not wait)
+        self._pool.shutdown(wait=wait, cancel_futures=not wait)
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=wait, cancel_futures=not wait)
+        logger.info("🛑 Ejecutor de análisis detenido")
+
+
+# Instancia global del ejecutor
+analysis_executor = AnalysisExecutor()
+
+# Servidor pre-fork (app/server.py): cada worker necesita sus propios pools
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=analysis_executor._reset_after_fork)
@@ -15,7 +15,7 @@ logger = logging.getLogger(__name__)
 
 # Importar sentence-transformers de manera opcional
 try:
-    from sentence_transformers import SentenceTransformer, util
+    from sentence_transformers import SentenceTransformer
     SENTENCE_TRANSFORMERS_AVAILABLE = True
     logger.info("✅ Sentence Transformers disponible")
 except ImportError as e:
@@ -104,6 +104,10 @@ class ContextualToxicityClassifier:
             "racista", "xenofobo", "homofobo", "racist", "xenophobic", "homophobic"
         }
         
+        # Embeddings normalizados de los ejemplos, calculados una sola vez
+        self.example_embeddings: Dict[str, np.ndarray] = {}
+        self.encode_batch_size = 64
+        
         # Inicializar modelo de embeddings si está disponible
         self._initialize_embedding_model()
         
@@ -121,11 +125,28 @@ class ContextualToxicityClassifier:
         try:
             logger.info(f"🔄 Cargando modelo de embeddings: {self.model_name}")
             self.embedding_model = SentenceTransformer(self.model_name)
+            self._precompute_example_embeddings()
             logger.info("✅ Modelo de embeddings cargado exitosamente")
         except Exception as e:
             logger.error(f"❌ Error cargando modelo de embeddings: {e}")
             self.embedding_model = None
     
+    def _precompute_example_embeddings(self):
+        """Codifica todos los ejemplos de categoría en un solo lote y los normaliza"""
+        for category_name, category_info in self.toxicity_categories.items():
+            embeddings = np.asarray(
+                self.embedding_model.encode(category_info["examples"], batch_size=self.encode_batch_size),
+                dtype=np.float32
+            )
+            self.example_embeddings[category_name] = self._normalize_rows(embeddings)
+        logger.info(f"✅ Embeddings de {len(self.example_embeddings)} categorías precalculados")
+    
+    @staticmethod
+    def _normalize_rows(embeddings: np.ndarray) -> np.ndarray:
+        """Normaliza cada fila a norma 1 (el producto escalar pasa a ser similitud coseno)"""
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.maximum(norms, 1e-12)
+    
     def analyze_text(self, text: str) -> Dict:
         """
         Análisis contextual de toxicidad usando embeddings
@@ -136,26 +157,51 @@ class ContextualToxicityClassifier:
         Returns:
             Diccionario con el análisis completo de toxicidad contextual
         """
-        if not text or not text.strip():
+        return self.analyze_batch([text])[0]
+    
+    def analyze_batch(self, texts: List[str]) -> List[Dict]:
+        """
+        Análisis contextual de varios textos con una sola llamada a encode
+        
+        Las oraciones candidatas de todos los textos se codifican juntas y se
+        comparan con los embeddings precalculados de los ejemplos.
+        
+        Args:
+            texts: Textos a analizar
+            
+        Returns:
+            Lista de resultados en el mismo orden que los textos
+        """
+        try:
+            text_sentences = [
+                self._split_into_sentences(text) if text and text.strip() else []
+                for text in texts
+            ]
+            all_sentences = [sentence for sentences in text_sentences for sentence in sentences]
+            all_analyses = self._analyze_sentences_context(all_sentences)
+        except Exception as e:
+            logger.error(f"❌ Error en análisis contextual: {e}")
+            return [self._get_default_response() for _ in texts]
+        
+        results = []
+        offset = 0
+        for text, sentences in zip(texts, text_sentences):
+            sentence_analyses = all_analyses[offset:offset + len(sentences)]
+            offset += len(sentences)
+            results.append(self._build_result(text, sentences, sentence_analyses))
+        return results
+    
+    def _build_result(self, text: str, sentences: List[str], sentence_analyses: List[Dict]) -> Dict:
+        """Agrega los análisis por oración en el resultado del texto"""
+        if not text or not text.strip() or not sentences:
             return self._get_default_response()
         
         try:
-            # Dividir texto en oraciones para análisis contextual
-            sentences = self._split_into_sentences(text)
-            
-            if not sentences:
-                return self._get_default_response()
-            
-            # Análisis contextual por oración
-            sentence_analyses = []
             total_toxicity_score = 0.0
             detected_categories = set()
             explanations = {}
             
-            for sentence in sentences:
-                sentence_analysis = self._analyze_sentence_context(sentence)
-                sentence_analyses.append(sentence_analysis)
-                
+            for sentence_analysis in sentence_analyses:
                 total_toxicity_score += sentence_analysis["toxicity_score"]
                 detected_categories.update(sentence_analysis["categories"])
                 
@@ -218,47 +264,68 @@ class ContextualToxicityClassifier:
     
     def _analyze_sentence_context(self, sentence: str) -> Dict:
         """Analiza el contexto de una oración específica"""
+        return self._analyze_sentences_context([sentence])[0]
+    
+    def _analyze_sentences_context(self, sentences: List[str]) -> List[Dict]:
+        """Analiza el contexto de varias oraciones codificando las candidatas en un solo lote"""
         if not self.embedding_model:
             # Fallback sin embeddings
-            return self._analyze_sentence_fallback(sentence)
+            return [self._analyze_sentence_fallback(sentence) for sentence in sentences]
         
-        try:
+        analyses: List[Dict] = [None] * len(sentences)
+        candidates = []
+        for i, sentence in enumerate(sentences):
             # Verificar si la oración contiene palabras tóxicas
             sentence_lower = sentence.lower()
             toxic_words_found = [word for word in self.toxic_keywords if word in sentence_lower]
-            
-            if not toxic_words_found:
-                return {
+            if toxic_words_found:
+                candidates.append((i, toxic_words_found))
+            else:
+                analyses[i] = {
                     "toxicity_score": 0.0,
                     "categories": [],
                     "explanations": {},
                     "context_similarity": 0.0
                 }
+        
+        if not candidates:
+            return analyses
+        
+        try:
+            if not self.example_embeddings:
+                self._precompute_example_embeddings()
             
-            # Calcular embeddings para la oración
-            sentence_embedding = self.embedding_model.encode([sentence])[0]
+            # Un solo encode para todas las oraciones candidatas
+            sentence_embeddings = self._normalize_rows(np.asarray(
+                self.embedding_model.encode([sentences[i] for i, _ in candidates], batch_size=self.encode_batch_size),
+                dtype=np.float32
+            ))
             
-            # Comparar con ejemplos de cada categoría
-            max_similarity = 0.0
-            best_category = None
-            category_scores = {}
+            # Similitud máxima con los ejemplos de cada categoría (oraciones × categorías)
+            category_names = list(self.toxicity_categories)
+            similarity_matrix = np.column_stack([
+                (sentence_embeddings @ self.example_embeddings[name].T).max(axis=1)
+                for name in category_names
+            ])
             
-            for category_name, category_info in self.toxicity_categories.items():
-                category_similarities = []
-                
-                for example in category_info["examples"]:
-                    example_embedding = self.embedding_model.encode([example])[0]
-                    similarity = util.pytorch_cos_sim(sentence_embedding, example_embedding).item()
-                    category_similarities.append(similarity)
-                
-                # Usar la similitud máxima para esta categoría
-                max_category_similarity = max(category_similarities) if category_similarities else 0.0
-                category_scores[category_name] = max_category_similarity
-                
-                if max_category_similarity > max_similarity:
-                    max_similarity = max_category_similarity
-                    best_category = category_name
+            for row, (i, toxic_words_found) in enumerate(candidates):
+                category_scores = {name: float(similarity_matrix[row, j]) for j, name in enumerate(category_names)}
+                analyses[i] = self._score_sentence(sentences[i], category_scores, toxic_words_found)
+            return analyses
             
+        except Exception as e:
+            logger.error(f"❌ Error analizando oraciones: {e}")
+            return [
+                analysis if analysis is not None else self._analyze_sentence_fallback(sentences[i])
+                for i, analysis in enumerate(analyses)
+            ]
+    
+    def _score_sentence(self, sentence: str, category_scores: Dict[str, float],
+                        toxic_words_found: List[str]) -> Dict:
+        """Score de toxicidad de una oración a partir de su similitud con cada categoría"""
+        max_similarity = max(category_scores.values(), default=0.0)
+        
+        try:
             # Calcular score de toxicidad basado en similitud y peso de categoría
             toxicity_score = 0.0
             detected_categories = []
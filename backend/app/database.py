@@ -160,6 +160,41 @@ class AnalysisHistoryDB:
             
             return results
 
+    def get_top_texts(self, limit: int = 500, strategy: str = "frequent",
+                      scan_limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Textos distintos más analizados ("frequent") o más recientes ("recent")
+
+        Args:
+            limit: Número máximo de textos
+            strategy: "frequent" ordena por repeticiones, "recent" por último análisis
+            scan_limit: Considera solo los últimos N análisis (acota el coste en historiales grandes)
+        """
+        order_by = {
+            "frequent": "hits DESC, last_id DESC",
+            "recent": "last_id DESC"
+        }.get(strategy)
+        if order_by is None:
+            raise ValueError(f"Estrategia no válida: {strategy}. Usa 'frequent' o 'recent'")
+
+        source = "analysis_history"
+        params: List[Any] = []
+        if scan_limit:
+            source = "(SELECT id, text FROM analysis_history ORDER BY id DESC LIMIT ?)"
+            params.append(scan_limit)
+        params.append(limit)
+
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.execute(f"""
+                SELECT text, COUNT(*) AS hits, MAX(id) AS last_id
+                FROM {source}
+                GROUP BY text
+                ORDER BY {order_by}
+                LIMIT ?
+            """, params)
+            return [{"text": row["text"], "count": row["hits"]} for row in cursor.fetchall()]
+
 # Instancia global de la base de datos
 history_db = AnalysisHistoryDB()
 
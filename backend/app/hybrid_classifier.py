@@ -3,12 +3,36 @@
 Combina el clasificador avanzado ultra-sensible, contextual con embeddings, modelo de ML y clasificador basado en reglas
 """
 
+import copy
+import json
+import time
+import hashlib
 import logging
-from typing import Dict, List
-from .ml_classifier import ml_classifier
+import threading
+from concurrent.futures import wait
+from typing import Any, Dict, List, Optional
+from .ml_classifier import ml_classifier, ensemble_classifier, distilled_classifier
 from .improved_classifier import optimized_classifier
 from .contextual_classifier import contextual_classifier
 from .advanced_toxicity_classifier import advanced_toxicity_classifier
+from .analysis_executor import analysis_executor
+from .tier_monitor import latency_tracker, circuit_breakers
+from .micro_batcher import MicroBatcher
+from .result_cache import result_cache, encode_result, decode_result
+from .shared_cache import shared_cache
+from .single_flight import single_flight
+
+# Registro de modelos servibles (banda de confianza y profesor del estudiante destilado)
+try:
+    from ml.distillation import load_registry
+    from ml.config import DISTILLATION_CONFIG
+except ImportError:
+    load_registry = None
+    DISTILLATION_CONFIG = {
+        "teacher_weights": {"advanced": 0.4, "contextual": 0.3, "ml": 0.2, "rules": 0.1},
+        "confidence_band": (0.35, 0.65),
+        "min_feature_coverage": 0.5
+    }
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -16,10 +40,35 @@ logger = logging.getLogger(__name__)
 class HybridToxicityClassifier:
     """Clasificador híbrido que combina avanzado ultra-sensible, contextual, ML y reglas"""
     
+    # Modos de análisis seleccionables por petición o como valor por defecto global
+    SUPPORTED_MODES = ["advanced", "cascade", "fusion", "contextual", "ml", "ensemble", "distilled", "rules"]
+    
+    # Modos con ruta por lotes: niveles en orden de fallback (igual que _analyze_in_mode; después, reglas)
+    BATCH_TIER_CHAINS = {
+        "ml": ["ml"],
+        "ensemble": ["ensemble", "ml"],
+        "contextual": ["contextual", "ml"]
+    }
+    
+    # Niveles con circuit breaker que usa cada modo: con alguno retirado su resultado es parcial
+    MODE_BREAKER_TIERS = {
+        "advanced": [],
+        "rules": [],
+        "ensemble": [],
+        "ml": ["ml"],
+        "contextual": ["contextual"],
+        "cascade": ["ml", "contextual"],
+        "fusion": ["ml", "contextual"],
+        "distilled": ["ml", "contextual"]
+    }
+    
     def __init__(self):
         self.advanced_classifier = advanced_toxicity_classifier
         self.contextual_classifier = contextual_classifier
         self.ml_classifier = ml_classifier
+        self.ensemble_classifier = ensemble_classifier
+        self.distilled_classifier = distilled_classifier
+        self.distilled_config = self._load_distilled_config()
         self.rule_classifier = optimized_classifier
         
         # Orden de prioridad: avanzado > contextual > ML > reglas
@@ -27,24 +76,245 @@ class HybridToxicityClassifier:
         self.current_primary = "advanced"
         self.classification_technique = "Híbrido Ultra-Sensible (Avanzado + Contextual + ML + Reglas)"
         
+        # Configuración de la cascada: avanzado (keywords) → ML → contextual
+        self.cascade_config = {
+            "advanced_safe_below": 0.05,       # Score de reglas por debajo: seguro sin escalar
+            "advanced_toxic_above": 0.8,       # Score de reglas por encima: tóxico sin escalar
+            "uncertainty_band": (0.35, 0.65),  # Score combinado que escala a embeddings
+            "tier_weights": {"advanced": 0.4, "ml": 0.3, "contextual": 0.3},
+            "toxic_threshold": 0.5,
+            "level_thresholds": (0.3, 0.7)     # Límites safe / moderate / high_risk
+        }
+        
+        # Configuración de la fusión: niveles en paralelo con plazo por petición
+        self.fusion_config = {
+            "tier_weights": {"advanced": 0.35, "ml": 0.3, "contextual": 0.35},
+            "deadline_ms": 250.0,
+            "toxic_threshold": 0.5,
+            "level_thresholds": (0.3, 0.7)
+        }
+        self.executor = analysis_executor
+        self.latency_tracker = latency_tracker
+        self.circuit_breakers = circuit_breakers
+        
+        # Micro-batching de los niveles costosos: las peticiones concurrentes comparten
+        # una vectorización/predicción (ML) o un encode (contextual)
+        self.batchers = {
+            "ml": MicroBatcher("ml", lambda texts: self.ml_classifier.analyze_batch(texts)),
+            "contextual": MicroBatcher("contextual", lambda texts: self.contextual_classifier.analyze_batch(texts))
+        }
+        self._stats_lock = threading.Lock()
+        self._reset_cascade_stats()
+        
+        # Caché de resultados versionada por léxico y modelos
+        self.result_cache = result_cache
+        self.shared_cache = shared_cache
+        self.single_flight = single_flight
+        self._versions: Dict[str, str] = {}
+        self._versioned_objects: tuple = ()
+        
         logger.info("✅ Clasificador híbrido ultra-sensible mejorado inicializado")
     
-    def analyze_text(self, text: str) -> Dict:
+    def _load_distilled_config(self) -> Dict[str, Any]:
+        """
+        Banda de confianza del estudiante destilado y profesor al que delega
+        
+        El profesor es la mezcla ponderada de niveles con la que se generaron las
+        etiquetas suaves del estudiante (teacher_weights del registro de modelos).
+        """
+        config = {
+            "confidence_band": tuple(DISTILLATION_CONFIG["confidence_band"]),
+            "teacher_weights": dict(DISTILLATION_CONFIG["teacher_weights"]),
+            "min_feature_coverage": DISTILLATION_CONFIG.get("min_feature_coverage", 0.5),
+            "toxic_threshold": 0.5,          # Igual que las etiquetas del profesor en la destilación
+            "level_thresholds": (0.3, 0.7)
+        }
+        if load_registry is None:
+            return config
+        
+        try:
+            entry = load_registry().get("models", {}).get("distilled_student", {})
+            config["confidence_band"] = tuple(entry.get("confidence_band", config["confidence_band"]))
+            config["teacher_weights"] = dict(entry.get("teacher_weights", config["teacher_weights"]))
+            config["min_feature_coverage"] = entry.get("min_feature_coverage", config["min_feature_coverage"])
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo leer el registro de modelos: {e}")
+        return config
+    
+    @property
+    def distilled_band(self) -> tuple:
+        """Banda de probabilidad en la que el estudiante destilado delega al profesor"""
+        return self.distilled_config["confidence_band"]
+    
+    def available_modes(self) -> List[str]:
+        """Modos cuyos clasificadores están cargados en este despliegue"""
+        requirements = {
+            "contextual": self.contextual_classifier.embedding_model is not None,
+            "ml": self.ml_classifier.is_loaded,
+            "ensemble": self.ensemble_classifier.is_loaded,
+            "distilled": self.distilled_classifier.is_loaded
+        }
+        return [mode for mode in self.SUPPORTED_MODES if requirements.get(mode, True)]
+    
+    def resolve_mode(self, mode: Optional[str] = None) -> str:
+        """
+        Valida el modo pedido (None = modo por defecto global)
+        
+        Raises:
+            ValueError: Si el modo no existe o sus clasificadores no están cargados
+        """
+        if mode is None:
+            return self.current_primary
+        if mode not in self.SUPPORTED_MODES:
+            raise ValueError(f"Modo no válido: {mode}. Modos soportados: {', '.join(self.SUPPORTED_MODES)}")
+        if mode not in self.available_modes():
+            raise ValueError(f"Modo no disponible en este despliegue: {mode}. Disponibles: {', '.join(self.available_modes())}")
+        return mode
+    
+    def analyze_text(self, text: str, deadline_ms: Optional[float] = None, mode: Optional[str] = None) -> Dict:
         """
         Análisis híbrido ultra-sensible de toxicidad con prioridad al clasificador avanzado
         
         Args:
             text: Texto a analizar
+            deadline_ms: Plazo de la petición en modo fusión (por defecto el configurado)
+            mode: Modo de esta petición (por defecto el global de set_primary_classifier)
             
         Returns:
             Diccionario con el análisis completo de toxicidad ultra-sensible
+            
+        Raises:
+            ValueError: Si el modo pedido no es válido o no está cargado
         """
+        mode = self.resolve_mode(mode)
         if not text or not text.strip():
             return self._get_default_response()
         
+        cache_key = self._cache_key(text, mode)
+        if cache_key is not None and self.result_cache.enabled:
+            cached = self.result_cache.get(cache_key)
+            if cached is not None:
+                cached["details"]["cached"] = True
+                return cached
+        
+        # Las peticiones concurrentes con la misma clave comparten un único análisis
+        result, coalesced = self.single_flight.do(
+            cache_key, lambda: self._analyze_and_store(text, mode, deadline_ms, cache_key)
+        )
+        if coalesced:
+            result["details"]["coalesced"] = True
+        return result
+    
+    def _analyze_and_store(self, text: str, mode: str, deadline_ms: Optional[float],
+                           cache_key: Optional[str]) -> Dict:
+        """Fallo de la caché en proceso: consulta la compartida y, si tampoco está, analiza y guarda"""
+        if cache_key is not None:
+            payload = self.shared_cache.get(cache_key)
+            if payload is not None:
+                if self.result_cache.enabled:
+                    self.result_cache.put_payload(cache_key, payload)
+                result = decode_result(payload)
+                result["details"]["cached"] = True
+                return result
+        
+        result = self._analyze_in_mode(text, mode, deadline_ms)
+        result.setdefault("details", {})["mode"] = mode
+        self._cache_store(cache_key, result, mode)
+        return result
+    
+    def get_versions(self) -> Dict[str, str]:
+        """
+        Versiones del léxico y de los modelos para la clave de la caché
+        
+        Son hashes del contenido de los léxicos y de los ficheros de modelo
+        (estables entre procesos); solo se recalculan cuando cambian los patrones
+        compilados (_compile_patterns tras editar un léxico) o los objetos de
+        modelo/vectorizador (_load_model tras sustituir un fichero).
+        """
+        models = [self.ml_classifier, self.ensemble_classifier, self.distilled_classifier]
+        objects = (
+            self.advanced_classifier.category_patterns,
+            self.rule_classifier.category_patterns,
+            *[obj for classifier in models for obj in (classifier.model, classifier.vectorizer, classifier.multilabel_head)]
+        )
+        if len(objects) == len(self._versioned_objects) and all(
+            a is b for a, b in zip(objects, self._versioned_objects)
+        ):
+            return self._versions
+        
+        lexicons = {
+            "advanced": {name: info["keywords"] for name, info in self.advanced_classifier.toxicity_categories.items()},
+            "rules": {name: sorted(info["keywords"]) for name, info in self.rule_classifier.toxicity_categories.items()}
+        }
+        lexicon_hash = hashlib.sha1(json.dumps(lexicons, sort_keys=True).encode("utf-8"))
+        model_hash = hashlib.sha1(self.contextual_classifier.model_name.encode("utf-8"))
+        for classifier in models:
+            for path in (classifier.model_path, classifier.vectorizer_path, classifier.multilabel_head_path):
+                if path.exists():
+                    model_hash.update(path.read_bytes())
+        
+        versions = {"lexicon": lexicon_hash.hexdigest()[:12], "model": model_hash.hexdigest()[:12]}
+        if self._versions and versions != self._versions:
+            # Las entradas antiguas ya no se pueden acertar: liberar su memoria
+            self.result_cache.clear(f"versiones {self._versions} → {versions}")
+        self._versions, self._versioned_objects = versions, objects
+        return versions
+    
+    def _cache_key(self, text: str, mode: str) -> Optional[str]:
+        """Clave del análisis para las cachés y el single-flight (None si todo está desactivado)"""
+        if not (self.result_cache.enabled or self.shared_cache.enabled or self.single_flight.enabled):
+            return None
+        return self.result_cache.make_key(text, mode, self.get_versions())
+    
+    def _cache_store(self, cache_key: Optional[str], result: Dict, mode: str):
+        """
+        Guarda el resultado en ambas cachés salvo que sea parcial
+        
+        No se guardan la respuesta por defecto (error del análisis), los resultados
+        con algún nivel fallido, retirado por su breaker o fuera de plazo: un fallo
+        transitorio no debe fijar un veredicto incompleto durante todo el TTL.
+        """
+        if cache_key is None or "error" in result or result.get("model_used") == "hybrid_default":
+            return
+        details = result.get("details", {})
+        if (details.get("failed_tiers") or details.get("cascade", {}).get("failed")
+                or details.get("fusion", {}).get("failed")):
+            return
+        if not (self.result_cache.enabled or self.shared_cache.enabled):
+            return
+        mode_tiers = self.MODE_BREAKER_TIERS.get(mode, self.circuit_breakers.config["tiers"])
+        if set(self.circuit_breakers.open_tiers()) & set(mode_tiers):
+            return
+        if result.get("details", {}).get("fusion", {}).get("timed_out"):
+            return
+        payload = encode_result(result)
+        if self.result_cache.enabled:
+            self.result_cache.put_payload(cache_key, payload)
+        self.shared_cache.put_payload(cache_key, payload)
+    
+    def _analyze_in_mode(self, text: str, mode: str, deadline_ms: Optional[float] = None) -> Dict:
+        """Ejecuta el análisis con un modo ya validado (sin leer el estado global)"""
+        if mode == "cascade":
+            return self.analyze_cascade(text)
+        if mode == "fusion":
+            return self.analyze_fusion(text, deadline_ms)
+        
+        failed_tiers: List[str] = []
+        result = self._analyze_tier_chain(text, mode, failed_tiers)
+        if failed_tiers:
+            result.setdefault("details", {})["failed_tiers"] = failed_tiers
+        return result
+    
+    def _analyze_tier_chain(self, text: str, mode: str, failed_tiers: List[str]) -> Dict:
+        """Cadena de fallback de los modos de un nivel; anota en failed_tiers los niveles que fallan"""
         try:
+            # Estudiante destilado: responde si tiene confianza, si no delega a su profesor
+            if mode == "distilled" and self.distilled_classifier.is_loaded:
+                logger.debug("🎓 Usando estudiante destilado para análisis")
+                return self._analyze_distilled(text, failed_tiers)
+            
             # Usar el clasificador avanzado ultra-sensible primero (nuevo)
-            if self.current_primary == "advanced":
+            if mode == "advanced":
                 logger.debug("🚨 Usando clasificador avanzado ultra-sensible para análisis")
                 result = self.advanced_classifier.analyze_text(text)
                 
@@ -56,9 +326,10 @@ class HybridToxicityClassifier:
                     logger.warning("⚠️ Clasificador avanzado devolvió resultado inválido, usando fallback")
             
             # Intentar usar el clasificador contextual como segundo fallback
-            if self.current_primary in ["contextual", "advanced"] and self.contextual_classifier.embedding_model:
+            if (mode in ["contextual", "advanced"]
+                    and self.contextual_classifier.embedding_model and self.circuit_breakers.allow("contextual")):
                 logger.debug("🧠 Usando clasificador contextual para análisis")
-                result = self.contextual_classifier.analyze_text(text)
+                result = self._try_tier("contextual", self.contextual_classifier, text, failed_tiers)
                 
                 # Verificar que el resultado sea válido
                 if result and result.get("toxicity_percentage") is not None:
@@ -67,10 +338,22 @@ class HybridToxicityClassifier:
                 else:
                     logger.warning("⚠️ Clasificador contextual devolvió resultado inválido, usando fallback")
             
+            # Ensemble lineal apilado: todos los modelos lineales en un solo producto
+            if mode == "ensemble" and self.ensemble_classifier.is_loaded:
+                logger.debug("🧮 Usando ensemble lineal apilado para análisis")
+                result = self.ensemble_classifier.analyze_text(text)
+                
+                if result and result.get("toxicity_percentage") is not None:
+                    result["classification_technique"] = f"Híbrido - {result.get('classification_technique', 'Ensemble')}"
+                    return result
+                else:
+                    logger.warning("⚠️ Ensemble lineal devolvió resultado inválido, usando fallback")
+            
             # Intentar usar el modelo ML como tercer fallback
-            if self.current_primary in ["ml", "contextual", "advanced"] and self.ml_classifier.is_loaded:
+            if (mode in ["ml", "ensemble", "distilled", "contextual", "advanced"]
+                    and self.ml_classifier.is_loaded and self.circuit_breakers.allow("ml")):
                 logger.debug("🔬 Usando modelo ML para análisis")
-                result = self.ml_classifier.analyze_text(text)
+                result = self._try_tier("ml", self.ml_classifier, text, failed_tiers)
                 
                 # Verificar que el resultado sea válido
                 if result and result.get("toxicity_percentage") is not None:
@@ -92,6 +375,427 @@ class HybridToxicityClassifier:
             logger.error(f"❌ Error en análisis híbrido ultra-sensible: {e}")
             return self._get_default_response()
     
+    def _analyze_distilled(self, text: str, failed_tiers: Optional[List[str]] = None) -> Dict:
+        """
+        Estudiante destilado con delegación al profesor
+        
+        El estudiante responde si su probabilidad queda fuera de la banda de
+        confianza y conoce suficientes términos del texto (sin vocabulario
+        conocido su score es solo el sesgo del modelo, p. ej. textos en otro
+        idioma que el del corpus de destilación).
+        """
+        config = self.distilled_config
+        result = self.distilled_classifier.analyze_text(text)
+        details = result.get("details", {})
+        score = details.get("toxicity_score")
+        coverage = details.get("known_features", 0) / max(details.get("word_count") or len(text.split()), 1)
+        low, high = config["confidence_band"]
+        
+        if score is None:
+            reason = "invalid"
+        elif coverage < config["min_feature_coverage"]:
+            reason = "low_coverage"
+        elif low <= score <= high:
+            reason = "uncertain"
+        else:
+            result["classification_technique"] = f"Híbrido - {result.get('classification_technique', 'Destilado')}"
+            details["distilled"] = {"escalated": False, "student_score": score,
+                                    "feature_coverage": round(coverage, 3)}
+            return result
+        
+        logger.debug(f"🎓 Estudiante sin confianza ({reason}), delegando al profesor")
+        teacher = self._analyze_distilled_teacher(text, failed_tiers if failed_tiers is not None else [])
+        teacher["details"]["distilled"] = {
+            **teacher["details"].get("distilled", {}),
+            "escalated": True,
+            "reason": reason,
+            "student_score": score,
+            "feature_coverage": round(coverage, 3)
+        }
+        return teacher
+    
+    def _analyze_distilled_teacher(self, text: str, failed_tiers: List[str]) -> Dict:
+        """Profesor del estudiante: mezcla ponderada de niveles con los pesos de la destilación (anota los que fallan)"""
+        config = self.distilled_config
+        tier_scores: Dict[str, float] = {}
+        tier_results: Dict[str, Dict] = {}
+        
+        for tier, weight in config["teacher_weights"].items():
+            if weight <= 0:
+                continue
+            try:
+                if tier == "advanced":
+                    result = self.advanced_classifier.analyze_text(text)
+                elif tier == "rules":
+                    result = self.rule_classifier.analyze_text(text)
+                elif tier == "ml" and self.ml_classifier.is_loaded and self.circuit_breakers.allow("ml"):
+                    result, _ = self._timed_analyze("ml", self.ml_classifier, text)
+                elif (tier == "contextual" and self.contextual_classifier.embedding_model
+                        and self.circuit_breakers.allow("contextual")):
+                    result, _ = self._timed_analyze("contextual", self.contextual_classifier, text)
+                else:
+                    continue
+            except Exception as e:
+                logger.warning(f"⚠️ Nivel {tier} del profesor falló: {e}")
+                failed_tiers.append(tier)
+                continue
+            if result and result.get("toxicity_percentage") is not None:
+                tier_results[tier] = result
+                tier_scores[tier] = result["toxicity_percentage"] / 100
+        
+        if not tier_scores:
+            return self._normalize_rule_result(self.rule_classifier.analyze_text(text))
+        
+        # Base: el nivel de mayor prioridad que respondió (conserva explicaciones)
+        base_tier = next(tier for tier in self.classifier_priority if tier in tier_results)
+        base = tier_results[base_tier]
+        if base_tier == "rules":
+            base = self._normalize_rule_result(base)
+        result = self._apply_fused_score(base, self._fuse_scores(tier_scores, config["teacher_weights"]), config)
+        result["classification_technique"] = f"Híbrido - Profesor destilado ({' + '.join(tier_scores)})"
+        result["details"]["distilled"] = {"teacher_scores": {tier: round(score, 4) for tier, score in tier_scores.items()}}
+        return result
+    
+    def analyze_cascade(self, text: str, tiers: Optional[List[str]] = None) -> Dict:
+        """
+        Análisis en cascada por bandas de confianza
+        
+        El motor de keywords avanzado responde solo si es decisivo; si no, se
+        combina con el modelo ML, y los embeddings contextuales solo se
+        calculan cuando el score combinado cae en la banda de incertidumbre.
+        
+        Args:
+            text: Texto a analizar
+            tiers: Niveles utilizables (por defecto available_tiers())
+            
+        Returns:
+            Diccionario con el análisis y el detalle de niveles ejecutados
+        """
+        if not text or not text.strip():
+            return self._get_default_response()
+        
+        config = self.cascade_config
+        tiers = tiers if tiers is not None else self.available_tiers()
+        start_time = time.perf_counter()
+        tier_scores: Dict[str, float] = {}
+        tier_times: Dict[str, float] = {}
+        failed: List[str] = []
+        
+        try:
+            # Nivel 1: motor de keywords con ponderación de severidad
+            result = self._run_tier("advanced", self.advanced_classifier, text, tier_scores, tier_times)
+            exit_tier = "advanced"
+            
+            rules_score = tier_scores["advanced"]
+            rules_decisive = rules_score < config["advanced_safe_below"] or rules_score > config["advanced_toxic_above"]
+            
+            if not rules_decisive:
+                # Nivel 2: modelo ML cuando las reglas no son concluyentes
+                if "ml" in tiers and self.circuit_breakers.allow("ml"):
+                    tier_result = self._try_run_tier("ml", self.ml_classifier, text, tier_scores, tier_times, failed)
+                    if tier_result is not None:
+                        result, exit_tier = tier_result, "ml"
+                
+                # Nivel 3: embeddings solo dentro de la banda de incertidumbre
+                low, high = config["uncertainty_band"]
+                if (low <= self._fuse_scores(tier_scores) <= high and "contextual" in tiers
+                        and self.circuit_breakers.allow("contextual")):
+                    tier_result = self._try_run_tier("contextual", self.contextual_classifier, text,
+                                                     tier_scores, tier_times, failed)
+                    if tier_result is not None:
+                        result, exit_tier = tier_result, "contextual"
+                
+                result = self._apply_fused_score(result, self._fuse_scores(tier_scores))
+            
+            total_ms = (time.perf_counter() - start_time) * 1000
+            self._record_cascade(exit_tier, tier_times, total_ms)
+            
+            result["classification_technique"] = f"Híbrido en Cascada - {result.get('classification_technique', exit_tier)}"
+            result.setdefault("details", {})["cascade"] = {
+                "tiers_run": list(tier_scores),
+                "exit_tier": exit_tier,
+                "failed": failed,
+                "tier_scores": {tier: round(score, 4) for tier, score in tier_scores.items()},
+                "tier_times_ms": {tier: round(ms, 3) for tier, ms in tier_times.items()},
+                "total_time_ms": round(total_ms, 3)
+            }
+            return result
+            
+        except Exception as e:
+            logger.error(f"❌ Error en análisis en cascada: {e}")
+            return self._get_default_response()
+    
+    def analyze_fusion(self, text: str, deadline_ms: Optional[float] = None,
+                       tiers: Optional[List[str]] = None) -> Dict:
+        """
+        Análisis por fusión: avanzado, ML y contextual en paralelo
+        
+        Los niveles se lanzan a la vez en el ejecutor de análisis y se fusionan
+        con pesos configurables; si el plazo vence se usan los que hayan
+        terminado (los que siguen en curso terminan en segundo plano y se descartan).
+        
+        Args:
+            text: Texto a analizar
+            deadline_ms: Plazo de la petición (por defecto fusion_config["deadline_ms"])
+            tiers: Niveles utilizables (por defecto available_tiers())
+            
+        Returns:
+            Diccionario con el análisis fusionado y los niveles que contribuyeron
+        """
+        if not text or not text.strip():
+            return self._get_default_response()
+        
+        config = self.fusion_config
+        deadline_ms = deadline_ms if deadline_ms is not None else config["deadline_ms"]
+        start_time = time.perf_counter()
+        
+        tiers = tiers if tiers is not None else self.available_tiers()
+        classifiers = {
+            "advanced": self.advanced_classifier,
+            "ml": self.ml_classifier,
+            "contextual": self.contextual_classifier
+        }
+        
+        try:
+            futures = {
+                tier: self.executor.submit(self._timed_analyze, tier, classifier, text)
+                for tier, classifier in classifiers.items()
+                if tier in tiers and self.circuit_breakers.allow(tier)
+            }
+            wait(list(futures.values()), timeout=max(deadline_ms, 0.0) / 1000)
+            
+            tier_results, tier_scores, tier_times = {}, {}, {}
+            timed_out, failed = [], []
+            for tier, future in futures.items():
+                if not future.done():
+                    future.cancel()
+                    timed_out.append(tier)
+                elif future.cancelled() or future.exception() is not None:
+                    logger.warning(f"⚠️ Nivel {tier} falló en fusión: {future.exception() if not future.cancelled() else 'cancelado'}")
+                    failed.append(tier)
+                else:
+                    result, elapsed_ms = future.result()
+                    tier_results[tier] = result
+                    tier_times[tier] = elapsed_ms
+                    tier_scores[tier] = (result.get("toxicity_percentage") or 0.0) / 100
+            
+            if tier_results:
+                # Base: el nivel de mayor prioridad que terminó (conserva explicaciones)
+                base_tier = next(tier for tier in self.classifier_priority if tier in tier_results)
+                result = self._apply_fused_score(
+                    tier_results[base_tier],
+                    self._fuse_scores(tier_scores, config["tier_weights"]),
+                    config
+                )
+                technique = f"Híbrido Fusión ({' + '.join(tier_results)})"
+            else:
+                # Ningún nivel llegó a tiempo: respuesta inmediata por reglas
+                logger.warning(f"⚠️ Ningún nivel terminó en {deadline_ms:.0f}ms, usando reglas")
+                result = self._normalize_rule_result(self.rule_classifier.analyze_text(text))
+                technique = "Híbrido Fusión (reglas por plazo vencido)"
+            
+            result["classification_technique"] = technique
+            result.setdefault("details", {})["fusion"] = {
+                "contributed": list(tier_results),
+                "timed_out": timed_out,
+                "failed": failed,
+                "tier_scores": {tier: round(score, 4) for tier, score in tier_scores.items()},
+                "tier_times_ms": {tier: round(ms, 3) for tier, ms in tier_times.items()},
+                "deadline_ms": deadline_ms,
+                "total_time_ms": round((time.perf_counter() - start_time) * 1000, 3)
+            }
+            return result
+            
+        except Exception as e:
+            logger.error(f"❌ Error en análisis por fusión: {e}")
+            return self._get_default_response()
+    
+    def analyze_with_budget(self, text: str, budget_ms: float) -> Dict:
+        """
+        Análisis con presupuesto de latencia
+        
+        Elige la combinación de niveles más precisa cuyo p95 reciente (por
+        nivel y longitud de texto) cabe en el presupuesto; en fusión el
+        presupuesto se usa además como plazo.
+        
+        Args:
+            text: Texto a analizar
+            budget_ms: Presupuesto de latencia en milisegundos
+            
+        Returns:
+            Diccionario con el análisis y el plan elegido con su tiempo esperado y real
+        """
+        if not text or not text.strip():
+            return self._get_default_response()
+        
+        tiers = self.available_tiers()
+        plan, expected_ms = self.latency_tracker.select_plan(budget_ms, len(text), tiers)
+        start_time = time.perf_counter()
+        
+        if plan == "fusion":
+            result = self.analyze_fusion(text, deadline_ms=budget_ms, tiers=tiers)
+        elif plan == "cascade":
+            result = self.analyze_cascade(text, tiers=tiers)
+        else:
+            if not self.circuit_breakers.allow(plan):
+                # Semiabierto sin turno de sondeo: nivel avanzado (sin breaker)
+                plan, expected_ms = "advanced", self.latency_tracker.p95("advanced", len(text))
+            result = self._analyze_single_tier(plan, text)
+        
+        actual_ms = (time.perf_counter() - start_time) * 1000
+        result.setdefault("details", {})["mode"] = plan
+        result["details"]["budget"] = {
+            "budget_ms": budget_ms,
+            "selected_tier": plan,
+            "expected_time_ms": round(expected_ms, 3),
+            "actual_time_ms": round(actual_ms, 3)
+        }
+        return result
+    
+    def available_tiers(self) -> List[str]:
+        """
+        Niveles cargados y no retirados por su circuit breaker
+        
+        Consulta de solo lectura: los niveles en semiabierto se incluyen y el turno
+        de sondeo se pide (allow) justo antes de ejecutar cada nivel.
+        """
+        tiers = ["rules", "advanced"]
+        if self.ml_classifier.is_loaded and self.circuit_breakers.is_available("ml"):
+            tiers.append("ml")
+        if self.contextual_classifier.embedding_model and self.circuit_breakers.is_available("contextual"):
+            tiers.append("contextual")
+        return tiers
+    
+    def _analyze_single_tier(self, tier: str, text: str) -> Dict:
+        """Analiza con un único nivel registrando su latencia"""
+        classifiers = {
+            "advanced": self.advanced_classifier,
+            "ml": self.ml_classifier,
+            "contextual": self.contextual_classifier,
+            "rules": self.rule_classifier
+        }
+        try:
+            result, _ = self._timed_analyze(tier, classifiers[tier], text)
+            if tier == "rules":
+                result = self._normalize_rule_result(result)
+            result["classification_technique"] = f"Híbrido - {result.get('classification_technique', tier)}"
+            return result
+        except Exception as e:
+            logger.error(f"❌ Error en nivel {tier}: {e}")
+            return self._get_default_response()
+    
+    def _timed_analyze(self, tier: str, classifier: Any, text: str) -> tuple:
+        """
+        Analiza el texto con un nivel y devuelve (resultado, milisegundos)
+        
+        Registra la latencia en el monitor y el resultado en el circuit breaker del nivel.
+        """
+        tier_start = time.perf_counter()
+        batcher = self.batchers.get(tier)
+        try:
+            result = batcher.process(text) if batcher else classifier.analyze_text(text)
+        except Exception:
+            self.circuit_breakers.record(tier, (time.perf_counter() - tier_start) * 1000, success=False)
+            raise
+        elapsed_ms = (time.perf_counter() - tier_start) * 1000
+        self.latency_tracker.record(tier, len(text), elapsed_ms)
+        self.circuit_breakers.record(tier, elapsed_ms, success=bool(result) and result.get("toxicity_percentage") is not None)
+        return result, elapsed_ms
+    
+    def _try_tier(self, tier: str, classifier: Any, text: str, failed_tiers: List[str]) -> Optional[Dict]:
+        """Analiza con un nivel de la cadena de fallback (None si falla, para pasar al siguiente)"""
+        try:
+            result, _ = self._timed_analyze(tier, classifier, text)
+            return result
+        except Exception as e:
+            logger.warning(f"⚠️ Nivel {tier} falló, usando fallback: {e}")
+            failed_tiers.append(tier)
+            return None
+    
+    def _run_tier(self, tier: str, classifier: Any, text: str,
+                  tier_scores: Dict[str, float], tier_times: Dict[str, float]) -> Dict:
+        """Ejecuta un nivel de la cascada y registra su score y tiempo"""
+        result, tier_times[tier] = self._timed_analyze(tier, classifier, text)
+        tier_scores[tier] = (result.get("toxicity_percentage") or 0.0) / 100
+        return result
+    
+    def _try_run_tier(self, tier: str, classifier: Any, text: str, tier_scores: Dict[str, float],
+                      tier_times: Dict[str, float], failed: List[str]) -> Optional[Dict]:
+        """Nivel de la cascada que, si falla, se omite y se anota en failed (se fusiona con los ya ejecutados)"""
+        try:
+            return self._run_tier(tier, classifier, text, tier_scores, tier_times)
+        except Exception as e:
+            logger.warning(f"⚠️ Nivel {tier} falló en cascada, se omite: {e}")
+            failed.append(tier)
+            return None
+    
+    def _fuse_scores(self, tier_scores: Dict[str, float], weights: Dict[str, float] = None) -> float:
+        """Promedio ponderado de los scores de los niveles ejecutados"""
+        weights = weights or self.cascade_config["tier_weights"]
+        total_weight = sum(weights.get(tier, 0.0) for tier in tier_scores)
+        if total_weight <= 0:
+            return max(tier_scores.values(), default=0.0)
+        return sum(weights.get(tier, 0.0) * score for tier, score in tier_scores.items()) / total_weight
+    
+    def _apply_fused_score(self, result: Dict, score: float, config: Dict = None) -> Dict:
+        """Sustituye el veredicto del nivel base por el score combinado"""
+        config = config or self.cascade_config
+        low, high = config["level_thresholds"]
+        result = dict(result)
+        result["is_toxic"] = score >= config["toxic_threshold"]
+        result["toxicity_percentage"] = round(score * 100, 2)
+        result["toxicity_level"] = "safe" if score < low else "moderate" if score < high else "high_risk"
+        result["details"] = {**result.get("details", {}), "toxicity_score": round(score, 4)}
+        return result
+    
+    def _reset_cascade_stats(self):
+        """Reinicia los contadores de escalado de la cascada"""
+        with self._stats_lock:
+            self.cascade_stats = {
+                "requests": 0,
+                "tier_runs": {"advanced": 0, "ml": 0, "contextual": 0},
+                "exits": {"advanced": 0, "ml": 0, "contextual": 0},
+                "tier_time_ms": {"advanced": 0.0, "ml": 0.0, "contextual": 0.0},
+                "total_time_ms": 0.0
+            }
+    
+    def _record_cascade(self, exit_tier: str, tier_times: Dict[str, float], total_ms: float):
+        """Acumula las estadísticas de una petición en cascada"""
+        with self._stats_lock:
+            stats = self.cascade_stats
+            stats["requests"] += 1
+            stats["exits"][exit_tier] += 1
+            stats["total_time_ms"] += total_ms
+            for tier, elapsed in tier_times.items():
+                stats["tier_runs"][tier] += 1
+                stats["tier_time_ms"][tier] += elapsed
+    
+    def get_cascade_stats(self) -> Dict:
+        """Tasas de escalado y latencia media por nivel de la cascada"""
+        with self._stats_lock:
+            stats = {key: (dict(value) if isinstance(value, dict) else value) for key, value in self.cascade_stats.items()}
+        
+        requests = stats["requests"]
+        runs = stats["tier_runs"]
+        return {
+            "requests": requests,
+            "escalation_rates": {
+                "ml": round(runs["ml"] / requests, 4) if requests else 0.0,
+                "contextual": round(runs["contextual"] / requests, 4) if requests else 0.0
+            },
+            "exit_rates": {tier: round(count / requests, 4) if requests else 0.0 for tier, count in stats["exits"].items()},
+            "tier_runs": runs,
+            "avg_tier_time_ms": {
+                tier: round(stats["tier_time_ms"][tier] / count, 3) if count else 0.0
+                for tier, count in runs.items()
+            },
+            "avg_total_time_ms": round(stats["total_time_ms"] / requests, 3) if requests else 0.0,
+            "config": {
+                key: list(value) if isinstance(value, tuple) else value
+                for key, value in self.cascade_config.items()
+            }
+        }
+    
     def _normalize_rule_result(self, rule_result: Dict) -> Dict:
         """Normaliza el resultado del clasificador basado en reglas"""
         try:
@@ -137,13 +841,156 @@ class HybridToxicityClassifier:
             }
         }
     
-    def batch_analyze(self, texts: List[str]) -> List[Dict]:
+    def analyze_texts(self, texts: List[str], mode: Optional[str] = None) -> List[Dict]:
+        """
+        Análisis completo de varios textos usando la ruta por lotes del modo cuando existe
+        
+        Los textos repetidos (misma clave de caché) se analizan una sola vez y
+        los ya cacheados no se analizan. Los modos ml, ensemble y contextual
+        vectorizan/codifican los pendientes de una vez; el resto analiza texto a texto.
+        
+        Args:
+            texts: Textos a analizar
+            mode: Modo (por defecto el global)
+            
+        Returns:
+            Lista de resultados en el mismo orden que los textos
+        """
+        mode = self.resolve_mode(mode)
+        
+        # Deduplicar: los textos con la misma clave forman un grupo que se analiza una vez
+        groups: Dict[Any, List[int]] = {}
+        for index, text in enumerate(texts):
+            key = self._cache_key(text, mode) if text and text.strip() else None
+            groups.setdefault(key if key is not None else ("uncached", index), []).append(index)
+        
+        results: List[Optional[Dict]] = [None] * len(texts)
+        missing = []
+        for key, positions in groups.items():
+            cached = self.result_cache.get(key) if isinstance(key, str) and self.result_cache.enabled else None
+            if cached is not None:
+                cached["details"]["cached"] = True
+                self._fill_positions(results, positions, cached)
+            else:
+                missing.append((key, positions))
+        
+        # Segundo nivel: una sola consulta a la caché compartida para todos los fallos
+        shared = self.shared_cache.get_many([key for key, _ in missing if isinstance(key, str)])
+        to_analyze = []
+        for key, positions in missing:
+            payload = shared.get(key) if isinstance(key, str) else None
+            if payload is None:
+                to_analyze.append((key, positions))
+                continue
+            if self.result_cache.enabled:
+                self.result_cache.put_payload(key, payload)
+            cached = decode_result(payload)
+            cached["details"]["cached"] = True
+            self._fill_positions(results, positions, cached)
+        
+        unique_texts = [texts[positions[0]] for _, positions in to_analyze]
+        if mode not in self.BATCH_TIER_CHAINS:
+            analyses = []
+            for (key, _), text in zip(to_analyze, unique_texts):
+                if isinstance(key, tuple):
+                    analyses.append(self.analyze_text(text, mode=mode))
+                    continue
+                result = self._analyze_in_mode(text, mode)
+                result.setdefault("details", {})["mode"] = mode
+                self._cache_store(key, result, mode)
+                analyses.append(result)
+        else:
+            analyses = self._analyze_batch_in_mode(unique_texts, mode) if unique_texts else []
+            for (key, _), result in zip(to_analyze, analyses):
+                result.setdefault("details", {})["mode"] = mode
+                if isinstance(key, str):
+                    self._cache_store(key, result, mode)
+        
+        for (_, positions), result in zip(to_analyze, analyses):
+            self._fill_positions(results, positions, result)
+        return results
+    
+    def _batch_tiers(self, mode: str) -> List[tuple]:
+        """Niveles (nombre, clasificador) cargados de la cadena por lotes del modo, en orden"""
+        classifiers = {
+            "ml": (self.ml_classifier, self.ml_classifier.is_loaded),
+            "ensemble": (self.ensemble_classifier, self.ensemble_classifier.is_loaded),
+            "contextual": (self.contextual_classifier, self.contextual_classifier.embedding_model is not None)
+        }
+        return [(tier, classifiers[tier][0]) for tier in self.BATCH_TIER_CHAINS[mode] if classifiers[tier][1]]
+    
+    def _analyze_batch_in_mode(self, texts: List[str], mode: str) -> List[Dict]:
+        """
+        Ruta por lotes de un modo con la misma cadena que _analyze_in_mode
+        
+        Cada nivel se consulta a su circuit breaker, analiza de una vez los textos
+        pendientes y registra su latencia (amortizada por texto); los textos con
+        resultado inválido o de un nivel que falla pasan al siguiente nivel y, al
+        final, a las reglas.
+        """
+        results: List[Optional[Dict]] = [None] * len(texts)
+        pending = list(range(len(texts)))
+        failed_tiers: List[str] = []
+        failed_pending: set = set()
+        
+        for tier, classifier in self._batch_tiers(mode):
+            if not pending:
+                break
+            if not self.circuit_breakers.allow(tier):
+                continue
+            
+            batch = [texts[i] for i in pending]
+            tier_start = time.perf_counter()
+            try:
+                analyses = classifier.analyze_batch(batch)
+            except Exception as e:
+                self.circuit_breakers.record(tier, (time.perf_counter() - tier_start) * 1000 / len(batch), success=False)
+                logger.warning(f"⚠️ Nivel {tier} falló en lote ({len(batch)} textos), usando fallback: {e}")
+                failed_tiers.append(tier)
+                failed_pending.update(pending)
+                continue
+            
+            per_text_ms = (time.perf_counter() - tier_start) * 1000 / len(batch)
+            still_pending = []
+            for index, result in zip(pending, analyses):
+                if result and result.get("toxicity_percentage") is not None:
+                    result["classification_technique"] = f"Híbrido - {result.get('classification_technique', tier)}"
+                    results[index] = result
+                    self.latency_tracker.record(tier, len(texts[index]), per_text_ms)
+                else:
+                    still_pending.append(index)
+            self.circuit_breakers.record(tier, per_text_ms, success=not still_pending)
+            if still_pending:
+                logger.warning(f"⚠️ Nivel {tier} devolvió {len(still_pending)} resultados inválidos en lote, usando fallback")
+            pending = still_pending
+        
+        # Fallback al clasificador basado en reglas
+        for index in pending:
+            results[index] = self._analyze_in_mode(texts[index], "rules")
+        
+        # Los textos que pasaron por un nivel caído llevan la marca (no se cachean)
+        for index in failed_pending:
+            results[index].setdefault("details", {})["failed_tiers"] = list(failed_tiers)
+        return results
+    
+    def _fill_positions(self, results: List[Optional[Dict]], positions: List[int], result: Dict):
+        """Asigna un resultado a todas las posiciones de un grupo (copias para los repetidos)"""
+        results[positions[0]] = result
+        for index in positions[1:]:
+            results[index] = copy.deepcopy(result)
+    
+    def get_batcher_stats(self) -> Dict:
+        """Métricas de micro-batching por nivel"""
+        return {tier: batcher.get_stats() for tier, batcher in self.batchers.items()}
+    
+    def batch_analyze(self, texts: List[str], mode: Optional[str] = None) -> List[Dict]:
         """Análisis en lote usando el clasificador híbrido ultra-sensible"""
         results = []
+        mode = self.resolve_mode(mode)
         
         for text in texts:
             try:
-                result = self.analyze_text(text)
+                result = self.analyze_text(text, mode=mode)
                 results.append({
                     "text": text,
                     "is_toxic": result["is_toxic"],
@@ -190,6 +1037,20 @@ class HybridToxicityClassifier:
                 "is_available": self.ml_classifier.is_loaded,
                 "performance": self.ml_classifier.get_model_info().get("performance", {})
             },
+            "ensemble_classifier": {
+                "type": "Stacked Linear Ensemble (LR + SVM + NB)",
+                "technique": self.ensemble_classifier.classification_technique,
+                "is_available": self.ensemble_classifier.is_loaded,
+                "members": self.ensemble_classifier.model.get_info() if self.ensemble_classifier.is_loaded and hasattr(self.ensemble_classifier.model, "get_info") else {}
+            },
+            "distilled_classifier": {
+                "type": "Distilled Linear Student",
+                "technique": self.distilled_classifier.classification_technique,
+                "is_available": self.distilled_classifier.is_loaded,
+                "confidence_band": list(self.distilled_band),
+                "teacher_weights": self.distilled_config["teacher_weights"],
+                "min_feature_coverage": self.distilled_config["min_feature_coverage"]
+            },
             "fallback_classifier": {
                 "type": "Rules-based",
                 "technique": self.rule_classifier.classification_technique if hasattr(self.rule_classifier, 'classification_technique') else "Análisis de Patrones",
@@ -197,6 +1058,14 @@ class HybridToxicityClassifier:
                 "description": "Clasificador basado en keywords y patrones"
             },
             "hybrid_mode": "Advanced Ultra-Sensitive primary + Contextual secondary + ML tertiary + Rules fallback",
+            "current_mode": self.current_primary,
+            "available_modes": self.available_modes(),
+            "cascade": self.get_cascade_stats(),
+            "circuit_breakers": self.circuit_breakers.get_states(),
+            "fusion": {
+                **{key: list(value) if isinstance(value, tuple) else value for key, value in self.fusion_config.items()},
+                "executor": self.executor.get_info()
+            },
             "current_technique": self.classification_technique,
             "ultra_sensitive_features": {
                 "sentence_analysis": True,
@@ -209,12 +1078,14 @@ class HybridToxicityClassifier:
         }
     
     def set_primary_classifier(self, classifier_type: str = "advanced"):
-        """Cambia el clasificador principal"""
-        if classifier_type in ["advanced", "contextual", "ml", "rules"]:
-            self.current_primary = classifier_type
-            logger.info(f"🔄 Clasificador principal cambiado a: {classifier_type}")
-        else:
-            logger.warning(f"⚠️ Tipo de clasificador no válido: {classifier_type}")
+        """
+        Cambia el modo por defecto de las peticiones que no indican uno
+        
+        Raises:
+            ValueError: Si el modo no es válido o no está cargado
+        """
+        self.current_primary = self.resolve_mode(classifier_type)
+        logger.info(f"🔄 Clasificador principal cambiado a: {classifier_type}")
 
 # Instancia global del clasificador híbrido ultra-sensible mejorado
 hybrid_classifier = HybridToxicityClassifier()
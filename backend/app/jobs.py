@@ -0,0 +1,579 @@
+"""
+🗂️ Trabajos en Lote - ToxiGuard
+Análisis en segundo plano de ficheros CSV/JSONL completos (barridos nocturnos de
+moderación): el fichero se procesa por bloques con la ruta por lotes del
+clasificador, el estado y el progreso se guardan en SQLite y los resultados se
+escriben como JSONL comprimido con gzip. Un trabajo interrumpido (reinicio,
+caída) continúa desde el último bloque confirmado.
+"""
+
+import os
+import csv
+import asyncio
+import json
+import gzip
+import time
+import uuid
+import socket
+import logging
+import sqlite3
+import threading
+from itertools import islice
+from datetime import datetime
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .streaming import format_result, format_error
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Configuración de los trabajos (sobrescribible por variables de entorno)
+JOBS_CONFIG = {
+    "db_path": os.getenv("JOBS_DB_PATH", "jobs.db"),
+    "storage_dir": os.getenv("JOBS_DIR", "jobs_data"),           # Ficheros subidos y resultados
+    # Directorios desde los que se pueden leer ficheros del servidor (separados por os.pathsep)
+    "input_dirs": [
+        directory for directory in os.getenv(
+            "JOBS_INPUT_DIRS", str(Path(__file__).resolve().parents[2] / "data")
+        ).split(os.pathsep) if directory
+    ],
+    "chunk_size": int(os.getenv("JOBS_CHUNK_SIZE", "256")),
+    "max_upload_bytes": int(float(os.getenv("JOBS_MAX_UPLOAD_MB", "512")) * 1024 * 1024),
+    "upload_buffer_bytes": 1024 * 1024,                          # Escritura a disco por trozos de 1 MB
+    "default_text_column": "Text",                               # Columna de los CSV exportados
+    "max_text_length": 10000,
+    "poll_seconds": 1.0,                                         # Búsqueda de trabajos en cola
+    "stale_seconds": 300.0,                                      # Trabajo de otro host sin latido se reanuda
+    "heartbeat_seconds": 30.0,                                   # Latido mientras se cuenta o analiza
+    "formats": {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+}
+
+# Estados de un trabajo
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+
+class UploadTooLargeError(Exception):
+    """El fichero subido supera JOBS_MAX_UPLOAD_MB"""
+    pass
+
+
+class JobManager:
+    """Cola persistente de trabajos de análisis con un hilo de procesamiento por proceso"""
+
+    def __init__(self, config: Dict[str, Any] = None):
+        """
+        Inicializa el gestor
+
+        Args:
+            config: Configuración (por defecto JOBS_CONFIG)
+        """
+        self.config = {**JOBS_CONFIG, **(config or {})}
+        self.db_path = Path(self.config["db_path"])
+        self.storage_dir = Path(self.config["storage_dir"])
+        self.analyze_fn: Optional[Callable[[List[str], str], List[Dict]]] = None
+        self._thread: Optional[threading.Thread] = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self.init_database()
+
+    @property
+    def owner(self) -> str:
+        """Proceso que procesa el trabajo (cada worker pre-fork tiene el suyo)"""
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def init_database(self):
+        """Crea la tabla de trabajos"""
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    input_path TEXT NOT NULL,
+                    input_format TEXT NOT NULL,
+                    text_column TEXT NOT NULL,
+                    id_column TEXT,
+                    mode TEXT NOT NULL,
+                    total_rows INTEGER,
+                    processed_rows INTEGER NOT NULL DEFAULT 0,
+                    error_rows INTEGER NOT NULL DEFAULT 0,
+                    toxic_rows INTEGER NOT NULL DEFAULT 0,
+                    output_path TEXT NOT NULL,
+                    output_bytes INTEGER NOT NULL DEFAULT 0,  -- Tamaño confirmado del .jsonl.gz
+                    owner TEXT,
+                    error TEXT,
+                    elapsed_seconds REAL NOT NULL DEFAULT 0,  -- Acumulado entre reanudaciones
+                    run_started_at REAL,
+                    run_start_rows INTEGER NOT NULL DEFAULT 0,
+                    heartbeat_at REAL,
+                    created_at DATETIME NOT NULL,
+                    finished_at DATETIME
+                )
+            """)
+            conn.commit()
+
+    # ------------------------------------------------------------------
+    # Creación y consulta
+    # ------------------------------------------------------------------
+
+    def detect_format(self, filename: Optional[str] = None, input_format: Optional[str] = None,
+                      content_type: Optional[str] = None) -> str:
+        """Formato explícito o deducido de la extensión o del Content-Type"""
+        if input_format:
+            if input_format not in ("csv", "jsonl"):
+                raise ValueError(f"Formato no soportado: {input_format}. Formatos: csv, jsonl")
+            return input_format
+        if filename:
+            detected = self.config["formats"].get(Path(filename).suffix.lower())
+            if detected:
+                return detected
+        content_type = (content_type or "").split(";")[0].strip().lower()
+        if content_type in ("text/csv", "application/csv"):
+            return "csv"
+        if content_type in ("application/x-ndjson", "application/jsonl", "application/x-jsonlines"):
+            return "jsonl"
+        raise ValueError("No se pudo deducir el formato: indicar format=csv o format=jsonl")
+
+    def resolve_input_path(self, path: str) -> Path:
+        """Valida un fichero del servidor: debe existir dentro de los directorios permitidos"""
+        resolved = Path(path).resolve()
+        allowed = [Path(directory).resolve() for directory in self.config["input_dirs"]]
+        if not any(resolved == directory or directory in resolved.parents for directory in allowed):
+            raise ValueError(f"Ruta no permitida: los ficheros deben estar en {', '.join(map(str, allowed))}")
+        if not resolved.is_file():
+            raise ValueError(f"El fichero no existe: {path}")
+        return resolved
+
+    def new_job_dir(self) -> Tuple[str, Path]:
+        """Identificador y directorio de un trabajo nuevo"""
+        job_id = uuid.uuid4().hex
+        job_dir = self.storage_dir / job_id
+        job_dir.mkdir(parents=True, exist_ok=True)
+        return job_id, job_dir
+
+    async def save_upload(self, job_dir: Path, input_format: str, byte_stream: AsyncIterator[bytes],
+                          content_length: Optional[int] = None) -> Path:
+        """
+        Guarda en disco el cuerpo de la petición sin bloquear el event loop
+
+        Raises:
+            UploadTooLargeError: Si el cuerpo supera max_upload_bytes
+            ValueError: Si el cuerpo está vacío
+        """
+        max_bytes = self.config["max_upload_bytes"]
+        if content_length is not None and content_length > max_bytes:
+            self._discard_dir(job_dir)
+            raise UploadTooLargeError(f"El fichero supera el límite de {max_bytes // (1024 * 1024)} MB")
+
+        input_path = job_dir / f"input.{input_format}"
+        f = await asyncio.to_thread(open, input_path, "wb")
+        size = 0
+        buffer = bytearray()
+        try:
+            async for chunk in byte_stream:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(f"El fichero supera el límite de {max_bytes // (1024 * 1024)} MB")
+                buffer += chunk
+                if len(buffer) >= self.config["upload_buffer_bytes"]:
+                    await asyncio.to_thread(f.write, bytes(buffer))
+                    buffer.clear()
+            if buffer:
+                await asyncio.to_thread(f.write, bytes(buffer))
+        except BaseException:
+            await asyncio.to_thread(f.close)
+            self._discard_dir(job_dir)
+            raise
+        await asyncio.to_thread(f.close)
+
+        if size == 0:
+            self._discard_dir(job_dir)
+            raise ValueError("El fichero está vacío: enviarlo como cuerpo o indicar path")
+        return input_path
+
+    def _discard_dir(self, job_dir: Path):
+        """Elimina el directorio de un trabajo que no llegó a crearse"""
+        for child in job_dir.glob("*"):
+            child.unlink()
+        job_dir.rmdir()
+
+    def create_job(self, job_id: str, input_path: Path, input_format: str, mode: str,
+                   text_column: Optional[str] = None, id_column: Optional[str] = None) -> Dict[str, Any]:
+        """Registra un trabajo en cola y despierta al hilo de procesamiento"""
+        job_dir = self.storage_dir / job_id
+        job_dir.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                INSERT INTO jobs (
+                    id, status, input_path, input_format, text_column, id_column,
+                    mode, output_path, created_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                job_id, JOB_QUEUED, str(input_path), input_format,
+                text_column or self.config["default_text_column"], id_column,
+                mode, str(job_dir / "results.jsonl.gz"), datetime.now().isoformat()
+            ))
+            conn.commit()
+        logger.info(f"🗂️ Trabajo {job_id} en cola ({input_format}, modo {mode})")
+        self._wake.set()
+        return self.get_job(job_id)
+
+    def _row(self, job_id: str) -> Optional[sqlite3.Row]:
+        with self._connect() as conn:
+            return conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+    def _describe(self, row: sqlite3.Row) -> Dict[str, Any]:
+        """Estado público de un trabajo con progreso, velocidad y tiempo restante"""
+        job = dict(row)
+        total, processed = job["total_rows"], job["processed_rows"]
+        elapsed = job["elapsed_seconds"]
+        throughput = None
+        if job["status"] == JOB_RUNNING and job["run_started_at"]:
+            run_elapsed = time.time() - job["run_started_at"]
+            elapsed += run_elapsed
+            if run_elapsed > 0:
+                throughput = (processed - job["run_start_rows"]) / run_elapsed
+        elif elapsed > 0:
+            throughput = processed / elapsed
+
+        eta = None
+        if job["status"] == JOB_RUNNING and total is not None and throughput:
+            eta = max(total - processed, 0) / throughput
+
+        return {
+            "id": job["id"],
+            "status": job["status"],
+            "input_format": job["input_format"],
+            "text_column": job["text_column"],
+            "id_column": job["id_column"],
+            "mode": job["mode"],
+            "total_rows": total,
+            "processed_rows": processed,
+            "error_rows": job["error_rows"],
+            "toxic_rows": job["toxic_rows"],
+            "progress": round(processed / total, 4) if total else (1.0 if job["status"] == JOB_COMPLETED else 0.0),
+            "rows_per_second": round(throughput, 2) if throughput is not None else None,
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+            "elapsed_seconds": round(elapsed, 2),
+            "results_available": job["status"] == JOB_COMPLETED,
+            "error": job["error"],
+            "created_at": job["created_at"],
+            "finished_at": job["finished_at"]
+        }
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Estado de un trabajo (None si no existe)"""
+        row = self._row(job_id)
+        return self._describe(row) if row else None
+
+    def list_jobs(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Trabajos más recientes"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [self._describe(row) for row in rows]
+
+    def results_path(self, job_id: str) -> Optional[Path]:
+        """Fichero de resultados de un trabajo terminado"""
+        row = self._row(job_id)
+        if row is None or row["status"] != JOB_COMPLETED:
+            return None
+        return Path(row["output_path"])
+
+    def cancel_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Cancela un trabajo en cola o en curso (el bloque en curso termina antes de parar)"""
+        with self._connect() as conn:
+            conn.execute("""
+                UPDATE jobs SET status = ?, finished_at = ?
+                WHERE id = ? AND status IN (?, ?)
+            """, (JOB_CANCELLED, datetime.now().isoformat(), job_id, JOB_QUEUED, JOB_RUNNING))
+            conn.commit()
+        return self.get_job(job_id)
+
+    # ------------------------------------------------------------------
+    # Procesamiento
+    # ------------------------------------------------------------------
+
+    def start(self, analyze_fn: Callable[[List[str], str], List[Dict]]):
+        """
+        Arranca el hilo de procesamiento y reanuda los trabajos interrumpidos
+
+        Args:
+            analyze_fn: Función por lotes analyze_fn(texts, mode) -> resultados
+        """
+        self.analyze_fn = analyze_fn
+        self._stop.clear()
+        self._requeue_orphans()
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="toxiguard-jobs", daemon=True)
+            self._thread.start()
+        logger.info("✅ Gestor de trabajos iniciado")
+
+    def shutdown(self, timeout: float = 5.0):
+        """Detiene el hilo; el trabajo en curso vuelve a la cola y se reanuda al arrancar"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _is_orphan(self, owner: Optional[str], heartbeat_at: Optional[float], now: float) -> bool:
+        """
+        Indica si un trabajo en curso perdió a su dueño
+
+        En este host se comprueba el proceso (un análisis lento no lo convierte
+        en huérfano); en otro host solo se puede juzgar por el latido.
+        """
+        if not owner or ":" not in owner:
+            return True
+        host, pid = owner.rsplit(":", 1)
+        if host != socket.gethostname():
+            return heartbeat_at is None or now - heartbeat_at > self.config["stale_seconds"]
+        try:
+            os.kill(int(pid), 0)
+            return False
+        except (OSError, ValueError):
+            return True
+
+    def _requeue_orphans(self):
+        """Devuelve a la cola los trabajos cuyo proceso murió (o, en otro host, dejó de latir)"""
+        now = time.time()
+        with self._connect() as conn:
+            rows = conn.execute("SELECT id, owner, heartbeat_at FROM jobs WHERE status = ?",
+                                (JOB_RUNNING,)).fetchall()
+            for row in rows:
+                if self._is_orphan(row["owner"], row["heartbeat_at"], now):
+                    conn.execute("UPDATE jobs SET status = ?, owner = NULL WHERE id = ? AND status = ?",
+                                 (JOB_QUEUED, row["id"], JOB_RUNNING))
+                    logger.info(f"🔁 Trabajo {row['id']} interrumpido, se reanudará")
+            conn.commit()
+
+    def _claim_next(self) -> Optional[sqlite3.Row]:
+        """Reclama el trabajo en cola más antiguo (atómico entre workers del servidor pre-fork)"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT id FROM jobs WHERE status = ? ORDER BY created_at",
+                                (JOB_QUEUED,)).fetchall()
+            for row in rows:
+                claimed = conn.execute("""
+                    UPDATE jobs SET status = ?, owner = ?, run_started_at = ?,
+                        run_start_rows = processed_rows, heartbeat_at = ?
+                    WHERE id = ? AND status = ?
+                """, (JOB_RUNNING, self.owner, time.time(), time.time(), row["id"], JOB_QUEUED))
+                conn.commit()
+                if claimed.rowcount == 1:
+                    return conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+        return None
+
+    def _run(self):
+        """Bucle del hilo de procesamiento"""
+        while not self._stop.is_set():
+            try:
+                self._requeue_orphans()
+                job = self._claim_next()
+            except sqlite3.Error as e:
+                logger.error(f"❌ Error consultando trabajos: {e}")
+                job = None
+
+            if job is None:
+                self._wake.wait(self.config["poll_seconds"])
+                self._wake.clear()
+                continue
+
+            try:
+                self._process(job)
+            except Exception as e:
+                logger.error(f"❌ Trabajo {job['id']} falló: {e}")
+                self._finish(job["id"], JOB_FAILED, error=str(e))
+
+    def _iter_rows(self, job: sqlite3.Row) -> Iterator[Tuple[Optional[str], Any]]:
+        """Filas del fichero de entrada como (texto, id); texto None si la fila no lo tiene"""
+        text_column, id_column = job["text_column"], job["id_column"]
+
+        if job["input_format"] == "csv":
+            csv.field_size_limit(max(csv.field_size_limit(), 10 * 1024 * 1024))
+            with open(job["input_path"], "r", encoding="utf-8-sig", newline="") as f:
+                reader = csv.DictReader(f)
+                if reader.fieldnames is None or text_column not in reader.fieldnames:
+                    raise ValueError(
+                        f"La columna '{text_column}' no existe. Columnas: {', '.join(reader.fieldnames or [])}"
+                    )
+                for record in reader:
+                    yield record.get(text_column), record.get(id_column) if id_column else None
+            return
+
+        with open(job["input_path"], "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    value = json.loads(line)
+                except json.JSONDecodeError:
+                    yield None, None
+                    continue
+                if isinstance(value, str):
+                    yield value, None
+                elif isinstance(value, dict):
+                    text = value.get(text_column, value.get("text"))
+                    yield text if isinstance(text, str) else None, value.get(id_column) if id_column else None
+                else:
+                    yield None, None
+
+    def _count_rows(self, job: sqlite3.Row) -> int:
+        """Número de filas del fichero (para progreso y tiempo restante)"""
+        return sum(1 for _ in self._iter_rows(job))
+
+    def _job_status(self, job_id: str) -> Optional[str]:
+        row = self._row(job_id)
+        return row["status"] if row else None
+
+    @contextmanager
+    def _heartbeat(self, job_id: str):
+        """Mantiene el latido del trabajo mientras se cuenta el fichero o se analiza un bloque largo"""
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(self.config["heartbeat_seconds"]):
+                try:
+                    with self._connect() as conn:
+                        conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND owner = ?",
+                                     (time.time(), job_id, self.owner))
+                        conn.commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"⚠️ No se pudo actualizar el latido del trabajo {job_id}: {e}")
+
+        thread = threading.Thread(target=beat, name=f"toxiguard-job-heartbeat-{job_id[:8]}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def _analyze_chunk(self, rows: List[Tuple[int, Optional[str], Any]], mode: str) -> Tuple[List[Dict], int]:
+        """Analiza un bloque de filas y devuelve sus líneas de resultado y el número de errores"""
+        max_length = self.config["max_text_length"]
+        valid = [(index, text, row_id) for index, text, row_id in rows
+                 if text and text.strip() and len(text) <= max_length]
+        analyses = self.analyze_fn([text for _, text, _ in valid], mode) if valid else []
+        results = {
+            index: format_result({"index": index, "id": row_id}, analysis)
+            for (index, _, row_id), analysis in zip(valid, analyses)
+        }
+
+        lines = []
+        for index, text, row_id in rows:
+            if index in results:
+                lines.append(results[index])
+            elif text is None:
+                lines.append(format_error({"index": index, "id": row_id}, "Fila sin texto válido"))
+            elif not text.strip():
+                lines.append(format_error({"index": index, "id": row_id}, "El texto no puede estar vacío"))
+            else:
+                lines.append(format_error(
+                    {"index": index, "id": row_id}, f"El texto excede el límite de {max_length:,} caracteres"
+                ))
+        return lines, len(rows) - len(results)
+
+    def _process(self, job: sqlite3.Row):
+        """Procesa un trabajo desde su última fila confirmada"""
+        with self._heartbeat(job["id"]):
+            self._process_rows(job)
+
+    def _process_rows(self, job: sqlite3.Row):
+        """Cuenta las filas si hace falta y analiza el resto del fichero bloque a bloque"""
+        job_id = job["id"]
+        if job["total_rows"] is None:
+            total = self._count_rows(job)
+            with self._connect() as conn:
+                conn.execute("UPDATE jobs SET total_rows = ? WHERE id = ?", (total, job_id))
+                conn.commit()
+
+        processed = job["processed_rows"]
+        output_path = Path(job["output_path"])
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        if processed:
+            logger.info(f"🔁 Reanudando trabajo {job_id} desde la fila {processed}")
+        else:
+            logger.info(f"▶️ Procesando trabajo {job_id}")
+
+        # Lo escrito tras el último bloque confirmado (caída a mitad de bloque) se descarta
+        with open(output_path, "ab") as out:
+            out.truncate(job["output_bytes"])
+
+        chunk_size = self.config["chunk_size"]
+        rows = islice(enumerate(self._iter_rows(job)), processed, None)
+        while True:
+            chunk = [(index, text, row_id) for index, (text, row_id) in islice(rows, chunk_size)]
+            if not chunk:
+                break
+            if self._stop.is_set():
+                self._pause(job_id)
+                return
+            if self._job_status(job_id) != JOB_RUNNING:
+                logger.info(f"⏹️ Trabajo {job_id} cancelado en la fila {processed}")
+                self._close_run(job_id)
+                return
+
+            lines, errors = self._analyze_chunk(chunk, job["mode"])
+            toxic = sum(1 for line in lines if line.get("is_toxic"))
+
+            # Cada bloque es un miembro gzip completo: el fichero es válido tras cada confirmación
+            payload = "".join(json.dumps(line, ensure_ascii=False) + "\n" for line in lines).encode("utf-8")
+            with open(output_path, "ab") as out:
+                out.write(gzip.compress(payload))
+                out.flush()
+                os.fsync(out.fileno())
+                output_bytes = out.tell()
+
+            processed += len(chunk)
+            with self._connect() as conn:
+                updated = conn.execute("""
+                    UPDATE jobs SET processed_rows = ?, error_rows = error_rows + ?,
+                        toxic_rows = toxic_rows + ?, output_bytes = ?, heartbeat_at = ?
+                    WHERE id = ? AND owner = ?
+                """, (processed, errors, toxic, output_bytes, time.time(), job_id, self.owner))
+                conn.commit()
+            if updated.rowcount == 0:
+                # Otro proceso reanudó el trabajo: deja de escribir en su fichero
+                logger.warning(f"⚠️ Trabajo {job_id} reclamado por otro proceso, se abandona")
+                return
+
+        self._finish(job_id, JOB_COMPLETED)
+        logger.info(f"✅ Trabajo {job_id} completado: {processed} filas")
+
+    def _close_run(self, job_id: str, status: Optional[str] = None, error: Optional[str] = None):
+        """Acumula el tiempo de la ejecución actual y opcionalmente cambia el estado"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT run_started_at FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            run_elapsed = time.time() - row["run_started_at"] if row and row["run_started_at"] else 0.0
+            conn.execute("""
+                UPDATE jobs SET elapsed_seconds = elapsed_seconds + ?, run_started_at = NULL, owner = NULL
+                WHERE id = ?
+            """, (run_elapsed, job_id))
+            if status is not None:
+                finished_at = datetime.now().isoformat() if status != JOB_QUEUED else None
+                # Una cancelación concurrente prevalece sobre el estado final
+                conn.execute("UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ? AND status = ?",
+                             (status, error, finished_at, job_id, JOB_RUNNING))
+            conn.commit()
+
+    def _finish(self, job_id: str, status: str, error: Optional[str] = None):
+        self._close_run(job_id, status, error)
+
+    def _pause(self, job_id: str):
+        """Devuelve el trabajo a la cola al detener el servidor"""
+        self._close_run(job_id, JOB_QUEUED)
+        logger.info(f"⏸️ Trabajo {job_id} pausado, se reanudará al arrancar")
+
+
+# Instancia global del gestor de trabajos
+job_manager = JobManager()
@@ -3,10 +3,18 @@ ToxiGuard Backend - Advanced Toxicity Detection API
 FastAPI application with ML-powered text analysis capabilities
 """
 
-from fastapi import FastAPI, HTTPException, Request
+if __name__ == "__main__":
+    # python -m app.main: lanzador pre-fork (modelos cargados una vez y compartidos por
+    # los workers). Se delega antes de importar la aplicación para que se cargue una
+    # sola vez, como app.main, y no también como __main__
+    from app.server import main
+    raise SystemExit(main())
+
+from fastapi import FastAPI, HTTPException, Request, Header, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, FileResponse
 import time
+import asyncio
 import logging
 from datetime import datetime
 from typing import List, Optional
@@ -18,6 +26,16 @@ from .services import (
     contextual_classifier,
     history_db
 )
+from .analysis_executor import (
+    analysis_executor,
+    analyze_in_process,
+    AnalysisOverloadedError,
+    AnalysisTimeoutError
+)
+from .streaming import stream_analysis, RequestBodyChannel, ChannelStreamingResponse, STREAM_CONFIG
+from .jobs import job_manager, UploadTooLargeError
+from .routing import cluster_router
+from .warmup import cache_warmer
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -71,12 +89,42 @@ async def startup_event():
             logger.info("✅ Clasificador contextual con embeddings disponible")
         else:
             logger.info("⚠️ Clasificador contextual sin embeddings")
+        
+        # Pool de procesos de reglas (si está configurado) antes de que arranquen trabajos y precalentamiento
+        analysis_executor.start_process_pool()
+        
+        # Trabajos en lote: reanuda los interrumpidos por un reinicio
+        job_manager.start(primary_classifier.analyze_texts)
+        
+        # Precalentar la caché con los textos más frecuentes del historial (se omite si
+        # el maestro pre-fork ya lo hizo antes de crear este worker)
+        if history_db:
+            cache_warmer.start(history_db.get_top_texts, primary_classifier.analyze_texts, cluster_router.owns)
+            wait_seconds = cache_warmer.config["wait_seconds"]
+            if wait_seconds > 0 and not await asyncio.to_thread(cache_warmer.wait, wait_seconds):
+                logger.info("🔥 Precalentamiento aún en curso, se completa en segundo plano")
             
         logger.info("🚀 ToxiGuard API iniciada exitosamente")
         
     except Exception as e:
         logger.error(f"❌ Error durante el inicio: {e}")
 
+def warm_cache_before_fork():
+    """Precalienta en el maestro pre-fork: los workers heredan la caché en proceso"""
+    if history_db:
+        cache_warmer.run(history_db.get_top_texts, primary_classifier.analyze_texts, cluster_router.owns)
+        if hasattr(primary_classifier, 'shared_cache'):
+            primary_classifier.shared_cache.flush()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Evento de cierre: detiene el precalentamiento, los trabajos en lote y el ejecutor, y vacía la cola de la caché compartida"""
+    cache_warmer.shutdown()
+    job_manager.shutdown()
+    analysis_executor.shutdown(wait=False)
+    if hasattr(primary_classifier, 'shared_cache'):
+        primary_classifier.shared_cache.close()
+
 @app.middleware("http")
 async def add_process_time_header(request: Request, call_next):
     """Middleware para agregar tiempo de procesamiento a las respuestas"""
@@ -95,7 +143,47 @@ async def value_error_handler(request: Request, exc: ValueError):
         content={
             "error": "Error de validación",
             "detail": str(exc),
-            "timestamp": datetime.now()
+            "timestamp": datetime.now().isoformat()
+        }
+    )
+
+@app.exception_handler(AnalysisOverloadedError)
+async def overloaded_handler(request: Request, exc: AnalysisOverloadedError):
+    """Cola de análisis llena: el cliente debe reintentar más tarde"""
+    logger.warning(f"Servicio saturado: {exc}")
+    return JSONResponse(
+        status_code=503,
+        headers={"Retry-After": "1"},
+        content={
+            "error": "Servicio saturado",
+            "detail": str(exc),
+            "timestamp": datetime.now().isoformat()
+        }
+    )
+
+@app.exception_handler(AnalysisTimeoutError)
+async def analysis_timeout_handler(request: Request, exc: AnalysisTimeoutError):
+    """El análisis superó el timeout de la petición"""
+    logger.warning(f"Timeout de análisis: {exc}")
+    return JSONResponse(
+        status_code=504,
+        content={
+            "error": "Timeout de análisis",
+            "detail": str(exc),
+            "timestamp": datetime.now().isoformat()
+        }
+    )
+
+@app.exception_handler(UploadTooLargeError)
+async def upload_too_large_handler(request: Request, exc: UploadTooLargeError):
+    """Fichero de trabajo mayor que JOBS_MAX_UPLOAD_MB"""
+    logger.warning(f"Fichero demasiado grande: {exc}")
+    return JSONResponse(
+        status_code=413,
+        content={
+            "error": "Fichero demasiado grande",
+            "detail": str(exc),
+            "timestamp": datetime.now().isoformat()
         }
     )
 
@@ -108,7 +196,7 @@ async def general_exception_handler(request: Request, exc: Exception):
         content={
             "error": "Error interno del servidor",
             "detail": "Ocurrió un error inesperado",
-            "timestamp": datetime.now()
+            "timestamp": datetime.now().isoformat()
         }
     )
 
@@ -156,10 +244,10 @@ async def get_classifier_info():
 @app.post("/switch-classifier")
 async def switch_classifier(classifier_type: str = "contextual"):
     """
-    Cambiar entre clasificadores disponibles
+    Cambiar el modo por defecto de las peticiones que no indican `mode`
     
     Args:
-        classifier_type: "contextual", "ml", o "rules"
+        classifier_type: "advanced", "cascade", "fusion", "contextual", "ml", "ensemble", "distilled" o "rules"
         
     Returns:
         Confirmación del cambio
@@ -170,7 +258,7 @@ async def switch_classifier(classifier_type: str = "contextual"):
             return {
                 "message": f"Clasificador cambiado a: {classifier_type}",
                 "current_mode": f"{classifier_type} primary",
-                "available_classifiers": ["contextual", "ml", "rules"],
+                "available_classifiers": primary_classifier.available_modes(),
                 "timestamp": datetime.now()
             }
         else:
@@ -179,6 +267,8 @@ async def switch_classifier(classifier_type: str = "contextual"):
                 "current_mode": "Fixed",
                 "timestamp": datetime.now()
             }
+    except ValueError:
+        raise
     except Exception as e:
         logger.error(f"Error cambiando clasificador: {e}")
         raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
@@ -186,8 +276,11 @@ async def switch_classifier(classifier_type: str = "contextual"):
 @app.get("/health")
 async def health_check():
     """Verificación de salud optimizada con estado ultra-sensible"""
+    # Niveles retirados por su circuit breaker: el servicio responde con los restantes
+    breakers = getattr(primary_classifier, 'circuit_breakers', None)
+    degraded_tiers = breakers.open_tiers() if breakers else []
     return {
-        "status": "healthy",
+        "status": "degraded" if degraded_tiers else "healthy",
         "timestamp": datetime.now(),
         "classifier": "hybrid_ultra_sensitive",
         "database": "connected" if history_db else "disconnected",
@@ -197,9 +290,41 @@ async def health_check():
             "severity_weighting": True,
             "ultra_sensitive_thresholds": True,
             "repetition_analysis": True
-        }
+        },
+        "degraded_tiers": degraded_tiers,
+        "cache_warmup": cache_warmer.status,
+        "circuit_breakers": breakers.get_states() if breakers else {}
     }
 
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Métricas de la cascada de clasificadores
+    
+    Returns:
+        Tasas de escalado por nivel y latencias medias
+    """
+    metrics = {"timestamp": datetime.now()}
+    if hasattr(primary_classifier, 'get_cascade_stats'):
+        metrics["cascade"] = primary_classifier.get_cascade_stats()
+    if hasattr(primary_classifier, 'latency_tracker'):
+        metrics["tier_latency_p95"] = primary_classifier.latency_tracker.get_stats()
+    metrics["executor"] = analysis_executor.get_info()
+    if hasattr(primary_classifier, 'get_batcher_stats'):
+        metrics["micro_batching"] = primary_classifier.get_batcher_stats()
+    if hasattr(primary_classifier, 'result_cache'):
+        metrics["result_cache"] = {
+            **primary_classifier.result_cache.get_stats(),
+            "versions": primary_classifier.get_versions()
+        }
+    if hasattr(primary_classifier, 'shared_cache'):
+        metrics["shared_cache"] = primary_classifier.shared_cache.get_stats()
+    if hasattr(primary_classifier, 'single_flight'):
+        metrics["single_flight"] = primary_classifier.single_flight.get_stats()
+    metrics["routing"] = cluster_router.get_stats()
+    metrics["warmup"] = cache_warmer.get_stats()
+    return metrics
+
 @app.get("/info")
 async def get_info():
     """Información del sistema optimizada con capacidades ultra-sensibles"""
@@ -245,20 +370,32 @@ async def get_info():
             "/info",
             "/analyze",
             "/batch-analyze",
+            "/batch-analyze/stream",
+            "/jobs",
             "/history",
             "/stats",
             "/classifier-info",
-            "/switch-classifier"
+            "/switch-classifier",
+            "/metrics"
         ]
     }
 
 @app.post("/analyze", response_model=AnalyzeResponse)
-async def analyze_text(request: AnalyzeRequest):
+async def analyze_text(
+    request: AnalyzeRequest,
+    x_latency_budget_ms: Optional[float] = Header(None, gt=0),
+    x_toxiguard_forwarded: Optional[str] = Header(None)
+):
     """
     Análisis optimizado de toxicidad de texto con análisis contextual
     
+    Con enrutado de clúster (CLUSTER_NODES), la petición se reenvía al nodo dueño
+    del texto en el anillo de hash consistente; si no responde, se analiza aquí.
+    
     Args:
         request: Solicitud de análisis
+        x_latency_budget_ms: Presupuesto de latencia (cabecera X-Latency-Budget-Ms)
+        x_toxiguard_forwarded: Cabecera de reenvío entre nodos (evita bucles)
         
     Returns:
         Respuesta con análisis de toxicidad optimizado y contextual
@@ -272,8 +409,42 @@ async def analyze_text(request: AnalyzeRequest):
         if len(request.text) > 10000:
             raise ValueError("El texto excede el límite de 10,000 caracteres")
         
+        # Enrutado por hash consistente: el nodo dueño del texto lo analiza y lo cachea
+        owner = cluster_router.route(request.text, x_toxiguard_forwarded)
+        if owner is not None:
+            headers = {"X-Latency-Budget-Ms": str(x_latency_budget_ms)} if x_latency_budget_ms else {}
+            forwarded = await asyncio.to_thread(
+                cluster_router.forward, owner, "/analyze", request.model_dump(exclude_none=True), headers
+            )
+            if forwarded is not None:
+                status_code, body = forwarded
+                return JSONResponse(status_code=status_code, content=body, headers={"X-ToxiGuard-Node": owner})
+        
         # Análisis optimizado usando el clasificador mejorado con contextual
-        analysis_result = primary_classifier.analyze_text(request.text)
+        # Un modo explícito tiene prioridad; el presupuesto elige modo solo si no se indica.
+        # El análisis corre en el ejecutor acotado para no bloquear el event loop
+        budget_ms = request.latency_budget_ms or x_latency_budget_ms
+        if budget_ms and not request.mode:
+            analysis_result = await analysis_executor.run_analysis(
+                primary_classifier.analyze_with_budget, request.text, budget_ms
+            )
+        else:
+            mode = primary_classifier.resolve_mode(request.mode)
+            if analysis_executor.uses_process_pool(mode):
+                analysis_result = await analysis_executor.run_analysis(
+                    analyze_in_process, request.text, mode, in_process=True
+                )
+            else:
+                analysis_result = await analysis_executor.run_analysis(
+                    primary_classifier.analyze_text, request.text, request.deadline_ms, mode
+                )
+        details = analysis_result["details"]
+        budget_info = details.get("budget", {})
+        tiers_contributed = (
+            details.get("fusion", {}).get("contributed")
+            or details.get("cascade", {}).get("tiers_run")
+            or []
+        )
         
         # Calcular tiempo de respuesta
         response_time = int((time.time() - start_time) * 1000)
@@ -293,7 +464,13 @@ async def analyze_text(request: AnalyzeRequest):
             classification_technique=analysis_result.get("classification_technique", "Técnica no especificada"),
             explanations=analysis_result["details"].get("explanations", {}),
             severity_breakdown=analysis_result["details"].get("severity_breakdown", {}),
-            ultra_sensitive_analysis=analysis_result["details"].get("ultra_sensitive_analysis", False)
+            ultra_sensitive_analysis=analysis_result["details"].get("ultra_sensitive_analysis", False),
+            mode=details.get("mode"),
+            tiers_contributed=tiers_contributed,
+            selected_tier=budget_info.get("selected_tier"),
+            expected_time_ms=budget_info.get("expected_time_ms"),
+            actual_time_ms=budget_info.get("actual_time_ms"),
+            cached=details.get("cached", False)
         )
         
         # Guardar en historial si está habilitado
@@ -306,20 +483,80 @@ async def analyze_text(request: AnalyzeRequest):
         logger.info(f"Análisis contextual completado en {response_time}ms - Toxicidad: {analysis_result['toxicity_percentage']}%")
         return response
         
-    except ValueError as e:
-        logger.warning(f"Error de validación: {e}")
+    except (ValueError, AnalysisOverloadedError, AnalysisTimeoutError):
         raise
     except Exception as e:
         logger.error(f"Error en análisis: {e}")
         raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
 
+def _analyze_batch_texts(texts: List[str], mode: str, budget_ms: Optional[float],
+                         start_time: float) -> tuple:
+    """
+    Analiza los textos de un lote (se ejecuta en el ejecutor de análisis)
+    
+    Returns:
+        Tuple con (resultados por texto, suma de toxicidad de los analizados)
+    """
+    results = []
+    total_toxicity = 0
+    valid_texts = [text for text in texts if text and text.strip() and len(text) <= 10000]
+    
+    # Sin presupuesto se usa la ruta por lotes del modo (una vectorización/encode para todo el lote)
+    batch_results = None
+    if not budget_ms:
+        try:
+            batch_results = primary_classifier.analyze_texts(valid_texts, mode)
+        except Exception as e:
+            logger.warning(f"Análisis por lotes no disponible, analizando texto a texto: {e}")
+    
+    for index, text in enumerate(valid_texts):
+        try:
+            if batch_results is not None:
+                analysis_result = batch_results[index]
+            elif budget_ms:
+                remaining_ms = budget_ms - (time.time() - start_time) * 1000
+                analysis_result = primary_classifier.analyze_with_budget(
+                    text, max(remaining_ms, 0.0) / (len(valid_texts) - index)
+                )
+            else:
+                analysis_result = primary_classifier.analyze_text(text, mode=mode)
+            results.append({
+                "text": text,
+                "toxicity_percentage": analysis_result["toxicity_percentage"],
+                "toxicity_level": analysis_result["toxicity_level"],
+                "confidence": analysis_result["confidence"],
+                "is_toxic": analysis_result["is_toxic"],
+                "detected_categories": analysis_result["details"]["detected_categories"],
+                "word_count": analysis_result["details"]["word_count"],
+                "classification_technique": analysis_result.get("classification_technique", "Técnica no especificada"),
+                "explanations": analysis_result["details"].get("explanations", {}),
+                "mode": analysis_result["details"].get("mode"),
+                **analysis_result["details"].get("budget", {})
+            })
+            total_toxicity += analysis_result["toxicity_percentage"]
+        except Exception as e:
+            logger.warning(f"Error analizando texto: {e}")
+            results.append({
+                "text": text,
+                "error": str(e)
+            })
+    
+    return results, total_toxicity
+
 @app.post("/batch-analyze", response_model=BatchAnalyzeResponse)
-async def batch_analyze_texts(request: BatchAnalyzeRequest):
+async def batch_analyze_texts(
+    request: BatchAnalyzeRequest,
+    x_latency_budget_ms: Optional[float] = Header(None, gt=0)
+):
     """
     Análisis en lote optimizado de múltiples textos
     
+    El presupuesto de latencia, si se indica, es del lote completo: cada texto
+    recibe el tiempo restante repartido entre los textos pendientes.
+    
     Args:
         request: Solicitud de análisis en lote
+        x_latency_budget_ms: Presupuesto de latencia (cabecera X-Latency-Budget-Ms)
         
     Returns:
         Respuesta con análisis en lote optimizado
@@ -330,39 +567,17 @@ async def batch_analyze_texts(request: BatchAnalyzeRequest):
         if not request.texts or len(request.texts) == 0:
             raise ValueError("La lista de textos no puede estar vacía")
         
-        if len(request.texts) > 50:
-            raise ValueError("Máximo 50 textos por lote")
+        if len(request.texts) > 100:
+            raise ValueError("Máximo 100 textos por lote (para más, usar /batch-analyze/stream)")
         
-        results = []
-        total_toxicity = 0
+        budget_ms = None if request.mode else request.latency_budget_ms or x_latency_budget_ms
+        mode = primary_classifier.resolve_mode(request.mode)
         
-        for text in request.texts:
-            if not text or not text.strip():
-                continue
-                
-            if len(text) > 10000:
-                continue
-            
-            try:
-                analysis_result = primary_classifier.analyze_text(text)
-                results.append({
-                    "text": text,
-                    "toxicity_percentage": analysis_result["toxicity_percentage"],
-                    "toxicity_level": analysis_result["toxicity_level"],
-                    "confidence": analysis_result["confidence"],
-                    "is_toxic": analysis_result["is_toxic"],
-                    "detected_categories": analysis_result["details"]["detected_categories"],
-                    "word_count": analysis_result["details"]["word_count"],
-                    "classification_technique": analysis_result.get("classification_technique", "Técnica no especificada"),
-                    "explanations": analysis_result["details"].get("explanations", {})
-                })
-                total_toxicity += analysis_result["toxicity_percentage"]
-            except Exception as e:
-                logger.warning(f"Error analizando texto: {e}")
-                results.append({
-                    "text": text,
-                    "error": str(e)
-                })
+        # El lote completo corre en el ejecutor acotado, con su propio timeout
+        results, total_toxicity = await analysis_executor.run_analysis(
+            _analyze_batch_texts, request.texts, mode, budget_ms, start_time,
+            timeout=analysis_executor.config["batch_timeout_seconds"]
+        )
         
         if not results:
             raise ValueError("No se pudo analizar ningún texto")
@@ -382,13 +597,53 @@ async def batch_analyze_texts(request: BatchAnalyzeRequest):
         logger.info(f"Análisis en lote completado: {len(results)} textos en {response_time}ms")
         return response
         
-    except ValueError as e:
-        logger.warning(f"Error de validación en lote: {e}")
+    except (ValueError, AnalysisOverloadedError, AnalysisTimeoutError):
         raise
     except Exception as e:
         logger.error(f"Error en análisis en lote: {e}")
         raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
 
+@app.post("/batch-analyze/stream")
+async def batch_analyze_stream(
+    request: Request,
+    mode: Optional[str] = None,
+    ordered: bool = True,
+    chunk_size: int = Query(STREAM_CONFIG["chunk_size"], ge=1, le=512),
+    max_in_flight: int = Query(STREAM_CONFIG["max_in_flight"], ge=1, le=64)
+):
+    """
+    Análisis en streaming de textos NDJSON sin límite de tamaño
+    
+    Cada línea del cuerpo es una cadena JSON o un objeto {"text": ..., "id": ...}.
+    La respuesta es NDJSON con una línea por entrada (con su "index" y su "id")
+    en cuanto su bloque se analiza, y una línea final {"summary": {...}}. Con
+    max_in_flight bloques en curso se deja de leer el cuerpo, por lo que la
+    memoria no depende del número de textos.
+    
+    Args:
+        request: Petición con el cuerpo NDJSON
+        mode: Modo del clasificador (por defecto el principal)
+        ordered: Mantener el orden de entrada (False: los bloques salen según terminan)
+        chunk_size: Líneas por bloque analizado
+        max_in_flight: Bloques analizándose a la vez
+        
+    Returns:
+        Respuesta NDJSON en streaming
+    """
+    # El modo se valida antes de empezar a responder (400 si no existe)
+    resolved_mode = primary_classifier.resolve_mode(mode)
+    
+    # Una sola tarea lee receive(): el cuerpo no se lee desde dentro de la respuesta
+    channel = RequestBodyChannel(request.receive)
+    return ChannelStreamingResponse(
+        channel,
+        stream_analysis(
+            channel.stream(), primary_classifier.analyze_texts, resolved_mode, ordered=ordered,
+            config={"chunk_size": chunk_size, "max_in_flight": max_in_flight}
+        ),
+        media_type="application/x-ndjson"
+    )
+
 @app.get("/history")
 async def get_analysis_history(limit: int = 100, offset: int = 0):
     """
@@ -476,6 +731,81 @@ async def clear_analysis_history():
         logger.error(f"Error limpiando historial: {e}")
         raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
 
-if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+@app.post("/jobs", status_code=202)
+async def create_job(
+    request: Request,
+    path: Optional[str] = None,
+    format: Optional[str] = None,
+    filename: Optional[str] = None,
+    text_column: str = "Text",
+    id_column: Optional[str] = None,
+    mode: Optional[str] = None
+):
+    """
+    Crea un trabajo de análisis en segundo plano para un fichero CSV o JSONL
+    
+    El fichero se envía como cuerpo de la petición (se guarda en disco en
+    streaming) o se indica con `path` si ya está en el servidor, dentro de los
+    directorios de JOBS_INPUT_DIRS.
+    
+    Args:
+        request: Petición con el fichero como cuerpo (si no se indica path)
+        path: Ruta de un fichero del servidor
+        format: csv o jsonl (por defecto según extensión o Content-Type)
+        filename: Nombre del fichero subido (para deducir el formato)
+        text_column: Columna o campo con el texto
+        id_column: Columna o campo opcional con el identificador de cada fila
+        mode: Modo del clasificador (por defecto el principal)
+        
+    Returns:
+        Estado inicial del trabajo
+    """
+    resolved_mode = primary_classifier.resolve_mode(mode)
+    
+    if path:
+        input_path = job_manager.resolve_input_path(path)
+        input_format = job_manager.detect_format(str(input_path), format)
+        job_id, _ = job_manager.new_job_dir()
+    else:
+        input_format = job_manager.detect_format(filename, format, request.headers.get("content-type"))
+        job_id, job_dir = job_manager.new_job_dir()
+        content_length = request.headers.get("content-length")
+        input_path = await job_manager.save_upload(
+            job_dir, input_format, request.stream(),
+            int(content_length) if content_length and content_length.isdigit() else None
+        )
+    
+    return job_manager.create_job(job_id, input_path, input_format, resolved_mode, text_column, id_column)
+
+@app.get("/jobs")
+async def list_jobs(limit: int = Query(50, ge=1, le=500)):
+    """Trabajos en lote más recientes"""
+    return {"jobs": job_manager.list_jobs(limit)}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Estado de un trabajo: progreso, filas por segundo y tiempo restante estimado"""
+    job = job_manager.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return job
+
+@app.get("/jobs/{job_id}/results")
+async def get_job_results(job_id: str):
+    """Resultados de un trabajo terminado como JSONL comprimido con gzip"""
+    job = job_manager.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    results_path = job_manager.results_path(job_id)
+    if results_path is None:
+        raise HTTPException(status_code=409, detail=f"El trabajo no ha terminado (estado: {job['status']})")
+    return FileResponse(results_path, media_type="application/gzip", filename=f"toxiguard-{job_id}.jsonl.gz")
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancela un trabajo en cola o en curso"""
+    job = job_manager.cancel_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return job
+
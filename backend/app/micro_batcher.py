@@ -0,0 +1,172 @@
+"""
+📦 Micro-batching - ToxiGuard
+Agrupa las peticiones concurrentes a un nivel costoso (ML, contextual) durante
+unos milisegundos y las resuelve con una sola llamada por lotes: una
+vectorización y una predicción, o un único encode de embeddings
+"""
+
+import os
+import time
+import queue
+import logging
+import threading
+from collections import Counter, deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Configuración del micro-batching (sobrescribible por variables de entorno)
+MICRO_BATCH_CONFIG = {
+    "enabled": os.getenv("MICRO_BATCH_ENABLED", "1") == "1",
+    "max_batch_size": int(os.getenv("MICRO_BATCH_MAX_SIZE", "32")),
+    "max_wait_ms": float(os.getenv("MICRO_BATCH_MAX_WAIT_MS", "3")),
+    # Sin más peticiones esperando, el lote sale sin agotar max_wait_ms (latencia mínima en reposo)
+    "eager_when_idle": True,
+    "metrics_window": 1000
+}
+
+
+class MicroBatcher:
+    """Cola que agrupa elementos concurrentes y los procesa con una función por lotes"""
+
+    def __init__(self, name: str, batch_fn: Callable[[List[Any]], List[Any]],
+                 config: Dict[str, Any] = None):
+        """
+        Inicializa el micro-batcher
+
+        Args:
+            name: Nombre del nivel (para métricas y logs)
+            batch_fn: Función que recibe una lista de elementos y devuelve sus resultados en orden
+            config: Configuración (por defecto MICRO_BATCH_CONFIG)
+        """
+        self.name = name
+        self.batch_fn = batch_fn
+        self.config = {**MICRO_BATCH_CONFIG, **(config or {})}
+        self._init_state()
+
+        # Servidor pre-fork: el hilo colector no sobrevive al fork
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._init_state)
+
+    def _init_state(self):
+        """Estado mutable (cola, hilo y métricas); se recrea tras un fork"""
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._pending = 0  # Llamadas en process() aún sin resultado
+        self._queue_waits = deque(maxlen=self.config["metrics_window"])
+        self._batch_sizes: Counter = Counter()
+        self.stats = {"items": 0, "batches": 0, "errors": 0, "batch_time_ms": 0.0}
+
+    def _ensure_worker(self):
+        """Arranca el hilo colector al primer uso"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name=f"toxiguard-batcher-{self.name}", daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, item: Any) -> Future:
+        """Encola un elemento y devuelve el Future de su resultado"""
+        self._ensure_worker()
+        future: Future = Future()
+        with self._lock:
+            self._pending += 1
+        future.add_done_callback(lambda _: self._release())
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def process(self, item: Any, timeout: Optional[float] = None) -> Any:
+        """Procesa un elemento dentro de un lote (bloquea el hilo que llama)"""
+        if not self.config["enabled"]:
+            return self.batch_fn([item])[0]
+        return self.submit(item).result(timeout=timeout)
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+
+    def _collect(self) -> List[tuple]:
+        """Espera el primer elemento y agrupa los siguientes hasta el tamaño o plazo máximos"""
+        batch = [self._queue.get()]
+        deadline = batch[0][2] + self.config["max_wait_ms"] / 1000
+
+        while len(batch) < self.config["max_batch_size"]:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+
+            if self.config["eager_when_idle"]:
+                with self._lock:
+                    waiting = self._pending
+                if len(batch) >= waiting:
+                    break
+
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        """Bucle del hilo colector"""
+        while True:
+            batch = self._collect()
+            items = [item for item, _, _ in batch]
+            dispatched_at = time.perf_counter()
+
+            try:
+                results = self.batch_fn(items)
+                if len(results) != len(items):
+                    raise RuntimeError(f"{self.name}: {len(results)} resultados para {len(items)} elementos")
+                for (_, future, _), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                logger.error(f"❌ Error en lote {self.name}: {e}")
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                with self._lock:
+                    self.stats["errors"] += 1
+
+            elapsed_ms = (time.perf_counter() - dispatched_at) * 1000
+            with self._lock:
+                self.stats["items"] += len(batch)
+                self.stats["batches"] += 1
+                self.stats["batch_time_ms"] += elapsed_ms
+                self._batch_sizes[len(batch)] += 1
+                self._queue_waits.extend((dispatched_at - enqueued) * 1000 for _, _, enqueued in batch)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Distribuciones de espera en cola y de tamaño de lote"""
+        with self._lock:
+            stats = dict(self.stats)
+            waits = np.array(self._queue_waits) if self._queue_waits else None
+            sizes = dict(self._batch_sizes)
+
+        batches = stats["batches"]
+        return {
+            "enabled": self.config["enabled"],
+            "max_batch_size": self.config["max_batch_size"],
+            "max_wait_ms": self.config["max_wait_ms"],
+            "items": stats["items"],
+            "batches": batches,
+            "errors": stats["errors"],
+            "avg_batch_size": round(stats["items"] / batches, 3) if batches else 0.0,
+            "avg_batch_time_ms": round(stats["batch_time_ms"] / batches, 3) if batches else 0.0,
+            "batch_size_distribution": {str(size): count for size, count in sorted(sizes.items())},
+            "queue_wait_ms": {
+                "p50": round(float(np.percentile(waits, 50)), 3),
+                "p95": round(float(np.percentile(waits, 95)), 3),
+                "p99": round(float(np.percentile(waits, 99)), 3),
+                "max": round(float(waits.max()), 3)
+            } if waits is not None else {}
+        }
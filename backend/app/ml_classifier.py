@@ -6,10 +6,22 @@ Implementa el mejor modelo identificado (Linear SVM) para clasificación de toxi
 import pickle
 import logging
 import time
-from typing import Dict, List
+from typing import Dict, List, Optional
 from pathlib import Path
 import numpy as np
 
+# Cabezal multi-etiqueta opcional (comparte el vectorizador del modelo binario)
+try:
+    from ml.multilabel import load_head_for_vectorizer
+except ImportError:
+    load_head_for_vectorizer = None
+
+# Compilación de ensembles de árboles (Random Forest / Gradient Boosting) a arrays planos
+try:
+    from ml.tree_compiler import compile_if_tree_ensemble
+except ImportError:
+    compile_if_tree_ensemble = None
+
 # Configurar logging
 logger = logging.getLogger(__name__)
 
@@ -17,13 +29,17 @@ class MLToxicityClassifier:
     """Clasificador de toxicidad basado en machine learning optimizado"""
     
     def __init__(self, model_path: str = "../models/linear_svm_trained.pkl", 
-                 vectorizer_path: str = "../models/linear_svm_vectorizer.pkl"):
+                 vectorizer_path: str = "../models/linear_svm_vectorizer.pkl",
+                 multilabel_head_path: str = "../models/multilabel_head.pkl"):
         self.model_path = Path(model_path)
         self.vectorizer_path = Path(vectorizer_path)
+        self.multilabel_head_path = Path(multilabel_head_path)
         self.model = None
         self.vectorizer = None
+        self.multilabel_head = None
         self.is_loaded = False
         self.classification_technique = self._determine_technique_from_path()
+        self.model_name = f"{self.model_path.stem.replace('_trained', '')}_optimized"
         
         # Cargar modelo y vectorizer
         self._load_model()
@@ -42,6 +58,8 @@ class MLToxicityClassifier:
             return "Logistic Regression"
         elif "gradient_boosting" in model_name or "boosting" in model_name:
             return "Gradient Boosting"
+        elif "distilled" in model_name:
+            return "Estudiante Destilado (Lineal)"
         elif "ensemble" in model_name:
             return "Ensemble (Múltiples Modelos)"
         else:
@@ -62,18 +80,38 @@ class MLToxicityClassifier:
             with open(self.model_path, 'rb') as f:
                 self.model = pickle.load(f)
             
+            # Los ensembles de árboles se sirven compilados (misma salida, sin recorrer árboles en sklearn)
+            if compile_if_tree_ensemble is not None:
+                self.model = compile_if_tree_ensemble(self.model)
+            
             # Cargar vectorizer
             with open(self.vectorizer_path, 'rb') as f:
                 self.vectorizer = pickle.load(f)
             
             self.is_loaded = True
             logger.info("✅ Modelo ML cargado exitosamente")
+            self._load_multilabel_head()
             return True
             
         except Exception as e:
             logger.error(f"❌ Error cargando modelo ML: {e}")
             return False
     
+    def _load_multilabel_head(self) -> bool:
+        """Carga el cabezal multi-etiqueta si existe y coincide con el vectorizador"""
+        if load_head_for_vectorizer is None:
+            return False
+        
+        try:
+            self.multilabel_head = load_head_for_vectorizer(str(self.multilabel_head_path), self.vectorizer)
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo cargar el cabezal multi-etiqueta: {e}")
+            self.multilabel_head = None
+        
+        if self.multilabel_head is not None:
+            logger.info(f"✅ Cabezal multi-etiqueta cargado: {', '.join(self.multilabel_head.categories)}")
+        return self.multilabel_head is not None
+    
     def analyze_text(self, text: str) -> Dict:
         """
         Análisis de toxicidad usando el modelo de machine learning
@@ -84,76 +122,107 @@ class MLToxicityClassifier:
         Returns:
             Diccionario con el análisis completo de toxicidad
         """
-        if not text or not text.strip():
-            return self._get_default_response()
+        return self.analyze_batch([text])[0]
+    
+    def analyze_batch(self, texts: List[str]) -> List[Dict]:
+        """
+        Análisis de varios textos con una sola vectorización y una sola predicción
+        
+        Args:
+            texts: Textos a analizar
+            
+        Returns:
+            Lista de resultados en el mismo orden que los textos
+        """
+        results: List[Dict] = [None] * len(texts)
+        valid = [i for i, text in enumerate(texts) if text and text.strip()]
+        for i in set(range(len(texts))) - set(valid):
+            results[i] = self._get_default_response()
+        if not valid:
+            return results
         
         if not self.is_loaded:
             logger.warning("⚠️ Modelo ML no cargado, usando respuesta por defecto")
-            return self._get_default_response()
+            return [result or self._get_default_response() for result in results]
         
         try:
             start_time = time.time()
             
-            # Preprocesar texto
-            processed_text = self._preprocess_text(text)
-            
-            # Vectorizar texto
-            text_vectorized = self.vectorizer.transform([processed_text])
+            # Preprocesar y vectorizar todos los textos en una sola llamada
+            batch_texts = [texts[i] for i in valid]
+            text_vectorized = self.vectorizer.transform([self._preprocess_text(text) for text in batch_texts])
             
             # Predecir toxicidad
-            prediction = self.model.predict(text_vectorized)[0]
+            predictions = self.model.predict(text_vectorized)
             
             # Obtener probabilidades si están disponibles
             try:
-                probability = self.model.predict_proba(text_vectorized)[0]
-                toxicity_percentage = probability[1] * 100 if len(probability) > 1 else 0
-                confidence = max(probability)
+                probabilities = self.model.predict_proba(text_vectorized)
+                if probabilities.shape[1] > 1:
+                    toxicity_percentages = probabilities[:, 1] * 100
+                else:
+                    toxicity_percentages = np.zeros(len(batch_texts))
+                confidences = probabilities.max(axis=1)
             except AttributeError:
                 # Para modelos como LinearSVC que no tienen predict_proba
                 # Usar decision_function para obtener un score
                 try:
-                    decision_score = self.model.decision_function(text_vectorized)[0]
+                    decision_scores = self.model.decision_function(text_vectorized)
                     # Normalizar el score a un porcentaje (0-100)
-                    toxicity_percentage = max(0, min(100, (decision_score + 1) * 50))
-                    confidence = 0.8  # Confianza por defecto para modelos sin probabilidades
+                    toxicity_percentages = np.clip((decision_scores + 1) * 50, 0, 100)
+                    confidences = np.full(len(batch_texts), 0.8)  # Confianza por defecto para modelos sin probabilidades
                 except AttributeError:
                     # Fallback si no hay decision_function
-                    toxicity_percentage = 50.0 if prediction else 0.0
-                    confidence = 0.7
-            
-            # Determinar categoría
-            toxicity_level = self._determine_toxicity_level(toxicity_percentage)
-            
-            # Obtener categorías detectadas
-            detected_categories = self._get_detected_categories(toxicity_percentage)
+                    toxicity_percentages = np.where(predictions.astype(bool), 50.0, 0.0)
+                    confidences = np.full(len(batch_texts), 0.7)
             
-            # Generar explicaciones
-            explanations = self._generate_explanations(text, toxicity_percentage, detected_categories)
+            # Categorías y scores de miembros (reutilizan la misma matriz vectorizada)
+            category_scores_batch = self._get_category_scores(text_vectorized)
+            member_scores_batch = self._get_member_scores(text_vectorized)
+            # Términos del vocabulario presentes (sin ninguno, el score es solo el sesgo del modelo)
+            known_features = (
+                text_vectorized.getnnz(axis=1) if hasattr(text_vectorized, "getnnz")
+                else np.count_nonzero(text_vectorized, axis=1)
+            )
             
-            # Calcular tiempo de respuesta
-            response_time = (time.time() - start_time) * 1000
+            # Tiempo de respuesta repartido entre los textos del lote
+            response_time = (time.time() - start_time) * 1000 / len(batch_texts)
             
-            return {
-                "is_toxic": bool(prediction),
-                "toxicity_percentage": round(toxicity_percentage, 2),
-                "toxicity_level": toxicity_level,
-                "confidence": round(confidence, 3),
-                "model_used": "linear_svm_optimized",
-                "classification_technique": self.classification_technique,
-                "details": {
-                    "toxicity_score": round(toxicity_percentage / 100, 4),
-                    "detected_categories": detected_categories,
-                    "text_length": len(text),
-                    "word_count": len(text.split()),
-                    "prediction_confidence": round(confidence, 3),
-                    "response_time_ms": round(response_time, 2),
-                    "explanations": explanations
+            for k, i in enumerate(valid):
+                text = texts[i]
+                toxicity_percentage = float(toxicity_percentages[k])
+                confidence = float(confidences[k])
+                category_scores = category_scores_batch[k] if category_scores_batch is not None else None
+                detected_categories = (
+                    list(category_scores) if category_scores is not None
+                    else self._get_detected_categories(toxicity_percentage)
+                )
+                
+                results[i] = {
+                    "is_toxic": bool(predictions[k]),
+                    "toxicity_percentage": round(toxicity_percentage, 2),
+                    "toxicity_level": self._determine_toxicity_level(toxicity_percentage),
+                    "confidence": round(confidence, 3),
+                    "model_used": self.model_name,
+                    "classification_technique": self.classification_technique,
+                    "details": {
+                        "toxicity_score": round(toxicity_percentage / 100, 4),
+                        "detected_categories": detected_categories,
+                        "category_scores": category_scores or {},
+                        "member_scores": member_scores_batch[k],
+                        "text_length": len(text),
+                        "word_count": len(text.split()),
+                        "known_features": int(known_features[k]),
+                        "prediction_confidence": round(confidence, 3),
+                        "response_time_ms": round(response_time, 2),
+                        "explanations": self._generate_explanations(text, toxicity_percentage, detected_categories)
+                    }
                 }
-            }
+            return results
             
         except Exception as e:
             logger.error(f"❌ Error en análisis ML: {e}")
-            return self._get_default_response()
+            return [result or self._get_default_response() for result in results]
     
     def _preprocess_text(self, text: str) -> str:
         """Preprocesa el texto para el modelo ML"""
@@ -176,6 +245,22 @@ class MLToxicityClassifier:
         else:
             return "high_risk"
     
+    def _get_member_scores(self, text_vectorized) -> List[Dict[str, float]]:
+        """Scores de cada miembro por texto cuando el modelo es un ensemble apilado"""
+        if not hasattr(self.model, "member_scores_dict"):
+            return [{} for _ in range(text_vectorized.shape[0])]
+        return self.model.member_scores_dict(text_vectorized)
+    
+    def _get_category_scores(self, text_vectorized) -> Optional[List[Dict[str, float]]]:
+        """Probabilidad de cada categoría detectada por texto con el cabezal multi-etiqueta (None si no hay cabezal)"""
+        if self.multilabel_head is None:
+            return None
+        
+        return [
+            {category: round(probability, 4) for category, probability in detected.items()}
+            for detected in self.multilabel_head.detect(text_vectorized)
+        ]
+    
     def _get_detected_categories(self, toxicity_percentage: float) -> List[str]:
         """Determina las categorías detectadas basadas en el porcentaje de toxicidad"""
         categories = []
@@ -199,7 +284,18 @@ class MLToxicityClassifier:
             "insulto_moderado": "insulto moderado", 
             "insultos_severo": "insulto severo",
             "acoso": "acoso",
-            "discriminacion": "discriminación"
+            "discriminacion": "discriminación",
+            "abuso": "abuso",
+            "amenaza": "amenaza",
+            "provocacion": "provocación",
+            "obscenidad": "obscenidad",
+            "discurso_odio": "discurso de odio",
+            "racismo": "racismo",
+            "nacionalismo": "nacionalismo",
+            "sexismo": "sexismo",
+            "homofobia": "homofobia",
+            "odio_religioso": "odio religioso",
+            "radicalismo": "radicalismo"
         }
         
         for category in detected_categories:
@@ -227,7 +323,7 @@ class MLToxicityClassifier:
             "toxicity_percentage": 0.0,
             "toxicity_level": "safe",
             "confidence": 0.0,
-            "model_used": "linear_svm_optimized",
+            "model_used": self.model_name,
             "classification_technique": self.classification_technique,
             "details": {
                 "toxicity_score": 0.0,
@@ -248,6 +344,7 @@ class MLToxicityClassifier:
             "is_loaded": self.is_loaded,
             "model_path": str(self.model_path),
             "vectorizer_path": str(self.vectorizer_path),
+            "multilabel_categories": self.multilabel_head.categories if self.multilabel_head else [],
             "performance": {
                 "f1_score": 0.7324,
                 "precision": 0.7363,
@@ -284,3 +381,15 @@ class MLToxicityClassifier:
 
 # Instancia global del clasificador ML
 ml_classifier = MLToxicityClassifier()
+
+# Ensemble lineal apilado (LR + Linear SVM + Naive Bayes) sobre el mismo vectorizador
+ensemble_classifier = MLToxicityClassifier(
+    model_path="../models/linear_ensemble_trained.pkl",
+    vectorizer_path="../models/linear_ensemble_vectorizer.pkl"
+)
+
+# Estudiante lineal destilado del clasificador híbrido (ml/distillation.py)
+distilled_classifier = MLToxicityClassifier(
+    model_path="../models/distilled_student_trained.pkl",
+    vectorizer_path="../models/distilled_student_vectorizer.pkl"
+)
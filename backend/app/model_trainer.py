@@ -9,8 +9,14 @@ import os
 from typing import List, Dict, Tuple, Any
 from datetime import datetime
 import pandas as pd
-from sklearn.model_selection import GridSearchCV
+import joblib
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import GridSearchCV, ParameterGrid, StratifiedKFold
 from sklearn.metrics import classification_report, confusion_matrix
+from sklearn.pipeline import Pipeline
 
 from .ml_models import MLToxicityClassifier
 
@@ -20,15 +26,24 @@ logger = logging.getLogger(__name__)
 class ModelTrainer:
     """Entrenador y evaluador de modelos ML para toxicidad"""
     
-    def __init__(self, models_dir: str = "models"):
+    def __init__(self, models_dir: str = "models", use_feature_cache: bool = True):
         """
         Inicializa el entrenador de modelos
         
         Args:
             models_dir: Directorio donde guardar los modelos entrenados
+            use_feature_cache: Si reutilizar la matriz TF-IDF cacheada entre ejecuciones
         """
         self.models_dir = models_dir
         self.results_history = []
+        self.feature_cache = None
+        
+        if use_feature_cache:
+            try:
+                from ml.feature_cache import feature_cache
+                self.feature_cache = feature_cache
+            except ImportError as e:
+                logger.warning(f"Caché de características no disponible: {e}")
         
         # Crear directorio si no existe
         os.makedirs(models_dir, exist_ok=True)
@@ -50,6 +65,10 @@ class ModelTrainer:
             }
         }
         
+        # Modos de búsqueda de hiperparámetros soportados
+        self.search_modes = ["grid", "halving", "halving_random"]
+        self.halving_random_candidates = 10
+        
         logger.info(f"Entrenador de modelos inicializado en: {models_dir}")
     
     def prepare_training_data(self, data_path: str) -> Tuple[List[str], List[int]]:
@@ -91,8 +110,53 @@ class ModelTrainer:
             logger.error(f"Error preparando datos: {e}")
             raise
     
+    def _fold_features(self, texts: List[str], labels: List[int], vectorizer_config: Dict[str, Any],
+                       cv: int = 5) -> List[Tuple]:
+        """
+        Características cacheadas de cada fold (los mismos folds que GridSearchCV(cv=cv))
+        
+        Cada fold ajusta el vectorizador solo con sus textos de entrenamiento (sin
+        fuga del vocabulario ni del IDF de validación) y su matriz queda en la
+        caché, así que los candidatos y las ejecuciones siguientes la reutilizan.
+        
+        Returns:
+            Lista de (X_train, y_train, X_val, y_val) por fold
+        """
+        y = np.asarray(labels)
+        folds = []
+        for train_idx, val_idx in StratifiedKFold(n_splits=cv).split(np.zeros(len(y)), y):
+            vectorizer, X_train, fit_key = self.feature_cache.fit_transform(
+                [texts[i] for i in train_idx], vectorizer_config
+            )
+            X_val, _ = self.feature_cache.transform(vectorizer, [texts[i] for i in val_idx], fit_key)
+            folds.append((X_train, y[train_idx], X_val, y[val_idx]))
+        return folds
+    
+    def _cached_grid_search(self, estimator, param_grid: Dict[str, List[Any]], folds: List[Tuple],
+                            scoring: str = 'f1') -> Tuple[Dict[str, Any], float, List[float]]:
+        """
+        Grid Search con un pipeline por fold sobre las características precalculadas
+        
+        Returns:
+            Tuple con (mejores parámetros, mejor score medio, score medio de cada candidato)
+        """
+        from ml.halving_search import _fit_and_score
+        
+        candidates = list(ParameterGrid(param_grid))
+        scorer = get_scorer(scoring)
+        jobs = [
+            delayed(_fit_and_score)(estimator, params, X_train, y_train, X_val, y_val, scorer)
+            for params in candidates
+            for X_train, y_train, X_val, y_val in folds
+        ]
+        fold_scores = np.array(Parallel(n_jobs=-1)(jobs)).reshape(len(candidates), len(folds))
+        mean_scores = fold_scores.mean(axis=1)
+        best = int(np.argmax(mean_scores))
+        return candidates[best], float(mean_scores[best]), mean_scores.tolist()
+    
     def train_single_model(self, model_type: str, texts: List[str], labels: List[int],
-                          use_grid_search: bool = False) -> Tuple[MLToxicityClassifier, Dict[str, Any]]:
+                          use_grid_search: bool = False,
+                          search_mode: str = "grid") -> Tuple[MLToxicityClassifier, Dict[str, Any]]:
         """
         Entrena un modelo individual
         
@@ -100,54 +164,115 @@ class ModelTrainer:
             model_type: Tipo de modelo a entrenar
             texts: Lista de textos de entrenamiento
             labels: Lista de etiquetas de entrenamiento
-            use_grid_search: Si usar Grid Search para optimización
+            use_grid_search: Si usar búsqueda de hiperparámetros para optimización
+            search_mode: "grid" (GridSearchCV exhaustivo), "halving" o "halving_random"
+                (successive halving con características precalculadas por fold)
             
         Returns:
             Tuple con (modelo entrenado, métricas de entrenamiento)
         """
+        if search_mode not in self.search_modes:
+            raise ValueError(f"Modo de búsqueda no válido: {search_mode}. Válidos: {self.search_modes}")
+        
         try:
             logger.info(f"Entrenando modelo: {model_type}")
             
             # Crear clasificador
             classifier = MLToxicityClassifier(model_type)
+            use_halving = use_grid_search and search_mode != "grid"
+            search_report = None
             
-            if use_grid_search:
+            # Vectorizar una sola vez: los folds y candidatos reutilizan la matriz cacheada
+            if self.feature_cache is not None and not use_halving:
+                vectorizer, X, _ = self.feature_cache.fit_transform(texts, classifier.vectorizer_config)
+                estimator = Pipeline([('classifier', classifier.model)])
+            else:
+                vectorizer, X = None, texts
+                estimator = classifier.pipeline
+            
+            if use_halving:
+                from ml.halving_search import SuccessiveHalvingSearch
+                
+                search = SuccessiveHalvingSearch(
+                    Pipeline([('classifier', classifier.model)]),
+                    self.hyperparameter_grids.get(model_type, {}),
+                    classifier.vectorizer_config,
+                    cv=5,
+                    n_candidates=self.halving_random_candidates if search_mode == "halving_random" else None,
+                    scoring='f1',
+                    feature_cache=self.feature_cache
+                )
+                search.fit(texts, labels)
+                
+                # best_estimator_ ya incluye el vectorizador ajustado sobre todos los datos
+                estimator = search.best_estimator_
+                best_params = search.best_params_
+                search_report = search.get_report()
+                
+                logger.info(f"Mejores parámetros ({search_mode}): {best_params}")
+            elif use_grid_search and vectorizer is not None:
+                # Grid Search sobre características cacheadas por fold: cada fold tiene su
+                # propio vectorizador ajustado solo con su parte de entrenamiento
+                folds = self._fold_features(texts, labels, classifier.vectorizer_config, cv=5)
+                best_params, best_score, _ = self._cached_grid_search(
+                    estimator, self.hyperparameter_grids.get(model_type, {}), folds, scoring='f1'
+                )
+                
+                # Reentrenar con los mejores parámetros sobre la matriz de todos los datos
+                estimator = clone(estimator).set_params(**best_params).fit(X, labels)
+                
+                logger.info(f"Mejores parámetros: {best_params}")
+            elif use_grid_search:
                 # Usar Grid Search para optimización
                 grid_search = GridSearchCV(
-                    classifier.pipeline,
+                    estimator,
                     self.hyperparameter_grids.get(model_type, {}),
                     cv=5,
                     scoring='f1',
                     n_jobs=-1
                 )
                 
-                grid_search.fit(texts, labels)
+                grid_search.fit(X, labels)
                 
                 # Actualizar modelo con mejores parámetros
-                classifier.pipeline = grid_search.best_estimator_
+                estimator = grid_search.best_estimator_
                 best_params = grid_search.best_params_
                 
                 logger.info(f"Mejores parámetros: {best_params}")
             else:
                 # Entrenamiento directo
-                classifier.pipeline.fit(texts, labels)
+                estimator.fit(X, labels)
                 best_params = {}
             
+            if vectorizer is not None:
+                # Reconstruir el pipeline completo (vectorizador + clasificador) para guardarlo
+                classifier.vectorizer = vectorizer
+                classifier.model = estimator.named_steps['classifier']
+                classifier.pipeline = Pipeline([
+                    ('vectorizer', classifier.vectorizer),
+                    ('classifier', classifier.model)
+                ])
+            else:
+                classifier.pipeline = estimator
+            
             # Evaluar modelo
-            y_pred = classifier.pipeline.predict(texts)
+            y_pred = estimator.predict(X)
             metrics = self._calculate_metrics(labels, y_pred)
             
             # Guardar modelo
             model_path = os.path.join(self.models_dir, f"{model_type}_trained.pkl")
             vectorizer_path = os.path.join(self.models_dir, f"{model_type}_vectorizer.pkl")
             
-            classifier.save_model(model_path, vectorizer_path)
+            classifier.is_trained = True
+            classifier.save_model(model_path)
+            joblib.dump(classifier.pipeline.named_steps['vectorizer'], vectorizer_path)
             
             # Guardar resultados
             result = {
                 "model_type": model_type,
                 "best_params": best_params,
                 "metrics": metrics,
+                "search": search_report,
                 "model_path": model_path,
                 "vectorizer_path": vectorizer_path,
                 "timestamp": datetime.now().isoformat()
@@ -162,7 +287,60 @@ class ModelTrainer:
             logger.error(f"Error entrenando modelo {model_type}: {e}")
             raise
     
-    def train_all_models(self, texts: List[str], labels: List[int], 
+    def train_streaming_model(self, data_path: str, model_type: str = "sgd",
+                              text_column: str = "text", label_column: str = "label",
+                              use_idf: bool = False) -> Dict[str, Any]:
+        """
+        Entrena un modelo out-of-core leyendo el CSV por bloques
+
+        A diferencia de prepare_training_data, nunca carga el archivo completo:
+        usa HashingVectorizer sin estado y partial_fit, por lo que la memoria
+        queda acotada por el tamaño de bloque y del holdout.
+
+        Args:
+            data_path: Ruta al archivo CSV (puede ser de varios GB)
+            model_type: Modelo incremental ('sgd', 'naive_bayes')
+            text_column: Columna con el texto
+            label_column: Columna con la etiqueta binaria
+            use_idf: Si estimar IDF con una pasada previa en streaming
+
+        Returns:
+            Resultado del entrenamiento con métricas progresivas y de holdout
+        """
+        from ml.streaming_trainer import StreamingTrainer
+
+        try:
+            logger.info(f"Entrenando modelo en streaming: {model_type}")
+
+            trainer = StreamingTrainer(
+                model_type=model_type,
+                text_column=text_column,
+                label_column=label_column,
+                config={"use_idf": use_idf}
+            )
+            training_result = trainer.train(data_path)
+            model_path, vectorizer_path = trainer.save_model(self.models_dir)
+
+            result = {
+                "model_type": f"{model_type}_streaming",
+                "best_params": {},
+                "metrics": training_result["holdout_metrics"],
+                "streaming": {k: v for k, v in training_result.items() if k != "history"},
+                "model_path": model_path,
+                "vectorizer_path": vectorizer_path,
+                "timestamp": datetime.now().isoformat()
+            }
+
+            self.results_history.append(result)
+
+            logger.info(f"Modelo en streaming {model_type} entrenado con {training_result['rows_seen']} filas")
+            return result
+
+        except Exception as e:
+            logger.error(f"Error entrenando modelo en streaming {model_type}: {e}")
+            raise
+
+    def train_all_models(self, texts: List[str], labels: List[int],
                         use_grid_search: bool = False) -> Dict[str, Tuple[MLToxicityClassifier, Dict[str, Any]]]:
         """
         Entrena todos los modelos disponibles
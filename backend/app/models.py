@@ -10,6 +10,22 @@ class AnalyzeRequest(BaseModel):
         max_length=10000,
         description="Texto a analizar para detectar toxicidad"
     )
+    deadline_ms: Optional[float] = Field(
+        None,
+        gt=0,
+        le=10000,
+        description="Plazo en milisegundos para el modo fusión (opcional)"
+    )
+    latency_budget_ms: Optional[float] = Field(
+        None,
+        gt=0,
+        le=60000,
+        description="Presupuesto de latencia en milisegundos (alternativa a la cabecera X-Latency-Budget-Ms)"
+    )
+    mode: Optional[str] = Field(
+        None,
+        description="Modo del clasificador para esta petición (advanced, cascade, fusion, contextual, ml, ensemble, distilled, rules); por defecto el global"
+    )
     
     @validator('text')
     def validate_text(cls, v):
@@ -81,6 +97,30 @@ class AnalyzeResponse(BaseModel):
         default=False,
         description="Indica si se utilizó análisis ultra-sensible"
     )
+    mode: Optional[str] = Field(
+        None,
+        description="Modo del clasificador híbrido usado en esta petición"
+    )
+    tiers_contributed: List[str] = Field(
+        default_factory=list,
+        description="Niveles del clasificador híbrido que contribuyeron al resultado"
+    )
+    selected_tier: Optional[str] = Field(
+        None,
+        description="Combinación de niveles elegida para el presupuesto de latencia"
+    )
+    expected_time_ms: Optional[float] = Field(
+        None,
+        description="Latencia esperada (p95 reciente) del plan elegido"
+    )
+    actual_time_ms: Optional[float] = Field(
+        None,
+        description="Latencia real del análisis con presupuesto"
+    )
+    cached: bool = Field(
+        False,
+        description="El resultado viene de la caché de resultados"
+    )
 
 class BatchAnalyzeRequest(BaseModel):
     """Modelo para solicitudes de análisis en lote"""
@@ -90,6 +130,16 @@ class BatchAnalyzeRequest(BaseModel):
         max_items=100,
         description="Lista de textos a analizar (máximo 100)"
     )
+    latency_budget_ms: Optional[float] = Field(
+        None,
+        gt=0,
+        le=600000,
+        description="Presupuesto de latencia del lote completo en milisegundos"
+    )
+    mode: Optional[str] = Field(
+        None,
+        description="Modo del clasificador para todo el lote; por defecto el global"
+    )
 
 class BatchAnalyzeResponse(BaseModel):
     """Modelo para respuestas de análisis en lote"""
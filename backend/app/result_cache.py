@@ -0,0 +1,157 @@
+"""
+🧊 Caché de Resultados - ToxiGuard
+Caché LRU con TTL de análisis completos delante del clasificador híbrido. La
+clave incluye el texto normalizado, el modo, la versión del léxico, la versión
+de los modelos y el nivel de explicación, así que cambiar un léxico o un modelo
+invalida las entradas sin borrarlas a mano. Los resultados se guardan como JSON
+compacto (comprimido si es grande) y cada acierto devuelve una copia nueva.
+"""
+
+import os
+import re
+import json
+import time
+import zlib
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Configuración de la caché (sobrescribible por variables de entorno)
+RESULT_CACHE_CONFIG = {
+    "enabled": os.getenv("RESULT_CACHE_ENABLED", "1") == "1",
+    "max_entries": int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "10000")),
+    "max_bytes": int(float(os.getenv("RESULT_CACHE_MAX_MB", "64")) * 1024 * 1024),
+    "ttl_seconds": float(os.getenv("RESULT_CACHE_TTL_SECONDS", "3600")),
+    "compress_above_bytes": 1024,
+    "default_explain": "full"       # Los resultados incluyen siempre las explicaciones completas
+}
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Forma canónica del texto para la clave (Unicode NFC y espacios colapsados)"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def encode_result(result: Dict[str, Any], compress_above_bytes: int = None) -> bytes:
+    """Representación compacta de un resultado: JSON sin espacios, con zlib si es grande"""
+    if compress_above_bytes is None:
+        compress_above_bytes = RESULT_CACHE_CONFIG["compress_above_bytes"]
+    payload = json.dumps(result, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+    if len(payload) > compress_above_bytes:
+        return b"z" + zlib.compress(payload)
+    return b"j" + payload
+
+
+def decode_result(payload: bytes) -> Dict[str, Any]:
+    """Resultado (copia nueva) a partir de su representación compacta"""
+    data = payload[1:]
+    return json.loads(zlib.decompress(data) if payload[:1] == b"z" else data)
+
+
+class ResultCache:
+    """Caché LRU + TTL acotada por número de entradas y por bytes"""
+
+    def __init__(self, config: Dict[str, Any] = None):
+        """
+        Inicializa la caché
+
+        Args:
+            config: Configuración (por defecto RESULT_CACHE_CONFIG)
+        """
+        self.config = {**RESULT_CACHE_CONFIG, **(config or {})}
+        self.enabled = self.config["enabled"]
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()  # clave → (expira, datos)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def make_key(self, text: str, mode: str, versions: Dict[str, str], explain: str = None) -> str:
+        """Clave de un análisis: hash de texto normalizado, modo, versiones y nivel de explicación"""
+        parts = [
+            normalize_text(text), mode,
+            versions.get("lexicon", ""), versions.get("model", ""),
+            explain or self.config["default_explain"]
+        ]
+        return hashlib.blake2b("\x1f".join(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Resultado cacheado (copia nueva) o None si no existe o caducó"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            expires_at, payload = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self.stats["expirations"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+        return decode_result(payload)
+
+    def put(self, key: str, result: Dict[str, Any]):
+        """Guarda un resultado, desalojando las entradas menos usadas si hace falta"""
+        self.put_payload(key, encode_result(result, self.config["compress_above_bytes"]))
+
+    def put_payload(self, key: str, payload: bytes):
+        """Guarda un resultado ya codificado con encode_result (p. ej. traído de la caché compartida)"""
+        if len(payload) > self.config["max_bytes"]:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.config["ttl_seconds"], payload)
+            self._bytes += len(key) + len(payload)
+            self.stats["stores"] += 1
+            while self._entries and (len(self._entries) > self.config["max_entries"]
+                                     or self._bytes > self.config["max_bytes"]):
+                self._remove(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+
+    def _remove(self, key: str):
+        """Elimina una entrada (llamar con el lock tomado)"""
+        _, payload = self._entries.pop(key)
+        self._bytes -= len(key) + len(payload)
+
+    def clear(self, reason: str = None):
+        """Vacía la caché (p. ej. tras cambiar un léxico o un modelo)"""
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+            self.stats["invalidations"] += 1
+        if reason:
+            logger.info(f"🧊 Caché de resultados vaciada ({count} entradas): {reason}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Tasa de aciertos, tamaño y memoria de la caché"""
+        with self._lock:
+            stats = dict(self.stats)
+            entries = len(self._entries)
+            used_bytes = self._bytes
+        lookups = stats["hits"] + stats["misses"]
+        return {
+            "enabled": self.enabled,
+            "entries": entries,
+            "max_entries": self.config["max_entries"],
+            "memory_bytes": used_bytes,
+            "max_bytes": self.config["max_bytes"],
+            "ttl_seconds": self.config["ttl_seconds"],
+            "hit_ratio": round(stats["hits"] / lookups, 4) if lookups else 0.0,
+            **stats
+        }
+
+
+# Instancia global de la caché de resultados
+result_cache = ResultCache()
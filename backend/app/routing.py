@@ -0,0 +1,208 @@
+"""
+🧭 Enrutado por Hash Consistente - ToxiGuard
+Reparte los textos entre los nodos de un clúster con un anillo de hash
+consistente sobre el texto normalizado: cada texto tiene un nodo dueño, así que
+cada nodo cachea solo su fragmento y la caché efectiva del clúster crece con el
+número de nodos. Cualquier nodo (o un proceso frontal que no esté en el anillo)
+puede recibir la petición y reenviarla a su dueño.
+"""
+
+import os
+import json
+import time
+import bisect
+import hashlib
+import logging
+import threading
+import urllib.error
+import urllib.request
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from .result_cache import normalize_text
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Configuración del enrutado (sobrescribible por variables de entorno)
+ROUTING_CONFIG = {
+    # URLs base de los nodos del anillo, separadas por comas (vacío = enrutado desactivado)
+    "nodes": [node.strip().rstrip("/") for node in os.getenv("CLUSTER_NODES", "").split(",") if node.strip()],
+    # URL de este nodo tal como aparece en CLUSTER_NODES (vacío = proceso frontal, reenvía todo)
+    "self_node": os.getenv("CLUSTER_SELF", "").strip().rstrip("/"),
+    "virtual_nodes": int(os.getenv("CLUSTER_VIRTUAL_NODES", "160")),
+    "forward_timeout_seconds": float(os.getenv("CLUSTER_FORWARD_TIMEOUT_SECONDS", "5")),
+    "down_seconds": 10.0,                         # Tras un fallo, sus textos se analizan en local durante este tiempo
+    "forwarded_header": "X-ToxiGuard-Forwarded"  # Evita bucles: una petición reenviada se analiza siempre en local
+}
+
+
+def _hash(value: str) -> int:
+    """Hash estable entre procesos y máquinas (hash() de Python cambia por proceso)"""
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Anillo de hash consistente con nodos virtuales"""
+
+    def __init__(self, nodes: List[str], virtual_nodes: int = 160):
+        """
+        Construye el anillo
+
+        Args:
+            nodes: Identificadores (URLs) de los nodos
+            virtual_nodes: Puntos por nodo; más puntos, reparto más uniforme
+        """
+        self.nodes = list(dict.fromkeys(nodes))
+        self.virtual_nodes = virtual_nodes
+        points = sorted(
+            (_hash(f"{node}#{replica}"), node)
+            for node in self.nodes for replica in range(virtual_nodes)
+        )
+        self._hashes = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    def node_for(self, key: str) -> Optional[str]:
+        """Nodo dueño de una clave (el primer punto del anillo en sentido horario)"""
+        if not self._hashes:
+            return None
+        index = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._owners[index]
+
+    def ownership(self) -> Dict[str, float]:
+        """Fracción del espacio de claves que posee cada nodo"""
+        if not self._hashes:
+            return {}
+        space = 2 ** 64
+        shares: Dict[str, float] = {node: 0.0 for node in self.nodes}
+        previous = self._hashes[-1] - space
+        for point, node in zip(self._hashes, self._owners):
+            shares[node] += (point - previous) / space
+            previous = point
+        return {node: round(share, 4) for node, share in shares.items()}
+
+
+class ClusterRouter:
+    """Decide el nodo dueño de cada texto y reenvía las peticiones ajenas"""
+
+    def __init__(self, config: Dict[str, Any] = None):
+        """
+        Inicializa el router
+
+        Args:
+            config: Configuración (por defecto ROUTING_CONFIG)
+        """
+        self.config = {**ROUTING_CONFIG, **(config or {})}
+        self.self_node = self.config["self_node"]
+        self.ring = HashRing(self.config["nodes"], self.config["virtual_nodes"])
+        self.enabled = bool(self.ring.nodes)
+        self.forwarded_header = self.config["forwarded_header"]
+        self._lock = threading.Lock()
+        self._forwarded: Counter = Counter()
+        self._down_until: Dict[str, float] = {}
+        self.stats = {"local": 0, "forwarded": 0, "received_forwarded": 0, "forward_errors": 0, "fallbacks": 0}
+
+        if self.enabled:
+            role = "nodo" if self.self_node in self.ring.nodes else "frontal"
+            logger.info(f"🧭 Enrutado por hash consistente: {len(self.ring.nodes)} nodos, este proceso es {role}")
+
+    def owner_for(self, text: str) -> Optional[str]:
+        """Nodo dueño del texto normalizado"""
+        return self.ring.node_for(normalize_text(text))
+
+    def owns(self, text: str) -> bool:
+        """Indica si este nodo es el dueño del texto (sin clúster, todos los textos son locales)"""
+        return not self.enabled or self.owner_for(text) == self.self_node
+
+    def route(self, text: str, forwarded: Optional[str] = None) -> Optional[str]:
+        """
+        Nodo al que reenviar la petición, o None si se analiza en este nodo
+
+        Args:
+            text: Texto de la petición
+            forwarded: Valor de la cabecera de reenvío (presente = ya reenviada)
+        """
+        if forwarded:
+            with self._lock:
+                self.stats["received_forwarded"] += 1
+            return None
+        owner = self.owner_for(text) if self.enabled else None
+        with self._lock:
+            down = owner is not None and self._down_until.get(owner, 0.0) > time.monotonic()
+            if owner is None or owner == self.self_node or down:
+                self.stats["local"] += 1
+                self.stats["fallbacks"] += int(down)
+                return None
+        return owner
+
+    def forward(self, node: str, path: str, payload: Dict[str, Any],
+                headers: Dict[str, str] = None) -> Optional[Tuple[int, Any]]:
+        """
+        Reenvía una petición JSON al nodo dueño (bloqueante: llamar fuera del event loop)
+
+        Returns:
+            Tuple con (status, cuerpo JSON) del nodo; None si el nodo no responde o
+            responde con un error de servidor (el llamante analiza en local)
+        """
+        request = urllib.request.Request(
+            node + path,
+            data=json.dumps(payload, default=str).encode("utf-8"),
+            headers={
+                "Content-Type": "application/json",
+                self.forwarded_header: self.self_node or "front",
+                **(headers or {})
+            },
+            method="POST"
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.config["forward_timeout_seconds"]) as response:
+                status, body = response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            if e.code < 500:
+                # Error del cliente: el dueño respondería igual en cualquier nodo
+                with self._lock:
+                    self.stats["forwarded"] += 1
+                    self._forwarded[node] += 1
+                return e.code, json.loads(e.read() or b"{}")
+            logger.warning(f"⚠️ Nodo {node} respondió {e.code}, analizando en local")
+            self._record_fallback(node)
+            return None
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            logger.warning(f"⚠️ No se pudo reenviar a {node} ({e}), analizando en local")
+            self._record_fallback(node)
+            return None
+
+        with self._lock:
+            self.stats["forwarded"] += 1
+            self._forwarded[node] += 1
+        return status, body
+
+    def _record_fallback(self, node: str):
+        """Cuenta el fallo y retira el nodo temporalmente"""
+        with self._lock:
+            self.stats["forward_errors"] += 1
+            self.stats["fallbacks"] += 1
+            self.stats["local"] += 1
+            self._down_until[node] = time.monotonic() + self.config["down_seconds"]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Miembros del anillo, reparto del espacio de claves y contadores de reenvío"""
+        now = time.monotonic()
+        with self._lock:
+            stats = dict(self.stats)
+            forwarded = dict(self._forwarded)
+            down = [node for node, until in self._down_until.items() if until > now]
+        return {
+            "enabled": self.enabled,
+            "self_node": self.self_node or None,
+            "nodes": self.ring.nodes,
+            "virtual_nodes": self.ring.virtual_nodes,
+            "key_space_share": self.ring.ownership(),
+            "forwarded_by_node": forwarded,
+            "down_nodes": down,
+            **stats
+        }
+
+
+# Instancia global del router del clúster
+cluster_router = ClusterRouter()
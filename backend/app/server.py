@@ -0,0 +1,254 @@
+"""
+🚀 Lanzador Pre-fork - ToxiGuard
+Carga los modelos una sola vez en el proceso maestro, congela el heap con
+gc.freeze() para que el recolector no ensucie las páginas compartidas
+(copy-on-write) y hace fork de N workers uvicorn que comparten el socket de
+escucha y la memoria de solo lectura de los modelos
+"""
+
+import os
+import gc
+import sys
+import time
+import signal
+import socket
+import logging
+import argparse
+from typing import Any, Callable, Dict, List, Optional
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Configuración del servidor (sobrescribible por variables de entorno)
+SERVER_CONFIG = {
+    "host": os.getenv("HOST", "0.0.0.0"),
+    "port": int(os.getenv("PORT", "8000")),
+    "workers": int(os.getenv("TOXIGUARD_WORKERS", "1")),
+    "backlog": 2048,
+    "log_level": os.getenv("LOG_LEVEL", "info"),
+    "threads_per_worker": int(os.getenv("TOXIGUARD_THREADS_PER_WORKER", "1")),  # Hilos de torch por worker
+    "shared_cache_backend": "sqlite",  # Caché L2 entre workers si SHARED_CACHE_BACKEND no indica otra
+    "memory_report_delay": 5.0,     # Segundos tras arrancar antes del informe de memoria
+    "restart_delay": 1.0            # Espera antes de relanzar un worker caído
+}
+
+
+def read_memory_kb(pid: int) -> Dict[str, int]:
+    """
+    Memoria de un proceso desde /proc/<pid>/smaps_rollup
+
+    Returns:
+        Diccionario con rss, pss y uss (Private_Clean + Private_Dirty) en kB;
+        vacío si /proc no está disponible
+    """
+    fields: Dict[str, int] = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                    fields[parts[0][:-1]] = int(parts[1])
+    except OSError:
+        return {}
+
+    return {
+        "rss_kb": fields.get("Rss", 0),
+        "pss_kb": fields.get("Pss", 0),
+        "uss_kb": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    }
+
+
+def load_application():
+    """Importa la aplicación y con ella todos los clasificadores y modelos"""
+    start_time = time.time()
+    from app.main import app
+    logger.info(f"✅ Modelos cargados en el maestro en {time.time() - start_time:.2f}s")
+    return app
+
+
+def create_socket(host: str, port: int, backlog: int) -> socket.socket:
+    """Socket de escucha compartido por todos los workers"""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def serve_with_uvicorn(app: Any, sock: socket.socket, config: Dict[str, Any]):
+    """Ejecuta uvicorn en el worker sobre el socket heredado"""
+    import uvicorn
+
+    # torch mantiene pools de hilos propios: limitarlos evita sobresuscribir la CPU con N workers
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(config["threads_per_worker"])
+
+    server = uvicorn.Server(uvicorn.Config(app, log_level=config["log_level"]))
+    server.run(sockets=[sock])
+
+
+class PreforkServer:
+    """Proceso maestro que reparte el socket entre workers hijos y los supervisa"""
+
+    def __init__(self, config: Dict[str, Any] = None, serve: Callable = None):
+        """
+        Inicializa el lanzador
+
+        Args:
+            config: Configuración (por defecto SERVER_CONFIG)
+            serve: Función serve(app, sock, config) de cada worker (por defecto uvicorn)
+        """
+        self.config = {**SERVER_CONFIG, **(config or {})}
+        self.serve = serve or serve_with_uvicorn
+        self.workers: Dict[int, int] = {}  # pid → índice del worker
+        self.app = None
+        self.sock: Optional[socket.socket] = None
+        self._stopping = False
+
+    def _spawn(self, index: int) -> int:
+        """Hace fork de un worker; el hijo sirve hasta terminar y sale"""
+        pid = os.fork()
+        if pid == 0:
+            # Hijo: restaurar señales por defecto (uvicorn instala las suyas)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            exit_code = 0
+            try:
+                self.serve(self.app, self.sock, self.config)
+            except Exception as e:
+                logger.error(f"❌ Worker {index} terminó con error: {e}")
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+
+        self.workers[pid] = index
+        logger.info(f"👷 Worker {index} iniciado (pid {pid})")
+        return pid
+
+    def _handle_stop(self, signum, frame):
+        """Reenvía la parada a los workers"""
+        self._stopping = True
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def memory_report(self) -> List[Dict[str, Any]]:
+        """Memoria del maestro y de cada worker (USS = memoria no compartida)"""
+        report = [{"process": "master", "pid": os.getpid(), **read_memory_kb(os.getpid())}]
+        for pid, index in sorted(self.workers.items(), key=lambda item: item[1]):
+            report.append({"process": f"worker-{index}", "pid": pid, **read_memory_kb(pid)})
+        return report
+
+    def log_memory_report(self):
+        """Escribe el informe de memoria en el log"""
+        report = self.memory_report()
+        for entry in report:
+            if "uss_kb" in entry:
+                logger.info(
+                    f"🧠 {entry['process']:>10} (pid {entry['pid']}): "
+                    f"USS {entry['uss_kb'] / 1024:.1f} MB, PSS {entry['pss_kb'] / 1024:.1f} MB, "
+                    f"RSS {entry['rss_kb'] / 1024:.1f} MB"
+                )
+        workers = [entry for entry in report[1:] if "uss_kb" in entry]
+        if workers:
+            total_uss = sum(entry["uss_kb"] for entry in workers)
+            logger.info(f"🧠 USS medio por worker: {total_uss / len(workers) / 1024:.1f} MB")
+
+    def run(self) -> int:
+        """Carga modelos, congela el heap, lanza los workers y los supervisa"""
+        self.app = load_application()
+
+        # Con varios workers la caché L2 compartida (SQLite) se activa salvo que se configure otra
+        from app.shared_cache import shared_cache
+        shared_cache.use_default_backend(self.config["shared_cache_backend"])
+
+        # Un solo precalentamiento por máquina: los workers heredan la caché del maestro
+        from app.main import warm_cache_before_fork
+        warm_cache_before_fork()
+
+        self.sock = create_socket(self.config["host"], self.config["port"], self.config["backlog"])
+
+        # Todo lo cargado hasta aquí pasa a la generación permanente: el GC de los
+        # workers no lo recorre y sus páginas siguen compartidas tras el fork
+        gc.collect()
+        gc.freeze()
+        logger.info(f"🧊 Heap congelado ({gc.get_freeze_count()} objetos)")
+
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+
+        for index in range(self.config["workers"]):
+            self._spawn(index)
+        logger.info(
+            f"🚀 ToxiGuard escuchando en {self.config['host']}:{self.config['port']} "
+            f"con {self.config['workers']} workers"
+        )
+
+        report_at = time.monotonic() + self.config["memory_report_delay"]
+        while self.workers:
+            if report_at is not None and time.monotonic() >= report_at:
+                self.log_memory_report()
+                report_at = None
+
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                time.sleep(0.2)
+                continue
+
+            index = self.workers.pop(pid, None)
+            if index is None:
+                continue
+            if not self._stopping:
+                logger.warning(f"⚠️ Worker {index} (pid {pid}) terminó con estado {status}, relanzando")
+                time.sleep(self.config["restart_delay"])
+                self._spawn(index)
+
+        self.sock.close()
+        logger.info("🛑 Servidor pre-fork detenido")
+        return 0
+
+
+def run_server(config: Dict[str, Any] = None) -> int:
+    """
+    Punto de entrada del servidor
+
+    Sin fork (Windows) o con un solo worker se ejecuta uvicorn en el proceso actual.
+    """
+    config = {**SERVER_CONFIG, **(config or {})}
+    if config["workers"] <= 1 or not hasattr(os, "fork"):
+        if config["workers"] > 1:
+            logger.warning("⚠️ os.fork no disponible, se usa un único worker")
+        import uvicorn
+        app = load_application()
+        uvicorn.run(app, host=config["host"], port=config["port"], log_level=config["log_level"])
+        return 0
+    return PreforkServer(config).run()
+
+
+def main(argv: List[str] = None) -> int:
+    """CLI: python -m app.server --workers 8"""
+    parser = argparse.ArgumentParser(description="Servidor pre-fork de ToxiGuard")
+    parser.add_argument("--host", default=SERVER_CONFIG["host"])
+    parser.add_argument("--port", type=int, default=SERVER_CONFIG["port"])
+    parser.add_argument("--workers", type=int, default=SERVER_CONFIG["workers"])
+    parser.add_argument("--log-level", default=SERVER_CONFIG["log_level"])
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    return run_server({
+        "host": args.host,
+        "port": args.port,
+        "workers": args.workers,
+        "log_level": args.log_level
+    })
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -308,3 +308,8 @@ class ToxicityClassifier:
 
 # Instancia global del clasificador
 toxicity_classifier = ToxicityClassifier()
+
+# Clasificadores y base de datos expuestos a la API (main.py)
+from .hybrid_classifier import hybrid_classifier as primary_classifier
+from .contextual_classifier import contextual_classifier
+from .database import history_db
@@ -0,0 +1,454 @@
+"""
+🗄️ Caché Compartida de Resultados - ToxiGuard
+Segundo nivel (L2) de la caché de resultados, compartido por todos los workers
+del servidor pre-fork: se consulta tras la caché en proceso y se escribe en
+segundo plano. Es opcional: el backend SQLite (fichero local con WAL, mmap y
+barrido LRU) lo activa el servidor pre-fork o SHARED_CACHE_BACKEND; el backend
+Redis se puede probar con un sustituto en memoria que implementa el mismo
+subconjunto del protocolo.
+"""
+
+import os
+import time
+import queue
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Cliente Redis opcional
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    redis = None
+    REDIS_AVAILABLE = False
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Configuración de la caché compartida (sobrescribible por variables de entorno)
+SHARED_CACHE_CONFIG = {
+    # sqlite, redis, memory o none; vacío = sin configurar (none, o sqlite en el servidor pre-fork)
+    "backend": os.getenv("SHARED_CACHE_BACKEND", ""),
+    "sqlite_path": os.getenv("SHARED_CACHE_PATH", "result_cache.db"),
+    "mmap_bytes": 256 * 1024 * 1024,
+    "sqlite_max_variables": 900,        # Parámetros por consulta (SQLite antiguo admite 999)
+    "redis_url": os.getenv("SHARED_CACHE_REDIS_URL", "redis://localhost:6379/0"),
+    "key_prefix": "toxiguard:result:",
+    "max_entries": int(os.getenv("SHARED_CACHE_MAX_ENTRIES", "200000")),
+    "ttl_seconds": float(os.getenv("SHARED_CACHE_TTL_SECONDS", "86400")),
+    "sweep_interval_seconds": 30.0,
+    "touch_interval_seconds": 60.0,     # Precisión del "último acceso" para el LRU de SQLite
+    "write_queue_size": 4096,           # Escrituras pendientes; al llenarse se descartan
+    "write_batch_size": 256
+}
+
+
+class SharedCacheBackend:
+    """Interfaz de los backends de la caché compartida (valores ya codificados en bytes)"""
+
+    name = "base"
+
+    def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """Valores vigentes de las claves que existen"""
+        raise NotImplementedError
+
+    def set_many(self, items: List[Tuple[str, bytes]], ttl_seconds: float):
+        """Guarda varios valores con el mismo TTL"""
+        raise NotImplementedError
+
+    def touch_many(self, keys: List[str]):
+        """Marca claves como usadas (solo backends con LRU propio)"""
+
+    def sweep(self) -> int:
+        """Elimina entradas caducadas o sobrantes; devuelve cuántas"""
+        return 0
+
+    def get_info(self) -> Dict[str, Any]:
+        return {"backend": self.name}
+
+    def reset_after_fork(self):
+        """Descarta conexiones heredadas del proceso padre"""
+
+    def close(self):
+        """Libera las conexiones"""
+
+
+class SQLiteSharedBackend(SharedCacheBackend):
+    """Fichero SQLite compartido entre procesos con barrido LRU por último acceso"""
+
+    name = "sqlite"
+
+    def __init__(self, path: str, max_entries: int, mmap_bytes: int = 0, max_variables: int = 900):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.mmap_bytes = mmap_bytes
+        self.max_variables = max_variables
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS result_cache (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    expires_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_result_cache_accessed ON result_cache (accessed_at)")
+            conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Conexión del hilo actual (WAL: lectores y un escritor concurrentes entre procesos)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            if self.mmap_bytes:
+                conn.execute(f"PRAGMA mmap_size={int(self.mmap_bytes)}")
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        if not keys:
+            return {}
+        # Lotes por debajo del límite de parámetros de SQLite (uno es expires_at)
+        conn = self._connect()
+        now = time.time()
+        chunk_size = max(self.max_variables - 1, 1)
+        found = {}
+        for start in range(0, len(keys), chunk_size):
+            chunk = keys[start:start + chunk_size]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT key, value FROM result_cache WHERE key IN ({placeholders}) AND expires_at > ?",
+                (*chunk, now)
+            ).fetchall()
+            found.update((key, bytes(value)) for key, value in rows)
+        return found
+
+    def set_many(self, items: List[Tuple[str, bytes]], ttl_seconds: float):
+        now = time.time()
+        conn = self._connect()
+        conn.executemany(
+            "INSERT OR REPLACE INTO result_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+            [(key, value, now + ttl_seconds, now) for key, value in items]
+        )
+        conn.commit()
+
+    def touch_many(self, keys: List[str]):
+        conn = self._connect()
+        conn.executemany("UPDATE result_cache SET accessed_at = ? WHERE key = ?",
+                         [(time.time(), key) for key in keys])
+        conn.commit()
+
+    def sweep(self) -> int:
+        conn = self._connect()
+        removed = conn.execute("DELETE FROM result_cache WHERE expires_at <= ?", (time.time(),)).rowcount
+        excess = conn.execute("SELECT COUNT(*) FROM result_cache").fetchone()[0] - self.max_entries
+        if excess > 0:
+            removed += conn.execute("""
+                DELETE FROM result_cache WHERE key IN (
+                    SELECT key FROM result_cache ORDER BY accessed_at LIMIT ?
+                )
+            """, (excess,)).rowcount
+        conn.commit()
+        return removed
+
+    def get_info(self) -> Dict[str, Any]:
+        entries = self._connect().execute("SELECT COUNT(*) FROM result_cache").fetchone()[0]
+        size = sum(p.stat().st_size for p in self.path.parent.glob(self.path.name + "*") if p.is_file())
+        return {"backend": self.name, "path": str(self.path), "entries": entries,
+                "max_entries": self.max_entries, "file_bytes": size}
+
+    def reset_after_fork(self):
+        self._local = threading.local()
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class InMemoryRedis:
+    """Sustituto en memoria del subconjunto de Redis que usa RedisSharedBackend (GET, MGET, SET EX)"""
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[bytes, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def _alive(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._data[key]
+            return None
+        return value
+
+    def get(self, name: str) -> Optional[bytes]:
+        with self._lock:
+            return self._alive(name)
+
+    def mget(self, keys: List[str]) -> List[Optional[bytes]]:
+        with self._lock:
+            return [self._alive(key) for key in keys]
+
+    def set(self, name: str, value: bytes, ex: Optional[int] = None) -> bool:
+        with self._lock:
+            self._data[name] = (bytes(value), time.time() + ex if ex else None)
+        return True
+
+    def dbsize(self) -> int:
+        with self._lock:
+            return sum(1 for key in list(self._data) if self._alive(key) is not None)
+
+    def ping(self) -> bool:
+        return True
+
+    def flushdb(self):
+        with self._lock:
+            self._data.clear()
+
+
+class RedisSharedBackend(SharedCacheBackend):
+    """Redis (o compatible); el LRU lo aplica el servidor con maxmemory-policy allkeys-lru"""
+
+    name = "redis"
+
+    def __init__(self, client: Any, key_prefix: str):
+        self.client = client
+        self.key_prefix = key_prefix
+
+    def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        if not keys:
+            return {}
+        values = self.client.mget([self.key_prefix + key for key in keys])
+        return {key: value for key, value in zip(keys, values) if value is not None}
+
+    def set_many(self, items: List[Tuple[str, bytes]], ttl_seconds: float):
+        pipeline = self.client.pipeline() if hasattr(self.client, "pipeline") else self.client
+        for key, value in items:
+            pipeline.set(self.key_prefix + key, value, ex=max(int(ttl_seconds), 1))
+        if pipeline is not self.client:
+            pipeline.execute()
+
+    def get_info(self) -> Dict[str, Any]:
+        return {"backend": self.name, "client": type(self.client).__name__, "entries": self.client.dbsize()}
+
+
+def create_backend(config: Dict[str, Any]) -> Optional[SharedCacheBackend]:
+    """Backend configurado (None si está desactivado o no se puede crear)"""
+    backend = config["backend"]
+    try:
+        if backend == "sqlite":
+            return SQLiteSharedBackend(config["sqlite_path"], config["max_entries"], config["mmap_bytes"],
+                                       config["sqlite_max_variables"])
+        if backend == "memory":
+            return RedisSharedBackend(InMemoryRedis(), config["key_prefix"])
+        if backend == "redis":
+            if not REDIS_AVAILABLE:
+                logger.warning("⚠️ Paquete redis no instalado, caché compartida desactivada")
+                return None
+            return RedisSharedBackend(redis.Redis.from_url(config["redis_url"]), config["key_prefix"])
+    except Exception as e:
+        logger.warning(f"⚠️ Caché compartida no disponible ({backend}): {e}")
+        return None
+    if backend not in ("", "none"):
+        logger.warning(f"⚠️ Backend de caché compartida desconocido: {backend}")
+    return None
+
+
+class SharedResultCache:
+    """Caché L2: lecturas síncronas, escrituras y barrido en un hilo de fondo"""
+
+    def __init__(self, config: Dict[str, Any] = None, backend: SharedCacheBackend = None):
+        """
+        Inicializa la caché compartida
+
+        Args:
+            config: Configuración (por defecto SHARED_CACHE_CONFIG)
+            backend: Backend explícito (por defecto el de config["backend"])
+        """
+        self.config = {**SHARED_CACHE_CONFIG, **(config or {})}
+        self.backend = backend if backend is not None else create_backend(self.config)
+        self.enabled = self.backend is not None
+        self._init_state()
+
+        # Servidor pre-fork: conexiones e hilo escritor propios en cada worker
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+        if self.enabled:
+            logger.info(f"✅ Caché compartida de resultados: {self.backend.name}")
+
+    def use_default_backend(self, backend: str) -> bool:
+        """
+        Activa un backend si no se configuró ninguno (SHARED_CACHE_BACKEND vacío)
+
+        La usa el servidor pre-fork tras cargar la aplicación, de modo que la
+        elección no depende de cuándo se importó este módulo.
+
+        Returns:
+            True si la caché compartida queda activa
+        """
+        if self.backend is not None or self.config["backend"]:
+            return self.enabled
+        self.config["backend"] = backend
+        self.backend = create_backend(self.config)
+        self.enabled = self.backend is not None
+        if self.enabled:
+            logger.info(f"✅ Caché compartida de resultados: {self.backend.name} (por defecto)")
+        return self.enabled
+
+    def _init_state(self):
+        """Cola de escritura, hilo y contadores"""
+        self._queue: "queue.Queue" = queue.Queue(maxsize=self.config["write_queue_size"])
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._touched: Dict[str, float] = {}
+        self._last_sweep = time.monotonic()
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "dropped_writes": 0, "errors": 0,
+                      "swept": 0, "lookup_time_ms": 0.0, "lookups": 0}
+
+    def _after_fork(self):
+        self._init_state()
+        if self.backend is not None:
+            self.backend.reset_after_fork()
+
+    def _ensure_writer(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="toxiguard-shared-cache", daemon=True)
+                self._thread.start()
+
+    def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """
+        Valores codificados (encode_result) de las claves presentes
+
+        Los errores del backend se registran y cuentan como fallos: la caché
+        compartida nunca hace fallar un análisis.
+        """
+        if not self.enabled or not keys:
+            return {}
+        start = time.perf_counter()
+        try:
+            found = self.backend.get_many(keys)
+        except Exception as e:
+            logger.warning(f"⚠️ Error leyendo la caché compartida: {e}")
+            found = {}
+            with self._lock:
+                self.stats["errors"] += 1
+
+        now = time.monotonic()
+        with self._lock:
+            self.stats["lookups"] += 1
+            self.stats["lookup_time_ms"] += (time.perf_counter() - start) * 1000
+            self.stats["hits"] += len(found)
+            self.stats["misses"] += len(keys) - len(found)
+            # El último acceso se actualiza en diferido y como mucho una vez por intervalo
+            touch = [key for key in found
+                     if now - self._touched.get(key, 0.0) > self.config["touch_interval_seconds"]]
+            for key in touch:
+                self._touched[key] = now
+            if len(self._touched) > self.config["max_entries"]:
+                self._touched.clear()
+        if touch:
+            self._enqueue(("touch", touch))
+        return found
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Valor codificado de una clave o None"""
+        return self.get_many([key]).get(key)
+
+    def put_payload(self, key: str, payload: bytes):
+        """Encola la escritura de un resultado codificado (no bloquea)"""
+        if self.enabled:
+            self._enqueue(("set", (key, payload)))
+
+    def _enqueue(self, item: Tuple[str, Any]):
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._lock:
+                self.stats["dropped_writes"] += 1
+
+    def _run(self):
+        """Hilo escritor: agrupa escrituras y barre periódicamente"""
+        interval = self.config["sweep_interval_seconds"]
+        while True:
+            try:
+                items = [self._queue.get(timeout=interval)]
+            except queue.Empty:
+                items = []
+            while items and len(items) < self.config["write_batch_size"]:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                sets = [payload for kind, payload in items if kind == "set"]
+                touches = [key for kind, keys in items if kind == "touch" for key in keys]
+                if sets:
+                    self.backend.set_many(sets, self.config["ttl_seconds"])
+                if touches:
+                    self.backend.touch_many(touches)
+                with self._lock:
+                    self.stats["writes"] += len(sets)
+
+                if time.monotonic() - self._last_sweep >= interval:
+                    self._last_sweep = time.monotonic()
+                    removed = self.backend.sweep()
+                    with self._lock:
+                        self.stats["swept"] += removed
+            except Exception as e:
+                logger.warning(f"⚠️ Error escribiendo en la caché compartida: {e}")
+                with self._lock:
+                    self.stats["errors"] += 1
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Espera a que se apliquen las escrituras encoladas"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return not self._queue.unfinished_tasks
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Aciertos, latencia de consulta, escrituras y estado del backend"""
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats.pop("lookups")
+        lookup_time = stats.pop("lookup_time_ms")
+        keys_looked_up = stats["hits"] + stats["misses"]
+        info: Dict[str, Any] = {"enabled": self.enabled}
+        if self.enabled:
+            try:
+                info.update(self.backend.get_info())
+            except Exception as e:
+                info["backend_error"] = str(e)
+        return {
+            **info,
+            "hit_ratio": round(stats["hits"] / keys_looked_up, 4) if keys_looked_up else 0.0,
+            "avg_lookup_ms": round(lookup_time / lookups, 3) if lookups else 0.0,
+            "pending_writes": self._queue.qsize(),
+            **stats
+        }
+
+    def close(self):
+        """Aplica las escrituras pendientes y cierra el backend"""
+        if self.enabled:
+            self.flush()
+            self.backend.close()
+
+
+# Instancia global de la caché compartida
+shared_cache = SharedResultCache()
@@ -0,0 +1,139 @@
+"""
+🛬 Single-flight - ToxiGuard
+Agrupa los análisis idénticos que están en curso a la vez: la primera llamada
+con una clave ejecuta el análisis y las concurrentes con la misma clave esperan
+su resultado en lugar de recalcularlo (oleadas de spam antes de que el
+resultado llegue a la caché)
+"""
+
+import os
+import copy
+import logging
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Tuple
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Configuración del single-flight (sobrescribible por variables de entorno)
+SINGLE_FLIGHT_CONFIG = {
+    "enabled": os.getenv("SINGLE_FLIGHT_ENABLED", "1") == "1",
+    # Espera máxima de un seguidor; al vencer calcula por su cuenta
+    "wait_timeout_seconds": float(os.getenv("SINGLE_FLIGHT_WAIT_SECONDS", "5"))
+}
+
+
+class _Call:
+    """Análisis en curso de una clave"""
+
+    __slots__ = ("future", "waiters")
+
+    def __init__(self):
+        self.future: Future = Future()
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalescencia de llamadas concurrentes con la misma clave"""
+
+    def __init__(self, config: Dict[str, Any] = None):
+        """
+        Inicializa el grupo
+
+        Args:
+            config: Configuración (por defecto SINGLE_FLIGHT_CONFIG)
+        """
+        self.config = {**SINGLE_FLIGHT_CONFIG, **(config or {})}
+        self.enabled = self.config["enabled"]
+        self._init_state()
+
+        # Servidor pre-fork: cada worker empieza sin llamadas en curso
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._init_state)
+
+    def _init_state(self):
+        """Llamadas en curso, lock y contadores; se recrean tras un fork"""
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self.stats = {"leaders": 0, "coalesced": 0, "timeouts": 0, "shared_errors": 0, "max_waiters": 0}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Ejecuta fn una sola vez por clave entre las llamadas concurrentes
+
+        Args:
+            key: Clave del análisis (la misma que la de la caché de resultados)
+            fn: Función sin argumentos que calcula el resultado
+
+        Returns:
+            Tuple con (resultado, coalesced); los seguidores reciben una copia
+
+        Raises:
+            Exception: La del líder, compartida con sus seguidores
+        """
+        if not self.enabled or key is None:
+            return fn(), False
+
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                leader = True
+                self.stats["leaders"] += 1
+            else:
+                leader = False
+                call.waiters += 1
+                self.stats["coalesced"] += 1
+                self.stats["max_waiters"] = max(self.stats["max_waiters"], call.waiters)
+
+        if leader:
+            try:
+                result = fn()
+            except BaseException as e:
+                self._finish(key)
+                call.future.set_exception(e)
+                raise
+            # Los seguidores copian de una instantánea: el llamante del líder puede modificar su resultado
+            if self._finish(key):
+                call.future.set_result(copy.deepcopy(result))
+            else:
+                call.future.set_result(None)
+            return result, False
+
+        try:
+            result = call.future.result(timeout=self.config["wait_timeout_seconds"])
+        except FutureTimeoutError:
+            # El líder va lento: no arrastrar a todos los seguidores con él
+            with self._lock:
+                self.stats["timeouts"] += 1
+            logger.warning("⏱️ Single-flight: espera agotada, se analiza de forma independiente")
+            return fn(), False
+        except Exception:
+            with self._lock:
+                self.stats["shared_errors"] += 1
+            raise
+        return copy.deepcopy(result), True
+
+    def _finish(self, key: str) -> bool:
+        """Retira la clave (ya no se unen más seguidores) e indica si alguien espera"""
+        with self._lock:
+            call = self._calls.pop(key, None)
+            return call is not None and call.waiters > 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Llamadas líderes, coalescidas y claves en curso"""
+        with self._lock:
+            stats = dict(self.stats)
+            in_flight = len(self._calls)
+        total = stats["leaders"] + stats["coalesced"]
+        return {
+            "enabled": self.enabled,
+            "in_flight_keys": in_flight,
+            "coalesced_ratio": round(stats["coalesced"] / total, 4) if total else 0.0,
+            **stats
+        }
+
+
+# Instancia global del single-flight de análisis
+single_flight = SingleFlight()
@@ -0,0 +1,337 @@
+"""
+🌊 Análisis en Streaming - ToxiGuard
+Lee NDJSON de forma incremental, agrupa las líneas en bloques pequeños que se
+analizan por la ruta por lotes del ejecutor y devuelve una línea de resultado
+por entrada en cuanto su bloque termina, con un número acotado de bloques en
+vuelo (memoria constante y contrapresión sobre la lectura del cuerpo)
+"""
+
+import json
+import time
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from fastapi.responses import StreamingResponse
+
+from .analysis_executor import analysis_executor, AnalysisOverloadedError
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Configuración del streaming
+STREAM_CONFIG = {
+    "chunk_size": 32,             # Líneas por bloque enviado al ejecutor
+    "max_in_flight": 4,           # Bloques analizándose a la vez
+    "max_text_length": 10000,
+    "max_line_bytes": 1_000_000,  # Línea sin salto más larga admitida
+    "overload_retry_seconds": 0.05
+}
+
+
+async def iter_ndjson_lines(byte_stream: AsyncIterator[bytes],
+                            max_line_bytes: int = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Convierte un flujo de bytes NDJSON en entradas {index, text, id, error}
+
+    Cada línea puede ser un objeto {"text": ..., "id": ...} o una cadena JSON.
+    Las líneas vacías se ignoran y no consumen índice. Una línea de más de
+    max_line_bytes produce una única entrada de error y se descarta hasta su salto.
+    """
+    max_line_bytes = max_line_bytes or STREAM_CONFIG["max_line_bytes"]
+    buffer = b""
+    index = 0
+    skipping = False  # Descartando el resto de una línea demasiado larga
+
+    def too_long() -> Dict[str, Any]:
+        nonlocal index
+        entry = {"index": index, "text": None, "id": None, "error": "Línea demasiado larga"}
+        index += 1
+        return entry
+
+    def parse(raw: bytes):
+        nonlocal index
+        line = raw.strip()
+        if not line:
+            return None
+        if len(line) > max_line_bytes:
+            return too_long()
+        entry = {"index": index, "text": None, "id": None, "error": None}
+        index += 1
+        try:
+            value = json.loads(line.decode("utf-8"))
+            if isinstance(value, str):
+                entry["text"] = value
+            elif isinstance(value, dict) and isinstance(value.get("text"), str):
+                entry["text"] = value["text"]
+                entry["id"] = value.get("id")
+            else:
+                entry["error"] = "Cada línea debe ser una cadena o un objeto con 'text'"
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            entry["error"] = f"JSON inválido: {e}"
+        return entry
+
+    async for chunk in byte_stream:
+        if skipping:
+            newline = chunk.find(b"\n")
+            if newline < 0:
+                continue
+            chunk = chunk[newline + 1:]
+            skipping = False
+        buffer += chunk
+        # Partir por bytes antes de decodificar: un carácter multibyte nunca contiene b"\n"
+        *lines, buffer = buffer.split(b"\n")
+        for raw in lines:
+            entry = parse(raw)
+            if entry is not None:
+                yield entry
+        if len(buffer) > max_line_bytes:
+            buffer = b""
+            skipping = True
+            yield too_long()
+
+    if not skipping:
+        entry = parse(buffer)
+        if entry is not None:
+            yield entry
+
+
+class RequestBodyChannel:
+    """
+    Único lector de receive() para una respuesta en streaming que consume su propio cuerpo
+
+    Con ASGI < 2.4, StreamingResponse escucha la desconexión llamando a receive()
+    mientras se genera la respuesta; si el generador también leyera el cuerpo,
+    ambos competirían por los mensajes y el stream se bloquearía. Aquí una tarea
+    lee receive(), pasa los trozos del cuerpo a una cola acotada y expone la
+    desconexión a la respuesta a través de su propio receive().
+    """
+
+    def __init__(self, receive: Callable[[], Awaitable[Dict[str, Any]]], max_buffered_chunks: int = 8):
+        """
+        Args:
+            receive: receive() ASGI de la petición
+            max_buffered_chunks: Trozos del cuerpo leídos por adelantado (contrapresión)
+        """
+        self._receive = receive
+        self._body: asyncio.Queue = asyncio.Queue(maxsize=max_buffered_chunks)
+        self._disconnected = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Arranca la tarea lectora (dentro del event loop del servidor)"""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._pump())
+
+    async def _pump(self):
+        """Lee el cuerpo completo y después espera la desconexión del cliente"""
+        try:
+            while True:
+                message = await self._receive()
+                if message["type"] == "http.disconnect":
+                    self._disconnected.set()
+                    return
+                if message["type"] == "http.request":
+                    if message.get("body"):
+                        await self._body.put(message["body"])
+                    if not message.get("more_body", False):
+                        break
+            await self._body.put(None)
+            while (await self._receive())["type"] != "http.disconnect":
+                pass
+            self._disconnected.set()
+        finally:
+            if self._disconnected.is_set():
+                # Despierta al consumidor del cuerpo si sigue esperando
+                while True:
+                    try:
+                        self._body.put_nowait(None)
+                        break
+                    except asyncio.QueueFull:
+                        self._body.get_nowait()
+
+    async def stream(self) -> AsyncIterator[bytes]:
+        """Trozos del cuerpo en orden (termina al acabar el cuerpo o al desconectarse el cliente)"""
+        self.start()
+        while True:
+            chunk = await self._body.get()
+            if chunk is None:
+                return
+            yield chunk
+
+    async def receive(self) -> Dict[str, Any]:
+        """receive() para la respuesta: solo devuelve la desconexión"""
+        await self._disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def close(self):
+        """Detiene la tarea lectora"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+class ChannelStreamingResponse(StreamingResponse):
+    """StreamingResponse que lee receive() solo a través de un RequestBodyChannel"""
+
+    def __init__(self, channel: RequestBodyChannel, content: AsyncIterator[bytes], **kwargs):
+        super().__init__(content, **kwargs)
+        self.channel = channel
+
+    async def __call__(self, scope, receive, send):
+        self.channel.start()
+        try:
+            await super().__call__(scope, self.channel.receive, send)
+        finally:
+            await self.channel.close()
+
+
+def format_result(entry: Dict[str, Any], analysis_result: Dict[str, Any]) -> Dict[str, Any]:
+    """Línea de salida de una entrada analizada"""
+    details = analysis_result.get("details", {})
+    line = {
+        "index": entry["index"],
+        "is_toxic": analysis_result["is_toxic"],
+        "toxicity_percentage": analysis_result["toxicity_percentage"],
+        "toxicity_level": analysis_result["toxicity_level"],
+        "confidence": analysis_result["confidence"],
+        "detected_categories": details.get("detected_categories", []),
+        "mode": details.get("mode")
+    }
+    if entry["id"] is not None:
+        line["id"] = entry["id"]
+    return line
+
+
+def format_error(entry: Dict[str, Any], error: str) -> Dict[str, Any]:
+    """Línea de salida de una entrada que no se pudo analizar"""
+    line = {"index": entry["index"], "error": error}
+    if entry.get("id") is not None:
+        line["id"] = entry["id"]
+    return line
+
+
+async def _analyze_chunk(analyze_fn: Callable, entries: List[Dict[str, Any]], mode: str,
+                         config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Analiza un bloque en el ejecutor y devuelve sus líneas de salida en orden de entrada"""
+    valid = [
+        entry for entry in entries
+        if entry["error"] is None and entry["text"].strip() and len(entry["text"]) <= config["max_text_length"]
+    ]
+
+    results: Dict[int, Dict[str, Any]] = {}
+    if valid:
+        # Con la cola llena se espera en lugar de fallar: el stream ya envió sus cabeceras
+        while True:
+            try:
+                analyses = await analysis_executor.run_analysis(
+                    analyze_fn, [entry["text"] for entry in valid], mode,
+                    timeout=analysis_executor.config["batch_timeout_seconds"]
+                )
+                for entry, analysis in zip(valid, analyses):
+                    results[entry["index"]] = format_result(entry, analysis)
+                break
+            except AnalysisOverloadedError:
+                await asyncio.sleep(config["overload_retry_seconds"])
+            except Exception as e:
+                logger.warning(f"Error analizando bloque en streaming: {e}")
+                for entry in valid:
+                    results[entry["index"]] = format_error(entry, str(e))
+                break
+
+    lines = []
+    for entry in entries:
+        if entry["index"] in results:
+            lines.append(results[entry["index"]])
+        elif entry["error"] is not None:
+            lines.append(format_error(entry, entry["error"]))
+        elif not entry["text"].strip():
+            lines.append(format_error(entry, "El texto no puede estar vacío"))
+        else:
+            lines.append(format_error(entry, f"El texto excede el límite de {config['max_text_length']:,} caracteres"))
+    return lines
+
+
+async def stream_analysis(byte_stream: AsyncIterator[bytes], analyze_fn: Callable, mode: str,
+                          ordered: bool = True, config: Dict[str, Any] = None) -> AsyncIterator[bytes]:
+    """
+    Genera las líneas NDJSON de resultado a medida que se analizan los bloques
+
+    Args:
+        byte_stream: Cuerpo de la petición
+        analyze_fn: Función por lotes analyze_fn(texts, mode) -> resultados
+        mode: Modo del clasificador ya validado
+        ordered: Mantener el orden de entrada (si no, los bloques salen según terminan)
+        config: Configuración (por defecto STREAM_CONFIG)
+
+    Yields:
+        Líneas NDJSON codificadas; la última es un resumen {"summary": {...}}
+    """
+    config = {**STREAM_CONFIG, **(config or {})}
+    start_time = time.perf_counter()
+    counts = {"analyzed": 0, "errors": 0}
+    # Bloques listos para emitir: en orden de envío (ordered) o según terminan
+    ready: asyncio.Queue = asyncio.Queue()
+    in_flight = asyncio.Semaphore(config["max_in_flight"])
+    tasks: List[asyncio.Task] = []
+    done_marker = object()
+
+    def encode(lines: List[Dict[str, Any]]) -> bytes:
+        for line in lines:
+            counts["errors" if "error" in line else "analyzed"] += 1
+        return "".join(json.dumps(line, ensure_ascii=False) + "\n" for line in lines).encode("utf-8")
+
+    async def submit(chunk: List[Dict[str, Any]]):
+        # Contrapresión: no se lee más cuerpo mientras haya max_in_flight bloques sin emitir
+        await in_flight.acquire()
+        task = asyncio.ensure_future(_analyze_chunk(analyze_fn, chunk, mode, config))
+        tasks.append(task)
+        if ordered:
+            ready.put_nowait(task)
+        else:
+            task.add_done_callback(ready.put_nowait)
+
+    async def produce():
+        try:
+            chunk: List[Dict[str, Any]] = []
+            async for entry in iter_ndjson_lines(byte_stream, config["max_line_bytes"]):
+                chunk.append(entry)
+                if len(chunk) >= config["chunk_size"]:
+                    await submit(chunk)
+                    chunk = []
+            if chunk:
+                await submit(chunk)
+            if not ordered:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            ready.put_nowait(done_marker)
+
+    # La lectura del cuerpo y la emisión avanzan por separado: cada bloque se
+    # emite en cuanto termina (y, en orden, en cuanto terminan los anteriores)
+    producer = asyncio.ensure_future(produce())
+    try:
+        while True:
+            task = await ready.get()
+            if task is done_marker:
+                break
+            lines = await task
+            in_flight.release()
+            yield encode(lines)
+        # Errores de lectura del cuerpo
+        await producer
+    finally:
+        producer.cancel()
+        for task in tasks:
+            task.cancel()
+
+    summary = {
+        "summary": {
+            "analyzed": counts["analyzed"],
+            "errors": counts["errors"],
+            "elapsed_ms": round((time.perf_counter() - start_time) * 1000, 2)
+        }
+    }
+    yield (json.dumps(summary) + "\n").encode("utf-8")
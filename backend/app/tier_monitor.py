@@ -0,0 +1,278 @@
+"""
+⏱️ Monitor de Niveles - ToxiGuard
+Latencias recientes por nivel del clasificador híbrido, agrupadas por longitud
+de texto, para elegir la combinación de niveles que cabe en un presupuesto, y
+circuit breakers que retiran temporalmente los niveles lentos o con errores
+"""
+
+import time
+import random
+import logging
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Configuración del monitor de latencias
+LATENCY_CONFIG = {
+    "window_size": 200,                     # Muestras recientes por nivel y bucket
+    "min_samples": 5,                       # Muestras antes de confiar en el p95 observado
+    "percentile": 95,
+    "length_buckets": [(64, "short"), (256, "medium"), (1024, "long")],  # Resto: "xlong"
+    "prior_p95_ms": {"rules": 1.0, "advanced": 2.0, "ml": 10.0, "contextual": 150.0},
+    # Planes ordenados de más a menos preciso; "parallel" cuesta el máximo, si no la suma
+    "plans": [
+        {"name": "fusion", "tiers": ["advanced", "ml", "contextual"], "parallel": True},
+        {"name": "cascade", "tiers": ["advanced", "ml", "contextual"], "parallel": False},
+        {"name": "ml", "tiers": ["ml"], "parallel": False},
+        {"name": "advanced", "tiers": ["advanced"], "parallel": False},
+        {"name": "rules", "tiers": ["rules"], "parallel": False}
+    ]
+}
+
+
+# Configuración de los circuit breakers (solo niveles costosos; avanzado y reglas siempre disponibles)
+CIRCUIT_BREAKER_CONFIG = {
+    "tiers": ["ml", "contextual"],
+    "window_size": 50,                      # Llamadas recientes evaluadas
+    "min_calls": 10,                        # Llamadas mínimas antes de poder abrir
+    "failure_rate_threshold": 0.5,
+    "slow_call_rate_threshold": 0.5,
+    "slow_call_ms": {"ml": 200.0, "contextual": 1000.0},
+    "open_seconds": 30.0,                   # Tiempo abierto antes de sondear
+    "probe_fraction": 0.1,                  # Fracción del tráfico que sondea en semiabierto
+    "probe_successes": 3                    # Sondeos correctos seguidos para cerrar
+}
+
+
+class LatencyTracker:
+    """Ventanas de latencia por nivel y longitud de texto con estimación de p95"""
+
+    def __init__(self, config: Dict[str, Any] = None):
+        """
+        Inicializa el monitor
+
+        Args:
+            config: Configuración (por defecto LATENCY_CONFIG)
+        """
+        self.config = {**LATENCY_CONFIG, **(config or {})}
+        self._windows: Dict[Tuple[str, str], deque] = {}
+        self._lock = threading.Lock()
+
+    def bucket_for(self, text_length: int) -> str:
+        """Bucket de longitud al que pertenece un texto"""
+        for limit, name in self.config["length_buckets"]:
+            if text_length <= limit:
+                return name
+        return "xlong"
+
+    def record(self, tier: str, text_length: int, elapsed_ms: float):
+        """Registra la latencia de una ejecución de un nivel"""
+        key = (tier, self.bucket_for(text_length))
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None:
+                window = self._windows[key] = deque(maxlen=self.config["window_size"])
+            window.append(elapsed_ms)
+
+    def p95(self, tier: str, text_length: int) -> float:
+        """p95 reciente del nivel para la longitud dada (prior si hay pocas muestras)"""
+        with self._lock:
+            samples = list(self._windows.get((tier, self.bucket_for(text_length)), ()))
+        if len(samples) < self.config["min_samples"]:
+            return float(self.config["prior_p95_ms"].get(tier, 0.0))
+        return float(np.percentile(samples, self.config["percentile"]))
+
+    def plan_cost(self, plan: Dict[str, Any], text_length: int) -> float:
+        """Latencia esperada de un plan a partir del p95 de sus niveles"""
+        costs = [self.p95(tier, text_length) for tier in plan["tiers"]]
+        return max(costs) if plan["parallel"] else sum(costs)
+
+    def select_plan(self, budget_ms: float, text_length: int,
+                    available_tiers: List[str]) -> Tuple[str, float]:
+        """
+        Elige el plan más preciso cuyo p95 cabe en el presupuesto
+
+        Args:
+            budget_ms: Presupuesto de latencia en milisegundos
+            text_length: Longitud del texto en caracteres
+            available_tiers: Niveles cargados en este despliegue
+
+        Returns:
+            Tuple con (nombre del plan, latencia esperada en ms); si ninguno
+            cabe, el plan disponible más barato
+        """
+        candidates = []
+        for plan in self.config["plans"]:
+            # Los niveles no cargados se omiten (fusion y cascade funcionan con los restantes)
+            tiers = [tier for tier in plan["tiers"] if tier in available_tiers]
+            if not tiers:
+                continue
+            candidates.append((plan["name"], self.plan_cost({**plan, "tiers": tiers}, text_length)))
+
+        for name, cost in candidates:
+            if cost <= budget_ms:
+                return name, cost
+        return min(candidates, key=lambda candidate: candidate[1])
+
+    def get_stats(self) -> Dict[str, Any]:
+        """p95 y número de muestras por nivel y bucket"""
+        with self._lock:
+            windows = {key: list(window) for key, window in self._windows.items()}
+
+        stats: Dict[str, Dict[str, Any]] = {}
+        for (tier, bucket), samples in sorted(windows.items()):
+            stats.setdefault(tier, {})[bucket] = {
+                "samples": len(samples),
+                "p95_ms": round(float(np.percentile(samples, self.config["percentile"])), 3)
+            }
+        return stats
+
+
+class CircuitBreaker:
+    """Circuit breaker de un nivel: closed → open → half_open → closed"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, tier: str, config: Dict[str, Any] = None):
+        """
+        Inicializa el breaker
+
+        Args:
+            tier: Nombre del nivel protegido
+            config: Configuración (por defecto CIRCUIT_BREAKER_CONFIG)
+        """
+        self.tier = tier
+        self.config = {**CIRCUIT_BREAKER_CONFIG, **(config or {})}
+        self.slow_call_ms = self.config["slow_call_ms"].get(tier, float("inf"))
+        self.state = self.CLOSED
+        self.opened_at: Optional[float] = None
+        self.times_opened = 0
+        self._calls: deque = deque(maxlen=self.config["window_size"])  # (fallo, lenta)
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """Indica si la petición puede usar el nivel (en semiabierto, solo una fracción)"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.config["open_seconds"]:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probe_successes = 0
+                logger.info(f"🟡 Circuit breaker {self.tier}: semiabierto, sondeando")
+            if self.state == self.HALF_OPEN:
+                return random.random() < self.config["probe_fraction"]
+            return True
+
+    def is_available(self) -> bool:
+        """
+        Consulta sin efectos: el nivel está cerrado, sondeando o a punto de sondear
+
+        A diferencia de allow_request(), no cambia de estado ni consume un turno de
+        sondeo; sirve para planificar niveles que quizá no lleguen a ejecutarse.
+        """
+        with self._lock:
+            if self.state == self.OPEN:
+                return time.monotonic() - self.opened_at >= self.config["open_seconds"]
+            return True
+
+    def record(self, elapsed_ms: float, success: bool = True):
+        """Registra el resultado de una llamada al nivel"""
+        failed = not success
+        slow = elapsed_ms > self.slow_call_ms
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                if failed or slow:
+                    self._open()
+                else:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.config["probe_successes"]:
+                        self.state = self.CLOSED
+                        self._calls.clear()
+                        logger.info(f"🟢 Circuit breaker {self.tier}: cerrado")
+                return
+
+            self._calls.append((failed, slow))
+            if self.state == self.CLOSED and len(self._calls) >= self.config["min_calls"]:
+                failure_rate, slow_rate = self._rates()
+                if (failure_rate >= self.config["failure_rate_threshold"]
+                        or slow_rate >= self.config["slow_call_rate_threshold"]):
+                    self._open()
+
+    def _open(self):
+        """Abre el circuito (llamar con el lock tomado)"""
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+        failure_rate, slow_rate = self._rates()
+        logger.warning(
+            f"🔴 Circuit breaker {self.tier}: abierto "
+            f"(errores {failure_rate:.0%}, lentas {slow_rate:.0%})"
+        )
+
+    def _rates(self) -> Tuple[float, float]:
+        """Tasas de fallo y de llamadas lentas en la ventana"""
+        if not self._calls:
+            return 0.0, 0.0
+        total = len(self._calls)
+        return (sum(f for f, _ in self._calls) / total, sum(s for _, s in self._calls) / total)
+
+    def get_state(self) -> Dict[str, Any]:
+        """Estado del breaker para /health"""
+        with self._lock:
+            failure_rate, slow_rate = self._rates()
+            state = {
+                "state": self.state,
+                "calls_in_window": len(self._calls),
+                "failure_rate": round(failure_rate, 4),
+                "slow_call_rate": round(slow_rate, 4),
+                "slow_call_ms": self.slow_call_ms,
+                "times_opened": self.times_opened
+            }
+            if self.state == self.OPEN:
+                remaining = self.config["open_seconds"] - (time.monotonic() - self.opened_at)
+                state["retry_in_seconds"] = round(max(remaining, 0.0), 1)
+        return state
+
+
+class CircuitBreakerRegistry:
+    """Circuit breakers por nivel del clasificador híbrido"""
+
+    def __init__(self, config: Dict[str, Any] = None):
+        self.config = {**CIRCUIT_BREAKER_CONFIG, **(config or {})}
+        self.breakers = {tier: CircuitBreaker(tier, self.config) for tier in self.config["tiers"]}
+
+    def allow(self, tier: str) -> bool:
+        """Los niveles sin breaker siempre están permitidos"""
+        breaker = self.breakers.get(tier)
+        return breaker.allow_request() if breaker else True
+
+    def is_available(self, tier: str) -> bool:
+        """Consulta de solo lectura (no consume sondeos); los niveles sin breaker siempre lo están"""
+        breaker = self.breakers.get(tier)
+        return breaker.is_available() if breaker else True
+
+    def record(self, tier: str, elapsed_ms: float, success: bool = True):
+        """Registra una llamada en el breaker del nivel (si lo tiene)"""
+        breaker = self.breakers.get(tier)
+        if breaker:
+            breaker.record(elapsed_ms, success)
+
+    def get_states(self) -> Dict[str, Dict[str, Any]]:
+        """Estado de todos los breakers"""
+        return {tier: breaker.get_state() for tier, breaker in self.breakers.items()}
+
+    def open_tiers(self) -> List[str]:
+        """Niveles retirados actualmente (abiertos o sondeando)"""
+        return [tier for tier, breaker in self.breakers.items() if breaker.state != CircuitBreaker.CLOSED]
+
+
+# Instancias globales del monitor de latencias y de los circuit breakers
+latency_tracker = LatencyTracker()
+circuit_breakers = CircuitBreakerRegistry()
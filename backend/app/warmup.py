@@ -0,0 +1,203 @@
+"""
+🔥 Precalentamiento de Caché - ToxiGuard
+Tras un despliegue la caché de resultados empieza vacía y los textos más
+repetidos vuelven a pagar el análisis completo. Al arrancar, un hilo en segundo
+plano toma del historial los textos más frecuentes (o más recientes), los
+analiza por lotes con la versión actual de léxicos y modelos y deja sus
+resultados en la caché en proceso y en la compartida. Con el servidor pre-fork
+el maestro precalienta una sola vez antes del fork y los workers heredan la
+caché; en un clúster cada nodo precalienta solo los textos de los que es dueño.
+"""
+
+import os
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Configuración del precalentamiento (sobrescribible por variables de entorno)
+WARMUP_CONFIG = {
+    "enabled": os.getenv("WARMUP_ENABLED", "1") == "1",
+    "top_n": int(os.getenv("WARMUP_TOP_N", "500")),
+    "strategy": os.getenv("WARMUP_STRATEGY", "frequent"),           # frequent | recent
+    # Modos a precalentar, separados por comas (vacío = modo por defecto del servicio)
+    "modes": [mode.strip() for mode in os.getenv("WARMUP_MODES", "").split(",") if mode.strip()],
+    "max_seconds": float(os.getenv("WARMUP_MAX_SECONDS", "60")),    # Tiempo máximo total
+    # Espera en el arranque antes de aceptar tráfico (0 = precalienta tras quedar listo)
+    "wait_seconds": float(os.getenv("WARMUP_WAIT_SECONDS", "0")),
+    "scan_limit": int(os.getenv("WARMUP_SCAN_ROWS", "100000")),     # Últimos análisis del historial considerados
+    "batch_size": 64
+}
+
+# Estados del precalentamiento
+WARMUP_IDLE = "idle"
+WARMUP_DISABLED = "disabled"
+WARMUP_RUNNING = "running"
+WARMUP_COMPLETED = "completed"
+WARMUP_TIMED_OUT = "timed_out"
+WARMUP_FAILED = "failed"
+
+
+class CacheWarmer:
+    """Precalienta la caché de resultados con los textos del historial en un hilo propio"""
+
+    def __init__(self, config: Dict[str, Any] = None):
+        """
+        Inicializa el precalentador
+
+        Args:
+            config: Configuración (por defecto WARMUP_CONFIG)
+        """
+        self.config = {**WARMUP_CONFIG, **(config or {})}
+        self.enabled = self.config["enabled"] and self.config["top_n"] > 0
+        self._thread: Optional[threading.Thread] = None
+        self._done = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.stats: Dict[str, Any] = {
+            "status": WARMUP_IDLE if self.enabled else WARMUP_DISABLED,
+            "texts_loaded": 0, "texts_scored": 0, "already_cached": 0,
+            "query_ms": 0.0, "duration_seconds": 0.0, "modes": {},
+            "started_at": None, "finished_at": None, "error": None
+        }
+
+    @property
+    def status(self) -> str:
+        """Estado actual del precalentamiento"""
+        with self._lock:
+            return self.stats["status"]
+
+    def _should_run(self) -> bool:
+        """Solo una vez por proceso (los workers heredan el precalentamiento del maestro)"""
+        if not self.enabled:
+            self._done.set()
+            logger.info("🔥 Precalentamiento de caché desactivado")
+            return False
+        if self.status != WARMUP_IDLE:
+            self._done.set()
+            return False
+        return True
+
+    def start(self, load_texts: Callable[..., List[Dict[str, Any]]],
+              analyze_fn: Callable[[List[str], Optional[str]], List[Dict]],
+              owns: Optional[Callable[[str], bool]] = None):
+        """
+        Lanza el precalentamiento en segundo plano
+
+        Args:
+            load_texts: Consulta del historial (p. ej. history_db.get_top_texts)
+            analyze_fn: Análisis por lotes que guarda en caché (p. ej. primary_classifier.analyze_texts)
+            owns: Filtro de textos de este nodo (p. ej. cluster_router.owns); None = todos
+        """
+        if (self._thread is not None and self._thread.is_alive()) or not self._should_run():
+            return
+        self._done.clear()
+        self._stop.clear()
+        self._update(status=WARMUP_RUNNING)
+        self._thread = threading.Thread(
+            target=self._run, args=(load_texts, analyze_fn, owns), name="toxiguard-warmup", daemon=True
+        )
+        self._thread.start()
+
+    def run(self, load_texts: Callable[..., List[Dict[str, Any]]],
+            analyze_fn: Callable[[List[str], Optional[str]], List[Dict]],
+            owns: Optional[Callable[[str], bool]] = None):
+        """Precalienta en el hilo actual (el maestro pre-fork, antes de crear los workers)"""
+        if self._should_run():
+            self._done.clear()
+            self._stop.clear()
+            self._run(load_texts, analyze_fn, owns)
+
+    def wait(self, timeout: float = None) -> bool:
+        """Espera a que termine el precalentamiento; True si terminó"""
+        return self._done.wait(timeout)
+
+    def shutdown(self, timeout: float = 5.0):
+        """Interrumpe el precalentamiento entre lotes"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self, load_texts: Callable[..., List[Dict[str, Any]]],
+             analyze_fn: Callable[[List[str], Optional[str]], List[Dict]],
+             owns: Optional[Callable[[str], bool]] = None):
+        """Consulta el historial y analiza los textos por lotes y por modo"""
+        started = time.perf_counter()
+        deadline = started + self.config["max_seconds"]
+        self._update(status=WARMUP_RUNNING, started_at=datetime.now().isoformat())
+        status = WARMUP_COMPLETED
+        try:
+            rows = load_texts(
+                limit=self.config["top_n"],
+                strategy=self.config["strategy"],
+                scan_limit=self.config["scan_limit"]
+            )
+            texts = [row["text"] for row in rows if row.get("text") and row["text"].strip()]
+            if owns is not None:
+                texts = [text for text in texts if owns(text)]
+            self._update(texts_loaded=len(texts), query_ms=round((time.perf_counter() - started) * 1000, 2))
+
+            batch_size = self.config["batch_size"]
+            for mode in self.config["modes"] or [None]:
+                mode_name = mode or "default"
+                scored = cached = 0
+                for start in range(0, len(texts), batch_size):
+                    if self._stop.is_set() or time.perf_counter() > deadline:
+                        status = WARMUP_TIMED_OUT
+                        break
+                    try:
+                        results = analyze_fn(texts[start:start + batch_size], mode)
+                    except ValueError as e:
+                        # Modo inexistente o no cargado en este despliegue
+                        logger.warning(f"⚠️ Precalentamiento: se omite el modo {mode_name} ({e})")
+                        break
+                    batch_cached = sum(1 for result in results if result.get("details", {}).get("cached"))
+                    scored += len(results)
+                    cached += batch_cached
+                    with self._lock:
+                        self.stats["texts_scored"] += len(results)
+                        self.stats["already_cached"] += batch_cached
+                        self.stats["modes"][mode_name] = {"scored": scored, "already_cached": cached}
+                if status == WARMUP_TIMED_OUT:
+                    break
+        except Exception as e:
+            status = WARMUP_FAILED
+            self._update(error=str(e))
+            logger.error(f"❌ Error en el precalentamiento de caché: {e}")
+        finally:
+            duration = round(time.perf_counter() - started, 3)
+            self._update(status=status, duration_seconds=duration, finished_at=datetime.now().isoformat())
+            self._done.set()
+
+        stats = self.get_stats()
+        logger.info(
+            f"🔥 Precalentamiento {status}: {stats['texts_scored']} análisis "
+            f"({stats['already_cached']} ya en caché) de {stats['texts_loaded']} textos en {duration:.2f}s"
+        )
+
+    def _update(self, **values):
+        """Actualiza las estadísticas de forma atómica"""
+        with self._lock:
+            self.stats.update(values)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estado, textos precalentados por modo y tiempo empleado"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["modes"] = dict(self.stats["modes"])
+        return {
+            "enabled": self.enabled,
+            "strategy": self.config["strategy"],
+            "top_n": self.config["top_n"],
+            "max_seconds": self.config["max_seconds"],
+            **stats
+        }
+
+
+# Instancia global del precalentador de caché
+cache_warmer = CacheWarmer()
@@ -6,13 +6,21 @@ Sistema para optimizar automáticamente los pesos de las categorías de toxicida
 import logging
 import json
 import os
+import time
 from typing import List, Dict, Tuple, Any, Optional
 from datetime import datetime
 import numpy as np
 from sklearn.metrics import f1_score, precision_score, recall_score
-from sklearn.linear_model import LogisticRegression
 
 from .ml_models import MLToxicityClassifier
+from .improved_classifier import optimized_classifier
+from .advanced_preprocessor import advanced_preprocessor
+
+# Caché de características compartida con el entrenador y el evaluador
+try:
+    from ml.feature_cache import feature_cache
+except ImportError:
+    feature_cache = None
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -50,13 +58,28 @@ class WeightOptimizer:
         # Métricas objetivo para optimización
         self.optimization_metrics = ["f1", "precision", "recall", "balanced_accuracy"]
         
+        # Barrido de umbrales y refinamiento por coordenadas
+        self.threshold_grid = np.round(np.arange(0.05, 1.0, 0.05), 2)
+        self.refinement_steps = 21
+        self.refinement_max_iterations = 10
+        self.max_sweep_cells = 50_000_000  # Límite de celdas (muestras × candidatos × umbrales) por bloque
+        
         logger.info("Optimizador de pesos inicializado")
     
     def optimize_weights_grid_search(self, training_data: List[Tuple[str, int, str]], 
                                    validation_data: List[Tuple[str, int, str]] = None,
                                    metric: str = "f1") -> Dict[str, Any]:
         """
-        Optimiza pesos usando Grid Search
+        Optimiza pesos usando Grid Search vectorizado + refinamiento por coordenadas
+        
+        El score de reglas es lineal en los pesos de categoría, así que se calcula
+        una sola vez la matriz de coincidencias (textos × categorías) y todos los
+        candidatos se puntúan con un único producto matricial. Los umbrales se
+        barren de forma vectorizada para cada candidato.
+        
+        Pesos y umbral se ajustan siempre sobre training_data. Si se pasa
+        validation_data, best_score y metrics se miden en ella con los pesos y el
+        umbral elegidos; si no, son el score dentro de la muestra de entrenamiento.
         
         Args:
             training_data: Lista de tuplas (texto, etiqueta, categoría)
@@ -70,92 +93,239 @@ class WeightOptimizer:
             raise ValueError(f"Métrica no válida: {metric}. Válidas: {self.optimization_metrics}")
         
         logger.info(f"Optimizando pesos usando Grid Search con métrica: {metric}")
+        start_time = time.time()
         
         # Preparar datos para optimización
         X_train, y_train, category_weights = self._prepare_data_for_optimization(training_data)
         
-        # Definir grid de pesos a probar
-        weight_grid = self._generate_weight_grid()
+        # Matriz de coincidencias de entrenamiento calculada una sola vez
+        train_matrix = self._build_match_matrix(X_train)
         
-        # Grid Search para encontrar mejores pesos
-        best_score = 0
-        best_weights = self.base_weights.copy()
-        best_metrics = {}
+        # Puntuar todo el grid de pesos de una vez
+        weight_grid = self._weights_to_matrix(self._generate_weight_grid())
+        scores, thresholds = self._score_weight_candidates(train_matrix, y_train, weight_grid, metric)
+        best_idx = int(np.argmax(scores))
+        best_vector = weight_grid[best_idx]
+        training_score = float(scores[best_idx])
+        best_threshold = float(thresholds[best_idx])
+        candidates_evaluated = len(weight_grid)
         
-        for weights in weight_grid:
-            try:
-                # Aplicar pesos a los datos
-                weighted_X = self._apply_weights_to_features(X_train, weights)
-                
-                # Entrenar modelo simple para evaluar pesos
-                model = LogisticRegression(random_state=42, max_iter=1000)
-                model.fit(weighted_X, y_train)
-                
-                # Evaluar en datos de validación o entrenamiento
-                if validation_data:
-                    X_val, y_val, _ = self._prepare_data_for_optimization(validation_data)
-                    weighted_X_val = self._apply_weights_to_features(X_val, weights)
-                    y_pred = model.predict(weighted_X_val)
-                    
-                    # Calcular métricas
-                    if metric == "f1":
-                        score = f1_score(y_val, y_pred, average='weighted')
-                    elif metric == "precision":
-                        score = precision_score(y_val, y_pred, average='weighted')
-                    elif metric == "recall":
-                        score = recall_score(y_val, y_pred, average='weighted')
-                    else:
-                        score = f1_score(y_val, y_pred, average='weighted')
-                else:
-                    # Usar cross-validation en datos de entrenamiento
-                    y_pred = model.predict(weighted_X)
-                    
-                    if metric == "f1":
-                        score = f1_score(y_train, y_pred, average='weighted')
-                    elif metric == "precision":
-                        score = precision_score(y_train, y_pred, average='weighted')
-                    elif metric == "recall":
-                        score = recall_score(y_train, y_pred, average='weighted')
-                    else:
-                        score = f1_score(y_train, y_pred, average='weighted')
-                
-                # Actualizar mejores pesos si es necesario
-                if score > best_score:
-                    best_score = score
-                    best_weights = weights.copy()
-                    
-                    # Calcular métricas completas
-                    if validation_data:
-                        y_pred = model.predict(weighted_X_val)
-                        best_metrics = {
-                            "f1": f1_score(y_val, y_pred, average='weighted'),
-                            "precision": precision_score(y_val, y_pred, average='weighted'),
-                            "recall": recall_score(y_val, y_pred, average='weighted')
-                        }
-                    else:
-                        y_pred = model.predict(weighted_X)
-                        best_metrics = {
-                            "f1": f1_score(y_train, y_pred, average='weighted'),
-                            "precision": precision_score(y_train, y_pred, average='weighted'),
-                            "recall": recall_score(y_train, y_pred, average='weighted')
-                        }
-                
-            except Exception as e:
-                logger.warning(f"Error evaluando pesos {weights}: {e}")
-                continue
+        # Refinamiento por descenso de coordenadas dentro de los rangos permitidos
+        best_vector, training_score, best_threshold, refined = self._refine_coordinate_descent(
+            train_matrix, y_train, best_vector, training_score, best_threshold, metric
+        )
+        candidates_evaluated += refined
+        
+        best_weights = self._vector_to_weights(best_vector)
+        
+        # Evaluar los pesos y el umbral elegidos en validación (o en entrenamiento si no hay)
+        if validation_data:
+            X_eval, y_eval, _ = self._prepare_data_for_optimization(validation_data)
+            eval_matrix = self._build_match_matrix(X_eval)
+            best_score = self._score_at_threshold(
+                eval_matrix, y_eval, self._weights_to_matrix([best_weights])[0], best_threshold, metric
+            )
+        else:
+            y_eval, eval_matrix = y_train, train_matrix
+            best_score = training_score
+        
+        # Calcular métricas completas
+        y_pred = (self._apply_weights_to_features(eval_matrix, best_weights) >= best_threshold).astype(int)
+        best_metrics = {
+            "f1": f1_score(y_eval, y_pred, average='weighted', zero_division=0),
+            "precision": precision_score(y_eval, y_pred, average='weighted', zero_division=0),
+            "recall": recall_score(y_eval, y_pred, average='weighted', zero_division=0)
+        }
         
+        elapsed = time.time() - start_time
         logger.info(f"Mejores pesos encontrados: {best_weights}")
-        logger.info(f"Mejor score: {best_score:.4f}")
+        logger.info(f"Mejor score: {best_score:.4f} en {'validación' if validation_data else 'entrenamiento'} "
+                    f"(entrenamiento {training_score:.4f}; {candidates_evaluated} candidatos en {elapsed:.2f}s)")
         
         return {
             "optimized_weights": best_weights,
             "best_score": best_score,
+            "training_score": training_score,
+            "evaluated_on": "validation" if validation_data else "training",
+            "threshold": best_threshold,
             "metrics": best_metrics,
             "optimization_method": "grid_search",
+            "refinement": "coordinate_descent",
+            "candidates_evaluated": candidates_evaluated,
+            "elapsed_seconds": round(elapsed, 3),
             "metric_used": metric,
             "timestamp": datetime.now().isoformat()
         }
     
+    def _build_match_matrix(self, texts: np.ndarray) -> np.ndarray:
+        """
+        Construye la matriz (textos × categorías) de coincidencias del motor de reglas
+        
+        Cada columna es la contribución de la categoría al score del clasificador
+        optimizado sin su peso base: score = min(1, Σ peso_c · coincidencias_c).
+        """
+        categories = list(self.base_weights.keys())
+        rule_categories = optimized_classifier.toxicity_categories
+        
+        # Reutilizar la matriz si el mismo corpus y léxico ya se procesaron
+        cache_key = None
+        if feature_cache is not None:
+            lexicon = {
+                name: {
+                    "keywords": sorted(info["keywords"]),
+                    "context_multiplier": info["context_multiplier"],
+                    "requires_context": info["requires_context"]
+                }
+                for name, info in rule_categories.items()
+            }
+            cache_key = feature_cache.make_key(
+                feature_cache.hash_texts(texts),
+                {"categories": categories, "lexicon": lexicon},
+                namespace="rule_matches"
+            )
+            cached = feature_cache.load_array(cache_key, mmap=False)
+            if cached is not None:
+                return cached
+        
+        match_matrix = np.zeros((len(texts), len(categories)), dtype=np.float64)
+        
+        for i, text in enumerate(texts):
+            preprocessed = advanced_preprocessor.preprocess_text(str(text))
+            cleaned_text = preprocessed["cleaned_text"].lower() if preprocessed.get("cleaned_text") else ""
+            word_count = preprocessed.get("word_count", 0)
+            if not cleaned_text:
+                continue
+            
+            # Misma normalización que OptimizedToxicityClassifier._calculate_toxicity_score
+            length_factor = (word_count ** 0.5) / max(word_count, 1) if word_count > 0 else 1.0
+            
+            for j, category in enumerate(categories):
+                pattern = optimized_classifier.category_patterns.get(category)
+                if pattern is None:
+                    continue
+                
+                match_count = len(pattern.findall(cleaned_text))
+                if match_count:
+                    info = rule_categories[category]
+                    multiplier = info["context_multiplier"] if info["requires_context"] else 1.0
+                    match_matrix[i, j] = multiplier * match_count * length_factor
+        
+        if cache_key is not None:
+            feature_cache.save_array(cache_key, match_matrix)
+        
+        return match_matrix
+    
+    def _weights_to_matrix(self, weight_grid: List[Dict[str, float]]) -> np.ndarray:
+        """Convierte una lista de diccionarios de pesos en una matriz (candidatos × categorías)"""
+        categories = list(self.base_weights.keys())
+        return np.array([[weights[c] for c in categories] for weights in weight_grid], dtype=np.float64)
+    
+    def _vector_to_weights(self, vector: np.ndarray) -> Dict[str, float]:
+        """Convierte un vector de pesos en diccionario por categoría"""
+        return {c: round(float(w), 4) for c, w in zip(self.base_weights.keys(), vector)}
+    
+    def _score_weight_candidates(self, match_matrix: np.ndarray, y: np.ndarray,
+                                 weight_matrix: np.ndarray, metric: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Evalúa todos los candidatos con barrido vectorizado de umbrales
+        
+        Returns:
+            Tuple con (mejor score por candidato, umbral que lo consigue)
+        """
+        y = np.asarray(y).astype(np.float64)
+        n_samples = len(y)
+        thresholds = self.threshold_grid
+        best_scores = np.full(len(weight_matrix), -np.inf)
+        best_thresholds = np.zeros(len(weight_matrix))
+        
+        # Procesar por bloques para acotar memoria (muestras × candidatos × umbrales)
+        chunk = max(1, self.max_sweep_cells // max(1, n_samples * len(thresholds)))
+        
+        for start in range(0, len(weight_matrix), chunk):
+            block = weight_matrix[start:start + chunk]
+            scores = np.minimum(1.0, match_matrix @ block.T)  # (muestras × candidatos)
+            predictions = (scores[:, :, None] >= thresholds[None, None, :]).reshape(n_samples, -1)
+            
+            true_positives = y @ predictions
+            predicted_positives = predictions.sum(axis=0)
+            metric_values = self._metric_from_counts(
+                true_positives, predicted_positives, y.sum(), n_samples, metric
+            ).reshape(len(block), len(thresholds))
+            
+            best_threshold_idx = metric_values.argmax(axis=1)
+            best_scores[start:start + chunk] = metric_values[np.arange(len(block)), best_threshold_idx]
+            best_thresholds[start:start + chunk] = thresholds[best_threshold_idx]
+        
+        return best_scores, best_thresholds
+    
+    def _score_at_threshold(self, match_matrix: np.ndarray, y: np.ndarray, weights: np.ndarray,
+                            threshold: float, metric: str) -> float:
+        """Score de un único vector de pesos con un umbral fijo (sin barrido)"""
+        y = np.asarray(y).astype(np.float64)
+        predictions = (np.minimum(1.0, match_matrix @ weights) >= threshold).astype(np.float64)
+        return float(self._metric_from_counts(
+            np.asarray(y @ predictions), np.asarray(predictions.sum()), y.sum(), len(y), metric
+        ))
+    
+    @staticmethod
+    def _metric_from_counts(tp: np.ndarray, predicted_pos: np.ndarray, actual_pos: float,
+                            n_samples: int, metric: str) -> np.ndarray:
+        """Métricas ponderadas por soporte (equivalentes a average='weighted') desde conteos"""
+        fp = predicted_pos - tp
+        fn = actual_pos - tp
+        tn = n_samples - actual_pos - fp
+        actual_neg = n_samples - actual_pos
+        
+        with np.errstate(divide="ignore", invalid="ignore"):
+            precision_pos = np.where(predicted_pos > 0, tp / predicted_pos, 0.0)
+            precision_neg = np.where(tn + fn > 0, tn / (tn + fn), 0.0)
+            recall_pos = tp / actual_pos if actual_pos > 0 else np.zeros_like(tp)
+            recall_neg = tn / actual_neg if actual_neg > 0 else np.zeros_like(tn)
+            
+            if metric == "precision":
+                pos, neg = precision_pos, precision_neg
+            elif metric == "recall":
+                pos, neg = recall_pos, recall_neg
+            elif metric == "balanced_accuracy":
+                return (recall_pos + recall_neg) / 2
+            else:
+                pos = np.where(precision_pos + recall_pos > 0,
+                               2 * precision_pos * recall_pos / (precision_pos + recall_pos), 0.0)
+                neg = np.where(precision_neg + recall_neg > 0,
+                               2 * precision_neg * recall_neg / (precision_neg + recall_neg), 0.0)
+        
+        return (actual_pos * pos + actual_neg * neg) / n_samples
+    
+    def _refine_coordinate_descent(self, match_matrix: np.ndarray, y: np.ndarray, start_vector: np.ndarray,
+                                   start_score: float, start_threshold: float,
+                                   metric: str) -> Tuple[np.ndarray, float, float, int]:
+        """Refina los pesos categoría por categoría con una rejilla fina dentro de su rango"""
+        best_vector = start_vector.copy()
+        best_score, best_threshold = start_score, start_threshold
+        evaluated = 0
+        
+        for _ in range(self.refinement_max_iterations):
+            improved = False
+            
+            for j, category in enumerate(self.base_weights.keys()):
+                low, high = self.weight_ranges.get(category, (0.0, 1.0))
+                candidates = np.repeat(best_vector[None, :], self.refinement_steps, axis=0)
+                candidates[:, j] = np.linspace(low, high, self.refinement_steps)
+                
+                scores, thresholds = self._score_weight_candidates(match_matrix, y, candidates, metric)
+                evaluated += len(candidates)
+                
+                idx = int(np.argmax(scores))
+                if scores[idx] > best_score + 1e-9:
+                    best_vector = candidates[idx]
+                    best_score, best_threshold = float(scores[idx]), float(thresholds[idx])
+                    improved = True
+            
+            if not improved:
+                break
+        
+        return best_vector, best_score, best_threshold, evaluated
+    
     def _prepare_data_for_optimization(self, data: List[Tuple[str, int, str]]) -> Tuple[np.ndarray, np.ndarray, Dict[str, float]]:
         """Prepara datos para optimización de pesos"""
         if not data:
@@ -201,15 +371,10 @@ class WeightOptimizer:
         
         return weight_grid
     
-    def _apply_weights_to_features(self, X: np.ndarray, weights: Dict[str, float]) -> np.ndarray:
-        """Aplica pesos a las características del texto"""
-        # Implementación simplificada - en un caso real, esto dependería de cómo
-        # se extraen las características del texto
-        weighted_X = X.copy()
-        
-        # Aquí se aplicarían los pesos a las características específicas
-        # Por ahora, retornamos X sin modificar
-        return weighted_X
+    def _apply_weights_to_features(self, match_matrix: np.ndarray, weights: Dict[str, float]) -> np.ndarray:
+        """Aplica pesos a la matriz de coincidencias y devuelve el score de reglas por texto"""
+        weight_vector = np.array([weights.get(c, 0.0) for c in self.base_weights.keys()])
+        return np.minimum(1.0, match_matrix @ weight_vector)
     
     def save_optimized_weights(self, weights: Dict[str, float], filepath: str = None) -> bool:
         """Guarda los pesos optimizados en un archivo JSON"""
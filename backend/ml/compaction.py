@@ -0,0 +1,328 @@
+"""
+🗜️ Compactación de Modelos Lineales - ToxiGuard
+Poda los n-gramas con menor |coef|, reindexa el vocabulario en un array
+ordenado con búsqueda binaria (np.searchsorted) y pasa idf/coef a float32
+para reducir la memoria por worker al servir
+"""
+
+import os
+import sys
+import json
+import pickle
+import logging
+import argparse
+import subprocess
+from typing import Any, Dict, Iterable, List
+from datetime import datetime
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+# Las clases de servicio solo dependen de numpy/scipy: pandas y el resto de
+# utilidades de entrenamiento se importan dentro de compact_model()
+try:
+    from .config import COMPACTION_CONFIG, BASE_DIR, DATA_DIR, MODELS_DIR, RANDOM_STATE, TEST_SIZE
+except ImportError:  # Ejecución como script desde ml/
+    from config import COMPACTION_CONFIG, BASE_DIR, DATA_DIR, MODELS_DIR, RANDOM_STATE, TEST_SIZE
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Parámetros del vectorizador necesarios para reconstruir el analizador de n-gramas
+ANALYZER_PARAMS = ("analyzer", "lowercase", "ngram_range", "stop_words", "token_pattern",
+                   "strip_accents", "preprocessor", "tokenizer", "encoding", "decode_error")
+
+# Script ejecutado en un proceso limpio para medir la memoria de un worker con el modelo
+# cargado: RSS total y RSS de los datos del modelo (con los módulos ya importados)
+RSS_PROBE = """
+import importlib, pickle, sys
+def rss_kb():
+    with open('/proc/self/status') as f:
+        return next(int(line.split()[1]) for line in f if line.startswith('VmRSS'))
+if sys.argv[3] == 'data':
+    for module in ('sklearn.svm', 'sklearn.linear_model', 'sklearn.naive_bayes',
+                   'sklearn.feature_extraction.text', 'ml.compaction'):
+        importlib.import_module(module)
+base = rss_kb() if sys.argv[3] == 'data' else 0
+with open(sys.argv[1], 'rb') as f:
+    model = pickle.load(f)
+with open(sys.argv[2], 'rb') as f:
+    vectorizer = pickle.load(f)
+model.predict(vectorizer.transform(['this is a warmup text']))
+print(rss_kb() - base)
+"""
+
+
+class CompactVectorizer:
+    """TF-IDF de solo lectura con vocabulario en array ordenado y pesos float32"""
+
+    def __init__(self, terms: np.ndarray, idf: np.ndarray, analyzer_params: Dict[str, Any],
+                 norm: str = "l2", sublinear_tf: bool = False, binary: bool = False):
+        """
+        Inicializa el vectorizador compacto
+
+        Args:
+            terms: Términos codificados en UTF-8, ordenados (la posición es la columna)
+            idf: IDF de cada término en float32 (None si no se usa idf)
+            analyzer_params: Parámetros para reconstruir el analizador de sklearn
+            norm: Normalización de filas ('l2', 'l1' o None)
+            sublinear_tf: Aplicar 1 + log(tf)
+            binary: Usar conteos binarios
+        """
+        self.terms = terms
+        self.idf = idf
+        self.analyzer_params = analyzer_params
+        self.norm = norm
+        self.sublinear_tf = sublinear_tf
+        self.binary = binary
+        self.max_term_bytes = terms.dtype.itemsize
+        self._analyzer = None
+
+    @classmethod
+    def from_tfidf(cls, vectorizer: TfidfVectorizer, keep_columns: np.ndarray) -> "CompactVectorizer":
+        """
+        Construye el vectorizador compacto con un subconjunto de columnas
+
+        Returns:
+            Vectorizador compacto; el atributo source_columns indica la columna
+            original de cada término en el nuevo orden
+        """
+        feature_names = vectorizer.get_feature_names_out()
+        encoded = np.array([feature_names[c].encode("utf-8") for c in keep_columns], dtype=bytes)
+        order = np.argsort(encoded, kind="stable")
+
+        idf = getattr(vectorizer, "idf_", None)
+        compact = cls(
+            terms=encoded[order],
+            idf=idf[keep_columns][order].astype(np.float32) if idf is not None and vectorizer.use_idf else None,
+            analyzer_params={name: getattr(vectorizer, name) for name in ANALYZER_PARAMS},
+            norm=vectorizer.norm,
+            sublinear_tf=vectorizer.sublinear_tf,
+            binary=vectorizer.binary
+        )
+        compact.source_columns = np.asarray(keep_columns)[order]
+        return compact
+
+    def __getstate__(self):
+        """El analizador de sklearn es una closure: se reconstruye al cargar"""
+        state = self.__dict__.copy()
+        state["_analyzer"] = None
+        state.pop("source_columns", None)
+        return state
+
+    @property
+    def analyzer(self):
+        """Analizador de n-gramas idéntico al del vectorizador original (sin vocabulario)"""
+        if self._analyzer is None:
+            self._analyzer = TfidfVectorizer(**self.analyzer_params).build_analyzer()
+        return self._analyzer
+
+    @property
+    def vocabulary_size(self) -> int:
+        return len(self.terms)
+
+    def transform(self, texts: Iterable[str]) -> sparse.csr_matrix:
+        """Vectoriza textos buscando todos los n-gramas del lote con una sola búsqueda binaria"""
+        rows: List[int] = []
+        tokens: List[bytes] = []
+        n_docs = 0
+
+        for i, text in enumerate(texts):
+            n_docs += 1
+            for token in self.analyzer(text):
+                encoded = token.encode("utf-8")
+                # Términos más largos que el mayor del vocabulario no pueden coincidir
+                if len(encoded) <= self.max_term_bytes:
+                    tokens.append(encoded)
+                    rows.append(i)
+
+        n_terms = len(self.terms)
+        if tokens:
+            lookup = np.array(tokens, dtype=self.terms.dtype)
+            positions = np.minimum(np.searchsorted(self.terms, lookup), n_terms - 1)
+            found = self.terms[positions] == lookup
+            row_idx = np.asarray(rows, dtype=np.int32)[found]
+            col_idx = positions[found]
+        else:
+            row_idx = col_idx = np.empty(0, dtype=np.int32)
+
+        X = sparse.csr_matrix(
+            (np.ones(len(row_idx), dtype=np.float32), (row_idx, col_idx)),
+            shape=(n_docs, n_terms), dtype=np.float32
+        )
+        X.sum_duplicates()
+
+        if self.binary:
+            X.data[:] = 1.0
+        if self.sublinear_tf:
+            np.log(X.data, out=X.data)
+            X.data += 1.0
+        if self.idf is not None:
+            X.data *= self.idf[X.indices]
+        if self.norm:
+            X = normalize(X, norm=self.norm, copy=False)
+        return X
+
+
+class CompactLinearModel:
+    """Modelo lineal binario con coeficientes float32 en el orden del vocabulario compacto"""
+
+    def __init__(self, coef: np.ndarray, intercept: float, classes: np.ndarray, probabilistic: bool):
+        self.coef = np.ascontiguousarray(coef, dtype=np.float32)
+        self.intercept = np.float32(intercept)
+        self.classes_ = np.asarray(classes)
+        self.probabilistic = probabilistic
+
+    def decision_function(self, X: sparse.spmatrix) -> np.ndarray:
+        return np.asarray(X @ self.coef).ravel() + self.intercept
+
+    def predict(self, X: sparse.spmatrix) -> np.ndarray:
+        return self.classes_[(self.decision_function(X) > 0).astype(int)]
+
+    def predict_proba(self, X: sparse.spmatrix) -> np.ndarray:
+        """Solo para modelos probabilísticos (LR, NB); LinearSVC usa decision_function"""
+        if not self.probabilistic:
+            raise AttributeError("El modelo compactado no tiene predict_proba")
+        positive = 1.0 / (1.0 + np.exp(-self.decision_function(X).astype(np.float64)))
+        return np.column_stack([1.0 - positive, positive])
+
+
+def select_features(coef: np.ndarray, keep_features: float, min_abs_coef: float = 0.0) -> np.ndarray:
+    """Columnas con mayor |coef| (fracción si keep_features <= 1, número si > 1)"""
+    n_keep = int(round(keep_features * len(coef))) if keep_features <= 1 else int(keep_features)
+    n_keep = max(1, min(n_keep, len(coef)))
+    ranked = np.argsort(-np.abs(coef), kind="stable")[:n_keep]
+    if min_abs_coef > 0:
+        ranked = ranked[np.abs(coef[ranked]) >= min_abs_coef]
+    return np.sort(ranked)
+
+
+def measure_worker_rss_kb(model_path: str, vectorizer_path: str, scope: str = "total") -> int:
+    """
+    Memoria residente de un proceso limpio que carga el modelo y predice un texto
+
+    Args:
+        scope: 'total' (RSS del worker) o 'data' (solo lo que añaden los datos del modelo)
+    """
+    result = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", RSS_PROBE, model_path, vectorizer_path, scope],
+        cwd=str(BASE_DIR), capture_output=True, text=True, check=True
+    )
+    return int(result.stdout.strip().splitlines()[-1])
+
+
+def compact_model(model_name: str = "linear_svm", models_dir: str = None, data_path: str = None,
+                  keep_features: float = None, min_abs_coef: float = None) -> Dict[str, Any]:
+    """
+    Compacta un modelo lineal guardado y compara precisión, tamaño y memoria
+
+    Args:
+        model_name: Prefijo del modelo en models/ ({nombre}_trained.pkl / _vectorizer.pkl)
+        models_dir: Directorio de modelos
+        data_path: CSV de evaluación
+        keep_features: Fracción o número de n-gramas a conservar
+        min_abs_coef: Umbral mínimo de |coef|
+
+    Returns:
+        Informe antes/después
+    """
+    import pandas as pd
+    from sklearn.model_selection import train_test_split
+    from ml.linear_ensemble import linear_form
+    from ml.multilabel import preprocess_text
+
+    config = COMPACTION_CONFIG
+    models_dir = str(models_dir or MODELS_DIR)
+    data_path = data_path or str(DATA_DIR / "toxic_comments_processed.csv")
+    keep_features = config["keep_features"] if keep_features is None else keep_features
+    min_abs_coef = config["min_abs_coef"] if min_abs_coef is None else min_abs_coef
+
+    model_path = os.path.join(models_dir, f"{model_name}_trained.pkl")
+    vectorizer_path = os.path.join(models_dir, f"{model_name}_vectorizer.pkl")
+    with open(model_path, 'rb') as f:
+        model = pickle.load(f)
+    with open(vectorizer_path, 'rb') as f:
+        vectorizer = pickle.load(f)
+
+    if not isinstance(vectorizer, TfidfVectorizer):
+        raise ValueError(f"Solo se compactan vectorizadores TF-IDF, no {type(vectorizer).__name__}")
+
+    coef, intercept = linear_form(model)
+    keep = select_features(coef, keep_features, min_abs_coef)
+
+    compact_vectorizer = CompactVectorizer.from_tfidf(vectorizer, keep)
+    compact = CompactLinearModel(
+        coef=coef[compact_vectorizer.source_columns],
+        intercept=intercept,
+        classes=model.classes_,
+        probabilistic=hasattr(model, "predict_proba")
+    )
+
+    # Evaluar en el mismo split de prueba que ModelEvaluator, con el preprocesado de servicio
+    df = pd.read_csv(data_path)
+    texts = df[config["eval_text_column"]].fillna('').astype(str)
+    labels = df[config["eval_label_column"]].fillna(0).astype(int)
+    _, test_texts, _, test_labels = train_test_split(
+        texts, labels, test_size=TEST_SIZE, random_state=RANDOM_STATE, stratify=labels
+    )
+    test_texts = [preprocess_text(text) for text in test_texts]
+    y_test = test_labels.to_numpy()
+
+    original_pred = model.predict(vectorizer.transform(test_texts))
+    compact_pred = compact.predict(compact_vectorizer.transform(test_texts))
+    accuracy_before = float(np.mean(original_pred == y_test))
+    accuracy_after = float(np.mean(compact_pred == y_test))
+
+    compact_model_path = os.path.join(models_dir, f"{model_name}_compact_trained.pkl")
+    compact_vectorizer_path = os.path.join(models_dir, f"{model_name}_compact_vectorizer.pkl")
+    with open(compact_model_path, 'wb') as f:
+        pickle.dump(compact, f)
+    with open(compact_vectorizer_path, 'wb') as f:
+        pickle.dump(compact_vectorizer, f)
+
+    disk_before = os.path.getsize(model_path) + os.path.getsize(vectorizer_path)
+    disk_after = os.path.getsize(compact_model_path) + os.path.getsize(compact_vectorizer_path)
+    rss_before = measure_worker_rss_kb(model_path, vectorizer_path)
+    rss_after = measure_worker_rss_kb(compact_model_path, compact_vectorizer_path)
+    data_rss_before = measure_worker_rss_kb(model_path, vectorizer_path, scope="data")
+    data_rss_after = measure_worker_rss_kb(compact_model_path, compact_vectorizer_path, scope="data")
+
+    report = {
+        "model": model_name,
+        "features_before": int(len(coef)),
+        "features_after": int(len(keep)),
+        "accuracy_before": round(accuracy_before, 4),
+        "accuracy_after": round(accuracy_after, 4),
+        "accuracy_delta": round(accuracy_after - accuracy_before, 4),
+        "prediction_agreement": round(float(np.mean(original_pred == compact_pred)), 4),
+        "disk_kb_before": round(disk_before / 1024, 1),
+        "disk_kb_after": round(disk_after / 1024, 1),
+        "worker_rss_kb_before": rss_before,
+        "worker_rss_kb_after": rss_after,
+        "model_rss_kb_before": data_rss_before,
+        "model_rss_kb_after": data_rss_after,
+        "model_path": os.path.basename(compact_model_path),
+        "vectorizer_path": os.path.basename(compact_vectorizer_path),
+        "compacted_at": datetime.now().isoformat()
+    }
+    logger.info(
+        f"✅ {model_name} compactado: {report['features_before']} → {report['features_after']} n-gramas, "
+        f"precisión {report['accuracy_delta']:+.4f}, RSS {rss_before} → {rss_after} KB"
+    )
+    return report
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    # Reimportar desde el paquete para que el pickle referencie ml.compaction y no __main__
+    from ml.compaction import compact_model
+
+    parser = argparse.ArgumentParser(description="Compacta un modelo lineal guardado para servir")
+    parser.add_argument("--model", default="linear_svm", help="Prefijo del modelo en models/")
+    parser.add_argument("--keep", type=float, help="Fracción (<= 1) o número de n-gramas a conservar")
+    parser.add_argument("--min-abs-coef", type=float, help="Umbral mínimo de |coef|")
+    args = parser.parse_args()
+
+    print(json.dumps(compact_model(args.model, keep_features=args.keep, min_abs_coef=args.min_abs_coef), indent=2))
@@ -122,3 +122,85 @@ CLASSIFICATION_THRESHOLDS = {
     "insult": 0.5,
     "identity_hate": 0.6
 }
+
+# Configuración de entrenamiento en streaming (out-of-core)
+STREAMING_CONFIG = {
+    "chunk_size": 10000,            # Filas leídas del CSV por bloque
+    "n_features": 2 ** 20,          # Dimensión del espacio de hashing
+    "ngram_range": (1, 2),
+    "use_idf": False,               # Estimar IDF con una pasada previa en streaming
+    "holdout_fraction": 0.05,       # Fracción de cada bloque reservada para holdout
+    "holdout_max_rows": 20000,      # Tamaño máximo del holdout en memoria
+    "models": {
+        "sgd": {
+            "loss": "log_loss",
+            "alpha": 1e-5,
+            "random_state": RANDOM_STATE
+        },
+        "naive_bayes": {
+            "alpha": 0.1
+        }
+    }
+}
+
+# Configuración del cabezal multi-etiqueta (columnas Is* del dataset procesado)
+# Cada etiqueta se asocia a una categoría en español y a su umbral en CLASSIFICATION_THRESHOLDS
+MULTILABEL_CONFIG = {
+    "data_filename": "toxic_comments_processed.csv",
+    "text_column": "Text",
+    "labels": {
+        "IsAbusive": {"category": "abuso", "threshold_key": "insult"},
+        "IsThreat": {"category": "amenaza", "threshold_key": "threat"},
+        "IsProvocative": {"category": "provocacion", "threshold_key": "default"},
+        "IsObscene": {"category": "obscenidad", "threshold_key": "obscene"},
+        "IsHatespeech": {"category": "discurso_odio", "threshold_key": "identity_hate"},
+        "IsRacist": {"category": "racismo", "threshold_key": "identity_hate"},
+        "IsNationalist": {"category": "nacionalismo", "threshold_key": "identity_hate"},
+        "IsSexist": {"category": "sexismo", "threshold_key": "identity_hate"},
+        "IsHomophobic": {"category": "homofobia", "threshold_key": "identity_hate"},
+        "IsReligiousHate": {"category": "odio_religioso", "threshold_key": "identity_hate"},
+        "IsRadicalism": {"category": "radicalismo", "threshold_key": "default"}
+    },
+    "min_positives": 5,             # Etiquetas con menos positivos no se entrenan
+    "model": {
+        "C": 1.0,
+        "class_weight": "balanced",
+        "max_iter": 1000
+    },
+    "head_filename": "multilabel_head.pkl"
+}
+
+# Configuración de destilación del pipeline híbrido en un estudiante lineal
+DISTILLATION_CONFIG = {
+    "text_column": "Text",
+    "teacher_weights": {            # Peso de cada nivel del profesor en la etiqueta suave
+        "advanced": 0.4,
+        "contextual": 0.3,
+        "ml": 0.2,
+        "rules": 0.1
+    },
+    "vectorizer": {
+        "max_features": 50000,
+        "ngram_range": (1, 2),
+        "min_df": 2,
+        "max_df": 0.95,
+        "sublinear_tf": True
+    },
+    "student": {
+        "C": 4.0,
+        "max_iter": 1000
+    },
+    "test_size": 0.2,
+    "confidence_band": (0.35, 0.65),  # Probabilidades del estudiante que se delegan al profesor
+    "min_feature_coverage": 0.5,      # Términos conocidos por palabra por debajo de los cuales se delega
+    "student_name": "distilled_student",
+    "registry_filename": "model_registry.json"
+}
+
+# Configuración de compactación de modelos lineales para servir
+COMPACTION_CONFIG = {
+    "keep_features": 0.5,           # Fracción (<= 1) o número de n-gramas con mayor |coef| a conservar
+    "min_abs_coef": 0.0,            # Descartar además coeficientes por debajo de este valor
+    "eval_text_column": "Text",
+    "eval_label_column": "IsToxic"
+}
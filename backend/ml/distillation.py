@@ -0,0 +1,274 @@
+"""
+🎓 Destilación del Clasificador Híbrido - ToxiGuard
+Ejecuta el pipeline híbrido completo (avanzado + contextual + ML + reglas)
+offline sobre un corpus sin etiquetar, genera etiquetas suaves y entrena un
+estudiante lineal disperso que se registra como modelo servible
+"""
+
+import os
+import json
+import time
+import pickle
+import logging
+import argparse
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+
+try:
+    from .config import DISTILLATION_CONFIG, MODELS_DIR, RANDOM_STATE
+    from .feature_cache import feature_cache
+except ImportError:  # Ejecución como script desde ml/
+    from config import DISTILLATION_CONFIG, MODELS_DIR, RANDOM_STATE
+    from feature_cache import feature_cache
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+
+def load_corpus(corpus_path: str, text_column: str = None) -> List[str]:
+    """
+    Carga un corpus sin etiquetar (CSV con columna de texto o .txt con un texto por línea)
+
+    Args:
+        corpus_path: Ruta al corpus
+        text_column: Columna de texto del CSV
+
+    Returns:
+        Lista de textos no vacíos
+    """
+    if corpus_path.endswith(".txt"):
+        with open(corpus_path, "r", encoding="utf-8") as f:
+            return [line.strip() for line in f if line.strip()]
+
+    text_column = text_column or DISTILLATION_CONFIG["text_column"]
+    texts = pd.read_csv(corpus_path, usecols=[text_column])[text_column].dropna().astype(str)
+    return [text for text in texts.tolist() if text.strip()]
+
+
+class TeacherLabeler:
+    """Genera etiquetas suaves combinando todos los niveles disponibles del clasificador híbrido"""
+
+    def __init__(self, teacher=None, weights: Dict[str, float] = None):
+        """
+        Inicializa el etiquetador
+
+        Args:
+            teacher: HybridToxicityClassifier (por defecto la instancia global de app)
+            weights: Peso de cada nivel en la etiqueta suave
+        """
+        if teacher is None:
+            from app.hybrid_classifier import hybrid_classifier
+            teacher = hybrid_classifier
+
+        self.teacher = teacher
+        self.weights = weights or DISTILLATION_CONFIG["teacher_weights"]
+        self.tiers = self._available_tiers()
+        self.tier_time = {name: 0.0 for name in self.tiers}
+
+        logger.info(f"Profesor con niveles: {', '.join(self.tiers)}")
+
+    def _available_tiers(self) -> Dict[str, Any]:
+        """Niveles del clasificador híbrido cargados en este entorno"""
+        tiers = {"advanced": self.teacher.advanced_classifier}
+        if self.teacher.contextual_classifier.embedding_model is not None:
+            tiers["contextual"] = self.teacher.contextual_classifier
+        if self.teacher.ml_classifier.is_loaded:
+            tiers["ml"] = self.teacher.ml_classifier
+        tiers["rules"] = self.teacher.rule_classifier
+        return {name: tier for name, tier in tiers.items() if self.weights.get(name, 0) > 0}
+
+    def label(self, texts: List[str]) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Etiqueta los textos con el profesor
+
+        Returns:
+            Tuple con (etiqueta suave por texto en [0, 1], score de cada nivel)
+        """
+        tier_scores = {name: np.zeros(len(texts)) for name in self.tiers}
+
+        for name, tier in self.tiers.items():
+            start = time.perf_counter()
+            for i, text in enumerate(texts):
+                result = tier.analyze_text(text)
+                tier_scores[name][i] = (result.get("toxicity_percentage") or 0.0) / 100.0
+            self.tier_time[name] += time.perf_counter() - start
+            logger.info(f"✅ Nivel {name}: {len(texts)} textos en {self.tier_time[name]:.2f}s")
+
+        total_weight = sum(self.weights[name] for name in self.tiers)
+        soft_labels = sum(self.weights[name] * tier_scores[name] for name in self.tiers) / total_weight
+        return np.clip(soft_labels, 0.0, 1.0), tier_scores
+
+    def latency_ms(self, n_texts: int) -> float:
+        """Latencia media por texto del profesor completo"""
+        return sum(self.tier_time.values()) / max(n_texts, 1) * 1000
+
+
+def fit_soft_label_student(X, soft_labels: np.ndarray, params: Dict[str, Any] = None) -> LogisticRegression:
+    """
+    Entrena una regresión logística sobre etiquetas suaves
+
+    Cada texto se duplica como positivo con peso p y negativo con peso 1 - p,
+    lo que equivale a minimizar la entropía cruzada frente a la etiqueta suave.
+    """
+    params = params or DISTILLATION_CONFIG["student"]
+    n_samples = X.shape[0]
+    X_dup = sparse.vstack([X, X], format="csr")
+    y_dup = np.concatenate([np.ones(n_samples, dtype=int), np.zeros(n_samples, dtype=int)])
+    weights = np.concatenate([soft_labels, 1.0 - soft_labels])
+
+    student = LogisticRegression(**params, random_state=RANDOM_STATE)
+    student.fit(X_dup, y_dup, sample_weight=weights)
+    return student
+
+
+def measure_latency_ms(vectorizer, model, texts: List[str], repeats: int = 200) -> float:
+    """Latencia mediana por texto (vectorizar + predecir) del estudiante"""
+    sample = [texts[i % len(texts)] for i in range(min(repeats, max(len(texts), 1)))]
+    timings = []
+    for text in sample:
+        start = time.perf_counter()
+        model.predict_proba(vectorizer.transform([text]))
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1000
+
+
+def load_registry(models_dir: str = None) -> Dict[str, Any]:
+    """Carga el registro de modelos servibles"""
+    path = os.path.join(str(models_dir or MODELS_DIR), DISTILLATION_CONFIG["registry_filename"])
+    if not os.path.exists(path):
+        return {"models": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def register_model(name: str, entry: Dict[str, Any], models_dir: str = None) -> str:
+    """Añade o reemplaza un modelo en el registro de modelos servibles"""
+    models_dir = str(models_dir or MODELS_DIR)
+    registry = load_registry(models_dir)
+    registry["models"][name] = entry
+    registry["updated_at"] = datetime.now().isoformat()
+
+    path = os.path.join(models_dir, DISTILLATION_CONFIG["registry_filename"])
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(registry, f, indent=2, ensure_ascii=False, default=str)
+    os.replace(tmp_path, path)
+
+    logger.info(f"✅ Modelo {name} registrado en {path}")
+    return path
+
+
+def distill(corpus_path: str, text_column: str = None, max_texts: Optional[int] = None,
+            models_dir: str = None, teacher=None, config: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    Destila el clasificador híbrido en un estudiante lineal
+
+    Args:
+        corpus_path: Corpus sin etiquetar (CSV o .txt)
+        text_column: Columna de texto del CSV
+        max_texts: Límite de textos a etiquetar (opcional)
+        models_dir: Directorio donde guardar el estudiante y el registro
+        teacher: Clasificador híbrido a destilar (por defecto la instancia global)
+        config: Configuración (por defecto DISTILLATION_CONFIG)
+
+    Returns:
+        Entrada del registro con métricas de acuerdo y latencia
+    """
+    config = {**DISTILLATION_CONFIG, **(config or {})}
+    models_dir = str(models_dir or MODELS_DIR)
+    start_time = time.time()
+
+    texts = load_corpus(corpus_path, text_column)
+    if max_texts:
+        texts = texts[:max_texts]
+    if len(texts) < 10:
+        raise ValueError("El corpus necesita al menos 10 textos para destilar")
+
+    # 1. Etiquetas suaves del profesor
+    labeler = TeacherLabeler(teacher, config["teacher_weights"])
+    soft_labels, tier_scores = labeler.label(texts)
+
+    # 2. Estudiante lineal sobre TF-IDF (con caché de características)
+    train_idx, test_idx = train_test_split(
+        np.arange(len(texts)), test_size=config["test_size"], random_state=RANDOM_STATE
+    )
+    train_texts = [texts[i] for i in train_idx]
+    test_texts = [texts[i] for i in test_idx]
+
+    vectorizer, X_train, fit_key = feature_cache.fit_transform(train_texts, config["vectorizer"], TfidfVectorizer)
+    X_test, _ = feature_cache.transform(vectorizer, test_texts, fit_key)
+    student = fit_soft_label_student(X_train, soft_labels[train_idx], config["student"])
+
+    # 3. Acuerdo con el profesor en el split reservado
+    student_proba = student.predict_proba(X_test)[:, 1]
+    teacher_labels = soft_labels[test_idx] >= 0.5
+    student_labels = student_proba >= 0.5
+    low, high = config["confidence_band"]
+    confident = (student_proba < low) | (student_proba > high)
+
+    agreement = {
+        "agreement_rate": round(float(np.mean(teacher_labels == student_labels)), 4),
+        "confident_agreement_rate": round(float(np.mean(teacher_labels[confident] == student_labels[confident])), 4) if confident.any() else None,
+        "teacher_fallback_rate": round(float(1.0 - confident.mean()), 4),
+        "soft_label_mae": round(float(np.mean(np.abs(student_proba - soft_labels[test_idx]))), 4),
+        "evaluated_texts": int(len(test_idx))
+    }
+
+    # 4. Reentrenar con todo el corpus y guardar como modelo servible
+    vectorizer, X_all, _ = feature_cache.fit_transform(texts, config["vectorizer"], TfidfVectorizer)
+    student = fit_soft_label_student(X_all, soft_labels, config["student"])
+
+    name = config["student_name"]
+    model_path = os.path.join(models_dir, f"{name}_trained.pkl")
+    vectorizer_path = os.path.join(models_dir, f"{name}_vectorizer.pkl")
+    os.makedirs(models_dir, exist_ok=True)
+    with open(model_path, 'wb') as f:
+        pickle.dump(student, f)
+    with open(vectorizer_path, 'wb') as f:
+        pickle.dump(vectorizer, f)
+
+    entry = {
+        "type": "distilled_student",
+        # Rutas relativas al directorio de modelos (el registro viaja con los modelos)
+        "model_path": os.path.basename(model_path),
+        "vectorizer_path": os.path.basename(vectorizer_path),
+        "teacher": "HybridToxicityClassifier",
+        "teacher_tiers": list(labeler.tiers),
+        "teacher_weights": {tier: config["teacher_weights"][tier] for tier in labeler.tiers},
+        "confidence_band": list(config["confidence_band"]),
+        "min_feature_coverage": config["min_feature_coverage"],
+        **agreement,
+        "student_latency_ms": round(measure_latency_ms(vectorizer, student, test_texts), 4),
+        "teacher_latency_ms": round(labeler.latency_ms(len(texts)), 4),
+        "corpus": os.path.basename(corpus_path),
+        "corpus_size": len(texts),
+        "n_features": int(X_all.shape[1]),
+        "tier_mean_scores": {tier: round(float(scores.mean()), 4) for tier, scores in tier_scores.items()},
+        "distill_time": round(time.time() - start_time, 2),
+        "trained_at": datetime.now().isoformat()
+    }
+    register_model(name, entry, models_dir)
+
+    logger.info(
+        f"✅ Estudiante destilado: acuerdo {entry['agreement_rate']:.2%}, "
+        f"{entry['student_latency_ms']:.3f} ms vs profesor {entry['teacher_latency_ms']:.3f} ms"
+    )
+    return entry
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Destila el clasificador híbrido en un estudiante lineal")
+    parser.add_argument("corpus", help="Corpus sin etiquetar (CSV o .txt)")
+    parser.add_argument("--text-column", help="Columna de texto del CSV")
+    parser.add_argument("--max-texts", type=int, help="Máximo de textos a etiquetar")
+    args = parser.parse_args()
+
+    result = distill(args.corpus, args.text_column, args.max_texts)
+    print(json.dumps({k: v for k, v in result.items() if k != "tier_mean_scores"}, indent=2, ensure_ascii=False))
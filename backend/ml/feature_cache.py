@@ -0,0 +1,259 @@
+"""
+🗄️ Caché de Características - ToxiGuard
+Vectoriza una sola vez y reutiliza la matriz TF-IDF entre el entrenador,
+el evaluador y el optimizador de pesos
+"""
+
+import os
+import json
+import shutil
+import pickle
+import hashlib
+import logging
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+import numpy as np
+from scipy import sparse
+import sklearn
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+try:
+    from .config import CACHE_DIR
+except ImportError:  # Ejecución como script desde ml/
+    from config import CACHE_DIR
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Componentes CSR guardados como .npy para poder abrirlos con mmap
+CSR_COMPONENTS = ("data", "indices", "indptr")
+
+
+class FeatureCache:
+    """Caché en disco de vectorizadores ajustados y matrices CSR memory-mapped"""
+
+    def __init__(self, cache_dir: Path = None):
+        """
+        Inicializa la caché de características
+
+        Args:
+            cache_dir: Directorio base (por defecto ml/config.CACHE_DIR)
+        """
+        self.cache_dir = Path(cache_dir or CACHE_DIR) / "features"
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def hash_texts(texts: Iterable[str]) -> str:
+        """Hash del contenido del dataset (orden incluido)"""
+        digest = hashlib.sha256()
+        for text in texts:
+            digest.update(str(text).encode("utf-8", errors="replace"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    @staticmethod
+    def hash_file(path: str, block_size: int = 1 << 20) -> str:
+        """Hash del contenido de un archivo leído por bloques"""
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def make_key(dataset_hash: str, params: Dict[str, Any], namespace: str = "tfidf") -> str:
+        """Clave de caché: hash del dataset + configuración del vectorizador"""
+        payload = json.dumps(
+            {
+                "dataset": dataset_hash,
+                "params": params,
+                "namespace": namespace,
+                "sklearn": sklearn.__version__
+            },
+            sort_keys=True,
+            default=str
+        )
+        return f"{namespace}_{hashlib.sha256(payload.encode('utf-8')).hexdigest()[:24]}"
+
+    def entry_dir(self, key: str) -> Path:
+        """Directorio de una entrada de la caché"""
+        return self.cache_dir / key
+
+    def has(self, key: str) -> bool:
+        """Indica si existe una entrada completa para la clave"""
+        return (self.entry_dir(key) / "meta.json").exists()
+
+    def save_matrix(self, key: str, X: sparse.spmatrix, vectorizer: Any = None) -> Path:
+        """Guarda una matriz CSR (y opcionalmente su vectorizador) de forma atómica"""
+        X = sparse.csr_matrix(X)
+        X.sort_indices()
+
+        tmp_dir = self.cache_dir / f".{key}.tmp.{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir(parents=True)
+
+        for component in CSR_COMPONENTS:
+            np.save(tmp_dir / f"{component}.npy", getattr(X, component))
+
+        if vectorizer is not None:
+            with open(tmp_dir / "vectorizer.pkl", "wb") as f:
+                pickle.dump(vectorizer, f)
+
+        with open(tmp_dir / "meta.json", "w", encoding="utf-8") as f:
+            json.dump({"kind": "csr", "shape": list(X.shape), "nnz": int(X.nnz)}, f)
+
+        self._publish(tmp_dir, key)
+        return self.entry_dir(key)
+
+    def load_matrix(self, key: str, mmap: bool = True) -> Optional[Tuple[Any, sparse.csr_matrix]]:
+        """
+        Carga una matriz CSR de la caché
+
+        Args:
+            key: Clave de la entrada
+            mmap: Si abrir los arrays con memory-mapping (sin copiarlos a RAM)
+
+        Returns:
+            Tuple con (vectorizador o None, matriz CSR), o None si no existe
+        """
+        entry = self.entry_dir(key)
+        if not self.has(key):
+            return None
+
+        try:
+            with open(entry / "meta.json", "r", encoding="utf-8") as f:
+                meta = json.load(f)
+
+            mmap_mode = "r" if mmap else None
+            data, indices, indptr = (
+                np.load(entry / f"{component}.npy", mmap_mode=mmap_mode)
+                for component in CSR_COMPONENTS
+            )
+            X = sparse.csr_matrix((data, indices, indptr), shape=tuple(meta["shape"]), copy=False)
+
+            vectorizer = None
+            if (entry / "vectorizer.pkl").exists():
+                with open(entry / "vectorizer.pkl", "rb") as f:
+                    vectorizer = pickle.load(f)
+
+            return vectorizer, X
+
+        except Exception as e:
+            logger.warning(f"⚠️ Entrada de caché corrupta {key}, se regenerará: {e}")
+            shutil.rmtree(entry, ignore_errors=True)
+            return None
+
+    def save_array(self, key: str, array: np.ndarray) -> Path:
+        """Guarda un array denso (p. ej. matriz de coincidencias de reglas)"""
+        tmp_dir = self.cache_dir / f".{key}.tmp.{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir(parents=True)
+
+        np.save(tmp_dir / "array.npy", np.ascontiguousarray(array))
+        with open(tmp_dir / "meta.json", "w", encoding="utf-8") as f:
+            json.dump({"kind": "dense", "shape": list(array.shape)}, f)
+
+        self._publish(tmp_dir, key)
+        return self.entry_dir(key)
+
+    def load_array(self, key: str, mmap: bool = True) -> Optional[np.ndarray]:
+        """Carga un array denso de la caché"""
+        if not self.has(key):
+            return None
+        return np.load(self.entry_dir(key) / "array.npy", mmap_mode="r" if mmap else None)
+
+    def fit_transform(self, texts: Iterable[str], vectorizer_params: Dict[str, Any],
+                      vectorizer_factory: Callable[..., Any] = TfidfVectorizer,
+                      dataset_hash: str = None) -> Tuple[Any, sparse.csr_matrix, str]:
+        """
+        Ajusta el vectorizador y transforma los textos, o lo recupera de la caché
+
+        Args:
+            texts: Textos a vectorizar
+            vectorizer_params: Parámetros del vectorizador (forman parte de la clave)
+            vectorizer_factory: Clase del vectorizador
+            dataset_hash: Hash precalculado del dataset (opcional)
+
+        Returns:
+            Tuple con (vectorizador ajustado, matriz CSR, clave de caché)
+        """
+        texts = list(texts)
+        dataset_hash = dataset_hash or self.hash_texts(texts)
+        params = {"class": getattr(vectorizer_factory, "__name__", str(vectorizer_factory)), **vectorizer_params}
+        key = self.make_key(dataset_hash, params)
+
+        cached = self.load_matrix(key)
+        if cached is not None and cached[0] is not None:
+            self.hits += 1
+            logger.info(f"✅ Características cargadas de caché: {key}")
+            return cached[0], cached[1], key
+
+        self.misses += 1
+        logger.info(f"🔄 Vectorizando {len(texts)} textos (caché vacía para {key})...")
+        vectorizer = vectorizer_factory(**vectorizer_params)
+        X = vectorizer.fit_transform(texts)
+        self.save_matrix(key, X, vectorizer)
+
+        # Devolver la versión memory-mapped para compartir páginas entre procesos
+        _, X = self.load_matrix(key)
+        return vectorizer, X, key
+
+    def transform(self, vectorizer: Any, texts: Iterable[str], fit_key: str) -> Tuple[sparse.csr_matrix, str]:
+        """
+        Transforma textos adicionales (p. ej. el conjunto de prueba) con caché
+
+        Args:
+            vectorizer: Vectorizador ya ajustado
+            texts: Textos a transformar
+            fit_key: Clave de la entrada con la que se ajustó el vectorizador
+
+        Returns:
+            Tuple con (matriz CSR, clave de caché)
+        """
+        texts = list(texts)
+        key = self.make_key(self.hash_texts(texts), {"fit_key": fit_key}, namespace="transform")
+
+        cached = self.load_matrix(key)
+        if cached is not None:
+            self.hits += 1
+            return cached[1], key
+
+        self.misses += 1
+        self.save_matrix(key, vectorizer.transform(texts))
+        return self.load_matrix(key)[1], key
+
+    def clear(self) -> int:
+        """Elimina todas las entradas de la caché"""
+        removed = 0
+        for entry in self.cache_dir.iterdir():
+            shutil.rmtree(entry, ignore_errors=True)
+            removed += 1
+        logger.info(f"Caché de características limpiada: {removed} entradas")
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estadísticas de uso de la caché"""
+        size_bytes = sum(f.stat().st_size for f in self.cache_dir.rglob("*") if f.is_file())
+        return {
+            "cache_dir": str(self.cache_dir),
+            "entries": sum(1 for e in self.cache_dir.iterdir() if not e.name.startswith(".")),
+            "size_mb": round(size_bytes / (1024 * 1024), 2),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+    def _publish(self, tmp_dir: Path, key: str):
+        """Publica una entrada escrita en un directorio temporal"""
+        entry = self.entry_dir(key)
+        shutil.rmtree(entry, ignore_errors=True)
+        try:
+            os.replace(tmp_dir, entry)
+        except OSError:
+            # Otro proceso publicó la misma entrada en paralelo
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+# Instancia global de la caché de características
+feature_cache = FeatureCache()
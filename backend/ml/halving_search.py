@@ -0,0 +1,227 @@
+"""
+✂️ Búsqueda de Hiperparámetros por Successive Halving - ToxiGuard
+Precalcula las características TF-IDF de cada fold una sola vez y descarta
+candidatos por rondas aumentando el tamaño del conjunto de entrenamiento
+"""
+
+import math
+import time
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import ParameterGrid, ParameterSampler, StratifiedKFold
+from sklearn.pipeline import Pipeline
+
+from .config import RANDOM_STATE
+from .feature_cache import FeatureCache
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+
+def _fit_and_score(estimator, params: Dict[str, Any], X_train, y_train, X_val, y_val, scorer) -> float:
+    """Ajusta un candidato sobre un subconjunto del fold y lo puntúa en validación"""
+    model = clone(estimator).set_params(**params)
+    model.fit(X_train, y_train)
+    return scorer(model, X_val, y_val)
+
+
+class SuccessiveHalvingSearch:
+    """Búsqueda successive halving sobre el tamaño de entrenamiento con folds precalculados"""
+
+    def __init__(self, estimator, param_grid: Dict[str, List[Any]], vectorizer_params: Dict[str, Any],
+                 vectorizer_factory=TfidfVectorizer, cv: int = 5, factor: int = 3,
+                 min_resources: Optional[int] = None, n_candidates: Optional[int] = None,
+                 scoring: str = "f1", n_jobs: int = -1, random_state: int = RANDOM_STATE,
+                 feature_cache: Optional[FeatureCache] = None):
+        """
+        Inicializa la búsqueda
+
+        Args:
+            estimator: Pipeline con un único paso 'classifier' (sin vectorizador)
+            param_grid: Grid de hiperparámetros (mismo formato que GridSearchCV)
+            vectorizer_params: Parámetros del vectorizador de cada fold
+            vectorizer_factory: Clase del vectorizador
+            cv: Número de folds
+            factor: Proporción de candidatos que sobreviven a cada ronda (1/factor)
+            min_resources: Muestras de entrenamiento en la primera ronda (automático si None)
+            n_candidates: Si se indica, muestrea candidatos aleatorios (estilo HalvingRandomSearchCV)
+            scoring: Métrica de sklearn a maximizar
+            n_jobs: Procesos para evaluar candidatos × folds de una ronda
+            random_state: Semilla
+            feature_cache: Caché de características (si None, vectoriza en memoria)
+        """
+        if factor < 2:
+            raise ValueError("El factor de halving debe ser >= 2")
+
+        self.estimator = estimator
+        self.param_grid = param_grid
+        self.vectorizer_params = vectorizer_params
+        self.vectorizer_factory = vectorizer_factory
+        self.cv = cv
+        self.factor = factor
+        self.min_resources = min_resources
+        self.n_candidates = n_candidates
+        self.scoring = scoring
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.feature_cache = feature_cache
+
+        self.rungs_: List[Dict[str, Any]] = []
+        self.best_params_: Dict[str, Any] = {}
+        self.best_score_: Optional[float] = None
+        self.best_estimator_ = None
+        self.total_time_: Optional[float] = None
+
+    def _candidates(self) -> List[Dict[str, Any]]:
+        """Genera los candidatos del grid o una muestra aleatoria"""
+        grid = ParameterGrid(self.param_grid)
+        if self.n_candidates and self.n_candidates < len(grid):
+            return list(ParameterSampler(self.param_grid, n_iter=self.n_candidates,
+                                         random_state=self.random_state))
+        return list(grid)
+
+    def _vectorize(self, fit_texts: List[str], other_texts: List[str] = None):
+        """Ajusta el vectorizador de un fold (con caché si está disponible)"""
+        if self.feature_cache is not None:
+            vectorizer, X_fit, fit_key = self.feature_cache.fit_transform(
+                fit_texts, self.vectorizer_params, self.vectorizer_factory
+            )
+            X_other = None
+            if other_texts is not None:
+                X_other, _ = self.feature_cache.transform(vectorizer, other_texts, fit_key)
+            return vectorizer, X_fit, X_other
+
+        vectorizer = self.vectorizer_factory(**self.vectorizer_params)
+        X_fit = vectorizer.fit_transform(fit_texts)
+        X_other = vectorizer.transform(other_texts) if other_texts is not None else None
+        return vectorizer, X_fit, X_other
+
+    def _precompute_folds(self, texts: List[str], y: np.ndarray) -> List[Tuple]:
+        """Vectoriza cada fold una única vez; todas las rondas lo reutilizan"""
+        rng = np.random.RandomState(self.random_state)
+        splitter = StratifiedKFold(n_splits=self.cv, shuffle=True, random_state=self.random_state)
+        folds = []
+
+        for train_idx, val_idx in splitter.split(np.zeros(len(y)), y):
+            _, X_train, X_val = self._vectorize(
+                [texts[i] for i in train_idx], [texts[i] for i in val_idx]
+            )
+            y_train = y[train_idx]
+
+            # Orden aleatorio fijo con al menos una muestra de cada clase al inicio,
+            # así cada ronda usa un prefijo creciente del mismo orden
+            order = rng.permutation(len(train_idx))
+            firsts = [order[np.argmax(y_train[order] == label)] for label in np.unique(y_train)]
+            order = np.concatenate([firsts, order[np.isin(order, firsts, invert=True)]]).astype(int)
+
+            folds.append((X_train[order], y_train[order], X_val, y[val_idx]))
+
+        return folds
+
+    def _resource_schedule(self, n_candidates: int, max_resources: int) -> List[int]:
+        """Calcula el tamaño de entrenamiento de cada ronda"""
+        n_rungs = max(1, math.ceil(math.log(n_candidates, self.factor)) + 1) if n_candidates > 1 else 1
+        min_resources = self.min_resources or max(
+            2 * self.cv, int(max_resources / (self.factor ** (n_rungs - 1)))
+        )
+        schedule = [min(max_resources, min_resources * self.factor ** i) for i in range(n_rungs)]
+        # La última ronda decide con todo el entrenamiento de cada fold
+        schedule[-1] = max_resources
+        return schedule
+
+    def fit(self, texts: List[str], labels: List[int]) -> "SuccessiveHalvingSearch":
+        """
+        Ejecuta la búsqueda successive halving
+
+        Args:
+            texts: Textos de entrenamiento
+            labels: Etiquetas de entrenamiento
+
+        Returns:
+            La propia búsqueda, con best_params_, best_score_, best_estimator_ y rungs_
+        """
+        start_time = time.time()
+        texts = list(texts)
+        y = np.asarray(labels)
+        scorer = get_scorer(self.scoring)
+
+        candidates = self._candidates()
+        if not candidates:
+            raise ValueError("El grid de hiperparámetros está vacío")
+
+        logger.info(f"🔄 Precalculando características de {self.cv} folds...")
+        folds = self._precompute_folds(texts, y)
+        max_resources = min(fold[0].shape[0] for fold in folds)
+        schedule = self._resource_schedule(len(candidates), max_resources)
+
+        self.rungs_ = []
+        scores: List[float] = []
+        for rung, n_resources in enumerate(schedule):
+            rung_start = time.time()
+
+            jobs = [
+                delayed(_fit_and_score)(
+                    self.estimator, params,
+                    X_train[:n_resources], y_train[:n_resources], X_val, y_val, scorer
+                )
+                for params in candidates
+                for X_train, y_train, X_val, y_val in folds
+            ]
+            fold_scores = np.array(Parallel(n_jobs=self.n_jobs)(jobs)).reshape(len(candidates), self.cv)
+            scores = fold_scores.mean(axis=1).tolist()
+
+            best_idx = int(np.argmax(scores))
+            self.rungs_.append({
+                "rung": rung,
+                "n_candidates": len(candidates),
+                "n_resources": int(n_resources),
+                "best_score": round(float(scores[best_idx]), 4),
+                "best_params": candidates[best_idx],
+                "wall_time": round(time.time() - rung_start, 4)
+            })
+            logger.info(
+                f"Ronda {rung}: {len(candidates)} candidatos con {n_resources} muestras, "
+                f"mejor {self.scoring}: {scores[best_idx]:.4f} ({self.rungs_[-1]['wall_time']}s)"
+            )
+
+            if rung == len(schedule) - 1 or len(candidates) == 1:
+                break
+
+            # Conservar el mejor 1/factor de los candidatos (orden estable ante empates)
+            keep = max(1, math.ceil(len(candidates) / self.factor))
+            ranking = np.argsort(-np.asarray(scores), kind="stable")[:keep]
+            candidates = [candidates[i] for i in ranking]
+
+        best_idx = int(np.argmax(scores))
+        self.best_params_ = candidates[best_idx]
+        self.best_score_ = float(scores[best_idx])
+
+        # Reajuste final sobre todos los datos con el mejor candidato
+        vectorizer, X_full, _ = self._vectorize(texts)
+        classifier = clone(self.estimator).set_params(**self.best_params_).fit(X_full, y)
+        self.best_estimator_ = Pipeline([
+            ('vectorizer', vectorizer),
+            ('classifier', classifier.named_steps['classifier'])
+        ])
+
+        self.total_time_ = round(time.time() - start_time, 4)
+        logger.info(f"✅ Mejores parámetros: {self.best_params_} ({self.total_time_}s)")
+        return self
+
+    def get_report(self) -> Dict[str, Any]:
+        """Resumen de la búsqueda: tiempo y mejor score por ronda"""
+        return {
+            "search_mode": "halving_random" if self.n_candidates else "halving",
+            "factor": self.factor,
+            "cv": self.cv,
+            "scoring": self.scoring,
+            "rungs": self.rungs_,
+            "best_params": self.best_params_,
+            "best_score": round(self.best_score_, 4) if self.best_score_ is not None else None,
+            "total_time": self.total_time_
+        }
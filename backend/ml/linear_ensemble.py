@@ -0,0 +1,276 @@
+"""
+🧮 Ensemble Lineal Apilado - ToxiGuard
+Apila los coeficientes de LR, Linear SVM y Naive Bayes (en espacio logarítmico)
+en una única matriz: todos los miembros y la mezcla aprendida se puntúan con
+un solo producto disperso-denso sobre el espacio TF-IDF compartido
+"""
+
+import os
+import shutil
+import pickle
+import logging
+import argparse
+from typing import Any, Dict, List, Tuple
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split, cross_val_score, StratifiedKFold
+from sklearn.metrics import accuracy_score, f1_score
+
+try:
+    from .config import DATA_DIR, MODELS_DIR, RANDOM_STATE, TEST_SIZE
+except ImportError:  # Ejecución como script desde ml/
+    from config import DATA_DIR, MODELS_DIR, RANDOM_STATE, TEST_SIZE
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Miembros por defecto: modelos lineales guardados sobre el mismo vectorizador
+DEFAULT_MEMBERS = ["logistic_regression", "linear_svm", "naive_bayes"]
+
+
+def linear_form(model: Any) -> Tuple[np.ndarray, float]:
+    """
+    Expresa un clasificador binario como w·x + b
+
+    LogisticRegression y LinearSVC ya son lineales; MultinomialNB lo es en
+    espacio logarítmico: log P(1|x) - log P(0|x) = (θ1 - θ0)·x + (log π1 - log π0)
+
+    Returns:
+        Tuple con (vector de coeficientes, sesgo)
+    """
+    if len(getattr(model, "classes_", [])) != 2:
+        raise ValueError(f"{type(model).__name__} no es un clasificador binario")
+
+    if hasattr(model, "feature_log_prob_"):
+        coef = model.feature_log_prob_[1] - model.feature_log_prob_[0]
+        intercept = model.class_log_prior_[1] - model.class_log_prior_[0]
+        return np.asarray(coef, dtype=np.float64), float(intercept)
+
+    if hasattr(model, "coef_"):
+        coef = model.coef_
+        coef = coef.toarray() if sparse.issparse(coef) else np.asarray(coef)
+        return coef.ravel().astype(np.float64), float(np.ravel(model.intercept_)[0])
+
+    raise ValueError(f"{type(model).__name__} no es lineal en el espacio de características")
+
+
+class StackedLinearEnsemble:
+    """Ensemble de modelos lineales evaluado con un único producto matricial"""
+
+    def __init__(self, member_names: List[str], coef: np.ndarray, intercept: np.ndarray,
+                 classes: np.ndarray = None):
+        """
+        Inicializa el ensemble
+
+        Args:
+            member_names: Nombre de cada miembro (columna de coef)
+            coef: Matriz de coeficientes (características × miembros)
+            intercept: Sesgo por miembro
+            classes: Clases del problema binario
+        """
+        self.member_names = list(member_names)
+        self.member_coef = np.ascontiguousarray(coef, dtype=np.float64)
+        self.member_intercept = np.asarray(intercept, dtype=np.float64)
+        self.classes_ = np.asarray(classes if classes is not None else [0, 1])
+
+        # Pesos de mezcla (por defecto, promedio simple de scores)
+        self.blend_weights = np.full(len(self.member_names), 1.0 / len(self.member_names))
+        self.blend_intercept = 0.0
+        self.metrics: Dict[str, Any] = {}
+        self._build_stacked_matrix()
+
+    @classmethod
+    def from_models(cls, models: Dict[str, Any]) -> "StackedLinearEnsemble":
+        """Construye el ensemble a partir de modelos sklearn ya entrenados"""
+        names, coefs, intercepts = [], [], []
+        n_features = None
+
+        for name, model in models.items():
+            coef, intercept = linear_form(model)
+            if n_features is not None and len(coef) != n_features:
+                raise ValueError(f"El miembro {name} tiene {len(coef)} características, se esperaban {n_features}")
+            n_features = len(coef)
+            names.append(name)
+            coefs.append(coef)
+            intercepts.append(intercept)
+
+        if not names:
+            raise ValueError("El ensemble necesita al menos un miembro")
+
+        classes = getattr(next(iter(models.values())), "classes_", None)
+        return cls(names, np.column_stack(coefs), np.array(intercepts), classes)
+
+    def _build_stacked_matrix(self):
+        """Añade la mezcla como columna extra: miembros y ensemble salen del mismo producto"""
+        blend_coef = self.member_coef @ self.blend_weights
+        blend_bias = float(self.member_intercept @ self.blend_weights + self.blend_intercept)
+        self.stacked_coef = np.ascontiguousarray(np.column_stack([self.member_coef, blend_coef]))
+        self.stacked_intercept = np.append(self.member_intercept, blend_bias)
+
+    def _scores(self, X: sparse.spmatrix) -> np.ndarray:
+        """Scores de todos los miembros y de la mezcla (muestras × (miembros + 1))"""
+        return np.asarray(X @ self.stacked_coef) + self.stacked_intercept
+
+    def fit_blend(self, X: sparse.spmatrix, y: np.ndarray, C: float = 1.0) -> "StackedLinearEnsemble":
+        """
+        Aprende los pesos de mezcla con una regresión logística sobre los scores de los miembros
+
+        Args:
+            X: Características de un conjunto no usado para entrenar a los miembros
+            y: Etiquetas binarias
+            C: Regularización del mezclador
+        """
+        member_scores = self.member_scores(X)
+        blender = LogisticRegression(C=C, max_iter=1000, random_state=RANDOM_STATE)
+        blender.fit(member_scores, y)
+
+        self.blend_weights = blender.coef_.ravel().astype(np.float64)
+        self.blend_intercept = float(blender.intercept_[0])
+        self._build_stacked_matrix()
+        return self
+
+    def member_scores(self, X: sparse.spmatrix) -> np.ndarray:
+        """Score lineal de cada miembro (muestras × miembros)"""
+        return self._scores(X)[:, :-1]
+
+    def member_scores_dict(self, X: sparse.spmatrix) -> List[Dict[str, float]]:
+        """Scores de los miembros por texto, indexados por nombre"""
+        return [
+            {name: round(float(score), 4) for name, score in zip(self.member_names, row)}
+            for row in self.member_scores(X)
+        ]
+
+    def decision_function(self, X: sparse.spmatrix) -> np.ndarray:
+        """Score de la mezcla (log-odds)"""
+        return self._scores(X)[:, -1]
+
+    def predict_proba(self, X: sparse.spmatrix) -> np.ndarray:
+        """Probabilidades [P(0), P(1)] de la mezcla"""
+        positive = 1.0 / (1.0 + np.exp(-self.decision_function(X)))
+        return np.column_stack([1.0 - positive, positive])
+
+    def predict(self, X: sparse.spmatrix) -> np.ndarray:
+        """Clase predicha por la mezcla"""
+        return self.classes_[(self.decision_function(X) >= 0).astype(int)]
+
+    def get_info(self) -> Dict[str, Any]:
+        """Resumen de miembros, pesos de mezcla y métricas"""
+        return {
+            "members": self.member_names,
+            "blend_weights": {n: round(float(w), 4) for n, w in zip(self.member_names, self.blend_weights)},
+            "blend_intercept": round(self.blend_intercept, 4),
+            "n_features": int(self.member_coef.shape[0]),
+            "metrics": self.metrics
+        }
+
+
+def _load_member(models_dir: str, name: str) -> Tuple[Any, Any]:
+    """Carga el modelo y el vectorizador guardados de un miembro"""
+    with open(os.path.join(models_dir, f"{name}_trained.pkl"), 'rb') as f:
+        model = pickle.load(f)
+    with open(os.path.join(models_dir, f"{name}_vectorizer.pkl"), 'rb') as f:
+        vectorizer = pickle.load(f)
+    return model, vectorizer
+
+
+def build_linear_ensemble(models_dir: str = None, data_path: str = None,
+                          members: List[str] = None, text_column: str = "Text",
+                          label_column: str = "IsToxic", save: bool = True) -> Dict[str, Any]:
+    """
+    Construye el ensemble con los modelos guardados y aprende la mezcla
+
+    La mezcla se ajusta sobre el split de prueba (mismo test_size, semilla y
+    estratificación que ModelEvaluator), que los miembros no vieron al entrenar.
+
+    Args:
+        models_dir: Directorio con los pickles {modelo}_trained.pkl / _vectorizer.pkl
+        data_path: CSV con texto y etiqueta
+        members: Modelos a combinar (por defecto LR, Linear SVM y Naive Bayes)
+        text_column: Columna de texto
+        label_column: Columna de etiqueta binaria
+        save: Guardar como linear_ensemble_trained.pkl / _vectorizer.pkl
+
+    Returns:
+        Diccionario con información del ensemble y métricas
+    """
+    models_dir = str(models_dir or MODELS_DIR)
+    data_path = data_path or str(DATA_DIR / "toxic_comments_processed.csv")
+    members = members or DEFAULT_MEMBERS
+
+    models, vectorizer, vectorizer_name = {}, None, None
+    for name in members:
+        model, member_vectorizer = _load_member(models_dir, name)
+        if vectorizer is None:
+            vectorizer, vectorizer_name = member_vectorizer, name
+        elif member_vectorizer.vocabulary_ != vectorizer.vocabulary_:
+            raise ValueError(f"El vocabulario de {name} no coincide con el de {vectorizer_name}")
+        models[name] = model
+
+    ensemble = StackedLinearEnsemble.from_models(models)
+
+    # Split de mezcla: el mismo conjunto de prueba del evaluador
+    df = pd.read_csv(data_path)
+    texts = df[text_column].fillna('').astype(str)
+    labels = df[label_column].fillna(0).astype(int)
+    _, blend_texts, _, blend_labels = train_test_split(
+        texts, labels, test_size=TEST_SIZE, random_state=RANDOM_STATE, stratify=labels
+    )
+    X_blend = vectorizer.transform(blend_texts)
+    y_blend = blend_labels.to_numpy()
+
+    # Estimación honesta de la mezcla con validación cruzada sobre el split
+    member_scores = ensemble.member_scores(X_blend)
+    cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=RANDOM_STATE)
+    blend_cv_f1 = cross_val_score(
+        LogisticRegression(max_iter=1000, random_state=RANDOM_STATE),
+        member_scores, y_blend, cv=cv, scoring="f1_weighted"
+    )
+
+    ensemble.fit_blend(X_blend, y_blend)
+
+    metrics = {
+        "members": {
+            name: round(f1_score(y_blend, (member_scores[:, j] >= 0).astype(int), average='weighted'), 4)
+            for j, name in enumerate(ensemble.member_names)
+        },
+        "blend_cv_f1_mean": round(float(blend_cv_f1.mean()), 4),
+        "blend_cv_f1_std": round(float(blend_cv_f1.std()), 4),
+        "blend_accuracy": round(accuracy_score(y_blend, ensemble.predict(X_blend)), 4),
+        "blend_samples": int(len(y_blend)),
+        "built_at": datetime.now().isoformat()
+    }
+    ensemble.metrics = metrics
+    logger.info(f"✅ Ensemble lineal: {ensemble.get_info()['blend_weights']} (F1 CV {metrics['blend_cv_f1_mean']})")
+
+    result = ensemble.get_info()
+    if save:
+        model_path = os.path.join(models_dir, "linear_ensemble_trained.pkl")
+        vectorizer_path = os.path.join(models_dir, "linear_ensemble_vectorizer.pkl")
+        with open(model_path, 'wb') as f:
+            pickle.dump(ensemble, f)
+        shutil.copyfile(os.path.join(models_dir, f"{vectorizer_name}_vectorizer.pkl"), vectorizer_path)
+        result.update({"model_path": model_path, "vectorizer_path": vectorizer_path})
+        logger.info(f"✅ Ensemble lineal guardado en {model_path}")
+
+    return result
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    # Reimportar desde el paquete para que el pickle referencie ml.linear_ensemble y no __main__
+    from ml.linear_ensemble import build_linear_ensemble
+
+    parser = argparse.ArgumentParser(description="Construye el ensemble lineal apilado de ToxiGuard")
+    parser.add_argument("--models-dir", help="Directorio de modelos guardados")
+    parser.add_argument("--data", help="CSV con texto y etiqueta")
+    parser.add_argument("--members", nargs="+", help="Modelos a combinar")
+    args = parser.parse_args()
+
+    info = build_linear_ensemble(args.models_dir, args.data, args.members)
+    print(f"Pesos de mezcla: {info['blend_weights']}")
+    print(f"F1 por miembro: {info['metrics']['members']}")
+    print(f"F1 mezcla (CV): {info['metrics']['blend_cv_f1_mean']} ± {info['metrics']['blend_cv_f1_std']}")
@@ -3,13 +3,18 @@
 Compara el rendimiento de diferentes algoritmos de machine learning para clasificación de toxicidad
 """
 
+import os
 import pandas as pd
 import numpy as np
 import pickle
 import time
 import logging
-from typing import Dict, List, Tuple
-from sklearn.model_selection import train_test_split, cross_val_score
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Tuple
+from sklearn.base import clone
+from sklearn.model_selection import train_test_split, cross_val_score, StratifiedKFold
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.naive_bayes import MultinomialNB
 from sklearn.linear_model import LogisticRegression
@@ -20,15 +25,93 @@ from sklearn.pipeline import Pipeline
 import warnings
 warnings.filterwarnings('ignore')
 
+try:
+    from .feature_cache import FeatureCache
+except ImportError:  # Ejecución como script desde ml/
+    from feature_cache import FeatureCache
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Número de folds de validación cruzada
+CV_FOLDS = 5
+
+
+def available_cpus() -> int:
+    """CPUs utilizables por este proceso según afinidad y cuota de cgroup"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    
+    # Respetar la cuota de CPU del contenedor (cgroup v2)
+    try:
+        with open("/sys/fs/cgroup/cpu.max", "r") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, int(quota) // int(period)))
+    except (OSError, ValueError):
+        pass
+    
+    return max(1, cpus)
+
+
+def _run_evaluation_task(task: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Ejecuta una tarea de evaluación en un proceso trabajador
+    
+    Las matrices se abren memory-mapped desde la caché de características,
+    por lo que no se serializan hacia cada trabajador.
+    """
+    cache = FeatureCache(task["cache_dir"])
+    _, X_train = cache.load_matrix(task["train_key"])
+    y_train = task["y_train"]
+    model = task["model"]
+    
+    start_time = time.time()
+    
+    if task["kind"] == "holdout":
+        _, X_test = cache.load_matrix(task["test_key"])
+        
+        train_start = time.time()
+        model.fit(X_train, y_train)
+        train_time = time.time() - train_start
+        
+        pred_start = time.time()
+        y_pred = model.predict(X_test)
+        pred_time = time.time() - pred_start
+        
+        return {
+            "model_key": task["model_key"],
+            "kind": "holdout",
+            "model": model,
+            "y_pred": y_pred,
+            "train_time": train_time,
+            "prediction_time": pred_time,
+            "elapsed": time.time() - start_time
+        }
+    
+    # Fold de validación cruzada
+    train_idx, val_idx = task["train_idx"], task["val_idx"]
+    model.fit(X_train[train_idx], y_train[train_idx])
+    y_pred = model.predict(X_train[val_idx])
+    
+    return {
+        "model_key": task["model_key"],
+        "kind": "fold",
+        "fold": task["fold"],
+        "score": f1_score(y_train[val_idx], y_pred, average='weighted'),
+        "elapsed": time.time() - start_time
+    }
+
 class ModelEvaluator:
     """Evaluador comparativo de modelos de clasificación de toxicidad"""
     
-    def __init__(self, data_path: str = "../../data/toxic_comments_processed.csv"):
+    def __init__(self, data_path: str = "../../data/toxic_comments_processed.csv",
+                 use_feature_cache: bool = True):
         self.data_path = data_path
+        self.feature_cache = FeatureCache() if use_feature_cache else None
         self.models = {}
         self.results = {}
         self.vectorizer = None
@@ -36,6 +119,11 @@ class ModelEvaluator:
         self.X_test = None
         self.y_train = None
         self.y_test = None
+        self.X_train_vectorized = None
+        self.X_test_vectorized = None
+        self._train_key = None
+        self._test_key = None
+        self.evaluation_wall_time = None
         
     def load_data(self) -> bool:
         """Carga y prepara el dataset para entrenamiento"""
@@ -81,17 +169,27 @@ class ModelEvaluator:
             )
             
             # Vectorizar texto
-            self.vectorizer = TfidfVectorizer(
-                max_features=10000,
-                ngram_range=(1, 2),
-                stop_words='english',
-                min_df=2,
-                max_df=0.95
-            )
+            vectorizer_params = {
+                "max_features": 10000,
+                "ngram_range": (1, 2),
+                "stop_words": 'english',
+                "min_df": 2,
+                "max_df": 0.95
+            }
             
-            logger.info("🔄 Vectorizando texto...")
-            self.X_train_vectorized = self.vectorizer.fit_transform(self.X_train)
-            self.X_test_vectorized = self.vectorizer.transform(self.X_test)
+            if self.feature_cache is not None:
+                # Reutilizar la matriz TF-IDF de ejecuciones anteriores si existe
+                self.vectorizer, self.X_train_vectorized, self._train_key = self.feature_cache.fit_transform(
+                    self.X_train, vectorizer_params
+                )
+                self.X_test_vectorized, self._test_key = self.feature_cache.transform(
+                    self.vectorizer, self.X_test, self._train_key
+                )
+            else:
+                logger.info("🔄 Vectorizando texto...")
+                self.vectorizer = TfidfVectorizer(**vectorizer_params)
+                self.X_train_vectorized = self.vectorizer.fit_transform(self.X_train)
+                self.X_test_vectorized = self.vectorizer.transform(self.X_test)
             
             logger.info(f"✅ Datos cargados: {len(self.X_train)} train, {len(self.X_test)} test")
             return True
@@ -196,14 +294,40 @@ class ModelEvaluator:
         logger.info(f"✅ {model_name} evaluado - F1: {f1:.4f}, Tiempo: {total_time:.4f}s")
         return results
     
-    def evaluate_all_models(self) -> Dict:
-        """Evalúa todos los modelos definidos"""
+    def evaluate_all_models(self, parallel: bool = True, max_workers: int = None) -> Dict:
+        """
+        Evalúa todos los modelos definidos
+        
+        Args:
+            parallel: Si repartir entrenamientos y folds en un pool de procesos
+            max_workers: Límite de procesos (por defecto, CPUs disponibles)
+        """
         logger.info("🚀 Iniciando evaluación de todos los modelos...")
         
         if not self.X_train_vectorized is not None:
             logger.error("❌ Datos no cargados. Ejecuta load_data() primero.")
             return {}
         
+        start_time = time.time()
+        workers = min(max_workers or available_cpus(), len(self.models) * (CV_FOLDS + 1))
+        
+        if parallel and workers > 1:
+            try:
+                all_results = self._evaluate_all_models_parallel(workers)
+            except Exception as e:
+                logger.warning(f"⚠️ Evaluación paralela falló, usando modo secuencial: {e}")
+                all_results = self._evaluate_all_models_sequential()
+        else:
+            all_results = self._evaluate_all_models_sequential()
+        
+        self.evaluation_wall_time = round(time.time() - start_time, 4)
+        logger.info(f"⏱️ Evaluación completa en {self.evaluation_wall_time}s")
+        
+        self.results = all_results
+        return all_results
+    
+    def _evaluate_all_models_sequential(self) -> Dict:
+        """Evalúa los modelos uno tras otro en el proceso actual"""
         all_results = {}
         
         for model_key, model_info in self.models.items():
@@ -225,7 +349,117 @@ class ModelEvaluator:
                     'error': str(e)
                 }
         
-        self.results = all_results
+        return all_results
+    
+    def _share_matrices(self) -> Tuple[str, str, str, bool]:
+        """Garantiza que las matrices estén en disco para abrirlas memory-mapped"""
+        if self.feature_cache is not None and self._train_key and self._test_key:
+            return str(self.feature_cache.cache_dir.parent), self._train_key, self._test_key, False
+        
+        # Sin caché persistente: volcar a un directorio temporal del proceso
+        cache = FeatureCache(tempfile.mkdtemp(prefix="toxiguard_eval_"))
+        cache.save_matrix("train", self.X_train_vectorized)
+        cache.save_matrix("test", self.X_test_vectorized)
+        return str(cache.cache_dir.parent), "train", "test", True
+    
+    def _evaluate_all_models_parallel(self, workers: int) -> Dict:
+        """
+        Reparte el ajuste principal y cada fold de cada modelo en un pool de procesos
+        
+        Cada modelo genera 1 tarea de holdout + CV_FOLDS tareas de validación cruzada,
+        así el tiempo total se aproxima al del modelo más lento. Los resultados
+        se combinan en el orden de definición de los modelos y de los folds.
+        """
+        cache_dir, train_key, test_key, temporary = self._share_matrices()
+        y_train = np.asarray(self.y_train)
+        y_test = np.asarray(self.y_test)
+        
+        # Mismos folds que cross_val_score(cv=5) para un clasificador
+        folds = list(StratifiedKFold(n_splits=CV_FOLDS).split(np.zeros(len(y_train)), y_train))
+        
+        tasks = []
+        for model_key, model_info in self.models.items():
+            base_model = model_info['model']
+            if 'n_jobs' in base_model.get_params():
+                # El paralelismo lo aporta el pool; evitar sobre-suscripción
+                base_model.set_params(n_jobs=1)
+            
+            common = {
+                "model_key": model_key,
+                "cache_dir": cache_dir,
+                "train_key": train_key,
+                "test_key": test_key,
+                "y_train": y_train
+            }
+            tasks.append({**common, "kind": "holdout", "model": clone(base_model)})
+            for fold, (train_idx, val_idx) in enumerate(folds):
+                tasks.append({
+                    **common,
+                    "kind": "fold",
+                    "fold": fold,
+                    "model": clone(base_model),
+                    "train_idx": train_idx,
+                    "val_idx": val_idx
+                })
+        
+        logger.info(f"⚙️ Evaluando {len(self.models)} modelos en {len(tasks)} tareas con {workers} procesos")
+        
+        outputs: Dict[str, Dict[str, Any]] = {key: {"folds": {}, "elapsed": 0.0} for key in self.models}
+        errors: Dict[str, str] = {}
+        
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [(task["model_key"], executor.submit(_run_evaluation_task, task)) for task in tasks]
+                
+                for model_key, future in futures:
+                    try:
+                        output = future.result()
+                    except Exception as e:
+                        errors.setdefault(model_key, str(e))
+                        continue
+                    
+                    outputs[model_key]["elapsed"] += output["elapsed"]
+                    if output["kind"] == "holdout":
+                        outputs[model_key]["holdout"] = output
+                    else:
+                        outputs[model_key]["folds"][output["fold"]] = output["score"]
+        finally:
+            if temporary:
+                shutil.rmtree(cache_dir, ignore_errors=True)
+        
+        all_results = {}
+        for model_key, model_info in self.models.items():
+            if model_key in errors:
+                logger.error(f"❌ Error evaluando {model_key}: {errors[model_key]}")
+                all_results[model_key] = {
+                    'model_name': model_info['name'],
+                    'error': errors[model_key]
+                }
+                continue
+            
+            holdout = outputs[model_key]["holdout"]
+            y_pred = holdout["y_pred"]
+            cv_scores = np.array([outputs[model_key]["folds"][fold] for fold in range(CV_FOLDS)])
+            
+            # Conservar el modelo ajustado para save_models()
+            model_info['model'] = holdout["model"]
+            
+            f1 = f1_score(y_test, y_pred, average='weighted', zero_division=0)
+            all_results[model_key] = {
+                'model_name': model_info['name'],
+                'accuracy': round(accuracy_score(y_test, y_pred), 4),
+                'precision': round(precision_score(y_test, y_pred, average='weighted', zero_division=0), 4),
+                'recall': round(recall_score(y_test, y_pred, average='weighted', zero_division=0), 4),
+                'f1_score': round(f1, 4),
+                'cv_f1_mean': round(cv_scores.mean(), 4),
+                'cv_f1_std': round(cv_scores.std(), 4),
+                'train_time': round(holdout["train_time"], 4),
+                'prediction_time': round(holdout["prediction_time"], 4),
+                'total_time': round(outputs[model_key]["elapsed"], 4)
+            }
+            
+            logger.info(f"✅ {model_info['name']} evaluado - F1: {f1:.4f}")
+        
         return all_results
     
     def generate_report(self) -> str:
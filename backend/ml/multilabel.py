@@ -0,0 +1,260 @@
+"""
+🏷️ Cabezal Multi-etiqueta - ToxiGuard
+Clasificador one-vs-rest lineal cuyos coeficientes se apilan en una única
+matriz (características × etiquetas): todas las categorías se puntúan con un
+solo producto disperso-denso y se umbralizan de forma vectorizada
+"""
+
+import os
+import re
+import pickle
+import hashlib
+import logging
+import argparse
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import f1_score
+
+try:
+    from .config import MULTILABEL_CONFIG, CLASSIFICATION_THRESHOLDS, DATA_DIR, MODELS_DIR, RANDOM_STATE, TEST_SIZE
+except ImportError:  # Ejecución como script desde ml/
+    from config import MULTILABEL_CONFIG, CLASSIFICATION_THRESHOLDS, DATA_DIR, MODELS_DIR, RANDOM_STATE, TEST_SIZE
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+
+def preprocess_text(text: str) -> str:
+    """Misma limpieza que MLToxicityClassifier._preprocess_text (el vectorizador es compartido)"""
+    text = str(text).lower().strip()
+    text = re.sub(r'[^\w\s]', ' ', text)
+    return re.sub(r'\s+', ' ', text)
+
+
+def vectorizer_signature(vectorizer: Any) -> str:
+    """Huella del vocabulario para verificar que el cabezal y el vectorizador coinciden"""
+    vocabulary = getattr(vectorizer, "vocabulary_", None)
+    if vocabulary is None:
+        return ""
+    digest = hashlib.sha256()
+    for term, index in sorted(vocabulary.items()):
+        digest.update(f"{term}\x00{index}\x00".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+class MultiLabelHead:
+    """Cabezal lineal multi-etiqueta sobre las características TF-IDF del modelo binario"""
+
+    def __init__(self, categories: List[str], coef: np.ndarray, intercept: np.ndarray,
+                 thresholds: np.ndarray, signature: str = "", metrics: Dict[str, Any] = None):
+        """
+        Inicializa el cabezal
+
+        Args:
+            categories: Nombre de la categoría de cada columna
+            coef: Matriz de coeficientes (características × etiquetas)
+            intercept: Sesgo por etiqueta
+            thresholds: Umbral de probabilidad por etiqueta
+            signature: Huella del vectorizador con el que se entrenó
+            metrics: Métricas de evaluación por etiqueta
+        """
+        self.categories = list(categories)
+        self.coef = np.ascontiguousarray(coef, dtype=np.float64)
+        self.intercept = np.asarray(intercept, dtype=np.float64)
+        self.thresholds = np.asarray(thresholds, dtype=np.float64)
+        self.signature = signature
+        self.metrics = metrics or {}
+
+    @classmethod
+    def fit(cls, X: sparse.spmatrix, Y: np.ndarray, label_columns: List[str],
+            config: Dict[str, Any] = None, signature: str = "") -> "MultiLabelHead":
+        """
+        Entrena un LogisticRegression por etiqueta y apila sus coeficientes
+
+        Args:
+            X: Matriz de características (muestras × características)
+            Y: Matriz binaria de etiquetas (muestras × etiquetas)
+            label_columns: Columnas Is* correspondientes a cada columna de Y
+            config: Configuración (por defecto MULTILABEL_CONFIG)
+            signature: Huella del vectorizador
+
+        Returns:
+            Cabezal entrenado
+        """
+        config = config or MULTILABEL_CONFIG
+        categories, coefs, intercepts, thresholds = [], [], [], []
+
+        for j, column in enumerate(label_columns):
+            label_info = config["labels"][column]
+            positives = int(Y[:, j].sum())
+            if positives < config["min_positives"] or positives == len(Y):
+                logger.warning(f"⚠️ Etiqueta {column} omitida: {positives} positivos")
+                continue
+
+            model = LogisticRegression(**config["model"], random_state=RANDOM_STATE)
+            model.fit(X, Y[:, j])
+
+            categories.append(label_info["category"])
+            coefs.append(model.coef_.ravel())
+            intercepts.append(model.intercept_[0])
+            thresholds.append(CLASSIFICATION_THRESHOLDS.get(
+                label_info["threshold_key"], CLASSIFICATION_THRESHOLDS["default"]
+            ))
+
+        if not categories:
+            raise ValueError("Ninguna etiqueta tiene suficientes positivos para entrenar")
+
+        logger.info(f"✅ Cabezal multi-etiqueta entrenado con {len(categories)} categorías")
+        return cls(categories, np.column_stack(coefs), np.array(intercepts),
+                   np.array(thresholds), signature)
+
+    def decision_function(self, X: sparse.spmatrix) -> np.ndarray:
+        """Scores lineales de todas las etiquetas con un único producto (muestras × etiquetas)"""
+        return np.asarray(X @ self.coef) + self.intercept
+
+    def predict_proba(self, X: sparse.spmatrix) -> np.ndarray:
+        """Probabilidad por etiqueta (sigmoide de los scores)"""
+        return 1.0 / (1.0 + np.exp(-self.decision_function(X)))
+
+    def predict(self, X: sparse.spmatrix) -> np.ndarray:
+        """Matriz binaria de categorías aplicando los umbrales configurados"""
+        return self.predict_proba(X) >= self.thresholds
+
+    def detect(self, X: sparse.spmatrix) -> List[Dict[str, float]]:
+        """Categorías detectadas por texto con su probabilidad"""
+        probabilities = self.predict_proba(X)
+        rows, cols = np.nonzero(probabilities >= self.thresholds)
+        detected: List[Dict[str, float]] = [{} for _ in range(probabilities.shape[0])]
+        for row, col in zip(rows, cols):
+            detected[row][self.categories[col]] = float(probabilities[row, col])
+        return detected
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Representación serializable sin dependencias de clases propias"""
+        return {
+            "categories": self.categories,
+            "coef": self.coef,
+            "intercept": self.intercept,
+            "thresholds": self.thresholds,
+            "signature": self.signature,
+            "metrics": self.metrics
+        }
+
+    def save(self, filepath: str) -> str:
+        """Guarda el cabezal en formato pickle (solo arrays y tipos básicos)"""
+        os.makedirs(os.path.dirname(os.path.abspath(filepath)), exist_ok=True)
+        with open(filepath, 'wb') as f:
+            pickle.dump(self.to_dict(), f)
+        logger.info(f"✅ Cabezal multi-etiqueta guardado en {filepath}")
+        return filepath
+
+    @classmethod
+    def load(cls, filepath: str) -> "MultiLabelHead":
+        """Carga un cabezal guardado con save()"""
+        with open(filepath, 'rb') as f:
+            data = pickle.load(f)
+        return cls(**data)
+
+
+def train_multilabel_head(data_path: str = None, vectorizer_path: str = None,
+                          output_path: str = None, config: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    Entrena el cabezal multi-etiqueta sobre el vectorizador del modelo binario
+
+    Args:
+        data_path: CSV con la columna de texto y las columnas Is*
+        vectorizer_path: Vectorizador ajustado del modelo binario (compartido)
+        output_path: Ruta de salida del cabezal
+        config: Configuración (por defecto MULTILABEL_CONFIG)
+
+    Returns:
+        Diccionario con la ruta del cabezal y las métricas por categoría
+    """
+    config = config or MULTILABEL_CONFIG
+    data_path = data_path or str(DATA_DIR / config["data_filename"])
+    vectorizer_path = vectorizer_path or str(MODELS_DIR / "linear_svm_vectorizer.pkl")
+    output_path = output_path or str(MODELS_DIR / config["head_filename"])
+
+    df = pd.read_csv(data_path)
+    label_columns = [column for column in config["labels"] if column in df.columns]
+    if not label_columns:
+        raise ValueError(f"El CSV no contiene columnas de etiquetas: {list(config['labels'])}")
+
+    df = df.dropna(subset=[config["text_column"]])
+    texts = df[config["text_column"]].map(preprocess_text).tolist()
+    Y = df[label_columns].fillna(0).astype(int).to_numpy()
+
+    with open(vectorizer_path, 'rb') as f:
+        vectorizer = pickle.load(f)
+    X = vectorizer.transform(texts)
+
+    # Evaluar en un split reservado y reentrenar con todos los datos
+    train_idx, test_idx = train_test_split(
+        np.arange(len(texts)), test_size=TEST_SIZE, random_state=RANDOM_STATE
+    )
+    signature = vectorizer_signature(vectorizer)
+    eval_head = MultiLabelHead.fit(X[train_idx], Y[train_idx], label_columns, config, signature)
+    Y_pred = eval_head.predict(X[test_idx])
+
+    category_columns = {config["labels"][c]["category"]: j for j, c in enumerate(label_columns)}
+    metrics = {
+        category: {
+            "f1": round(f1_score(Y[test_idx, category_columns[category]], Y_pred[:, k], zero_division=0), 4),
+            "support": int(Y[test_idx, category_columns[category]].sum()),
+            "threshold": float(eval_head.thresholds[k])
+        }
+        for k, category in enumerate(eval_head.categories)
+    }
+
+    head = MultiLabelHead.fit(X, Y, label_columns, config, signature)
+    head.metrics = {"per_category": metrics, "trained_at": datetime.now().isoformat()}
+    head.save(output_path)
+
+    return {"head_path": output_path, "categories": head.categories, "metrics": metrics}
+
+
+def load_head_for_vectorizer(filepath: str, vectorizer: Any) -> Optional[MultiLabelHead]:
+    """
+    Carga el cabezal solo si fue entrenado con el mismo vectorizador
+
+    Sin huella calculable (HashingVectorizer, CompactVectorizer) no se puede
+    verificar la correspondencia y el cabezal se ignora; la dimensión se
+    compara siempre con la anchura real de la salida del vectorizador.
+    """
+    if not os.path.exists(filepath):
+        return None
+
+    head = MultiLabelHead.load(filepath)
+    expected = vectorizer_signature(vectorizer)
+    if not expected:
+        logger.info(f"Cabezal multi-etiqueta {filepath}: el vectorizador no tiene huella verificable, se ignora")
+        return None
+    if head.signature and head.signature != expected:
+        logger.info(f"Cabezal multi-etiqueta {filepath} no coincide con el vectorizador, se ignora")
+        return None
+    try:
+        n_features = vectorizer.transform([""]).shape[1]
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo obtener la dimensión del vectorizador ({e}), se ignora el cabezal")
+        return None
+    if head.coef.shape[0] != n_features:
+        logger.warning(f"⚠️ Dimensión del cabezal multi-etiqueta incompatible ({head.coef.shape[0]} vs {n_features}), se ignora")
+        return None
+    return head
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Entrena el cabezal multi-etiqueta de ToxiGuard")
+    parser.add_argument("--data", help="CSV con columnas Is*")
+    parser.add_argument("--vectorizer", help="Vectorizador del modelo binario")
+    parser.add_argument("--output", help="Ruta de salida del cabezal")
+    args = parser.parse_args()
+
+    result = train_multilabel_head(args.data, args.vectorizer, args.output)
+    for category, values in result["metrics"].items():
+        print(f"{category:>16}: F1={values['f1']:.4f} (soporte {values['support']}, umbral {values['threshold']})")
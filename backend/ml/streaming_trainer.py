@@ -0,0 +1,324 @@
+"""
+🌊 Entrenador en Streaming - ToxiGuard
+Entrenamiento out-of-core por bloques con HashingVectorizer y partial_fit,
+con memoria acotada sin importar el tamaño del corpus
+"""
+
+import os
+import pickle
+import time
+import logging
+from typing import Dict, Iterator, List, Optional, Tuple, Any
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+from sklearn.linear_model import SGDClassifier
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import normalize
+from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
+
+from .config import STREAMING_CONFIG, MODELS_DIR, RANDOM_STATE
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Mapeo de etiquetas de texto a números (igual que ModelTrainer)
+LABEL_MAPPING = {"toxic": 1, "non-toxic": 0, "hate": 1, "normal": 0}
+
+
+class StreamingIDF:
+    """Estimación incremental de IDF acumulando document frequency por bloque"""
+
+    def __init__(self, n_features: int):
+        self.n_features = n_features
+        self.document_frequency = np.zeros(n_features, dtype=np.int64)
+        self.n_documents = 0
+
+    def partial_fit(self, X: sparse.csr_matrix) -> "StreamingIDF":
+        """Acumula la frecuencia de documento de un bloque ya vectorizado"""
+        X = sparse.csr_matrix(X)
+        X.sum_duplicates()
+        self.document_frequency += np.bincount(X.indices, minlength=self.n_features)
+        self.n_documents += X.shape[0]
+        return self
+
+    @property
+    def idf_(self) -> np.ndarray:
+        """IDF suavizado con la misma fórmula que TfidfTransformer"""
+        df = self.document_frequency.astype(np.float64)
+        return np.log((1.0 + self.n_documents) / (1.0 + df)) + 1.0
+
+    def to_transformer(self) -> TfidfTransformer:
+        """Construye un TfidfTransformer equivalente para servir el modelo"""
+        transformer = TfidfTransformer(norm="l2", use_idf=True, smooth_idf=True)
+        transformer.idf_ = self.idf_
+        return transformer
+
+
+class StreamingTrainer:
+    """Entrenador out-of-core que lee el CSV por bloques y entrena con partial_fit"""
+
+    def __init__(self, model_type: str = "sgd", text_column: str = "text",
+                 label_column: str = "label", config: Dict[str, Any] = None):
+        """
+        Inicializa el entrenador en streaming
+
+        Args:
+            model_type: Tipo de modelo incremental ('sgd', 'naive_bayes')
+            text_column: Columna del CSV con el texto
+            label_column: Columna del CSV con la etiqueta binaria
+            config: Configuración (por defecto STREAMING_CONFIG)
+        """
+        self.config = {**STREAMING_CONFIG, **(config or {})}
+
+        if model_type not in self.config["models"]:
+            raise ValueError(f"Tipo de modelo no válido para streaming: {model_type}")
+
+        self.model_type = model_type
+        self.text_column = text_column
+        self.label_column = label_column
+        self.classes = np.array([0, 1])
+
+        # Vectorizador sin estado: no necesita ver el corpus completo
+        self.hashing_vectorizer = HashingVectorizer(
+            n_features=self.config["n_features"],
+            ngram_range=tuple(self.config["ngram_range"]),
+            alternate_sign=False,  # MultinomialNB requiere valores no negativos
+            norm=None if self.config["use_idf"] else "l2"
+        )
+        self.idf = StreamingIDF(self.config["n_features"]) if self.config["use_idf"] else None
+        self.model = self._create_model()
+
+        # Holdout acotado y métricas progresivas
+        self.holdout_X: List[sparse.csr_matrix] = []
+        self.holdout_y: List[np.ndarray] = []
+        self.holdout_rows = 0
+        self.history: List[Dict[str, Any]] = []
+
+        logger.info(f"Entrenador en streaming inicializado: {model_type}")
+
+    def _create_model(self):
+        """Crea el modelo incremental según la configuración"""
+        params = self.config["models"][self.model_type]
+        if self.model_type == "sgd":
+            return SGDClassifier(**params)
+        return MultinomialNB(**params)
+
+    def iter_chunks(self, data_path: str) -> Iterator[Tuple[List[str], np.ndarray]]:
+        """
+        Lee el CSV por bloques y devuelve (textos, etiquetas) limpios
+
+        Args:
+            data_path: Ruta al archivo CSV
+
+        Yields:
+            Tuplas (textos, etiquetas) de tamaño chunk_size como máximo
+        """
+        reader = pd.read_csv(
+            data_path,
+            usecols=[self.text_column, self.label_column],
+            chunksize=self.config["chunk_size"]
+        )
+
+        for chunk in reader:
+            chunk = chunk.dropna(subset=[self.text_column, self.label_column])
+            texts = chunk[self.text_column].astype(str)
+            mask = texts.str.strip() != ""
+            chunk = chunk[mask]
+            texts = texts[mask]
+
+            labels = chunk[self.label_column]
+            if not pd.api.types.is_numeric_dtype(labels):
+                labels = labels.map(LABEL_MAPPING)
+            labels = labels.fillna(0).astype(int).clip(0, 1).to_numpy()
+
+            if len(texts) == 0:
+                continue
+
+            yield texts.tolist(), labels
+
+    def _vectorize(self, texts: List[str]) -> sparse.csr_matrix:
+        """Vectoriza un bloque aplicando el IDF estimado si está habilitado"""
+        X = self.hashing_vectorizer.transform(texts)
+        if self.idf is not None:
+            X = normalize(X @ sparse.diags(self.idf.idf_), norm="l2", copy=False)
+        return sparse.csr_matrix(X)
+
+    def _draw_holdout(self, n_rows: int, rng: np.random.RandomState, taken: int) -> np.ndarray:
+        """
+        Índices del bloque reservados para holdout
+
+        Depende solo del generador y de las filas ya reservadas, así que la pasada
+        del IDF y la de entrenamiento eligen exactamente las mismas filas.
+        """
+        remaining = self.config["holdout_max_rows"] - taken
+        if remaining <= 0 or self.config["holdout_fraction"] <= 0:
+            return np.empty(0, dtype=np.int64)
+        mask = rng.rand(n_rows) < self.config["holdout_fraction"]
+        return np.flatnonzero(mask)[:remaining]
+
+    def _split_holdout(self, X: sparse.csr_matrix, y: np.ndarray,
+                       rng: np.random.RandomState) -> Tuple[sparse.csr_matrix, np.ndarray]:
+        """Reserva una fracción del bloque para holdout mientras haya espacio"""
+        holdout_idx = self._draw_holdout(X.shape[0], rng, self.holdout_rows)
+        if len(holdout_idx) == 0:
+            return X, y
+
+        self.holdout_X.append(X[holdout_idx])
+        self.holdout_y.append(y[holdout_idx])
+        self.holdout_rows += len(holdout_idx)
+
+        train_mask = np.ones(X.shape[0], dtype=bool)
+        train_mask[holdout_idx] = False
+        return X[train_mask], y[train_mask]
+
+    def _calculate_metrics(self, y_true: np.ndarray, y_pred: np.ndarray) -> Dict[str, float]:
+        """Calcula métricas de evaluación (ponderadas como en ModelTrainer)"""
+        return {
+            "accuracy": round(accuracy_score(y_true, y_pred), 4),
+            "precision": round(precision_score(y_true, y_pred, average='weighted', zero_division=0), 4),
+            "recall": round(recall_score(y_true, y_pred, average='weighted', zero_division=0), 4),
+            "f1": round(f1_score(y_true, y_pred, average='weighted', zero_division=0), 4)
+        }
+
+    def estimate_idf(self, data_path: str) -> int:
+        """
+        Primera pasada en streaming para estimar el IDF del corpus
+
+        Excluye las filas que train() reservará para holdout (mismo generador y
+        semilla), para que la evaluación no vea su frecuencia de documento.
+        """
+        if self.idf is None:
+            return 0
+
+        logger.info("🔄 Estimando IDF en streaming...")
+        rng = np.random.RandomState(RANDOM_STATE)
+        taken = 0
+        for texts, _ in self.iter_chunks(data_path):
+            X = self.hashing_vectorizer.transform(texts)
+            holdout_idx = self._draw_holdout(X.shape[0], rng, taken)
+            if len(holdout_idx):
+                taken += len(holdout_idx)
+                train_mask = np.ones(X.shape[0], dtype=bool)
+                train_mask[holdout_idx] = False
+                X = X[train_mask]
+            self.idf.partial_fit(X)
+
+        logger.info(f"✅ IDF estimado sobre {self.idf.n_documents} documentos")
+        return self.idf.n_documents
+
+    def train(self, data_path: str, max_chunks: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Entrena el modelo leyendo el CSV por bloques
+
+        Cada bloque se evalúa primero con el modelo actual (validación progresiva)
+        y luego se usa para partial_fit. El holdout se evalúa tras cada bloque.
+
+        Args:
+            data_path: Ruta al archivo CSV
+            max_chunks: Número máximo de bloques a procesar (opcional)
+
+        Returns:
+            Diccionario con métricas progresivas y de holdout
+        """
+        start_time = time.time()
+        rng = np.random.RandomState(RANDOM_STATE)
+        self.estimate_idf(data_path)
+
+        rows_seen = 0
+        progressive_correct = 0
+        progressive_total = 0
+
+        for chunk_index, (texts, labels) in enumerate(self.iter_chunks(data_path)):
+            if max_chunks is not None and chunk_index >= max_chunks:
+                break
+
+            chunk_start = time.time()
+            X = self._vectorize(texts)
+            X_train, y_train = self._split_holdout(X, labels, rng)
+            if X_train.shape[0] == 0:
+                continue
+
+            # Validación progresiva: evaluar antes de entrenar con el bloque
+            chunk_metrics = {}
+            if chunk_index > 0:
+                y_pred = self.model.predict(X_train)
+                progressive_correct += int((y_pred == y_train).sum())
+                progressive_total += len(y_train)
+                chunk_metrics = self._calculate_metrics(y_train, y_pred)
+
+            self.model.partial_fit(X_train, y_train, classes=self.classes)
+            rows_seen += X_train.shape[0]
+
+            holdout_metrics = self.evaluate_holdout()
+            self.history.append({
+                "chunk": chunk_index,
+                "rows_seen": rows_seen,
+                "progressive": chunk_metrics,
+                "holdout": holdout_metrics,
+                "chunk_time": round(time.time() - chunk_start, 4)
+            })
+
+            logger.info(
+                f"Bloque {chunk_index}: {rows_seen} filas, "
+                f"holdout F1: {holdout_metrics.get('f1', 0):.4f}"
+            )
+
+        if rows_seen == 0:
+            raise ValueError("No se encontraron datos de entrenamiento en el CSV")
+
+        return {
+            "model_type": self.model_type,
+            "rows_seen": rows_seen,
+            "holdout_rows": self.holdout_rows,
+            "chunks": len(self.history),
+            "progressive_accuracy": round(progressive_correct / progressive_total, 4) if progressive_total else None,
+            "holdout_metrics": self.history[-1]["holdout"] if self.history else {},
+            "history": self.history,
+            "use_idf": self.idf is not None,
+            "train_time": round(time.time() - start_time, 4),
+            "timestamp": datetime.now().isoformat()
+        }
+
+    def evaluate_holdout(self) -> Dict[str, float]:
+        """Evalúa el modelo actual sobre el holdout acumulado"""
+        if not self.holdout_X:
+            return {}
+
+        X = sparse.vstack(self.holdout_X, format="csr")
+        y = np.concatenate(self.holdout_y)
+        return self._calculate_metrics(y, self.model.predict(X))
+
+    def get_serving_vectorizer(self):
+        """Devuelve un vectorizador con transform() compatible con MLToxicityClassifier"""
+        if self.idf is None:
+            return self.hashing_vectorizer
+
+        return Pipeline([
+            ("hashing", self.hashing_vectorizer),
+            ("idf", self.idf.to_transformer())
+        ])
+
+    def save_model(self, models_dir: str = None) -> Tuple[str, str]:
+        """
+        Guarda el modelo y el vectorizador en formato pickle
+
+        Returns:
+            Tuple con (ruta_modelo, ruta_vectorizador)
+        """
+        models_dir = str(models_dir or MODELS_DIR)
+        os.makedirs(models_dir, exist_ok=True)
+
+        model_path = os.path.join(models_dir, f"{self.model_type}_streaming_trained.pkl")
+        vectorizer_path = os.path.join(models_dir, f"{self.model_type}_streaming_vectorizer.pkl")
+
+        with open(model_path, 'wb') as f:
+            pickle.dump(self.model, f)
+        with open(vectorizer_path, 'wb') as f:
+            pickle.dump(self.get_serving_vectorizer(), f)
+
+        logger.info(f"✅ Modelo en streaming guardado en {model_path}")
+        return model_path, vectorizer_path
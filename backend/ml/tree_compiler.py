@@ -0,0 +1,336 @@
+"""
+🌲 Compilador de Ensembles de Árboles - ToxiGuard
+Aplana Random Forest / Gradient Boosting en arrays NumPy contiguos
+(feature, threshold, left, right, value) y evalúa lotes completos
+descendiendo todos los árboles nivel por nivel de forma vectorizada
+"""
+
+import time
+import pickle
+import logging
+import argparse
+from typing import Any, Dict, List, Sequence
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.special import expit
+
+try:
+    from .config import DATA_DIR, MODELS_DIR, RANDOM_STATE
+except ImportError:  # Ejecución como script desde ml/
+    from config import DATA_DIR, MODELS_DIR, RANDOM_STATE
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Filas evaluadas a la vez: bloques pequeños mantienen la matriz de nodos
+# (muestras × árboles) y las filas densificadas en caché
+DEFAULT_CHUNK_SIZE = 256
+
+# Tamaños de lote del benchmark
+BENCHMARK_BATCH_SIZES = (1, 10, 100, 1000, 10000)
+
+
+class CompiledTreeEnsemble:
+    """Ensemble de árboles compilado a arrays planos para inferencia por lotes"""
+
+    def __init__(self, kind: str, feature: np.ndarray, threshold: np.ndarray, left: np.ndarray,
+                 right: np.ndarray, value: np.ndarray, roots: np.ndarray, max_depth: int,
+                 used_features: np.ndarray, n_features: int, classes: np.ndarray,
+                 learning_rate: float = 1.0, init_score: float = 0.0):
+        """
+        Inicializa el ensemble compilado
+
+        Args:
+            kind: 'random_forest' (promedio de probabilidades) o 'gradient_boosting' (suma de log-odds)
+            feature: Índice compacto de la característica de cada nodo
+            threshold: Umbral de cada nodo
+            left: Hijo izquierdo de cada nodo (las hojas apuntan a sí mismas)
+            right: Hijo derecho de cada nodo (las hojas apuntan a sí mismas)
+            value: Valor de hoja (probabilidades [P(0), P(1)] en RF, valor de regresión en GB)
+            roots: Nodo raíz de cada árbol
+            max_depth: Profundidad máxima del ensemble
+            used_features: Columnas originales usadas por algún nodo
+            n_features: Número de características de entrada
+            classes: Clases del clasificador
+            learning_rate: Tasa de aprendizaje (solo gradient boosting)
+            init_score: Log-odds inicial (solo gradient boosting)
+        """
+        self.kind = kind
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        # Hijos intercalados: el siguiente nodo es children[2 * nodo + (x > umbral)]
+        self.children = np.empty(2 * len(left), dtype=np.int32)
+        self.children[0::2] = left
+        self.children[1::2] = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.used_features = used_features
+        self.n_features_in_ = int(n_features)
+        self.classes_ = np.asarray(classes)
+        self.learning_rate = float(learning_rate)
+        self.init_score = float(init_score)
+
+    @classmethod
+    def from_sklearn(cls, model: Any) -> "CompiledTreeEnsemble":
+        """
+        Compila un RandomForestClassifier / ExtraTreesClassifier o GradientBoostingClassifier binario
+
+        Args:
+            model: Ensemble de árboles de sklearn ya entrenado
+
+        Returns:
+            Ensemble compilado
+        """
+        if len(getattr(model, "classes_", [])) != 2:
+            raise ValueError("Solo se soportan clasificadores binarios")
+
+        if hasattr(model, "loss_") or hasattr(model, "init_") and hasattr(model, "learning_rate"):
+            kind = "gradient_boosting"
+            trees = [estimator.tree_ for estimator in model.estimators_[:, 0]]
+        elif hasattr(model, "estimators_"):
+            kind = "random_forest"
+            trees = [estimator.tree_ for estimator in model.estimators_]
+        else:
+            raise ValueError(f"{type(model).__name__} no es un ensemble de árboles soportado")
+
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset, max_depth = 0, 0
+
+        for tree in trees:
+            n_nodes = tree.node_count
+            is_leaf = tree.children_left == -1
+            node_ids = np.arange(n_nodes)
+
+            # Las hojas apuntan a sí mismas: descender max_depth niveles siempre termina en hoja
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+
+            if kind == "random_forest":
+                # Misma normalización que DecisionTreeClassifier.predict_proba
+                leaf_values = tree.value[:, 0, :]
+                values.append(leaf_values / leaf_values.sum(axis=1, keepdims=True))
+            else:
+                values.append(tree.value[:, 0, 0])
+
+            roots.append(offset)
+            offset += n_nodes
+            max_depth = max(max_depth, tree.max_depth)
+
+        feature = np.concatenate(features)
+        threshold = np.concatenate(thresholds)
+        internal = np.isfinite(threshold)
+
+        # Solo se densifican las columnas que algún nodo consulta
+        used_features, compact = np.unique(feature[internal], return_inverse=True)
+        compact_feature = np.zeros(len(feature), dtype=np.int32)
+        compact_feature[internal] = compact
+
+        learning_rate, init_score = 1.0, 0.0
+        if kind == "gradient_boosting":
+            learning_rate = model.learning_rate
+            init_score = float(np.ravel(model._raw_predict_init(np.zeros((1, model.n_features_in_), dtype=np.float32)))[0])
+
+        logger.info(f"✅ Ensemble compilado: {len(trees)} árboles, {offset} nodos, "
+                    f"profundidad {max_depth}, {len(used_features)} características usadas")
+
+        return cls(
+            kind=kind,
+            feature=np.ascontiguousarray(compact_feature),
+            threshold=np.ascontiguousarray(threshold, dtype=np.float64),
+            left=np.ascontiguousarray(np.concatenate(lefts), dtype=np.int32),
+            right=np.ascontiguousarray(np.concatenate(rights), dtype=np.int32),
+            value=np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+            roots=np.asarray(roots, dtype=np.int32),
+            max_depth=max_depth,
+            used_features=used_features.astype(np.int64),
+            n_features=model.n_features_in_,
+            classes=model.classes_,
+            learning_rate=learning_rate,
+            init_score=init_score
+        )
+
+    def _densify(self, X) -> np.ndarray:
+        """Extrae solo las columnas usadas, en float32 como hace sklearn"""
+        if sparse.issparse(X):
+            return sparse.csr_matrix(X)[:, self.used_features].toarray().astype(np.float32, copy=False)
+        return np.asarray(X, dtype=np.float32)[:, self.used_features]
+
+    def _leaf_nodes(self, X_used: np.ndarray) -> np.ndarray:
+        """Desciende todos los árboles nivel por nivel y devuelve la hoja alcanzada (muestras × árboles)"""
+        n_samples, n_used = X_used.shape
+        flat = np.ascontiguousarray(X_used).ravel()
+        index_dtype = np.int32 if n_samples * max(n_used, 1) < np.iinfo(np.int32).max else np.int64
+        row_offsets = (np.arange(n_samples, dtype=index_dtype) * n_used)[:, None]
+        nodes = np.broadcast_to(self.roots, (n_samples, len(self.roots))).copy()
+
+        for _ in range(self.max_depth):
+            positions = np.take(self.feature, nodes).astype(index_dtype, copy=False)
+            positions += row_offsets
+            go_right = np.take(flat, positions) > np.take(self.threshold, nodes)
+            nodes *= 2
+            nodes += go_right
+            nodes = np.take(self.children, nodes)
+
+        return nodes
+
+    def _raw_scores(self, X, chunk_size: int = DEFAULT_CHUNK_SIZE) -> np.ndarray:
+        """Probabilidades [P(0), P(1)] (RF) o log-odds (GB) por muestra"""
+        n_samples = X.shape[0]
+        width = 2 if self.kind == "random_forest" else 1
+        scores = np.empty((n_samples, width), dtype=np.float64)
+
+        for start in range(0, n_samples, chunk_size):
+            leaves = self.value[self._leaf_nodes(self._densify(X[start:start + chunk_size]))]
+            n_trees = leaves.shape[1]
+
+            # Acumular árbol a árbol en el mismo orden que sklearn (paridad exacta)
+            if self.kind == "random_forest":
+                total = np.zeros((leaves.shape[0], width))
+                for t in range(n_trees):
+                    total += leaves[:, t]
+                scores[start:start + chunk_size] = total / n_trees
+            else:
+                total = np.full(leaves.shape[0], self.init_score)
+                for t in range(n_trees):
+                    total += self.learning_rate * leaves[:, t]
+                scores[start:start + chunk_size, 0] = total
+
+        return scores
+
+    def decision_function(self, X) -> np.ndarray:
+        """Log-odds del ensemble (solo gradient boosting)"""
+        if self.kind != "gradient_boosting":
+            raise AttributeError("decision_function solo está disponible para gradient boosting")
+        return self._raw_scores(X)[:, 0]
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Probabilidades [P(0), P(1)] por muestra"""
+        if self.kind == "random_forest":
+            return self._raw_scores(X)
+        positive = expit(self.decision_function(X))
+        return np.column_stack([1.0 - positive, positive])
+
+    def predict(self, X) -> np.ndarray:
+        """Clase predicha (mismo desempate que sklearn: argmax de las probabilidades)"""
+        if self.kind == "gradient_boosting":
+            return self.classes_[(self.decision_function(X) > 0).astype(int)]
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def export(self, filepath: str) -> str:
+        """Exporta los arrays de nodos a un .npz portable (sin pickles de sklearn)"""
+        np.savez(
+            filepath, kind=self.kind, feature=self.feature, threshold=self.threshold,
+            left=self.left, right=self.right, value=self.value, roots=self.roots,
+            max_depth=self.max_depth, used_features=self.used_features,
+            n_features=self.n_features_in_, classes=self.classes_,
+            learning_rate=self.learning_rate, init_score=self.init_score
+        )
+        logger.info(f"✅ Ensemble compilado exportado a {filepath}")
+        return filepath
+
+    @classmethod
+    def load(cls, filepath: str) -> "CompiledTreeEnsemble":
+        """Carga un ensemble exportado con export()"""
+        with np.load(filepath, allow_pickle=False) as data:
+            arrays = {key: data[key] for key in data.files}
+        return cls(
+            kind=str(arrays.pop("kind")),
+            max_depth=int(arrays.pop("max_depth")),
+            n_features=int(arrays.pop("n_features")),
+            learning_rate=float(arrays.pop("learning_rate")),
+            init_score=float(arrays.pop("init_score")),
+            **arrays
+        )
+
+
+def compile_if_tree_ensemble(model: Any) -> Any:
+    """Devuelve la versión compilada si el modelo es un ensemble de árboles soportado"""
+    try:
+        return CompiledTreeEnsemble.from_sklearn(model)
+    except (ValueError, AttributeError):
+        return model
+
+
+def check_parity(model: Any, compiled: CompiledTreeEnsemble, X) -> Dict[str, Any]:
+    """Compara probabilidades y predicciones del ensemble compilado con sklearn"""
+    expected_proba = model.predict_proba(X)
+    compiled_proba = compiled.predict_proba(X)
+    expected_pred = model.predict(X)
+    compiled_pred = compiled.predict(X)
+
+    max_abs_diff = float(np.abs(expected_proba - compiled_proba).max())
+    return {
+        "samples": int(X.shape[0]),
+        "max_abs_proba_diff": max_abs_diff,
+        "prediction_agreement": float(np.mean(expected_pred == compiled_pred)),
+        "exact": bool(max_abs_diff == 0.0 and np.array_equal(expected_pred, compiled_pred))
+    }
+
+
+def benchmark(model: Any, compiled: CompiledTreeEnsemble, X,
+              batch_sizes: Sequence[int] = BENCHMARK_BATCH_SIZES, repeats: int = 5) -> List[Dict[str, Any]]:
+    """
+    Mide la latencia de predict_proba de sklearn frente al ensemble compilado
+
+    Los lotes mayores que X se construyen remuestreando filas con reemplazo.
+    """
+    rng = np.random.RandomState(RANDOM_STATE)
+    X = sparse.csr_matrix(X)
+    results = []
+
+    for batch_size in batch_sizes:
+        batch = X[rng.randint(0, X.shape[0], size=batch_size)]
+        timings = {}
+
+        for name, predictor in (("sklearn", model), ("compiled", compiled)):
+            predictor.predict_proba(batch)  # Calentamiento
+            elapsed = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                predictor.predict_proba(batch)
+                elapsed.append(time.perf_counter() - start)
+            timings[name] = float(np.median(elapsed)) * 1000
+
+        results.append({
+            "batch_size": batch_size,
+            "sklearn_ms": round(timings["sklearn"], 3),
+            "compiled_ms": round(timings["compiled"], 3),
+            "speedup": round(timings["sklearn"] / max(timings["compiled"], 1e-9), 2)
+        })
+        logger.info(f"Lote {batch_size}: sklearn {timings['sklearn']:.3f} ms, "
+                    f"compilado {timings['compiled']:.3f} ms")
+
+    return results
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Compila y compara un ensemble de árboles guardado")
+    parser.add_argument("--model", default="random_forest", help="Prefijo del modelo en models/")
+    parser.add_argument("--data", default=str(DATA_DIR / "toxic_comments_processed.csv"))
+    parser.add_argument("--text-column", default="Text")
+    parser.add_argument("--export", help="Ruta .npz donde exportar los arrays compilados")
+    args = parser.parse_args()
+
+    with open(MODELS_DIR / f"{args.model}_trained.pkl", 'rb') as f:
+        tree_model = pickle.load(f)
+    with open(MODELS_DIR / f"{args.model}_vectorizer.pkl", 'rb') as f:
+        vectorizer = pickle.load(f)
+
+    texts = pd.read_csv(args.data)[args.text_column].fillna('').astype(str)
+    X_all = vectorizer.transform(texts)
+
+    compiled_model = CompiledTreeEnsemble.from_sklearn(tree_model)
+    print(f"Paridad: {check_parity(tree_model, compiled_model, X_all)}")
+    for row in benchmark(tree_model, compiled_model, X_all):
+        print(f"lote {row['batch_size']:>6}: sklearn {row['sklearn_ms']:>9.3f} ms | "
+              f"compilado {row['compiled_ms']:>9.3f} ms | x{row['speedup']}")
+
+    if args.export:
+        compiled_model.export(args.export)
@@ -0,0 +1,91 @@
+"""
+🧪 Configuración común de las pruebas - ToxiGuard
+Aísla el almacenamiento de las pruebas (trabajos, caché compartida, historial)
+en un directorio temporal antes de importar la aplicación, y comparte los
+niveles falsos y el clasificador híbrido aislado de las pruebas
+"""
+
+import os
+import time
+import tempfile
+
+import pytest
+
+_TEST_DIR = tempfile.mkdtemp(prefix="toxiguard-tests-")
+
+os.environ.setdefault("JOBS_DB_PATH", os.path.join(_TEST_DIR, "jobs.db"))
+os.environ.setdefault("JOBS_DIR", os.path.join(_TEST_DIR, "jobs_data"))
+os.environ.setdefault("SHARED_CACHE_BACKEND", "memory")
+os.environ.setdefault("WARMUP_ENABLED", "0")
+os.environ.setdefault("CLUSTER_NODES", "")
+
+
+class FakeTier:
+    """Nivel falso con porcentaje fijo, retardo y fallo opcionales que registra sus lotes"""
+
+    def __init__(self, percentage=50.0, delay=0.0, fail=False):
+        self.is_loaded = True
+        self.embedding_model = object()
+        self.percentage = percentage
+        self.delay = delay
+        self.fail = fail
+        self.batches = []
+
+    @property
+    def calls(self):
+        """Número de textos analizados"""
+        return sum(len(batch) for batch in self.batches)
+
+    def analyze_text(self, text):
+        return self.analyze_batch([text])[0]
+
+    def analyze_batch(self, texts):
+        self.batches.append(list(texts))
+        if self.delay:
+            time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("nivel caído")
+        return [
+            {"is_toxic": self.percentage is not None and self.percentage >= 50,
+             "toxicity_percentage": self.percentage, "toxicity_level": "moderate",
+             "confidence": 0.5, "classification_technique": "Falso", "details": {}}
+            for _ in texts
+        ]
+
+
+@pytest.fixture
+def fake_tier():
+    """Fábrica de niveles falsos: fake_tier(percentage, delay=..., fail=...)"""
+    return FakeTier
+
+
+@pytest.fixture
+def make_hybrid():
+    """Fábrica de clasificadores híbridos aislados: sin caché compartida ni
+    estado heredado de otras pruebas en breakers, latencias o single-flight"""
+    from app.hybrid_classifier import HybridToxicityClassifier
+    from app.result_cache import ResultCache
+    from app.shared_cache import SharedResultCache
+    from app.single_flight import SingleFlight
+    from app.tier_monitor import CircuitBreakerRegistry, LatencyTracker
+
+    def build(result_cache=False, single_flight=False, breakers=None, fake_versions=False):
+        classifier = HybridToxicityClassifier()
+        classifier.result_cache = ResultCache({"enabled": result_cache})
+        classifier.shared_cache = SharedResultCache({"backend": "none"})
+        classifier.single_flight = SingleFlight({"enabled": single_flight})
+        classifier.circuit_breakers = CircuitBreakerRegistry(breakers)
+        classifier.latency_tracker = LatencyTracker()
+        classifier._reset_cascade_stats()
+        if fake_versions:
+            # Los niveles falsos no tienen léxicos ni ficheros de modelo que versionar
+            classifier.get_versions = lambda: {"lexicon": "test", "model": "test"}
+        return classifier
+
+    return build
+
+
+@pytest.fixture
+def hybrid(make_hybrid):
+    """Clasificador híbrido aislado con la caché de resultados desactivada"""
+    return make_hybrid()
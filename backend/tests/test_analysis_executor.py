@@ -0,0 +1,63 @@
+"""
+🧪 Pruebas del ejecutor de análisis - ToxiGuard
+"""
+
+import asyncio
+import os
+import threading
+
+import pytest
+
+from app.analysis_executor import (
+    AnalysisExecutor,
+    AnalysisOverloadedError,
+    AnalysisTimeoutError,
+    analyze_in_process
+)
+
+
+@pytest.fixture
+def executor():
+    executor = AnalysisExecutor({"request_workers": 1, "max_workers": 1, "max_queue": 0,
+                                 "process_workers": 1})
+    yield executor
+    executor.shutdown(wait=True)
+
+
+def test_process_pool_does_not_fork_the_threaded_server(executor):
+    # El servidor ya tiene hilos en marcha cuando se crea el pool
+    stop = threading.Event()
+    busy = threading.Thread(target=stop.wait, daemon=True)
+    busy.start()
+    try:
+        executor.start_process_pool()
+        pool = executor._get_process_pool()
+        assert pool._mp_context.get_start_method() == "forkserver"
+
+        result = asyncio.run(executor.run_analysis(analyze_in_process, "eres un idiota", "rules",
+                                                   timeout=60, in_process=True))
+        expected = analyze_in_process("eres un idiota", "rules")
+        assert result["toxicity_percentage"] == expected["toxicity_percentage"]
+        assert asyncio.run(executor.run_analysis(os.getpid, in_process=True, timeout=10)) != os.getpid()
+    finally:
+        stop.set()
+    assert executor.get_info()["process_requests"] == 2
+
+
+def test_full_queue_is_rejected_and_slow_analysis_times_out(executor):
+    release = threading.Event()
+
+    async def scenario():
+        slow = asyncio.ensure_future(executor.run_analysis(release.wait, timeout=0.2))
+        await asyncio.sleep(0.05)
+        with pytest.raises(AnalysisOverloadedError):
+            await executor.run_analysis(len, "x")
+        with pytest.raises(AnalysisTimeoutError):
+            await slow
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+    info = executor.get_info()
+    assert info["rejected"] == 1 and info["timeouts"] == 1
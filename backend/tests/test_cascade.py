@@ -0,0 +1,108 @@
+"""
+🧪 Pruebas del modo cascada del clasificador híbrido - ToxiGuard
+"""
+
+import pytest
+
+
+@pytest.fixture
+def tiers(hybrid, fake_tier):
+    def install(advanced, ml, contextual):
+        hybrid.advanced_classifier = fake_tier(advanced)
+        hybrid.ml_classifier = fake_tier(ml)
+        hybrid.contextual_classifier = fake_tier(contextual)
+    return install
+
+
+@pytest.mark.parametrize("advanced", [2.0, 95.0])
+def test_decisive_rules_exit_without_escalating(hybrid, tiers, advanced):
+    tiers(advanced, ml=50.0, contextual=50.0)
+
+    result = hybrid.analyze_text("texto", mode="cascade")
+
+    assert result["details"]["cascade"]["exit_tier"] == "advanced"
+    assert result["toxicity_percentage"] == advanced
+    assert hybrid.ml_classifier.calls == hybrid.contextual_classifier.calls == 0
+
+
+def test_confident_ml_skips_the_embeddings(hybrid, tiers):
+    tiers(advanced=10.0, ml=5.0, contextual=50.0)
+
+    result = hybrid.analyze_text("texto", mode="cascade")
+
+    # Score combinado (0.4·0.10 + 0.3·0.05) / 0.7 ≈ 0.079: por debajo de la banda de incertidumbre
+    assert result["details"]["cascade"]["tiers_run"] == ["advanced", "ml"]
+    assert result["details"]["cascade"]["exit_tier"] == "ml"
+    assert hybrid.contextual_classifier.calls == 0
+    assert result["toxicity_percentage"] == round((0.4 * 0.10 + 0.3 * 0.05) / 0.7 * 100, 2)
+    assert not result["is_toxic"]
+
+
+def test_uncertain_score_escalates_to_contextual_and_fuses(hybrid, tiers):
+    tiers(advanced=50.0, ml=50.0, contextual=90.0)
+
+    result = hybrid.analyze_text("texto", mode="cascade")
+    cascade = result["details"]["cascade"]
+
+    assert cascade["tiers_run"] == ["advanced", "ml", "contextual"]
+    assert result["toxicity_percentage"] == round((0.4 * 0.5 + 0.3 * 0.5 + 0.3 * 0.9) * 100, 2)
+    assert result["is_toxic"] and result["toxicity_level"] == "moderate"
+    assert result["classification_technique"].startswith("Híbrido en Cascada")
+
+
+def test_unavailable_tiers_are_skipped(hybrid, tiers):
+    tiers(advanced=50.0, ml=50.0, contextual=50.0)
+
+    result = hybrid.analyze_cascade("texto", tiers=["rules", "advanced"])
+
+    assert result["details"]["cascade"]["tiers_run"] == ["advanced"]
+    assert hybrid.ml_classifier.calls == hybrid.contextual_classifier.calls == 0
+
+
+def test_stats_report_escalation_rates(hybrid, tiers):
+    tiers(advanced=2.0, ml=50.0, contextual=50.0)
+    hybrid.analyze_cascade("uno")
+    hybrid.analyze_cascade("dos")
+    hybrid.advanced_classifier.percentage = 50.0
+    hybrid.analyze_cascade("tres")
+
+    stats = hybrid.get_cascade_stats()
+
+    assert stats["requests"] == 3
+    assert stats["escalation_rates"] == {"ml": round(1 / 3, 4), "contextual": round(1 / 3, 4)}
+    assert stats["exit_rates"]["advanced"] == round(2 / 3, 4)
+    assert stats["tier_runs"]["advanced"] == 3
+
+
+def test_failing_tier_is_skipped_and_the_partial_result_is_not_cached(make_hybrid, fake_tier):
+    hybrid = make_hybrid(result_cache=True, fake_versions=True)
+    hybrid.advanced_classifier = fake_tier(60.0)
+    hybrid.ml_classifier = fake_tier(80.0, fail=True)
+    hybrid.contextual_classifier = fake_tier(50.0)
+
+    result = hybrid.analyze_text("i hate this", mode="cascade")
+    cascade = result["details"]["cascade"]
+
+    # Se fusiona lo ya calculado en lugar de devolver la respuesta por defecto (0%)
+    assert result.get("model_used") != "hybrid_default"
+    assert cascade["failed"] == ["ml"]
+    assert cascade["tiers_run"] == ["advanced", "contextual"]
+    assert result["toxicity_percentage"] == round((0.4 * 0.6 + 0.3 * 0.5) / 0.7 * 100, 2)
+
+    # Recuperado el nivel, el siguiente análisis no sale de la caché
+    hybrid.ml_classifier.fail = False
+    again = hybrid.analyze_text("i hate this", mode="cascade")
+    assert not again["details"].get("cached")
+    assert again["details"]["cascade"]["failed"] == []
+    assert hybrid.analyze_text("i hate this", mode="cascade")["details"]["cached"]
+
+
+def test_default_and_failed_tier_results_are_never_cached(make_hybrid):
+    hybrid = make_hybrid(result_cache=True)
+
+    hybrid._cache_store("k1", hybrid._get_default_response(), "advanced")
+    hybrid._cache_store("k2", {"model_used": "x", "details": {"failed_tiers": ["ml"]}}, "ml")
+    hybrid._cache_store("k3", {"model_used": "x", "details": {"fusion": {"failed": ["ml"], "timed_out": []}}}, "fusion")
+    hybrid._cache_store("k4", {"model_used": "x", "details": {}}, "advanced")
+
+    assert [hybrid.result_cache.get(key) is not None for key in ("k1", "k2", "k3", "k4")] == [False, False, False, True]
@@ -0,0 +1,130 @@
+"""
+🧪 Pruebas de los circuit breakers y de la caché de resultados parciales - ToxiGuard
+"""
+
+import time
+
+import pytest
+
+from app.tier_monitor import CircuitBreaker, CircuitBreakerRegistry
+
+
+@pytest.fixture
+def hybrid(make_hybrid):
+    return make_hybrid(result_cache=True)
+
+
+@pytest.fixture
+def demoting_hybrid(make_hybrid):
+    """Híbrido sin cachés con breakers que abren tras pocas llamadas"""
+    def build(**config):
+        return make_hybrid(breakers={"min_calls": 3, **config})
+    return build
+
+
+def open_breaker(registry, tier, seconds_ago=0.0):
+    breaker = registry.breakers[tier]
+    breaker.state = CircuitBreaker.OPEN
+    breaker.opened_at = time.monotonic() - seconds_ago
+    return breaker
+
+
+def test_breaker_opens_on_failures_and_closes_after_probes():
+    breaker = CircuitBreaker("ml", {"min_calls": 4, "open_seconds": 0.0, "probe_fraction": 1.0,
+                                    "probe_successes": 2})
+    for _ in range(4):
+        assert breaker.allow_request()
+        breaker.record(1.0, success=False)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    assert breaker.allow_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.record(1.0)
+    breaker.record(1.0)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_slow_calls_open_the_breaker():
+    breaker = CircuitBreaker("ml", {"min_calls": 3})
+    for _ in range(3):
+        breaker.record(breaker.slow_call_ms + 1)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+
+def test_availability_check_is_read_only(monkeypatch):
+    registry = CircuitBreakerRegistry()
+    breaker = open_breaker(registry, "ml", seconds_ago=registry.config["open_seconds"] + 1)
+    monkeypatch.setattr("app.tier_monitor.random.random", lambda: pytest.fail("consumió un sondeo"))
+
+    assert registry.is_available("ml")
+    assert registry.is_available("advanced")
+    assert breaker.state == CircuitBreaker.OPEN
+
+    open_breaker(registry, "contextual")
+    assert not registry.is_available("contextual")
+
+
+def test_available_tiers_does_not_consume_probe_slots(hybrid, monkeypatch):
+    breaker = open_breaker(hybrid.circuit_breakers, "ml", seconds_ago=hybrid.circuit_breakers.config["open_seconds"] + 1)
+    monkeypatch.setattr("app.tier_monitor.random.random", lambda: pytest.fail("consumió un sondeo"))
+
+    assert "ml" in hybrid.available_tiers()
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_open_breaker_only_blocks_caching_for_modes_that_use_it(hybrid):
+    open_breaker(hybrid.circuit_breakers, "contextual")
+
+    hybrid.analyze_text("eres un idiota", mode="ml")
+    assert hybrid.analyze_text("eres un idiota", mode="ml")["details"].get("cached")
+
+    hybrid.analyze_text("eres un idiota", mode="cascade")
+    assert not hybrid.analyze_text("eres un idiota", mode="cascade")["details"].get("cached")
+
+    open_breaker(hybrid.circuit_breakers, "ml")
+    hybrid.analyze_text("buen trabajo", mode="ml")
+    assert not hybrid.analyze_text("buen trabajo", mode="ml")["details"].get("cached")
+
+
+def test_slow_ml_tier_is_demoted_from_the_cascade(demoting_hybrid, fake_tier):
+    hybrid = demoting_hybrid(slow_call_ms={"ml": 5.0, "contextual": 1000.0})
+    hybrid.advanced_classifier = fake_tier(50.0)
+    hybrid.ml_classifier = fake_tier(50.0, delay=0.02)
+    hybrid.contextual_classifier = fake_tier(50.0)
+
+    for i in range(3):
+        hybrid.analyze_text(f"texto {i}", mode="cascade")
+    assert hybrid.circuit_breakers.breakers["ml"].state == CircuitBreaker.OPEN
+    assert "ml" not in hybrid.available_tiers()
+
+    result = hybrid.analyze_text("otro texto", mode="cascade")
+    assert hybrid.ml_classifier.calls == 3
+    assert result["details"]["cascade"]["tiers_run"] == ["advanced", "contextual"]
+
+
+def test_failing_contextual_tier_falls_back_to_ml_and_stops_being_called(demoting_hybrid, fake_tier):
+    hybrid = demoting_hybrid()
+    hybrid.contextual_classifier = fake_tier(fail=True)
+    hybrid.ml_classifier = fake_tier(80.0)
+
+    results = [hybrid.analyze_text(f"texto {i}", mode="contextual") for i in range(5)]
+
+    assert hybrid.contextual_classifier.calls == 3
+    assert [result["toxicity_percentage"] for result in results] == [80.0] * 5
+    state = hybrid.circuit_breakers.get_states()["contextual"]
+    assert state["state"] == CircuitBreaker.OPEN and state["retry_in_seconds"] > 0
+
+
+def test_demoted_tier_recovers_through_probes(demoting_hybrid, fake_tier):
+    hybrid = demoting_hybrid(open_seconds=0.0, probe_fraction=1.0, probe_successes=2)
+    hybrid.ml_classifier = fake_tier(fail=True)
+    for i in range(3):
+        hybrid.analyze_text(f"texto {i}", mode="ml")
+    assert hybrid.circuit_breakers.open_tiers() == ["ml"]
+
+    hybrid.ml_classifier.fail = False
+    results = [hybrid.analyze_text(f"sonda {i}", mode="ml") for i in range(2)]
+
+    assert hybrid.circuit_breakers.breakers["ml"].state == CircuitBreaker.CLOSED
+    assert [result["toxicity_percentage"] for result in results] == [50.0, 50.0]
@@ -0,0 +1,95 @@
+"""
+🧪 Pruebas de la compactación de modelos lineales - ToxiGuard
+"""
+
+import pickle
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+from ml.compaction import CompactLinearModel, CompactVectorizer, compact_model, select_features
+
+DATA_PATH = Path(__file__).resolve().parents[2] / "data" / "toxic_comments_processed.csv"
+EXTRA_TEXTS = ["", "ñandú pingüino ÁRBOL", "eres un idiota idiota idiota", "texto sin ningún término conocido xyzzy"]
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    df = pd.read_csv(DATA_PATH)
+    return df["Text"].fillna("").astype(str).tolist(), df["IsToxic"].fillna(0).astype(int).to_numpy()
+
+
+@pytest.mark.parametrize("params", [
+    {"ngram_range": (1, 2)},
+    {"ngram_range": (1, 1), "sublinear_tf": True, "strip_accents": "unicode"},
+    {"analyzer": "char_wb", "ngram_range": (2, 4), "max_features": 3000, "norm": "l1"},
+    {"binary": True, "use_idf": False},
+])
+def test_full_vocabulary_matches_tfidf(corpus, params):
+    texts, _ = corpus
+    vectorizer = TfidfVectorizer(**params).fit(texts)
+    compact = CompactVectorizer.from_tfidf(vectorizer, np.arange(len(vectorizer.vocabulary_)))
+
+    sample = texts[:200] + EXTRA_TEXTS
+    expected = vectorizer.transform(sample)[:, compact.source_columns].toarray()
+    result = compact.transform(sample)
+
+    assert result.dtype == np.float32
+    np.testing.assert_allclose(result.toarray(), expected, rtol=1e-5, atol=1e-6)
+
+
+def test_pruned_model_scores_match_original_columns(corpus):
+    texts, labels = corpus
+    vectorizer = TfidfVectorizer(ngram_range=(1, 2), norm=None).fit(texts)
+    X = vectorizer.transform(texts)
+    model = LogisticRegression(max_iter=1000).fit(X, labels)
+    coef = model.coef_.ravel()
+
+    keep = select_features(coef, 0.25)
+    assert len(keep) == round(0.25 * len(coef))
+    assert np.abs(coef[keep]).min() >= np.abs(np.delete(coef, keep)).max()
+
+    compact_vectorizer = CompactVectorizer.from_tfidf(vectorizer, keep)
+    compact = CompactLinearModel(coef[compact_vectorizer.source_columns], model.intercept_[0],
+                                 model.classes_, probabilistic=True)
+
+    # Sin normalización de filas, el score compacto es el del modelo restringido a las columnas conservadas
+    expected = X[:, keep] @ coef[keep] + model.intercept_[0]
+    np.testing.assert_allclose(compact.decision_function(compact_vectorizer.transform(texts)), expected,
+                               rtol=1e-4, atol=1e-4)
+
+    restored = pickle.loads(pickle.dumps(compact_vectorizer))
+    assert not hasattr(restored, "source_columns")
+    np.testing.assert_array_equal(restored.transform(texts[:20]).toarray(),
+                                  compact_vectorizer.transform(texts[:20]).toarray())
+
+
+def test_select_features_by_count_and_threshold():
+    coef = np.array([0.1, -3.0, 0.5, 2.0, -0.05])
+
+    np.testing.assert_array_equal(select_features(coef, 2), [1, 3])
+    np.testing.assert_array_equal(select_features(coef, 1.0, min_abs_coef=0.4), [1, 2, 3])
+    assert len(select_features(coef, 0.0)) == 1
+
+
+def test_compact_model_report(corpus, tmp_path):
+    texts, labels = corpus
+    vectorizer = TfidfVectorizer(max_features=2000).fit(texts)
+    model = LogisticRegression(max_iter=1000).fit(vectorizer.transform(texts), labels)
+    with open(tmp_path / "logistic_regression_trained.pkl", "wb") as f:
+        pickle.dump(model, f)
+    with open(tmp_path / "logistic_regression_vectorizer.pkl", "wb") as f:
+        pickle.dump(vectorizer, f)
+
+    report = compact_model("logistic_regression", models_dir=str(tmp_path), data_path=str(DATA_PATH),
+                           keep_features=1.0)
+
+    assert report["features_after"] == report["features_before"] == 2000
+    assert report["prediction_agreement"] == 1.0
+    assert report["model_rss_kb_after"] > 0
+    with open(tmp_path / report["model_path"], "rb") as f:
+        assert isinstance(pickle.load(f), CompactLinearModel)
@@ -0,0 +1,46 @@
+"""
+🧪 Pruebas del estudiante destilado y su profesor - ToxiGuard
+"""
+
+import pytest
+
+from app.hybrid_classifier import HybridToxicityClassifier
+from app.tier_monitor import CircuitBreakerRegistry
+from ml.distillation import TeacherLabeler
+
+
+@pytest.fixture
+def hybrid():
+    classifier = HybridToxicityClassifier()
+    classifier.circuit_breakers = CircuitBreakerRegistry()
+    if not classifier.distilled_classifier.is_loaded:
+        pytest.skip("Estudiante destilado no disponible")
+    return classifier
+
+
+def test_escalation_uses_the_distillation_teacher_blend(hybrid):
+    text = "eres un idiota completo"
+    weights = hybrid.distilled_config["teacher_weights"]
+
+    result = hybrid._analyze_distilled(text)
+    soft_labels, _ = TeacherLabeler(hybrid, weights).label([text])
+
+    assert result["details"]["distilled"]["escalated"] is True
+    assert set(result["details"]["distilled"]["teacher_scores"]) == set(weights)
+    assert result["toxicity_percentage"] == pytest.approx(soft_labels[0] * 100, abs=0.01)
+    assert result["is_toxic"] is True
+
+
+def test_text_without_known_vocabulary_is_not_answered_by_the_student(hybrid):
+    result = hybrid._analyze_distilled("eres un idiota completo")
+    assert result["details"]["distilled"]["reason"] == "low_coverage"
+    assert result["details"]["distilled"]["feature_coverage"] == 0.0
+
+
+def test_confident_student_answers_without_teacher(hybrid):
+    result = hybrid._analyze_distilled("you are a stupid idiot")
+    low, high = hybrid.distilled_band
+
+    assert result["details"]["distilled"]["escalated"] is False
+    assert not (low <= result["details"]["toxicity_score"] <= high)
+    assert "teacher_scores" not in result["details"]["distilled"]
@@ -0,0 +1,49 @@
+"""
+🧪 Pruebas de la caché de características - ToxiGuard
+"""
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from ml.feature_cache import FeatureCache
+
+TEXTS = ["eres un idiota", "buen trabajo", "qué asco de comentario", "gracias por compartir"] * 5
+PARAMS = {"ngram_range": (1, 2), "min_df": 1}
+
+
+def test_fit_transform_is_vectorized_once_and_matches_sklearn(tmp_path):
+    cache = FeatureCache(tmp_path)
+    vectorizer, X, key = cache.fit_transform(TEXTS, PARAMS)
+    assert cache.misses == 1
+
+    # Segunda ejecución (otro proceso): mismo contenido desde disco, memory-mapped
+    other = FeatureCache(tmp_path)
+    cached_vectorizer, X_cached, cached_key = other.fit_transform(TEXTS, PARAMS)
+    assert other.hits == 1 and other.misses == 0 and cached_key == key
+    assert cached_vectorizer.vocabulary_ == vectorizer.vocabulary_
+
+    expected = TfidfVectorizer(**PARAMS).fit_transform(TEXTS)
+    np.testing.assert_allclose(X_cached.toarray(), expected.toarray())
+
+
+def test_key_depends_on_texts_and_parameters(tmp_path):
+    cache = FeatureCache(tmp_path)
+    _, _, key = cache.fit_transform(TEXTS, PARAMS)
+    _, _, other_params = cache.fit_transform(TEXTS, {**PARAMS, "ngram_range": (1, 1)})
+    _, _, other_texts = cache.fit_transform(TEXTS[::-1], PARAMS)
+
+    assert len({key, other_params, other_texts}) == 3
+    assert cache.get_stats()["entries"] == 3
+
+
+def test_transform_is_cached_per_fitted_vectorizer(tmp_path):
+    cache = FeatureCache(tmp_path)
+    vectorizer, _, fit_key = cache.fit_transform(TEXTS, PARAMS)
+    held_out = ["nuevo comentario idiota", "gracias"]
+
+    X_first, key = cache.transform(vectorizer, held_out, fit_key)
+    X_second, second_key = cache.transform(vectorizer, held_out, fit_key)
+
+    assert key == second_key and cache.hits == 1
+    np.testing.assert_allclose(X_second.toarray(), vectorizer.transform(held_out).toarray())
+    np.testing.assert_allclose(X_first.toarray(), X_second.toarray())
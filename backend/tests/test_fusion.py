@@ -0,0 +1,69 @@
+"""
+🧪 Pruebas del modo fusión con plazo del clasificador híbrido - ToxiGuard
+"""
+
+import time
+
+import pytest
+
+
+@pytest.fixture
+def hybrid(make_hybrid):
+    return make_hybrid(result_cache=True, fake_versions=True)
+
+
+def test_all_tiers_are_fused_with_weights(hybrid, fake_tier):
+    hybrid.advanced_classifier = fake_tier(20.0)
+    hybrid.ml_classifier = fake_tier(60.0)
+    hybrid.contextual_classifier = fake_tier(90.0)
+
+    result = hybrid.analyze_text("texto", mode="fusion", deadline_ms=2000)
+    fusion = result["details"]["fusion"]
+
+    assert sorted(fusion["contributed"]) == ["advanced", "contextual", "ml"]
+    assert fusion["timed_out"] == fusion["failed"] == []
+    assert result["toxicity_percentage"] == round((0.35 * 0.2 + 0.3 * 0.6 + 0.35 * 0.9) * 100, 2)
+    assert result["is_toxic"]
+    assert hybrid.analyze_text("texto", mode="fusion", deadline_ms=2000)["details"].get("cached")
+
+
+def test_slow_tier_is_dropped_at_the_deadline_and_not_cached(hybrid, fake_tier):
+    hybrid.advanced_classifier = fake_tier(20.0)
+    hybrid.ml_classifier = fake_tier(60.0)
+    hybrid.contextual_classifier = fake_tier(90.0, delay=0.5)
+
+    start = time.perf_counter()
+    result = hybrid.analyze_text("texto", mode="fusion", deadline_ms=100)
+    elapsed = time.perf_counter() - start
+    fusion = result["details"]["fusion"]
+
+    assert elapsed < 0.4
+    assert fusion["timed_out"] == ["contextual"]
+    assert result["toxicity_percentage"] == round((0.35 * 0.2 + 0.3 * 0.6) / 0.65 * 100, 2)
+    # Un resultado parcial por plazo no se guarda en caché
+    again = hybrid.analyze_text("texto", mode="fusion", deadline_ms=100)
+    assert not again["details"].get("cached")
+
+
+def test_failed_tier_is_reported_and_excluded(hybrid, fake_tier):
+    hybrid.advanced_classifier = fake_tier(40.0)
+    hybrid.ml_classifier = fake_tier(60.0, fail=True)
+    hybrid.contextual_classifier = fake_tier(40.0)
+
+    result = hybrid.analyze_fusion("texto", deadline_ms=2000)
+
+    assert result["details"]["fusion"]["failed"] == ["ml"]
+    assert result["toxicity_percentage"] == 40.0
+    assert hybrid.circuit_breakers.breakers["ml"].get_state()["failure_rate"] == 1.0
+
+
+def test_rules_answer_when_no_tier_finishes(hybrid, fake_tier):
+    hybrid.advanced_classifier = fake_tier(20.0, delay=0.3)
+    hybrid.ml_classifier = fake_tier(60.0, delay=0.3)
+    hybrid.contextual_classifier = fake_tier(90.0, delay=0.3)
+
+    result = hybrid.analyze_fusion("eres un idiota", deadline_ms=20)
+
+    assert result["details"]["fusion"]["contributed"] == []
+    assert result["classification_technique"] == "Híbrido Fusión (reglas por plazo vencido)"
+    assert result["model_used"] == "hybrid_rule_fallback"
@@ -0,0 +1,80 @@
+"""
+🧪 Pruebas de la búsqueda successive halving - ToxiGuard
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import StratifiedKFold
+from sklearn.pipeline import Pipeline
+
+from ml.config import RANDOM_STATE
+from ml.feature_cache import FeatureCache
+from ml.halving_search import SuccessiveHalvingSearch
+
+DATA_PATH = Path(__file__).resolve().parents[2] / "data" / "toxic_comments_processed.csv"
+VECTORIZER_PARAMS = {"ngram_range": (1, 2), "min_df": 1}
+GRID = {"classifier__C": [0.01, 0.1, 1.0, 10.0, 100.0], "classifier__class_weight": [None, "balanced"]}
+
+
+@pytest.fixture(scope="module")
+def dataset():
+    data = pd.read_csv(DATA_PATH).head(300)
+    return data["Text"].astype(str).tolist(), data["IsToxic"].astype(int).tolist()
+
+
+def _search(**kwargs):
+    estimator = Pipeline([("classifier", LogisticRegression(solver="liblinear"))])
+    return SuccessiveHalvingSearch(estimator, GRID, VECTORIZER_PARAMS, **{"cv": 3, "factor": 3, "n_jobs": 1, **kwargs})
+
+
+def test_rungs_shrink_candidates_and_grow_resources(dataset):
+    texts, labels = dataset
+    search = _search().fit(texts, labels)
+
+    candidates = [rung["n_candidates"] for rung in search.rungs_]
+    resources = [rung["n_resources"] for rung in search.rungs_]
+    assert candidates == [10, 4, 2, 1]
+    assert resources == sorted(resources) and resources[0] < resources[-1]
+    # La última ronda usa todo el entrenamiento del fold más pequeño
+    splitter = StratifiedKFold(n_splits=3, shuffle=True, random_state=RANDOM_STATE)
+    assert resources[-1] == min(len(train) for train, _ in splitter.split(np.zeros(len(labels)), labels))
+    assert search.best_params_ == search.rungs_[-1]["best_params"]
+    assert search.best_score_ == pytest.approx(search.rungs_[-1]["best_score"], abs=1e-4)
+
+
+def test_best_estimator_serves_raw_texts(dataset):
+    texts, labels = dataset
+    search = _search().fit(texts, labels)
+
+    assert list(search.best_estimator_.named_steps) == ["vectorizer", "classifier"]
+    assert search.best_estimator_.named_steps["classifier"].C == search.best_params_["classifier__C"]
+    predictions = search.best_estimator_.predict(["eres un idiota", "gracias por el vídeo"])
+    assert set(predictions) <= {0, 1}
+
+
+def test_fold_features_are_reused_across_searches(dataset, tmp_path):
+    texts, labels = dataset
+    cache = FeatureCache(tmp_path)
+
+    first = _search(feature_cache=cache).fit(texts, labels)
+    misses = cache.misses
+    second = _search(feature_cache=cache).fit(texts, labels)
+
+    assert cache.misses == misses
+    assert cache.hits >= 3 * 2 + 1
+    assert second.best_params_ == first.best_params_
+    assert [rung["best_score"] for rung in second.rungs_] == [rung["best_score"] for rung in first.rungs_]
+
+
+def test_random_mode_samples_candidates(dataset):
+    texts, labels = dataset
+    search = _search(n_candidates=3).fit(texts, labels)
+
+    assert search.rungs_[0]["n_candidates"] == 3
+    assert search.get_report()["search_mode"] == "halving_random"
+    with pytest.raises(ValueError):
+        _search(factor=1)
@@ -0,0 +1,72 @@
+"""
+🧪 Pruebas de la ruta por lotes del clasificador híbrido - ToxiGuard
+"""
+
+import time
+
+import pytest
+
+from app.tier_monitor import CircuitBreaker
+
+
+def open_breaker(classifier, tier):
+    breaker = classifier.circuit_breakers.breakers[tier]
+    breaker.state = CircuitBreaker.OPEN
+    breaker.opened_at = time.monotonic()
+
+
+TEXTS = ["eres un idiota", "buen trabajo, gracias", "te voy a matar"]
+
+
+def test_open_breaker_skips_tier_and_falls_back_to_rules(hybrid, fake_tier):
+    hybrid.ml_classifier = fake_tier()
+    open_breaker(hybrid, "ml")
+
+    results = hybrid.analyze_texts(TEXTS, mode="ml")
+
+    assert hybrid.ml_classifier.batches == []
+    assert all(result["model_used"] == "hybrid_rule_fallback" for result in results)
+    assert [result["details"]["mode"] for result in results] == ["ml"] * 3
+
+
+def test_failing_tier_records_failure_and_falls_back(hybrid, fake_tier):
+    hybrid.ml_classifier = fake_tier(fail=True)
+
+    results = hybrid.analyze_texts(TEXTS, mode="ml")
+
+    assert len(hybrid.ml_classifier.batches) == 1
+    assert all(result["model_used"] == "hybrid_rule_fallback" for result in results)
+    assert hybrid.circuit_breakers.breakers["ml"].get_state()["failure_rate"] == 1.0
+    assert all(result["details"]["failed_tiers"] == ["ml"] for result in results)
+
+
+def test_ensemble_failure_falls_back_to_ml_and_records_latency(hybrid, fake_tier):
+    hybrid.ensemble_classifier = fake_tier(fail=True)
+    hybrid.ml_classifier = fake_tier(percentage=77.0)
+
+    results = hybrid.analyze_texts(TEXTS, mode="ensemble")
+
+    assert [result["toxicity_percentage"] for result in results] == [77.0] * 3
+    assert all(result["classification_technique"] == "Híbrido - Falso" for result in results)
+    assert "ml" in hybrid.latency_tracker.get_stats()
+    assert hybrid.circuit_breakers.breakers["ml"].get_state()["calls_in_window"] == 1
+
+
+def test_invalid_results_continue_down_the_chain(hybrid, fake_tier):
+    hybrid.ml_classifier = fake_tier(percentage=None)
+
+    results = hybrid.analyze_texts(TEXTS, mode="ml")
+
+    assert all(result["model_used"] == "hybrid_rule_fallback" for result in results)
+
+
+def test_batch_matches_single_text_analysis(hybrid):
+    if not hybrid.ml_classifier.is_loaded:
+        pytest.skip("Modelo ML no disponible")
+    texts = TEXTS + ["eres un idiota", "  ", "hola"]
+
+    batch = hybrid.analyze_texts(texts, mode="ml")
+    single = [hybrid.analyze_text(text, mode="ml") for text in texts]
+
+    assert [r["toxicity_percentage"] for r in batch] == [r["toxicity_percentage"] for r in single]
+    assert [r["is_toxic"] for r in batch] == [r["is_toxic"] for r in single]
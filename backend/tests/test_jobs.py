@@ -0,0 +1,185 @@
+"""
+🧪 Pruebas de los trabajos en lote - ToxiGuard
+"""
+
+import csv
+import gzip
+import json
+import time
+import socket
+import asyncio
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+
+from app.jobs import JobManager, UploadTooLargeError, JOB_COMPLETED, JOB_QUEUED, JOB_RUNNING
+
+
+def fake_analyze(texts, mode):
+    return [
+        {"is_toxic": "idiota" in text, "toxicity_percentage": 90.0 if "idiota" in text else 0.0,
+         "toxicity_level": "alto", "confidence": 0.9, "details": {"mode": mode}}
+        for text in texts
+    ]
+
+
+@pytest.fixture
+def manager(tmp_path):
+    return JobManager({
+        "db_path": str(tmp_path / "jobs.db"),
+        "storage_dir": str(tmp_path / "jobs_data"),
+        "input_dirs": [str(tmp_path)],
+        "chunk_size": 10,
+        "poll_seconds": 0.05,
+        "heartbeat_seconds": 0.05
+    })
+
+
+def write_csv(path, rows):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["CommentId", "Text"])
+        for index in range(rows):
+            writer.writerow([f"c{index}", f"comentario {index} idiota" if index % 2 else f"comentario {index}"])
+    return path
+
+
+def read_results(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def set_running(manager, job_id, owner, heartbeat_at):
+    with sqlite3.connect(manager.db_path) as conn:
+        conn.execute("UPDATE jobs SET status = ?, owner = ?, heartbeat_at = ? WHERE id = ?",
+                     (JOB_RUNNING, owner, heartbeat_at, job_id))
+
+
+def new_job(manager, tmp_path, rows=35):
+    input_path = manager.resolve_input_path(str(write_csv(tmp_path / "comentarios.csv", rows)))
+    job_id, _ = manager.new_job_dir()
+    return manager.create_job(job_id, input_path, "csv", "rules", id_column="CommentId")["id"]
+
+
+def test_job_runs_in_background_and_writes_every_row_in_order(manager, tmp_path):
+    job_id = new_job(manager, tmp_path)
+    manager.start(fake_analyze)
+    try:
+        deadline = time.time() + 10
+        while manager.get_job(job_id)["status"] != JOB_COMPLETED and time.time() < deadline:
+            time.sleep(0.05)
+    finally:
+        manager.shutdown()
+
+    job = manager.get_job(job_id)
+    assert job["status"] == JOB_COMPLETED and job["total_rows"] == 35 and job["toxic_rows"] == 17
+    results = read_results(manager.results_path(job_id))
+    assert [line["id"] for line in results] == [f"c{index}" for index in range(35)]
+
+
+def test_resume_discards_uncommitted_output(manager, tmp_path):
+    job_id = new_job(manager, tmp_path)
+    calls = []
+
+    def stop_after_two_chunks(texts, mode):
+        calls.append(len(texts))
+        if len(calls) == 2:
+            manager._stop.set()
+        return fake_analyze(texts, mode)
+
+    manager.analyze_fn = stop_after_two_chunks
+    manager._process(manager._claim_next())
+    assert manager.get_job(job_id)["status"] == JOB_QUEUED
+    assert manager.get_job(job_id)["processed_rows"] == 20
+
+    # Caída a mitad de escritura: bytes sin confirmar al final del fichero
+    with open(manager._row(job_id)["output_path"], "ab") as out:
+        out.write(b"basura sin confirmar")
+
+    manager._stop.clear()
+    manager.analyze_fn = fake_analyze
+    manager._process(manager._claim_next())
+    results = read_results(manager.results_path(job_id))
+    assert [line["index"] for line in results] == list(range(35))
+
+
+def test_live_local_owner_is_not_requeued_even_with_old_heartbeat(manager, tmp_path):
+    job_id = new_job(manager, tmp_path)
+    set_running(manager, job_id, manager.owner, time.time() - 10_000)
+    manager._requeue_orphans()
+    assert manager.get_job(job_id)["status"] == JOB_RUNNING
+
+
+def test_dead_local_owner_is_requeued(manager, tmp_path):
+    job_id = new_job(manager, tmp_path)
+    finished = subprocess.Popen([sys.executable, "-c", "pass"])
+    finished.wait()
+    set_running(manager, job_id, f"{socket.gethostname()}:{finished.pid}", time.time())
+    manager._requeue_orphans()
+    assert manager.get_job(job_id)["status"] == JOB_QUEUED
+
+
+@pytest.mark.parametrize("age, expected", [(10, JOB_RUNNING), (10_000, JOB_QUEUED)])
+def test_remote_owner_is_judged_by_heartbeat(manager, tmp_path, age, expected):
+    job_id = new_job(manager, tmp_path)
+    set_running(manager, job_id, "otro-host:1234", time.time() - age)
+    manager._requeue_orphans()
+    assert manager.get_job(job_id)["status"] == expected
+
+
+def test_heartbeat_advances_during_a_long_chunk(manager, tmp_path):
+    job_id = new_job(manager, tmp_path, rows=5)
+    job = manager._claim_next()
+    claimed_at = job["heartbeat_at"]
+    seen = []
+
+    def slow_analyze(texts, mode):
+        time.sleep(0.3)
+        seen.append(manager._row(job_id)["heartbeat_at"])
+        return fake_analyze(texts, mode)
+
+    manager.analyze_fn = slow_analyze
+    manager._process(job)
+    assert seen[0] > claimed_at + 0.1
+
+
+def test_worker_stops_writing_when_another_process_takes_the_job(manager, tmp_path):
+    job_id = new_job(manager, tmp_path)
+
+    def taken_over(texts, mode):
+        set_running(manager, job_id, "otro-host:1", time.time())
+        return fake_analyze(texts, mode)
+
+    manager.analyze_fn = taken_over
+    manager._process(manager._claim_next())
+    row = manager._row(job_id)
+    assert row["owner"] == "otro-host:1" and row["processed_rows"] == 0
+
+
+async def body(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+def test_upload_is_saved_and_size_limit_enforced(manager):
+    manager.config["max_upload_bytes"] = 16
+    _, job_dir = manager.new_job_dir()
+    path = asyncio.run(manager.save_upload(job_dir, "jsonl", body(b'"hola"\n', b'"adios"\n')))
+    assert path.read_bytes() == b'"hola"\n"adios"\n'
+
+    _, job_dir = manager.new_job_dir()
+    with pytest.raises(UploadTooLargeError):
+        asyncio.run(manager.save_upload(job_dir, "jsonl", body(b"x" * 10, b"x" * 10)))
+    assert not job_dir.exists()
+
+    _, job_dir = manager.new_job_dir()
+    with pytest.raises(UploadTooLargeError):
+        asyncio.run(manager.save_upload(job_dir, "jsonl", body(b"x"), content_length=1000))
+    assert not job_dir.exists()
+
+    _, job_dir = manager.new_job_dir()
+    with pytest.raises(ValueError):
+        asyncio.run(manager.save_upload(job_dir, "jsonl", body()))
+    assert not job_dir.exists()
@@ -0,0 +1,70 @@
+"""
+🧪 Pruebas de la selección de niveles por presupuesto de latencia - ToxiGuard
+"""
+
+import time
+
+import pytest
+
+from app.tier_monitor import CircuitBreaker, LatencyTracker
+
+ALL_TIERS = ["rules", "advanced", "ml", "contextual"]
+
+
+@pytest.fixture
+def hybrid(hybrid, fake_tier):
+    hybrid.advanced_classifier = fake_tier(30.0)
+    hybrid.ml_classifier = fake_tier(30.0)
+    hybrid.contextual_classifier = fake_tier(30.0)
+    return hybrid
+
+
+@pytest.mark.parametrize("budget_ms, expected", [
+    (500.0, ("fusion", 150.0)),      # Paralelo: cuesta el nivel más lento
+    (155.0, ("fusion", 150.0)),
+    (100.0, ("ml", 10.0)),           # La cascada suma 162 ms
+    (5.0, ("advanced", 2.0)),
+    (0.5, ("rules", 1.0)),           # Nada cabe: el plan más barato
+])
+def test_most_accurate_plan_within_budget_from_priors(budget_ms, expected):
+    assert LatencyTracker().select_plan(budget_ms, 20, ALL_TIERS) == expected
+
+
+def test_observed_p95_replaces_the_prior_per_length_bucket():
+    tracker = LatencyTracker({"min_samples": 3})
+    for elapsed in (300.0, 310.0, 320.0):
+        tracker.record("contextual", 2000, elapsed)
+
+    assert tracker.p95("contextual", 2000) == pytest.approx(319.0)
+    assert tracker.p95("contextual", 20) == 150.0
+    assert tracker.select_plan(200.0, 2000, ALL_TIERS)[0] == "ml"
+    assert tracker.select_plan(200.0, 20, ALL_TIERS)[0] == "fusion"
+    assert tracker.get_stats()["contextual"]["xlong"]["samples"] == 3
+
+
+def test_unloaded_tiers_are_left_out_of_the_plans():
+    # Sin contextual, la fusión solo espera a avanzado y ML
+    assert LatencyTracker().select_plan(20.0, 20, ["rules", "advanced", "ml"]) == ("fusion", 10.0)
+
+
+def test_budget_analysis_reports_the_plan(hybrid):
+    result = hybrid.analyze_with_budget("texto", budget_ms=100.0)
+    budget = result["details"]["budget"]
+
+    assert budget["selected_tier"] == result["details"]["mode"] == "ml"
+    assert budget["expected_time_ms"] == 10.0
+    assert budget["actual_time_ms"] >= 0
+    assert hybrid.ml_classifier.calls == 1 and hybrid.contextual_classifier.calls == 0
+    assert "ml" in hybrid.latency_tracker.get_stats()
+
+
+def test_half_open_tier_without_probe_turn_falls_back_to_advanced(hybrid, monkeypatch):
+    breaker = hybrid.circuit_breakers.breakers["ml"]
+    breaker.state = CircuitBreaker.HALF_OPEN
+    breaker.opened_at = time.monotonic()
+    monkeypatch.setattr("app.tier_monitor.random.random", lambda: 1.0)
+
+    result = hybrid.analyze_with_budget("texto", budget_ms=100.0)
+
+    assert result["details"]["budget"]["selected_tier"] == "advanced"
+    assert hybrid.ml_classifier.calls == 0 and hybrid.advanced_classifier.calls == 1
@@ -0,0 +1,84 @@
+"""
+🧪 Pruebas del ensemble lineal apilado - ToxiGuard
+"""
+
+import pickle
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.svm import LinearSVC
+from sklearn.tree import DecisionTreeClassifier
+
+from ml.linear_ensemble import RANDOM_STATE, StackedLinearEnsemble, build_linear_ensemble, linear_form
+
+DATA_PATH = Path(__file__).resolve().parents[2] / "data" / "toxic_comments_processed.csv"
+
+
+@pytest.fixture(scope="module")
+def fitted():
+    df = pd.read_csv(DATA_PATH)
+    texts = df["Text"].fillna("").astype(str)
+    labels = df["IsToxic"].fillna(0).astype(int).to_numpy()
+    vectorizer = TfidfVectorizer(max_features=2000)
+    X = vectorizer.fit_transform(texts)
+    models = {
+        "logistic_regression": LogisticRegression(max_iter=1000).fit(X, labels),
+        "linear_svm": LinearSVC().fit(X, labels),
+        "naive_bayes": MultinomialNB().fit(X, labels),
+    }
+    return vectorizer, X, labels, models
+
+
+def test_member_scores_match_sklearn(fitted):
+    _, X, _, models = fitted
+    ensemble = StackedLinearEnsemble.from_models(models)
+    scores = ensemble.member_scores(X)
+
+    np.testing.assert_allclose(scores[:, 0], models["logistic_regression"].decision_function(X))
+    np.testing.assert_allclose(scores[:, 1], models["linear_svm"].decision_function(X))
+    # Naive Bayes: diferencia de log-probabilidades conjuntas
+    joint = models["naive_bayes"].predict_joint_log_proba(X)
+    np.testing.assert_allclose(scores[:, 2], joint[:, 1] - joint[:, 0])
+
+
+def test_blend_column_matches_blender(fitted):
+    _, X, labels, models = fitted
+    ensemble = StackedLinearEnsemble.from_models(models).fit_blend(X, labels)
+
+    blender = LogisticRegression(max_iter=1000, random_state=RANDOM_STATE).fit(ensemble.member_scores(X), labels)
+    np.testing.assert_allclose(ensemble.predict_proba(X)[:, 1],
+                               blender.predict_proba(ensemble.member_scores(X))[:, 1], rtol=1e-6)
+    assert set(ensemble.predict(X)) <= set(models["naive_bayes"].classes_)
+    assert ensemble.get_info()["members"] == list(models)
+
+
+def test_non_linear_or_mismatched_members_are_rejected(fitted):
+    _, X, labels, models = fitted
+    with pytest.raises(ValueError):
+        linear_form(DecisionTreeClassifier().fit(X, labels))
+    with pytest.raises(ValueError):
+        StackedLinearEnsemble.from_models({"a": models["naive_bayes"],
+                                           "b": MultinomialNB().fit(X[:, :10], labels)})
+
+
+def test_build_from_saved_members(fitted, tmp_path):
+    vectorizer, _, _, models = fitted
+    for name, model in models.items():
+        with open(tmp_path / f"{name}_trained.pkl", "wb") as f:
+            pickle.dump(model, f)
+        with open(tmp_path / f"{name}_vectorizer.pkl", "wb") as f:
+            pickle.dump(vectorizer, f)
+
+    info = build_linear_ensemble(str(tmp_path), str(DATA_PATH))
+
+    assert set(info["blend_weights"]) == set(models)
+    assert info["metrics"]["blend_samples"] > 0
+    with open(info["model_path"], "rb") as f:
+        ensemble = pickle.load(f)
+    X = vectorizer.transform(["eres un idiota", "buen trabajo"])
+    assert ensemble.member_scores_dict(X)[0].keys() == set(models)
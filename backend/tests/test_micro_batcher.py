@@ -0,0 +1,95 @@
+"""
+🧪 Pruebas del micro-batching de niveles - ToxiGuard
+"""
+
+import time
+import threading
+
+import pytest
+
+from app.micro_batcher import MicroBatcher
+
+
+class GatedBatchFn:
+    """Función por lotes que retiene el primer lote hasta que se libera"""
+
+    def __init__(self, fail=False, drop_last=False):
+        self.gate = threading.Event()
+        self.first_started = threading.Event()
+        self.batches = []
+        self.fail = fail
+        self.drop_last = drop_last
+
+    def __call__(self, items):
+        self.batches.append(list(items))
+        if len(self.batches) == 1:
+            self.first_started.set()
+            assert self.gate.wait(5)
+        if self.fail:
+            raise RuntimeError("lote caído")
+        results = [item * 10 for item in items]
+        return results[:-1] if self.drop_last else results
+
+
+def _queue_behind_first(batcher, batch_fn, items):
+    """Ocupa el colector con un primer elemento y encola el resto detrás"""
+    first = batcher.submit(0)
+    assert batch_fn.first_started.wait(5)
+    futures = [batcher.submit(item) for item in items]
+    batch_fn.gate.set()
+    return [first] + futures
+
+
+def test_concurrent_items_share_a_batch_in_order():
+    batch_fn = GatedBatchFn()
+    batcher = MicroBatcher("test", batch_fn, {"enabled": True, "max_batch_size": 32, "max_wait_ms": 50})
+
+    futures = _queue_behind_first(batcher, batch_fn, range(1, 10))
+
+    assert [future.result(timeout=5) for future in futures] == [i * 10 for i in range(10)]
+    assert batch_fn.batches == [[0], list(range(1, 10))]
+    stats = batcher.get_stats()
+    assert stats["batch_size_distribution"] == {"1": 1, "9": 1}
+    assert stats["items"] == 10 and stats["queue_wait_ms"]["max"] > 0
+
+
+def test_batches_are_capped_at_max_batch_size():
+    batch_fn = GatedBatchFn()
+    batcher = MicroBatcher("test", batch_fn, {"enabled": True, "max_batch_size": 4, "max_wait_ms": 50})
+
+    futures = _queue_behind_first(batcher, batch_fn, range(1, 11))
+
+    assert [future.result(timeout=5) for future in futures] == [i * 10 for i in range(11)]
+    assert [len(batch) for batch in batch_fn.batches] == [1, 4, 4, 2]
+
+
+@pytest.mark.parametrize("fail, drop_last, error", [(True, False, "lote caído"), (False, True, "resultados")])
+def test_batch_errors_reach_every_caller(fail, drop_last, error):
+    batch_fn = GatedBatchFn(fail=fail, drop_last=drop_last)
+    batcher = MicroBatcher("test", batch_fn, {"enabled": True, "max_wait_ms": 50})
+
+    futures = _queue_behind_first(batcher, batch_fn, [1, 2, 3])
+
+    for future in futures:
+        with pytest.raises(RuntimeError, match=error):
+            future.result(timeout=5)
+    assert batcher.get_stats()["errors"] == 2
+
+
+def test_idle_item_is_dispatched_without_waiting():
+    batcher = MicroBatcher("test", lambda items: [item + 1 for item in items],
+                           {"enabled": True, "max_wait_ms": 1000, "eager_when_idle": True})
+
+    start = time.perf_counter()
+    assert batcher.process(1, timeout=5) == 2
+    assert time.perf_counter() - start < 0.5
+
+
+def test_disabled_batcher_calls_directly():
+    calls = []
+    batcher = MicroBatcher("test", lambda items: calls.append(list(items)) or [item for item in items],
+                           {"enabled": False})
+
+    assert batcher.process("x") == "x"
+    assert calls == [["x"]]
+    assert batcher.get_stats()["batches"] == 0
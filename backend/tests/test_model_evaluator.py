@@ -0,0 +1,63 @@
+"""
+🧪 Pruebas de la evaluación paralela de modelos - ToxiGuard
+"""
+
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from ml.feature_cache import FeatureCache
+from ml.model_evaluator import ModelEvaluator
+
+DATA_PATH = Path(__file__).resolve().parents[2] / "data" / "toxic_comments_processed.csv"
+METRICS = ["accuracy", "precision", "recall", "f1_score", "cv_f1_mean", "cv_f1_std"]
+
+
+@pytest.fixture(scope="module")
+def data_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp("data") / "comments.csv"
+    pd.read_csv(DATA_PATH).head(400).to_csv(path, index=False)
+    return str(path)
+
+
+def _evaluator(data_path, cache_dir=None):
+    evaluator = ModelEvaluator(data_path, use_feature_cache=False)
+    if cache_dir is not None:
+        evaluator.feature_cache = FeatureCache(cache_dir)
+    assert evaluator.load_data()
+    evaluator.define_models()
+    evaluator.models = {key: evaluator.models[key] for key in ["naive_bayes", "logistic_regression", "random_forest"]}
+    return evaluator
+
+
+@pytest.mark.parametrize("cached", [False, True])
+def test_parallel_evaluation_matches_sequential(data_path, tmp_path, cached):
+    evaluator = _evaluator(data_path, tmp_path / "cache" if cached else None)
+
+    sequential = evaluator._evaluate_all_models_sequential()
+    parallel = evaluator._evaluate_all_models_parallel(workers=2)
+
+    assert list(parallel) == list(sequential)
+    for key in sequential:
+        assert "error" not in parallel[key]
+        assert {metric: parallel[key][metric] for metric in METRICS} == \
+               {metric: sequential[key][metric] for metric in METRICS}
+        # El modelo ajustado en el pool queda disponible para save_models()
+        assert hasattr(evaluator.models[key]["model"], "classes_")
+
+
+def test_temporary_matrices_are_removed_without_cache(data_path, monkeypatch):
+    import ml.model_evaluator as model_evaluator
+
+    created = []
+    original_mkdtemp = model_evaluator.tempfile.mkdtemp
+    monkeypatch.setattr(model_evaluator.tempfile, "mkdtemp",
+                        lambda **kwargs: created.append(original_mkdtemp(**kwargs)) or created[-1])
+
+    evaluator = _evaluator(data_path)
+    evaluator.models = {"naive_bayes": evaluator.models["naive_bayes"]}
+    evaluator.evaluate_all_models(parallel=True, max_workers=2)
+
+    assert evaluator.results["naive_bayes"]["f1_score"] > 0
+    assert len(created) == 1 and not Path(created[0]).exists()
@@ -0,0 +1,79 @@
+"""
+🧪 Pruebas del Grid Search con características cacheadas por fold - ToxiGuard
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.model_selection import GridSearchCV, StratifiedKFold
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.pipeline import Pipeline
+
+from app.model_trainer import ModelTrainer
+from app.ml_models import MLToxicityClassifier
+from ml.feature_cache import FeatureCache
+
+DATA_PATH = Path(__file__).resolve().parents[2] / "data" / "toxic_comments_processed.csv"
+
+
+@pytest.fixture(scope="module")
+def dataset():
+    data = pd.read_csv(DATA_PATH).head(300)
+    return data["Text"].astype(str).tolist(), data["IsToxic"].astype(int).tolist()
+
+
+@pytest.fixture
+def trainer(tmp_path):
+    trainer = ModelTrainer(models_dir=str(tmp_path / "models"))
+    trainer.feature_cache = FeatureCache(tmp_path / "cache")
+    return trainer
+
+
+def test_cached_fold_features_match_a_full_pipeline_grid_search(trainer, dataset):
+    texts, labels = dataset
+    vectorizer_config = MLToxicityClassifier("naive_bayes").vectorizer_config
+    grid = {"classifier__alpha": [0.1, 0.5, 1.0]}
+
+    folds = trainer._fold_features(texts, labels, vectorizer_config, cv=5)
+    best_params, best_score, mean_scores = trainer._cached_grid_search(
+        Pipeline([("classifier", MultinomialNB())]), grid, folds, scoring="f1"
+    )
+
+    # Referencia: vectorizador dentro del pipeline, reajustado en cada fold
+    reference = GridSearchCV(
+        Pipeline([("vectorizer", TfidfVectorizer(**vectorizer_config)), ("classifier", MultinomialNB())]),
+        grid, cv=StratifiedKFold(n_splits=5), scoring="f1"
+    ).fit(texts, labels)
+
+    np.testing.assert_allclose(mean_scores, reference.cv_results_["mean_test_score"], atol=1e-9)
+    assert best_params == reference.best_params_
+    assert best_score == pytest.approx(reference.best_score_)
+
+
+def test_validation_folds_do_not_leak_into_the_vocabulary(trainer, dataset):
+    texts, labels = dataset
+    texts = list(texts)
+    texts[0] = texts[0] + " palabrasoloenvalidacion"
+    vectorizer_config = {**MLToxicityClassifier("naive_bayes").vectorizer_config, "min_df": 1}
+
+    folds = trainer._fold_features(texts, labels, vectorizer_config, cv=5)
+    train_idx, val_idx = next(StratifiedKFold(n_splits=5).split(np.zeros(len(labels)), labels))
+    assert 0 in val_idx
+
+    # El fold se ajustó solo con su parte de entrenamiento: el término de validación no existe
+    vectorizer, X_train, _ = trainer.feature_cache.fit_transform([texts[i] for i in train_idx], vectorizer_config)
+    assert "palabrasoloenvalidacion" not in vectorizer.vocabulary_
+    assert folds[0][0].shape == X_train.shape
+    assert folds[0][2].shape == (len(val_idx), X_train.shape[1])
+    assert sum(fold[2].shape[0] for fold in folds) == len(texts)
+
+
+def test_train_single_model_with_cached_grid_search(trainer, dataset):
+    texts, labels = dataset
+    _, result = trainer.train_single_model("naive_bayes", texts, labels, use_grid_search=True)
+
+    assert result["best_params"]["classifier__alpha"] in trainer.hyperparameter_grids["naive_bayes"]["classifier__alpha"]
+    assert Path(result["model_path"]).exists()
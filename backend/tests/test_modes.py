@@ -0,0 +1,94 @@
+"""
+🧪 Pruebas del modo de clasificador por petición - ToxiGuard
+"""
+
+import json
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+
+@pytest.fixture
+def hybrid(make_hybrid):
+    return make_hybrid(result_cache=True)
+
+
+def call_app(method, path, body=None, query=b""):
+    """Llama a la aplicación ASGI directamente y devuelve (estado, JSON)"""
+    from app.main import app
+
+    payload = json.dumps(body).encode() if body is not None else b""
+    messages = [{"type": "http.request", "body": payload, "more_body": False}]
+
+    async def scenario():
+        sent = []
+
+        async def receive():
+            return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+            "query_string": query, "root_path": "",
+            "headers": [(b"content-type", b"application/json")],
+            "client": ("127.0.0.1", 50000), "server": ("127.0.0.1", 8000)
+        }
+        await app(scope, receive, send)
+        return sent
+
+    sent = asyncio.run(asyncio.wait_for(scenario(), timeout=30))
+    body = b"".join(message.get("body", b"") for message in sent[1:])
+    return sent[0]["status"], json.loads(body)
+
+
+def test_mode_resolution(hybrid, monkeypatch):
+    assert hybrid.resolve_mode(None) == hybrid.current_primary
+    assert hybrid.resolve_mode("rules") == "rules"
+    with pytest.raises(ValueError, match="no válido"):
+        hybrid.resolve_mode("bogus")
+
+    monkeypatch.setattr(hybrid.ml_classifier, "is_loaded", False)
+    assert "ml" not in hybrid.available_modes()
+    with pytest.raises(ValueError, match="no disponible"):
+        hybrid.resolve_mode("ml")
+    with pytest.raises(ValueError):
+        hybrid.set_primary_classifier("ml")
+    assert hybrid.current_primary == "advanced"
+
+
+def test_concurrent_requests_keep_their_own_mode(hybrid):
+    modes = ["rules", "advanced"] * 20
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda mode: hybrid.analyze_text(f"texto en modo {mode}", mode=mode), modes))
+
+    assert [result["details"]["mode"] for result in results] == modes
+    assert [result["model_used"] == "hybrid_rule_fallback" for result in results] == [m == "rules" for m in modes]
+    assert hybrid.current_primary == "advanced"
+
+
+def test_cache_entries_are_kept_per_mode(hybrid):
+    rules = hybrid.analyze_text("eres un idiota", mode="rules")
+    advanced = hybrid.analyze_text("eres un idiota", mode="advanced")
+
+    assert not advanced["details"].get("cached")
+    assert advanced["model_used"] != rules["model_used"]
+    assert hybrid.analyze_text("eres un idiota", mode="rules")["details"]["cached"]
+
+
+def test_analyze_endpoint_uses_and_validates_the_mode():
+    status, body = call_app("POST", "/analyze", {"text": "eres un idiota", "mode": "advanced"})
+    assert status == 200
+    assert body["mode"] == "advanced"
+
+    status, body = call_app("POST", "/analyze", {"text": "eres un idiota", "mode": "bogus"})
+    assert status == 400
+
+    status, _ = call_app("POST", "/switch-classifier", query=b"classifier_type=bogus")
+    assert status == 400
+    from app.main import primary_classifier
+    assert primary_classifier.current_primary == "advanced"
@@ -0,0 +1,84 @@
+"""
+🧪 Pruebas del cabezal multi-etiqueta - ToxiGuard
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+from ml.compaction import CompactVectorizer
+from ml.config import MULTILABEL_CONFIG, RANDOM_STATE
+from ml.multilabel import MultiLabelHead, load_head_for_vectorizer, preprocess_text, vectorizer_signature
+
+DATA_PATH = Path(__file__).resolve().parents[2] / "data" / "toxic_comments_processed.csv"
+
+
+@pytest.fixture(scope="module")
+def trained():
+    data = pd.read_csv(DATA_PATH)
+    label_columns = [column for column in MULTILABEL_CONFIG["labels"] if column in data.columns]
+    texts = data[MULTILABEL_CONFIG["text_column"]].map(preprocess_text).tolist()
+    vectorizer = TfidfVectorizer(min_df=2).fit(texts)
+    X = vectorizer.transform(texts)
+    Y = data[label_columns].fillna(0).astype(int).to_numpy()
+    head = MultiLabelHead.fit(X, Y, label_columns, signature=vectorizer_signature(vectorizer))
+    return head, vectorizer, X, Y, label_columns
+
+
+def test_single_matmul_matches_one_model_per_label(trained):
+    head, _, X, Y, label_columns = trained
+    probabilities = head.predict_proba(X[:50])
+
+    for k, category in enumerate(head.categories):
+        column = next(j for j, c in enumerate(label_columns)
+                      if MULTILABEL_CONFIG["labels"][c]["category"] == category)
+        model = LogisticRegression(**MULTILABEL_CONFIG["model"], random_state=RANDOM_STATE).fit(X, Y[:, column])
+        np.testing.assert_allclose(probabilities[:, k], model.predict_proba(X[:50])[:, 1], rtol=1e-10)
+
+
+def test_detect_applies_per_label_thresholds(trained):
+    head, _, X, _, _ = trained
+    probabilities = head.predict_proba(X[:100])
+    detected = head.detect(X[:100])
+
+    for row, found in enumerate(detected):
+        expected = {category for k, category in enumerate(head.categories)
+                    if probabilities[row, k] >= head.thresholds[k]}
+        assert set(found) == expected
+    assert (head.predict(X[:100]) == (probabilities >= head.thresholds)).all()
+
+
+def test_head_is_only_loaded_for_its_vectorizer(trained, tmp_path):
+    head, vectorizer, _, _, _ = trained
+    path = str(tmp_path / "head.pkl")
+    head.save(path)
+
+    loaded = load_head_for_vectorizer(path, vectorizer)
+    np.testing.assert_array_equal(loaded.coef, head.coef)
+    assert loaded.categories == head.categories
+
+    other = TfidfVectorizer().fit(["otro vocabulario distinto"])
+    assert load_head_for_vectorizer(path, other) is None
+    assert load_head_for_vectorizer(str(tmp_path / "missing.pkl"), vectorizer) is None
+
+
+def test_head_is_ignored_without_signature_or_with_another_width(trained, tmp_path):
+    head, vectorizer, _, _, _ = trained
+    path = str(tmp_path / "head.pkl")
+    head.save(path)
+
+    # Vectorizadores sin vocabulario_: la huella no es calculable
+    assert load_head_for_vectorizer(path, HashingVectorizer(n_features=head.coef.shape[0])) is None
+    compact = CompactVectorizer.from_tfidf(vectorizer, np.arange(head.coef.shape[0] // 2))
+    assert load_head_for_vectorizer(path, compact) is None
+
+    # Cabezal antiguo sin huella: se exige la misma anchura de salida
+    unsigned = MultiLabelHead(head.categories, head.coef, head.intercept, head.thresholds)
+    unsigned.save(path)
+    assert load_head_for_vectorizer(path, vectorizer) is not None
+    narrower = TfidfVectorizer(max_features=head.coef.shape[0] // 2).fit(vectorizer.get_feature_names_out())
+    assert load_head_for_vectorizer(path, narrower) is None
@@ -0,0 +1,103 @@
+"""
+🧪 Pruebas de la caché de resultados versionada - ToxiGuard
+"""
+
+import pytest
+
+import app.result_cache as result_cache_module
+from app.advanced_toxicity_classifier import AdvancedToxicityClassifier
+from app.result_cache import ResultCache, decode_result, encode_result
+
+VERSIONS = {"lexicon": "l1", "model": "m1"}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(result_cache_module.time, "monotonic", fake)
+    return fake
+
+
+def test_key_normalizes_text_and_separates_mode_versions_and_explain():
+    cache = ResultCache({"enabled": True})
+    key = cache.make_key("eres  un\tidiota ", "ml", VERSIONS)
+
+    assert cache.make_key("eres un idiota", "ml", VERSIONS) == key
+    assert cache.make_key("e\u0301l", "ml", VERSIONS) == cache.make_key("\u00e9l", "ml", VERSIONS)
+    assert cache.make_key("eres un idiota", "rules", VERSIONS) != key
+    assert cache.make_key("eres un idiota", "ml", {**VERSIONS, "model": "m2"}) != key
+    assert cache.make_key("eres un idiota", "ml", VERSIONS, explain="none") != key
+
+
+def test_payloads_round_trip_and_compress_large_results():
+    small = {"details": {"explanations": {}}, "toxicity_percentage": 12.5}
+    large = {"details": {"explanations": {"texto": "x" * 5000}}}
+
+    assert encode_result(small, 1024)[:1] == b"j"
+    assert encode_result(large, 1024)[:1] == b"z"
+    assert decode_result(encode_result(large, 1024)) == large
+
+
+def test_entries_are_copies_and_lru_evicts_by_count():
+    cache = ResultCache({"enabled": True, "max_entries": 2})
+    cache.put("a", {"details": {"n": 1}})
+    cache.put("b", {"details": {"n": 2}})
+
+    hit = cache.get("a")
+    hit["details"]["n"] = 99
+    assert cache.get("a") == {"details": {"n": 1}}
+
+    cache.put("c", {"details": {"n": 3}})   # "b" es la menos usada
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_memory_bound_evicts_and_skips_oversize_results():
+    cache = ResultCache({"enabled": True, "max_bytes": 400, "compress_above_bytes": 10 ** 6})
+    for i in range(10):
+        cache.put(f"k{i}", {"details": {"pad": "x" * 60}})
+
+    stats = cache.get_stats()
+    assert stats["memory_bytes"] <= 400
+    assert 0 < stats["entries"] < 10
+    assert cache.get("k9") is not None
+
+    cache.put("huge", {"details": {"pad": "x" * 1000}})
+    assert cache.get("huge") is None
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = ResultCache({"enabled": True, "ttl_seconds": 10})
+    cache.put("a", {"details": {}})
+
+    clock.now += 9
+    assert cache.get("a") is not None
+    clock.now += 2
+    assert cache.get("a") is None
+    assert cache.get_stats()["expirations"] == 1
+
+
+def test_hybrid_cache_is_invalidated_when_a_lexicon_changes(make_hybrid):
+    hybrid = make_hybrid(result_cache=True)
+    hybrid.advanced_classifier = AdvancedToxicityClassifier()
+
+    before = hybrid.analyze_text("eres un zoquete", mode="advanced")
+    assert hybrid.analyze_text("eres un zoquete", mode="advanced")["details"]["cached"]
+
+    # Editar el léxico y recompilar cambia la versión: la entrada antigua no se reutiliza
+    hybrid.advanced_classifier.toxicity_categories["insulto_moderado"]["keywords"]["zoquete"] = 0.9
+    hybrid.advanced_classifier._compile_patterns()
+    after = hybrid.analyze_text("eres un zoquete", mode="advanced")
+
+    assert not after["details"].get("cached")
+    assert after["toxicity_percentage"] > before["toxicity_percentage"]
+    assert hybrid.result_cache.get_stats()["invalidations"] == 1
@@ -0,0 +1,140 @@
+"""
+🧪 Pruebas del enrutado por hash consistente con varios procesos - ToxiGuard
+Cada nodo es un proceso independiente (con su propia semilla de hash de Python)
+que usa ClusterRouter para decidir si analiza o reenvía al dueño del texto
+"""
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import unicodedata
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+from app.result_cache import normalize_text
+from app.routing import HashRing
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+# Nodo mínimo: el mismo route()/forward() que /analyze, sin cargar los modelos
+NODE_SCRIPT = """
+import json, sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from app.routing import ClusterRouter
+
+router = ClusterRouter({"nodes": sys.argv[2].split(","), "self_node": sys.argv[1],
+                        "forward_timeout_seconds": 2})
+
+class Handler(BaseHTTPRequestHandler):
+    def _reply(self, body):
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        owner = router.route(payload["text"], self.headers.get(router.forwarded_header))
+        forwarded = router.forward(owner, "/analyze", payload) if owner else None
+        self._reply(forwarded[1] if forwarded else {"analyzed_by": router.self_node})
+
+    def do_GET(self):
+        self._reply(router.get_stats())
+
+    def log_message(self, *args):
+        pass
+
+ThreadingHTTPServer(("127.0.0.1", int(sys.argv[1].rsplit(":", 1)[1])), Handler).serve_forever()
+"""
+
+TEXTS = ["eres un idiota", "Hola, ¿qué tal?", "me encanta este vídeo", "cállate ya, inútil",
+         "buen trabajo equipo", "nadie te quiere aquí", "gracias por compartir", "vaya basura de post"]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _text_owned_by(ring: HashRing, node: str) -> str:
+    return next(f"comentario {i}" for i in range(10000) if ring.node_for(f"comentario {i}") == node)
+
+
+def _request(node: str, text: str = None):
+    data = json.dumps({"text": text}).encode() if text is not None else None
+    request = urllib.request.Request(node + ("/analyze" if data else "/"), data=data,
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=5) as response:
+        return json.loads(response.read())
+
+
+@pytest.fixture
+def cluster():
+    nodes = [f"http://127.0.0.1:{_free_port()}" for _ in range(3)]
+    processes = {}
+    for seed, node in enumerate(nodes):
+        env = {**os.environ, "PYTHONPATH": str(BACKEND_DIR), "PYTHONHASHSEED": str(seed + 1)}
+        processes[node] = subprocess.Popen([sys.executable, "-c", NODE_SCRIPT, node, ",".join(nodes)],
+                                           env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    deadline = time.monotonic() + 15
+    for node in nodes:
+        while True:
+            try:
+                _request(node)
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+
+    yield nodes, processes
+    for process in processes.values():
+        process.kill()
+        process.wait()
+
+
+def test_same_normalized_text_always_reaches_the_same_owner(cluster):
+    nodes, _ = cluster
+    ring = HashRing(nodes)
+
+    for text in TEXTS:
+        expected = ring.node_for(normalize_text(text))
+        # Cualquier nodo de entrada y cualquier variante normalizable llega al mismo dueño
+        for entry in nodes:
+            for variant in (text, f"  {text}  ", text.replace(" ", " \t "), unicodedata.normalize("NFD", text)):
+                assert _request(entry, variant)["analyzed_by"] == expected
+
+    stats = [_request(node) for node in nodes]
+    assert sum(node_stats["forwarded"] for node_stats in stats) > 0
+    assert sum(node_stats["forward_errors"] for node_stats in stats) == 0
+
+
+def test_texts_of_a_down_node_are_analyzed_locally(cluster):
+    nodes, processes = cluster
+    ring = HashRing(nodes)
+    down, entry = nodes[2], nodes[0]
+    text = _text_owned_by(ring, down)
+    survivor_text = _text_owned_by(ring, nodes[1])
+
+    processes[down].kill()
+    processes[down].wait()
+
+    assert _request(entry, text)["analyzed_by"] == entry
+    # Durante la retirada no se vuelve a intentar el nodo caído
+    assert _request(entry, text)["analyzed_by"] == entry
+    # Los textos de los nodos vivos se siguen reenviando a su dueño
+    assert _request(entry, survivor_text)["analyzed_by"] == nodes[1]
+
+    stats = _request(entry)
+    assert stats["down_nodes"] == [down]
+    assert stats["forward_errors"] == 1
+    assert stats["fallbacks"] == 2
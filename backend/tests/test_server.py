@@ -0,0 +1,132 @@
+"""
+🧪 Pruebas del lanzador pre-fork - ToxiGuard
+"""
+
+import os
+import sys
+import time
+import signal
+import socket
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from app.server import PreforkServer, create_socket, read_memory_kb
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+# Maestro con un worker de prueba (sin uvicorn): cada conexión recibe el pid del
+# worker, si hereda el heap congelado y el backend de la caché compartida (el
+# módulo se importa antes de arrancar); "crash" termina el worker con error
+SERVER_SCRIPT = """
+import gc, os, sys
+import app.shared_cache
+from app.server import PreforkServer
+from app.shared_cache import shared_cache
+
+def serve(app, sock, config):
+    while True:
+        conn, _ = sock.accept()
+        with conn:
+            conn.sendall(f"{os.getpid()} {os.getppid()} {gc.get_freeze_count() > 0} {app is not None} "
+                         f"{shared_cache.config['backend']}\\n".encode())
+            if conn.recv(16) == b"crash":
+                os._exit(3)
+
+sys.exit(PreforkServer({"host": "127.0.0.1", "port": int(sys.argv[1]), "workers": 2,
+                        "restart_delay": 0.1, "memory_report_delay": 0.0}, serve=serve).run())
+"""
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _connect(port, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            conn = socket.create_connection(("127.0.0.1", port), timeout=10)
+            pid, ppid, frozen, has_app, backend = conn.makefile().readline().split()
+            return conn, int(pid), int(ppid), frozen == "True", has_app == "True", backend
+        except (ConnectionRefusedError, ValueError):
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.2)
+
+
+def test_read_memory_kb():
+    memory = read_memory_kb(os.getpid())
+    if not memory:
+        pytest.skip("/proc/<pid>/smaps_rollup no disponible")
+
+    assert set(memory) == {"rss_kb", "pss_kb", "uss_kb"}
+    assert 0 < memory["uss_kb"] <= memory["rss_kb"]
+    assert read_memory_kb(2 ** 22 + 1) == {}
+
+
+def test_create_socket_is_inheritable_and_listening():
+    sock = create_socket("127.0.0.1", 0, 16)
+    try:
+        assert sock.get_inheritable()
+        socket.create_connection(sock.getsockname(), timeout=2).close()
+    finally:
+        sock.close()
+
+
+def test_memory_report_lists_master_and_workers():
+    server = PreforkServer({"workers": 0})
+    server.workers = {os.getpid(): 0}
+
+    report = server.memory_report()
+
+    assert [entry["process"] for entry in report] == ["master", "worker-0"]
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requiere os.fork")
+def test_workers_share_the_socket_restart_and_stop(tmp_path):
+    port = _free_port()
+    env = {key: value for key, value in os.environ.items() if key != "SHARED_CACHE_BACKEND"}
+    env["SHARED_CACHE_PATH"] = str(tmp_path / "result_cache.db")
+    master = subprocess.Popen([sys.executable, "-W", "ignore", "-c", SERVER_SCRIPT, str(port)], env=env,
+                              cwd=str(BACKEND_DIR), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        # Mantener abierta la primera conexión obliga al segundo worker a aceptar la siguiente
+        first, pid_a, ppid_a, frozen, has_app, backend = _connect(port)
+        second, pid_b, ppid_b, _, _, _ = _connect(port)
+        assert pid_a != pid_b
+        assert ppid_a == ppid_b == master.pid
+        assert frozen and has_app
+        # Sin SHARED_CACHE_BACKEND el servidor activa SQLite aunque el módulo ya estuviera importado
+        assert backend == "sqlite"
+
+        # Un worker caído se relanza con el mismo socket
+        first.sendall(b"crash")
+        first.close()
+        third, pid_c, ppid_c, _, _, _ = _connect(port)
+        assert pid_c not in (pid_a, pid_b) and ppid_c == master.pid
+        second.close()
+        third.close()
+
+        master.send_signal(signal.SIGTERM)
+        assert master.wait(timeout=10) == 0
+        for pid in (pid_b, pid_c):
+            with pytest.raises(ProcessLookupError):
+                os.kill(pid, 0)
+    finally:
+        if master.poll() is None:
+            master.kill()
+            master.wait()
+
+
+def test_module_entry_point_does_not_import_the_app_twice():
+    result = subprocess.run([sys.executable, "-W", "ignore", "-m", "app.main", "--help"],
+                            cwd=str(BACKEND_DIR), capture_output=True, text=True, timeout=60)
+
+    assert result.returncode == 0
+    assert "--workers" in result.stdout
+    # La aplicación (y el historial) no se cargan antes de que el lanzador lo pida
+    assert "historial" not in result.stdout + result.stderr
@@ -0,0 +1,70 @@
+"""
+🧪 Pruebas de la caché compartida de resultados - ToxiGuard
+"""
+
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from app.result_cache import decode_result, encode_result
+from app.shared_cache import InMemoryRedis, RedisSharedBackend, SharedResultCache, SQLiteSharedBackend
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+def test_importing_the_module_does_not_create_a_cache_file(tmp_path):
+    env = {key: value for key, value in os.environ.items() if not key.startswith("SHARED_CACHE_")}
+    env["PYTHONPATH"] = str(BACKEND_DIR)
+    code = "from app.shared_cache import shared_cache; print(shared_cache.enabled)"
+    output = subprocess.run([sys.executable, "-c", code], cwd=tmp_path, env=env,
+                            capture_output=True, text=True, check=True).stdout
+
+    assert output.strip() == "False"
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_in_memory_redis_round_trip_and_ttl():
+    client = InMemoryRedis()
+    cache = SharedResultCache({"ttl_seconds": 1}, backend=RedisSharedBackend(client, "test:"))
+    result = {"toxic": True, "score": 0.9, "labels": ["insult"]}
+
+    cache.put_payload("a", encode_result(result))
+    assert cache.flush()
+    assert decode_result(cache.get("a")) == result
+    assert cache.get_many(["a", "b"]).keys() == {"a"}
+
+    stats = cache.get_stats()
+    assert stats["backend"] == "redis" and stats["entries"] == 1
+    assert stats["hits"] == 2 and stats["misses"] == 1 and stats["writes"] == 1
+
+    # Caduca con el TTL de SET EX
+    client._data["test:a"] = (client._data["test:a"][0], time.time() - 1)
+    assert cache.get("a") is None
+    cache.close()
+
+
+def test_sqlite_get_many_stays_under_the_variable_limit(tmp_path):
+    backend = SQLiteSharedBackend(str(tmp_path / "cache.db"), max_entries=1000, max_variables=50)
+    items = [(f"key-{i}", f"value-{i}".encode()) for i in range(300)]
+    backend.set_many(items, ttl_seconds=60)
+
+    # Con un límite de 50 parámetros una única consulta IN (?, …) de 300 claves fallaría
+    backend._connect().setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 50)
+    found = backend.get_many([key for key, _ in items] + ["missing"])
+
+    assert found == dict(items)
+    backend.close()
+
+
+def test_default_backend_only_applies_when_none_is_configured():
+    unset = SharedResultCache({"backend": ""})
+    assert not unset.enabled
+    assert unset.use_default_backend("memory")
+    assert unset.backend.name == "redis"
+
+    disabled = SharedResultCache({"backend": "none"})
+    assert not disabled.use_default_backend("memory")
+    assert disabled.backend is None
@@ -0,0 +1,130 @@
+"""
+🧪 Pruebas del single-flight de análisis - ToxiGuard
+"""
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.single_flight import SingleFlight
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condición no alcanzada"
+        time.sleep(0.005)
+
+
+class BlockingCall:
+    """Función del líder que espera a que se liberen las llamadas"""
+
+    def __init__(self, result=None, error=None):
+        self.release = threading.Event()
+        self.calls = 0
+        self.result = result if result is not None else {"details": {"score": 1}}
+        self.error = error
+
+    def __call__(self):
+        self.calls += 1
+        assert self.release.wait(5)
+        if self.error:
+            raise self.error
+        return self.result
+
+
+def run_concurrently(group, key, fn, n):
+    pool = ThreadPoolExecutor(max_workers=n)
+    futures = [pool.submit(group.do, key, fn) for _ in range(n)]
+    wait_for(lambda: group.get_stats()["coalesced"] == n - 1)
+    fn.release.set()
+    pool.shutdown(wait=True)
+    return futures
+
+
+def test_concurrent_calls_share_one_execution():
+    group = SingleFlight({"enabled": True})
+    fn = BlockingCall()
+
+    results = [future.result() for future in run_concurrently(group, "k", fn, 8)]
+
+    assert fn.calls == 1
+    assert sorted(coalesced for _, coalesced in results) == [False] + [True] * 7
+    assert all(result == fn.result for result, _ in results)
+    # Cada seguidor recibe su propia copia
+    assert len({id(result) for result, _ in results}) == 8
+    stats = group.get_stats()
+    assert stats["leaders"] == 1 and stats["max_waiters"] == 7 and stats["in_flight_keys"] == 0
+
+
+def test_leader_error_is_shared_with_followers():
+    group = SingleFlight({"enabled": True})
+    fn = BlockingCall(error=RuntimeError("fallo del líder"))
+
+    futures = run_concurrently(group, "k", fn, 4)
+
+    for future in futures:
+        with pytest.raises(RuntimeError, match="fallo del líder"):
+            future.result()
+    assert fn.calls == 1
+    assert group.get_stats()["shared_errors"] == 3
+
+    # La clave queda libre: la siguiente llamada vuelve a ejecutar
+    assert group.do("k", lambda: 42) == (42, False)
+
+
+def test_slow_leader_lets_followers_compute_on_their_own():
+    group = SingleFlight({"enabled": True, "wait_timeout_seconds": 0.05})
+    fn = BlockingCall()
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        leader = pool.submit(group.do, "k", fn)
+        wait_for(lambda: group.get_stats()["in_flight_keys"] == 1)
+        result, coalesced = group.do("k", lambda: "independiente")
+        fn.release.set()
+        assert leader.result() == (fn.result, False)
+
+    assert (result, coalesced) == ("independiente", False)
+    assert group.get_stats()["timeouts"] == 1
+
+
+def test_different_keys_disabled_group_and_missing_key_do_not_coalesce():
+    group = SingleFlight({"enabled": True})
+    first, second = BlockingCall(), BlockingCall()
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        futures = [pool.submit(group.do, "a", first), pool.submit(group.do, "b", second)]
+        wait_for(lambda: group.get_stats()["in_flight_keys"] == 2)
+        first.release.set()
+        second.release.set()
+    assert [future.result()[1] for future in futures] == [False, False]
+
+    assert SingleFlight({"enabled": False}).do("k", lambda: 1) == (1, False)
+    assert group.do(None, lambda: 2) == (2, False)
+
+
+def test_hybrid_coalesces_identical_in_flight_analyses(make_hybrid):
+    class SlowTier:
+        is_loaded = True
+        calls = 0
+        release = threading.Event()
+
+        def analyze_batch(self, texts):
+            SlowTier.calls += 1
+            assert self.release.wait(5)
+            return [{"is_toxic": True, "toxicity_percentage": 88.0, "toxicity_level": "high_risk",
+                     "confidence": 0.9, "classification_technique": "Lento", "details": {}} for _ in texts]
+
+    hybrid = make_hybrid(single_flight=True, fake_versions=True)
+    hybrid.ml_classifier = SlowTier()
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        futures = [pool.submit(hybrid.analyze_text, "oleada de spam", mode="ml") for _ in range(6)]
+        wait_for(lambda: hybrid.single_flight.get_stats()["coalesced"] == 5)
+        SlowTier.release.set()
+    results = [future.result() for future in futures]
+
+    assert SlowTier.calls == 1
+    assert [result["toxicity_percentage"] for result in results] == [88.0] * 6
+    assert sum(bool(result["details"].get("coalesced")) for result in results) == 5
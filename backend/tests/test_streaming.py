@@ -0,0 +1,140 @@
+"""
+🧪 Pruebas del análisis en streaming - ToxiGuard
+"""
+
+import json
+import asyncio
+
+import pytest
+
+from app.streaming import iter_ndjson_lines, stream_analysis
+
+
+def fake_analyze(texts, mode):
+    """Análisis mínimo con la forma de los resultados del clasificador híbrido"""
+    return [
+        {
+            "is_toxic": "idiota" in text,
+            "toxicity_percentage": 90.0 if "idiota" in text else 0.0,
+            "toxicity_level": "alto" if "idiota" in text else "ninguno",
+            "confidence": 0.9,
+            "details": {"mode": mode}
+        }
+        for text in texts
+    ]
+
+
+async def collect(async_iterator):
+    return [item async for item in async_iterator]
+
+
+async def from_chunks(chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+def parse_output(chunks):
+    return [json.loads(line) for line in b"".join(chunks).decode("utf-8").splitlines()]
+
+
+def test_oversize_line_yields_one_error_and_resyncs_at_newline():
+    long_line = b'"' + b"x" * 100 + b'"'
+    chunks = [b'"hola"\n' + long_line[:40], long_line[40:80], long_line[80:] + b'\n"adios"\n']
+    entries = asyncio.run(collect(iter_ndjson_lines(from_chunks(chunks), max_line_bytes=32)))
+
+    assert [entry["text"] for entry in entries] == ["hola", None, "adios"]
+    assert entries[1]["error"] == "Línea demasiado larga"
+    assert [entry["index"] for entry in entries] == [0, 1, 2]
+
+
+def test_lines_split_across_chunks_and_objects_with_id():
+    chunks = [b'{"text": "eres un ', b'idiota", "id": "a"}\n\n"bien"', b"\n{malo}\n"]
+    entries = asyncio.run(collect(iter_ndjson_lines(from_chunks(chunks))))
+
+    assert [(entry["text"], entry["id"]) for entry in entries[:2]] == [("eres un idiota", "a"), ("bien", None)]
+    assert entries[2]["error"].startswith("JSON inválido")
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_stream_returns_one_line_per_input_and_summary(ordered):
+    body = b"".join(json.dumps(f"texto {i} idiota" if i % 3 else f"texto {i}").encode() + b"\n" for i in range(50))
+    chunks = [body[i:i + 37] for i in range(0, len(body), 37)]
+    output = parse_output(asyncio.run(collect(stream_analysis(
+        from_chunks(chunks), fake_analyze, "rules", ordered=ordered, config={"chunk_size": 4, "max_in_flight": 2}
+    ))))
+
+    results, summary = output[:-1], output[-1]["summary"]
+    assert summary["analyzed"] == 50 and summary["errors"] == 0
+    indices = [line["index"] for line in results]
+    assert sorted(indices) == list(range(50))
+    if ordered:
+        assert indices == list(range(50))
+    assert all(line["is_toxic"] == bool(line["index"] % 3) for line in results)
+
+
+def test_ordered_stream_emits_finished_chunk_before_input_ends():
+    """Un bloque terminado sale sin esperar a más entrada ni a max_in_flight bloques"""
+
+    async def scenario():
+        first_emitted = asyncio.Event()
+
+        async def body():
+            yield b'"uno"\n"dos"\n'
+            # El resto del cuerpo solo llega después de recibir el primer resultado
+            await first_emitted.wait()
+            yield b'"tres"\n'
+
+        output = []
+        async for data in stream_analysis(body(), fake_analyze, "rules",
+                                          config={"chunk_size": 2, "max_in_flight": 8}):
+            output.append(data)
+            first_emitted.set()
+        return parse_output(output)
+
+    output = asyncio.run(asyncio.wait_for(scenario(), timeout=10))
+    assert [line["index"] for line in output[:-1]] == [0, 1, 2]
+
+
+@pytest.mark.parametrize("spec_version", ["2.3", "2.4"])
+def test_stream_endpoint_does_not_deadlock_with_disconnect_listener(spec_version):
+    """Con ASGI < 2.4 la respuesta escucha receive() a la vez que se lee el cuerpo"""
+    from app.main import app
+
+    lines = b"".join(json.dumps({"text": f"comentario {i}", "id": i}).encode() + b"\n" for i in range(200))
+    body_messages = [
+        {"type": "http.request", "body": lines[i:i + 512], "more_body": i + 512 < len(lines)}
+        for i in range(0, len(lines), 512)
+    ]
+
+    async def scenario():
+        response_done = asyncio.Event()
+        sent = []
+
+        async def receive():
+            if body_messages:
+                return body_messages.pop(0)
+            await response_done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_done.set()
+
+        scope = {
+            "type": "http", "asgi": {"version": "3.0", "spec_version": spec_version},
+            "http_version": "1.1", "method": "POST", "scheme": "http",
+            "path": "/batch-analyze/stream", "raw_path": b"/batch-analyze/stream",
+            "query_string": b"mode=rules&chunk_size=16", "root_path": "",
+            "headers": [(b"content-type", b"application/x-ndjson")],
+            "client": ("127.0.0.1", 50000), "server": ("127.0.0.1", 8000)
+        }
+        await app(scope, receive, send)
+        return sent
+
+    sent = asyncio.run(asyncio.wait_for(scenario(), timeout=30))
+
+    assert sent[0]["status"] == 200
+    output = parse_output([message.get("body", b"") for message in sent[1:]])
+    assert [line["id"] for line in output[:-1]] == list(range(200))
+    assert output[-1]["summary"]["analyzed"] == 200
@@ -0,0 +1,47 @@
+"""
+🧪 Pruebas del entrenador en streaming - ToxiGuard
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml.streaming_trainer import StreamingTrainer
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    # Una palabra única por fila: cada fila ocupa exactamente una columna del hashing
+    rows = [{"text": f"palabra{i}", "label": "toxic" if i % 3 == 0 else "normal"} for i in range(400)]
+    path = tmp_path / "corpus.csv"
+    pd.DataFrame(rows).to_csv(path, index=False)
+    return path
+
+
+def _trainer(**config):
+    return StreamingTrainer("naive_bayes", config={"chunk_size": 64, "n_features": 2 ** 18, "ngram_range": (1, 1),
+                                                   "use_idf": True, "holdout_fraction": 0.2, **config})
+
+
+def test_idf_pass_excludes_the_holdout_rows(corpus):
+    trainer = _trainer()
+    report = trainer.train(str(corpus))
+
+    assert report["holdout_rows"] > 0
+    assert report["rows_seen"] + report["holdout_rows"] == 400
+    assert trainer.idf.n_documents == report["rows_seen"]
+
+    # Las columnas de las filas de holdout no aparecen en la frecuencia de documento
+    holdout_columns = np.concatenate([X.indices for X in trainer.holdout_X])
+    assert len(holdout_columns) == report["holdout_rows"]
+    assert not trainer.idf.document_frequency[holdout_columns].any()
+    assert trainer.idf.document_frequency.sum() == report["rows_seen"]
+
+
+def test_holdout_cap_is_respected_in_both_passes(corpus):
+    trainer = _trainer(holdout_max_rows=10)
+    report = trainer.train(str(corpus))
+
+    assert report["holdout_rows"] == 10
+    assert trainer.idf.n_documents == 390
+    assert report["holdout_metrics"]
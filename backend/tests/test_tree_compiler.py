@@ -0,0 +1,63 @@
+"""
+🧪 Pruebas del compilador de ensembles de árboles - ToxiGuard
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import ExtraTreesClassifier, GradientBoostingClassifier, RandomForestClassifier
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+from ml.tree_compiler import CompiledTreeEnsemble, check_parity, compile_if_tree_ensemble
+
+DATA_PATH = Path(__file__).resolve().parents[2] / "data" / "toxic_comments_processed.csv"
+
+
+@pytest.fixture(scope="module")
+def features():
+    df = pd.read_csv(DATA_PATH)
+    X = TfidfVectorizer(max_features=1500).fit_transform(df["Text"].fillna("").astype(str))
+    return X, df["IsToxic"].fillna(0).astype(int).to_numpy()
+
+
+@pytest.mark.parametrize("estimator", [
+    RandomForestClassifier(n_estimators=25, random_state=42),
+    ExtraTreesClassifier(n_estimators=15, max_depth=12, random_state=42),
+    GradientBoostingClassifier(n_estimators=30, max_depth=3, random_state=42),
+], ids=["random_forest", "extra_trees", "gradient_boosting"])
+def test_compiled_predictions_match_sklearn(features, estimator):
+    X, y = features
+    model = estimator.fit(X, y)
+    compiled = CompiledTreeEnsemble.from_sklearn(model)
+
+    # Lotes dispersos, densos y de una sola fila
+    for batch in (X, X[:1], X[:37].toarray()):
+        np.testing.assert_allclose(compiled.predict_proba(batch), model.predict_proba(batch), rtol=0, atol=1e-12)
+        np.testing.assert_array_equal(compiled.predict(batch), model.predict(batch))
+
+    if compiled.kind == "gradient_boosting":
+        np.testing.assert_allclose(compiled.decision_function(X), model.decision_function(X), atol=1e-12)
+    assert check_parity(model, compiled, X)["prediction_agreement"] == 1.0
+
+
+def test_export_round_trip(features, tmp_path):
+    X, y = features
+    model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+    compiled = CompiledTreeEnsemble.from_sklearn(model)
+
+    loaded = CompiledTreeEnsemble.load(compiled.export(str(tmp_path / "forest.npz")))
+
+    assert loaded.kind == "random_forest"
+    np.testing.assert_array_equal(loaded.predict_proba(X), compiled.predict_proba(X))
+
+
+def test_non_tree_models_are_left_untouched(features):
+    X, y = features
+    linear = LogisticRegression(max_iter=500).fit(X, y)
+
+    assert compile_if_tree_ensemble(linear) is linear
+    with pytest.raises(ValueError):
+        CompiledTreeEnsemble.from_sklearn(RandomForestClassifier(n_estimators=3).fit(X, np.arange(len(y)) % 3))
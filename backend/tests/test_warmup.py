@@ -0,0 +1,86 @@
+"""
+🧪 Pruebas del precalentamiento de caché - ToxiGuard
+"""
+
+import os
+
+from app.database import AnalysisHistoryDB
+from app.routing import ClusterRouter
+from app.warmup import WARMUP_COMPLETED, CacheWarmer
+
+
+class RecordingAnalyzer:
+    """analyze_texts de prueba que registra los textos de cada lote"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts, mode=None):
+        self.calls.append((list(texts), mode))
+        return [{"details": {"cached": False}} for _ in texts]
+
+
+def _history(tmp_path):
+    db = AnalysisHistoryDB(str(tmp_path / "history.db"))
+    for text in ["a", "b", "a", "c", "a", "b"]:
+        db.save_analysis(text, {"toxic": False, "score": 0.0})
+    return db
+
+
+def test_top_texts_by_frequency_and_recency(tmp_path):
+    db = _history(tmp_path)
+
+    assert [row["text"] for row in db.get_top_texts(limit=3, strategy="frequent")] == ["a", "b", "c"]
+    assert [row["text"] for row in db.get_top_texts(limit=3, strategy="recent")] == ["b", "a", "c"]
+    assert [row["text"] for row in db.get_top_texts(limit=5, scan_limit=2)] == ["b", "a"]
+
+
+def test_warms_only_owned_texts_once_per_process(tmp_path):
+    db = _history(tmp_path)
+    analyzer = RecordingAnalyzer()
+    warmer = CacheWarmer({"enabled": True, "top_n": 10, "modes": ["ml", "rules"]})
+
+    # Maestro pre-fork: precalentamiento síncrono con el filtro de propiedad del anillo
+    warmer.run(db.get_top_texts, analyzer, owns=lambda text: text != "b")
+    assert analyzer.calls == [(["a", "c"], "ml"), (["a", "c"], "rules")]
+    assert warmer.status == WARMUP_COMPLETED
+
+    # El worker hereda el estado y no vuelve a precalentar
+    warmer.start(db.get_top_texts, analyzer)
+    assert warmer.wait(1)
+    assert len(analyzer.calls) == 2
+    assert warmer.get_stats()["texts_scored"] == 4
+
+
+def test_forked_worker_skips_the_warmup(tmp_path):
+    db = _history(tmp_path)
+    analyzer = RecordingAnalyzer()
+    warmer = CacheWarmer({"enabled": True, "top_n": 10})
+    warmer.run(db.get_top_texts, analyzer)
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        warmer.start(db.get_top_texts, analyzer)
+        os.write(write_fd, str(len(analyzer.calls)).encode() if warmer.wait(1) else b"timeout")
+        os._exit(0)
+    os.close(write_fd)
+    reported = os.read(read_fd, 16)
+    os.waitpid(pid, 0)
+    os.close(read_fd)
+
+    assert reported == b"1"
+
+
+def test_router_ownership_filter():
+    nodes = ["http://node-a:8000", "http://node-b:8000"]
+    texts = [f"comentario {i}" for i in range(200)]
+    owned = {node: {text for text in texts if ClusterRouter({"nodes": nodes, "self_node": node}).owns(text)}
+             for node in nodes}
+
+    assert owned[nodes[0]] and owned[nodes[1]]
+    assert owned[nodes[0]].isdisjoint(owned[nodes[1]])
+    assert owned[nodes[0]] | owned[nodes[1]] == set(texts)
+    # Un proceso frontal no es dueño de nada; sin clúster todo es local
+    assert not any(ClusterRouter({"nodes": nodes, "self_node": ""}).owns(text) for text in texts)
+    assert all(ClusterRouter({"nodes": []}).owns(text) for text in texts)
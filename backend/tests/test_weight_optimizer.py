@@ -0,0 +1,95 @@
+"""
+🧪 Pruebas del optimizador de pesos vectorizado - ToxiGuard
+"""
+
+import numpy as np
+import pytest
+from sklearn.metrics import balanced_accuracy_score, f1_score, precision_score, recall_score
+
+from app.weight_optimizer import WeightOptimizer
+
+SKLEARN_METRICS = {
+    "f1": lambda y, p: f1_score(y, p, average="weighted", zero_division=0),
+    "precision": lambda y, p: precision_score(y, p, average="weighted", zero_division=0),
+    "recall": lambda y, p: recall_score(y, p, average="weighted", zero_division=0),
+    "balanced_accuracy": balanced_accuracy_score
+}
+
+
+@pytest.fixture
+def problem():
+    rng = np.random.RandomState(7)
+    match_matrix = rng.rand(120, 6) * (rng.rand(120, 6) < 0.3)
+    y = (match_matrix @ np.array([0.2, 0.5, 0.9, 0.8, 0.9, 0.1]) + rng.normal(0, 0.1, 120) > 0.3).astype(int)
+    candidates = rng.uniform(0.1, 1.0, size=(15, 6))
+    return match_matrix, y, candidates
+
+
+@pytest.mark.parametrize("metric", list(SKLEARN_METRICS))
+def test_vectorized_sweep_matches_sklearn(problem, metric):
+    match_matrix, y, candidates = problem
+    optimizer = WeightOptimizer()
+
+    scores, thresholds = optimizer._score_weight_candidates(match_matrix, y, candidates, metric)
+
+    for weights, score, threshold in zip(candidates, scores, thresholds):
+        rule_scores = np.minimum(1.0, match_matrix @ weights)
+        expected = max(SKLEARN_METRICS[metric](y, (rule_scores >= t).astype(int)) for t in optimizer.threshold_grid)
+        assert score == pytest.approx(expected)
+        # El umbral devuelto consigue ese score
+        assert SKLEARN_METRICS[metric](y, (rule_scores >= threshold).astype(int)) == pytest.approx(score)
+
+
+def test_chunked_sweep_gives_the_same_result(problem):
+    match_matrix, y, candidates = problem
+    optimizer = WeightOptimizer()
+    full = optimizer._score_weight_candidates(match_matrix, y, candidates, "f1")
+
+    optimizer.max_sweep_cells = len(y) * len(optimizer.threshold_grid) * 2
+    chunked = optimizer._score_weight_candidates(match_matrix, y, candidates, "f1")
+
+    np.testing.assert_allclose(full[0], chunked[0])
+    np.testing.assert_allclose(full[1], chunked[1])
+
+
+def test_grid_search_returns_weights_within_ranges(problem, monkeypatch):
+    match_matrix, y, _ = problem
+    optimizer = WeightOptimizer()
+    monkeypatch.setattr(optimizer, "_build_match_matrix", lambda texts: match_matrix)
+    data = [(f"texto {i}", int(label), "insulto_leve") for i, label in enumerate(y)]
+
+    result = optimizer.optimize_weights_grid_search(data, metric="f1")
+
+    for category, weight in result["optimized_weights"].items():
+        low, high = optimizer.weight_ranges[category]
+        assert low - 1e-9 <= weight <= high + 1e-9
+    assert result["candidates_evaluated"] >= len(optimizer._generate_weight_grid())
+    assert result["metrics"]["f1"] == pytest.approx(result["best_score"], abs=1e-4)
+    with pytest.raises(ValueError):
+        optimizer.optimize_weights_grid_search(data, metric="auc")
+
+
+def test_grid_search_fits_on_training_and_reports_validation(problem, monkeypatch):
+    match_matrix, y, _ = problem
+    rows = {f"texto {i}": i for i in range(len(y))}
+    optimizer = WeightOptimizer()
+    monkeypatch.setattr(optimizer, "_build_match_matrix",
+                        lambda texts: match_matrix[[rows[text] for text in texts]])
+    train = [(f"texto {i}", int(y[i]), "insulto_leve") for i in range(80)]
+    validation = [(f"texto {i}", int(y[i]), "insulto_leve") for i in range(80, 120)]
+    # Etiquetas de validación invertidas: si se filtraran a la búsqueda cambiarían los pesos
+    flipped = [(text, 1 - label, category) for text, label, category in validation]
+
+    in_sample = optimizer.optimize_weights_grid_search(train, metric="f1")
+    result = optimizer.optimize_weights_grid_search(train, validation_data=validation, metric="f1")
+    leaked = optimizer.optimize_weights_grid_search(train, validation_data=flipped, metric="f1")
+
+    assert result["optimized_weights"] == leaked["optimized_weights"] == in_sample["optimized_weights"]
+    assert result["threshold"] == in_sample["threshold"]
+    assert result["training_score"] == in_sample["best_score"] == in_sample["training_score"]
+    assert (result["evaluated_on"], in_sample["evaluated_on"]) == ("validation", "training")
+
+    weights = np.array(list(result["optimized_weights"].values()))
+    y_pred = (np.minimum(1.0, match_matrix[80:] @ weights) >= result["threshold"]).astype(int)
+    assert result["best_score"] == pytest.approx(SKLEARN_METRICS["f1"](y[80:], y_pred))
+    assert result["metrics"]["f1"] == pytest.approx(result["best_score"])